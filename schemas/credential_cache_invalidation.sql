@@ -0,0 +1,125 @@
+-- =========================================
+-- Credential Cache Invalidation
+-- NOTIFY on writes that change resolved tenant credentials
+-- Version: 1.0
+-- Apply after enhanced_channel_schema_migration.sql and
+-- credential_envelope_encryption.sql (the credential trigger watches its
+-- encrypted_blob and data_key_id columns)
+-- =========================================
+--
+-- Any insert or delete on saas_channel_installations or
+-- saas_channel_credentials, and any update of a column that feeds resolved
+-- credentials, sends the affected tenant channel on the channel
+-- 'saas_credential_changes':
+--
+--   {"saas_edge_id": "...", "channel_id": "...", "channel_key": "SHOPIFY",
+--    "source": "saas_channel_installations", "changed_at": "2024-01-15T10:00:00.123+00:00"}
+--
+-- get_tenant_credentials_bulk() also merges saas_channel_master's
+-- default_channel_config, so changing it (or a channel_key) notifies with a
+-- null saas_edge_id, meaning every tenant of that channel.
+--
+-- scripts/integration/credential_cache.py listens and drops the matching
+-- CredentialCache entries as soon as the writing transaction commits.
+
+BEGIN;
+
+-- =========================================
+-- 1) TRIGGER FUNCTION
+-- =========================================
+
+CREATE OR REPLACE FUNCTION notify_credential_change()
+RETURNS TRIGGER AS $$
+DECLARE
+  v_edge_id uuid;
+  v_channel_id uuid;
+  v_channel_key text;
+BEGIN
+  IF TG_TABLE_NAME = 'saas_channel_master' THEN
+    -- Old and new key, in case the channel was renamed
+    FOR v_channel_key IN SELECT DISTINCT k FROM (VALUES (OLD.channel_key), (NEW.channel_key)) v(k) LOOP
+      PERFORM pg_notify('saas_credential_changes', jsonb_build_object(
+        'saas_edge_id', NULL,
+        'channel_id', NEW.channel_id,
+        'channel_key', v_channel_key,
+        'source', TG_TABLE_NAME,
+        'changed_at', clock_timestamp()
+      )::text);
+    END LOOP;
+    RETURN NULL;
+  END IF;
+
+  -- NEW is NULL for deletes and OLD for inserts (PostgreSQL 11+); an update
+  -- moving a row to another tenant or channel invalidates both
+  FOR v_edge_id, v_channel_id IN
+    SELECT DISTINCT e, c
+    FROM (VALUES (OLD.saas_edge_id, OLD.channel_id), (NEW.saas_edge_id, NEW.channel_id)) v(e, c)
+    WHERE e IS NOT NULL
+  LOOP
+    -- NULL when the channel itself is being deleted; listeners then drop everything
+    SELECT m.channel_key INTO v_channel_key
+    FROM saas_channel_master m
+    WHERE m.channel_id = v_channel_id;
+
+    PERFORM pg_notify('saas_credential_changes', jsonb_build_object(
+      'saas_edge_id', v_edge_id,
+      'channel_id', v_channel_id,
+      'channel_key', v_channel_key,
+      'source', TG_TABLE_NAME,
+      'changed_at', clock_timestamp()
+    )::text);
+  END LOOP;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- =========================================
+-- 2) TRIGGERS
+-- =========================================
+
+-- Updates notify only when a column that feeds resolved credentials changes,
+-- so updated_at, last_tested_at or test_result writes do not flush the cache
+
+DROP TRIGGER IF EXISTS trg_notify_installation_credentials ON saas_channel_installations;
+CREATE TRIGGER trg_notify_installation_credentials
+  AFTER INSERT OR DELETE ON saas_channel_installations
+  FOR EACH ROW EXECUTE FUNCTION notify_credential_change();
+
+DROP TRIGGER IF EXISTS trg_notify_installation_credentials_update ON saas_channel_installations;
+CREATE TRIGGER trg_notify_installation_credentials_update
+  AFTER UPDATE OF installation_config, status, saas_edge_id, channel_id
+  ON saas_channel_installations
+  FOR EACH ROW
+  WHEN (OLD.installation_config IS DISTINCT FROM NEW.installation_config
+        OR OLD.status IS DISTINCT FROM NEW.status
+        OR OLD.saas_edge_id IS DISTINCT FROM NEW.saas_edge_id
+        OR OLD.channel_id IS DISTINCT FROM NEW.channel_id)
+  EXECUTE FUNCTION notify_credential_change();
+
+DROP TRIGGER IF EXISTS trg_notify_channel_credentials ON saas_channel_credentials;
+CREATE TRIGGER trg_notify_channel_credentials
+  AFTER INSERT OR DELETE ON saas_channel_credentials
+  FOR EACH ROW EXECUTE FUNCTION notify_credential_change();
+
+DROP TRIGGER IF EXISTS trg_notify_channel_credentials_update ON saas_channel_credentials;
+CREATE TRIGGER trg_notify_channel_credentials_update
+  AFTER UPDATE OF portal_credential_data, status, encrypted_blob, data_key_id, saas_edge_id, channel_id
+  ON saas_channel_credentials
+  FOR EACH ROW
+  WHEN (OLD.portal_credential_data IS DISTINCT FROM NEW.portal_credential_data
+        OR OLD.status IS DISTINCT FROM NEW.status
+        OR OLD.encrypted_blob IS DISTINCT FROM NEW.encrypted_blob
+        OR OLD.data_key_id IS DISTINCT FROM NEW.data_key_id
+        OR OLD.saas_edge_id IS DISTINCT FROM NEW.saas_edge_id
+        OR OLD.channel_id IS DISTINCT FROM NEW.channel_id)
+  EXECUTE FUNCTION notify_credential_change();
+
+DROP TRIGGER IF EXISTS trg_notify_channel_defaults ON saas_channel_master;
+CREATE TRIGGER trg_notify_channel_defaults
+  AFTER UPDATE OF default_channel_config, channel_key ON saas_channel_master
+  FOR EACH ROW
+  WHEN (OLD.default_channel_config IS DISTINCT FROM NEW.default_channel_config
+        OR OLD.channel_key IS DISTINCT FROM NEW.channel_key)
+  EXECUTE FUNCTION notify_credential_change();
+
+COMMIT;
@@ -0,0 +1,125 @@
+-- =========================================
+-- Credential Envelope Encryption
+-- Per-tenant data keys and whole-blob credential encryption
+-- Version: 1.0
+-- Apply after enhanced_channel_schema_migration.sql (requires pgcrypto)
+-- =========================================
+--
+-- Each tenant gets a random data key, stored wrapped (encrypted with the
+-- master CREDENTIAL_ENCRYPTION_KEY through encrypt_credential_data). A
+-- credential's fields are encrypted together as one blob with the data key,
+-- instead of field by field with the master key.
+--
+-- scripts/integration/credential_vault.py unwraps a tenant's data key once,
+-- decrypts a channel's blob once, and serves field lookups from a bounded,
+-- TTL-expiring in-memory cache, so the database does roughly one decrypt per
+-- tenant channel per TTL window instead of one per field per execution.
+--
+-- The master key is passed in as a parameter and never stored.
+
+BEGIN;
+
+CREATE EXTENSION IF NOT EXISTS pgcrypto;
+
+-- =========================================
+-- 1) DATA KEYS
+-- =========================================
+
+CREATE TABLE IF NOT EXISTS saas_credential_data_keys (
+  key_id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+  saas_edge_id uuid NOT NULL,
+  wrapped_key text NOT NULL,                 -- encrypt_credential_data({"data_key": ...}, master key)
+  status text NOT NULL DEFAULT 'active',     -- 'active', 'retired'
+  created_at timestamptz NOT NULL DEFAULT now(),
+  retired_at timestamptz,
+
+  CONSTRAINT ck_data_key_status CHECK (status IN ('active', 'retired'))
+);
+
+-- Retired keys stay until no blob references them
+CREATE UNIQUE INDEX IF NOT EXISTS uq_data_keys_active_edge
+  ON saas_credential_data_keys (saas_edge_id) WHERE status = 'active';
+
+-- =========================================
+-- 2) CREDENTIAL BLOB COLUMNS
+-- =========================================
+
+ALTER TABLE saas_channel_credentials
+  ADD COLUMN IF NOT EXISTS data_key_id uuid REFERENCES saas_credential_data_keys(key_id),
+  ADD COLUMN IF NOT EXISTS encrypted_blob text;   -- encrypt_credential_data(all fields, data key)
+
+CREATE INDEX IF NOT EXISTS idx_channel_creds_data_key
+  ON saas_channel_credentials (data_key_id) WHERE data_key_id IS NOT NULL;
+
+-- =========================================
+-- 3) FUNCTIONS
+-- =========================================
+
+-- Same as in enhanced_channel_schema_migration.sql. Earlier versions cast
+-- bytea::text, which yields the '\x...' hex form, so decryption always
+-- returned '{}'. convert_to/convert_from keep the UTF-8 bytes, and existing
+-- ciphertexts still decrypt.
+CREATE OR REPLACE FUNCTION encrypt_credential_data(data jsonb, encryption_key text)
+RETURNS text AS $$
+BEGIN
+  RETURN encode(encrypt(convert_to(data::text, 'UTF8'), convert_to(encryption_key, 'UTF8'), 'aes'), 'base64');
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+CREATE OR REPLACE FUNCTION decrypt_credential_data(encrypted_data text, encryption_key text)
+RETURNS jsonb AS $$
+BEGIN
+  RETURN convert_from(decrypt(decode(encrypted_data, 'base64'), convert_to(encryption_key, 'UTF8'), 'aes'), 'UTF8')::jsonb;
+EXCEPTION
+  WHEN OTHERS THEN
+    RETURN '{}'::jsonb; -- Return empty object if decryption fails
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Same, but returns NULL instead of '{}' (wrong key, corrupt blob), so the
+-- vault can tell a broken credential from an empty one. It must not raise:
+-- the failing statement, key included, would be written to the server log
+-- (log_min_error_statement)
+CREATE OR REPLACE FUNCTION decrypt_credential_data_strict(encrypted_data text, encryption_key text)
+RETURNS jsonb AS $$
+BEGIN
+  RETURN convert_from(decrypt(decode(encrypted_data, 'base64'), convert_to(encryption_key, 'UTF8'), 'aes'), 'UTF8')::jsonb;
+EXCEPTION
+  WHEN OTHERS THEN
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE SECURITY DEFINER;
+
+-- New active data key for a tenant (the previous one is retired); returns key_id
+CREATE OR REPLACE FUNCTION create_credential_data_key(p_saas_edge_id uuid, p_master_key text)
+RETURNS uuid AS $$
+DECLARE
+  v_key_id uuid;
+BEGIN
+  UPDATE saas_credential_data_keys
+  SET status = 'retired', retired_at = now()
+  WHERE saas_edge_id = p_saas_edge_id AND status = 'active';
+
+  INSERT INTO saas_credential_data_keys (saas_edge_id, wrapped_key)
+  VALUES (
+    p_saas_edge_id,
+    encrypt_credential_data(
+      jsonb_build_object('data_key', encode(gen_random_bytes(32), 'hex')),
+      p_master_key
+    )
+  )
+  RETURNING key_id INTO v_key_id;
+
+  RETURN v_key_id;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Plaintext data key; NULL if the key is unknown or the master key is wrong
+CREATE OR REPLACE FUNCTION unwrap_credential_data_key(p_key_id uuid, p_master_key text)
+RETURNS text AS $$
+  SELECT decrypt_credential_data(k.wrapped_key, p_master_key)->>'data_key'
+  FROM saas_credential_data_keys k
+  WHERE k.key_id = p_key_id;
+$$ LANGUAGE sql STABLE SECURITY DEFINER;
+
+COMMIT;
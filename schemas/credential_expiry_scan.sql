@@ -0,0 +1,83 @@
+-- =========================================
+-- Credential Expiry Scan
+-- Cursor state for the scheduled expiry scanner
+-- Version: 1.0
+-- Apply after enhanced_channel_schema_migration.sql and edge_job_dispatch.sql
+-- =========================================
+--
+-- scripts/monitoring/credential_expiry_scanner.py walks the partial index
+-- idx_channel_creds_expires in (expires_at, credential_id) order, from the
+-- position stored in credential_expiry_scan_cursors up to now() + horizon.
+-- Each batch enqueues refresh or notification jobs in saas_edge_jobs and
+-- advances the cursor in the same transaction, so each run reads only the
+-- credentials that came into the horizon since the previous run.
+--
+-- A credential whose expires_at is set, or whose status returns to 'active',
+-- at a position the cursor has already passed is recorded in
+-- credential_expiry_rescan by a trigger. The scanner drains that table on its
+-- next run. Writes that touch neither expires_at nor status (tests, renames)
+-- do not fire the trigger.
+
+BEGIN;
+
+-- =========================================
+-- 1) TABLES
+-- =========================================
+
+-- Position of each scanner: everything at or before (cursor_expires_at,
+-- cursor_credential_id) has been enqueued
+CREATE TABLE IF NOT EXISTS credential_expiry_scan_cursors (
+  scan_name text PRIMARY KEY,
+  cursor_expires_at timestamptz NOT NULL,
+  cursor_credential_id uuid NOT NULL DEFAULT '00000000-0000-0000-0000-000000000000',
+  last_run_at timestamptz,
+  updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+-- Credentials that qualified behind a scanner's cursor
+CREATE TABLE IF NOT EXISTS credential_expiry_rescan (
+  scan_name text NOT NULL REFERENCES credential_expiry_scan_cursors(scan_name) ON DELETE CASCADE,
+  credential_id uuid NOT NULL REFERENCES saas_channel_credentials(credential_id) ON DELETE CASCADE,
+  queued_at timestamptz NOT NULL DEFAULT now(),
+
+  PRIMARY KEY (scan_name, credential_id)
+);
+
+-- =========================================
+-- 2) TRIGGER
+-- =========================================
+
+CREATE OR REPLACE FUNCTION credential_expiry_on_change()
+RETURNS TRIGGER AS $$
+BEGIN
+  -- Wait for a scanner batch that is moving a cursor, then compare against
+  -- the committed position; otherwise a cursor could pass this row before it
+  -- becomes visible to the scanner.
+  PERFORM 1 FROM credential_expiry_scan_cursors FOR SHARE;
+
+  INSERT INTO credential_expiry_rescan (scan_name, credential_id)
+  SELECT s.scan_name, NEW.credential_id
+  FROM credential_expiry_scan_cursors s
+  WHERE (s.cursor_expires_at, s.cursor_credential_id) >= (NEW.expires_at, NEW.credential_id)
+  ON CONFLICT DO NOTHING;
+
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_credential_expiry_insert ON saas_channel_credentials;
+CREATE TRIGGER trg_credential_expiry_insert
+  AFTER INSERT ON saas_channel_credentials
+  FOR EACH ROW
+  WHEN (NEW.expires_at IS NOT NULL AND NEW.status = 'active')
+  EXECUTE FUNCTION credential_expiry_on_change();
+
+DROP TRIGGER IF EXISTS trg_credential_expiry_update ON saas_channel_credentials;
+CREATE TRIGGER trg_credential_expiry_update
+  AFTER UPDATE OF expires_at, status ON saas_channel_credentials
+  FOR EACH ROW
+  WHEN (NEW.expires_at IS NOT NULL AND NEW.status = 'active'
+        AND (OLD.expires_at IS DISTINCT FROM NEW.expires_at OR OLD.status IS DISTINCT FROM NEW.status))
+  EXECUTE FUNCTION credential_expiry_on_change();
+
+COMMIT;
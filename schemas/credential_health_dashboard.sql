@@ -0,0 +1,307 @@
+-- =========================================
+-- Materialized Credential Health Dashboard
+-- Incrementally maintained replacement for the v_credential_health_dashboard aggregation
+-- Version: 1.0
+-- Apply after enhanced_channel_schema_migration.sql
+-- =========================================
+--
+-- credential_health_dashboard holds one row per credential. Triggers keep it
+-- current as saas_channel_credentials, saas_channel_credential_test_history,
+-- saas_channel_installed_flows and channel names change, so
+-- v_credential_health_dashboard becomes a read of a table instead of a join of
+-- credentials, channels and flows with a GROUP BY on every page load.
+--
+-- flows_using_credential is adjusted by +1/-1 per flow change, which stays
+-- correct when flows of one credential change in concurrent transactions.
+--
+-- health_status depends on the clock (expiring_soon 7 days before expires_at,
+-- expired at expires_at, stale 30 days after last_tested_at). Each row stores
+-- health_recheck_at, the next moment its status can change by time alone;
+-- refresh_credential_health_transitions(), scheduled every few minutes by
+-- scripts/monitoring/credential_health_dashboard.py, recomputes only rows that
+-- are due.
+
+BEGIN;
+
+-- =========================================
+-- 1) HEALTH RULES
+-- =========================================
+
+-- Same rules as the original view, evaluated at p_at
+CREATE OR REPLACE FUNCTION credential_health_status(
+  p_status text, p_expires_at timestamptz, p_last_tested_at timestamptz, p_at timestamptz
+)
+RETURNS text AS $$
+  SELECT CASE
+    WHEN p_expires_at IS NOT NULL AND p_expires_at < p_at THEN 'expired'
+    WHEN p_expires_at IS NOT NULL AND p_expires_at < p_at + INTERVAL '7 days' THEN 'expiring_soon'
+    WHEN p_last_tested_at IS NULL THEN 'never_tested'
+    WHEN p_last_tested_at < p_at - INTERVAL '30 days' THEN 'stale'
+    WHEN p_status = 'active' THEN 'healthy'
+    ELSE p_status
+  END;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Next moment after p_at at which credential_health_status can change with no write
+CREATE OR REPLACE FUNCTION credential_health_recheck_at(
+  p_expires_at timestamptz, p_last_tested_at timestamptz, p_at timestamptz
+)
+RETURNS timestamptz AS $$
+  SELECT min(t)
+  FROM (VALUES (p_expires_at - INTERVAL '7 days'),
+               (p_expires_at),
+               (p_last_tested_at + INTERVAL '30 days')) v(t)
+  WHERE t >= p_at;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- =========================================
+-- 2) TABLE
+-- =========================================
+
+CREATE TABLE IF NOT EXISTS credential_health_dashboard (
+  credential_id uuid PRIMARY KEY,
+  saas_edge_id uuid NOT NULL,
+  credential_name text,
+  credential_type text,
+  status text,
+  last_tested_at timestamptz,
+  expires_at timestamptz,
+  channel_id uuid,
+  channel_name text,
+  channel_key text,
+  health_status text NOT NULL,
+  flows_using_credential bigint NOT NULL DEFAULT 0,
+
+  -- Latest saas_channel_credential_test_history entry
+  last_test_status text,
+  last_test_at timestamptz,
+
+  health_recheck_at timestamptz,            -- NULL: no time-based transition pending
+  refreshed_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_credential_health_edge
+  ON credential_health_dashboard (saas_edge_id, health_status);
+
+CREATE INDEX IF NOT EXISTS idx_credential_health_recheck
+  ON credential_health_dashboard (health_recheck_at) WHERE health_recheck_at IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_credential_health_channel
+  ON credential_health_dashboard (channel_id);
+
+-- =========================================
+-- 3) MAINTENANCE FUNCTIONS
+-- =========================================
+
+-- Rebuild every row from the source tables (initial load, drift repair)
+CREATE OR REPLACE FUNCTION rebuild_credential_health_dashboard()
+RETURNS bigint AS $$
+DECLARE
+  v_rows bigint;
+BEGIN
+  LOCK TABLE credential_health_dashboard IN EXCLUSIVE MODE;
+  DELETE FROM credential_health_dashboard;
+
+  INSERT INTO credential_health_dashboard (
+    credential_id, saas_edge_id, credential_name, credential_type, status,
+    last_tested_at, expires_at, channel_id, channel_name, channel_key,
+    health_status, flows_using_credential, last_test_status, last_test_at, health_recheck_at
+  )
+  SELECT
+    c.credential_id, c.saas_edge_id, c.credential_name, c.credential_type, c.status,
+    c.last_tested_at, c.expires_at, c.channel_id, cm.channel_name, cm.channel_key,
+    credential_health_status(c.status, c.expires_at, c.last_tested_at, now()),
+    COALESCE(f.flows, 0),
+    t.test_status, t.tested_at,
+    credential_health_recheck_at(c.expires_at, c.last_tested_at, now())
+  FROM saas_channel_credentials c
+  JOIN saas_channel_master cm ON c.channel_id = cm.channel_id
+  LEFT JOIN (
+    SELECT credential_id, count(*) AS flows
+    FROM saas_channel_installed_flows
+    WHERE credential_id IS NOT NULL
+    GROUP BY credential_id
+  ) f ON f.credential_id = c.credential_id
+  LEFT JOIN LATERAL (
+    SELECT h.test_status, h.tested_at
+    FROM saas_channel_credential_test_history h
+    WHERE h.credential_id = c.credential_id
+    ORDER BY h.tested_at DESC
+    LIMIT 1
+  ) t ON true;
+
+  GET DIAGNOSTICS v_rows = ROW_COUNT;
+  RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Recompute rows whose time-based health may have changed; returns rows updated
+CREATE OR REPLACE FUNCTION refresh_credential_health_transitions(p_limit integer DEFAULT 10000)
+RETURNS integer AS $$
+DECLARE
+  v_rows integer;
+BEGIN
+  WITH due AS (
+    SELECT credential_id
+    FROM credential_health_dashboard
+    WHERE health_recheck_at <= now()
+    ORDER BY health_recheck_at
+    LIMIT p_limit
+    FOR UPDATE SKIP LOCKED
+  )
+  UPDATE credential_health_dashboard d
+  SET health_status = credential_health_status(d.status, d.expires_at, d.last_tested_at, now()),
+      health_recheck_at = credential_health_recheck_at(d.expires_at, d.last_tested_at, now()),
+      refreshed_at = now()
+  FROM due
+  WHERE d.credential_id = due.credential_id;
+
+  GET DIAGNOSTICS v_rows = ROW_COUNT;
+  RETURN v_rows;
+END;
+$$ LANGUAGE plpgsql;
+
+-- =========================================
+-- 4) TRIGGER FUNCTIONS
+-- =========================================
+
+CREATE OR REPLACE FUNCTION credential_health_on_credential_change()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF TG_OP = 'DELETE' THEN
+    DELETE FROM credential_health_dashboard WHERE credential_id = OLD.credential_id;
+    RETURN NULL;
+  END IF;
+
+  INSERT INTO credential_health_dashboard (
+    credential_id, saas_edge_id, credential_name, credential_type, status,
+    last_tested_at, expires_at, channel_id, channel_name, channel_key,
+    health_status, flows_using_credential, health_recheck_at
+  )
+  SELECT
+    NEW.credential_id, NEW.saas_edge_id, NEW.credential_name, NEW.credential_type, NEW.status,
+    NEW.last_tested_at, NEW.expires_at, NEW.channel_id, cm.channel_name, cm.channel_key,
+    credential_health_status(NEW.status, NEW.expires_at, NEW.last_tested_at, now()),
+    -- Flows can only reference an existing credential, so this is 0 for inserts
+    (SELECT count(*) FROM saas_channel_installed_flows f WHERE f.credential_id = NEW.credential_id),
+    credential_health_recheck_at(NEW.expires_at, NEW.last_tested_at, now())
+  FROM saas_channel_master cm
+  WHERE cm.channel_id = NEW.channel_id
+  ON CONFLICT (credential_id) DO UPDATE
+  SET saas_edge_id = EXCLUDED.saas_edge_id,
+      credential_name = EXCLUDED.credential_name,
+      credential_type = EXCLUDED.credential_type,
+      status = EXCLUDED.status,
+      last_tested_at = EXCLUDED.last_tested_at,
+      expires_at = EXCLUDED.expires_at,
+      channel_id = EXCLUDED.channel_id,
+      channel_name = EXCLUDED.channel_name,
+      channel_key = EXCLUDED.channel_key,
+      health_status = EXCLUDED.health_status,
+      health_recheck_at = EXCLUDED.health_recheck_at,
+      refreshed_at = now();
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION credential_health_on_flow_change()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.credential_id IS NOT NULL THEN
+    UPDATE credential_health_dashboard
+    SET flows_using_credential = flows_using_credential - 1, refreshed_at = now()
+    WHERE credential_id = OLD.credential_id;
+  END IF;
+  IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.credential_id IS NOT NULL THEN
+    UPDATE credential_health_dashboard
+    SET flows_using_credential = flows_using_credential + 1, refreshed_at = now()
+    WHERE credential_id = NEW.credential_id;
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION credential_health_on_test()
+RETURNS TRIGGER AS $$
+BEGIN
+  UPDATE credential_health_dashboard
+  SET last_test_status = NEW.test_status,
+      last_test_at = NEW.tested_at,
+      refreshed_at = now()
+  WHERE credential_id = NEW.credential_id
+    AND (last_test_at IS NULL OR last_test_at <= NEW.tested_at);
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION credential_health_on_channel_change()
+RETURNS TRIGGER AS $$
+BEGIN
+  UPDATE credential_health_dashboard
+  SET channel_name = NEW.channel_name,
+      channel_key = NEW.channel_key,
+      refreshed_at = now()
+  WHERE channel_id = NEW.channel_id;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- =========================================
+-- 5) TRIGGERS
+-- =========================================
+
+DROP TRIGGER IF EXISTS trg_credential_health_credentials ON saas_channel_credentials;
+CREATE TRIGGER trg_credential_health_credentials
+  AFTER INSERT OR UPDATE OR DELETE ON saas_channel_credentials
+  FOR EACH ROW EXECUTE FUNCTION credential_health_on_credential_change();
+
+DROP TRIGGER IF EXISTS trg_credential_health_flows ON saas_channel_installed_flows;
+CREATE TRIGGER trg_credential_health_flows
+  AFTER INSERT OR DELETE ON saas_channel_installed_flows
+  FOR EACH ROW EXECUTE FUNCTION credential_health_on_flow_change();
+
+DROP TRIGGER IF EXISTS trg_credential_health_flow_credential ON saas_channel_installed_flows;
+CREATE TRIGGER trg_credential_health_flow_credential
+  AFTER UPDATE OF credential_id ON saas_channel_installed_flows
+  FOR EACH ROW
+  WHEN (OLD.credential_id IS DISTINCT FROM NEW.credential_id)
+  EXECUTE FUNCTION credential_health_on_flow_change();
+
+DROP TRIGGER IF EXISTS trg_credential_health_tests ON saas_channel_credential_test_history;
+CREATE TRIGGER trg_credential_health_tests
+  AFTER INSERT ON saas_channel_credential_test_history
+  FOR EACH ROW EXECUTE FUNCTION credential_health_on_test();
+
+DROP TRIGGER IF EXISTS trg_credential_health_channels ON saas_channel_master;
+CREATE TRIGGER trg_credential_health_channels
+  AFTER UPDATE OF channel_name, channel_key ON saas_channel_master
+  FOR EACH ROW
+  WHEN (OLD.channel_name IS DISTINCT FROM NEW.channel_name
+        OR OLD.channel_key IS DISTINCT FROM NEW.channel_key)
+  EXECUTE FUNCTION credential_health_on_channel_change();
+
+-- =========================================
+-- 6) INITIAL LOAD AND VIEW
+-- =========================================
+
+SELECT rebuild_credential_health_dashboard();
+
+-- Same columns as before, plus the latest test result
+CREATE OR REPLACE VIEW v_credential_health_dashboard AS
+SELECT
+  d.credential_id,
+  d.saas_edge_id,
+  d.credential_name,
+  d.credential_type,
+  d.status,
+  d.last_tested_at,
+  d.expires_at,
+  d.channel_name,
+  d.channel_key,
+  d.health_status,
+  d.flows_using_credential,
+  d.last_test_status,
+  d.last_test_at
+FROM credential_health_dashboard d;
+
+COMMIT;
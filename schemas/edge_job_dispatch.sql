@@ -0,0 +1,54 @@
+-- =========================================
+-- Edge Job Dispatch
+-- Lease columns and queue indexes for pulling saas_edge_jobs in parallel
+-- Version: 1.0
+-- Apply after base_channel_schema.sql (and time_partitioning_migration.sql if used)
+-- =========================================
+--
+-- scripts/monitoring/edge_job_dispatcher.py claims pending jobs in batches with
+-- FOR UPDATE SKIP LOCKED, so workers never wait on each other's row locks:
+--
+--   pending  --claim-->  running (lease_owner, lease_expires_at)
+--   running  --complete-->  success
+--   running  --fail-->  pending again (available_at = retry time) or error
+--   running, lease expired  --reclaim-->  pending (or error after max attempts)
+--
+-- 'success'/'error' are the terminal values the n8n workflow templates write
+-- to job_status as well.
+--
+-- Running workers extend lease_expires_at with a heartbeat. started_at stays
+-- the enqueue time (it is the partition key), so jobs are claimed oldest first.
+--
+-- All new columns are nullable or have constant defaults, so adding them does
+-- not rewrite the table.
+
+BEGIN;
+
+-- =========================================
+-- 1) COLUMNS
+-- =========================================
+
+ALTER TABLE saas_edge_jobs
+  ADD COLUMN IF NOT EXISTS available_at timestamptz,              -- not claimable before; NULL = now
+  ADD COLUMN IF NOT EXISTS attempts integer NOT NULL DEFAULT 0,   -- claims so far
+  ADD COLUMN IF NOT EXISTS lease_owner text,                      -- worker id holding the job
+  ADD COLUMN IF NOT EXISTS claimed_at timestamptz,
+  ADD COLUMN IF NOT EXISTS lease_expires_at timestamptz,
+  ADD COLUMN IF NOT EXISTS heartbeat_at timestamptz;
+
+-- =========================================
+-- 2) INDEXES
+-- =========================================
+
+-- Queue head: only pending rows, in claim order. Stays small however many
+-- finished jobs the table holds.
+CREATE INDEX IF NOT EXISTS idx_edge_jobs_pending
+  ON saas_edge_jobs (started_at)
+  WHERE job_status = 'pending';
+
+-- Expired-lease scan
+CREATE INDEX IF NOT EXISTS idx_edge_jobs_leases
+  ON saas_edge_jobs (lease_expires_at)
+  WHERE job_status = 'running';
+
+COMMIT;
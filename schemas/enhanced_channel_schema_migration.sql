@@ -240,7 +240,7 @@ CREATE INDEX IF NOT EXISTS idx_n8n_flows_webhook ON saas_n8n_flows (requires_web
 CREATE OR REPLACE FUNCTION encrypt_credential_data(data jsonb, encryption_key text)
 RETURNS text AS $$
 BEGIN
-  RETURN encode(encrypt(data::text::bytea, encryption_key::bytea, 'aes'), 'base64');
+  RETURN encode(encrypt(convert_to(data::text, 'UTF8'), convert_to(encryption_key, 'UTF8'), 'aes'), 'base64');
 END;
 $$ LANGUAGE plpgsql SECURITY DEFINER;
 
@@ -248,7 +248,7 @@ $$ LANGUAGE plpgsql SECURITY DEFINER;
 CREATE OR REPLACE FUNCTION decrypt_credential_data(encrypted_data text, encryption_key text)
 RETURNS jsonb AS $$
 BEGIN
-  RETURN decrypt(decode(encrypted_data, 'base64'), encryption_key::bytea, 'aes')::text::jsonb;
+  RETURN convert_from(decrypt(decode(encrypted_data, 'base64'), convert_to(encryption_key, 'UTF8'), 'aes'), 'UTF8')::jsonb;
 EXCEPTION
   WHEN OTHERS THEN
     RETURN '{}'::jsonb; -- Return empty object if decryption fails
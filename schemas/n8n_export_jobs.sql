@@ -0,0 +1,72 @@
+-- =========================================
+-- N8N Log Export Job Tracking
+-- Asynchronous export jobs for the log export Cloud Function
+-- Version: 1.0
+-- Apply to the n8n database (the one the exporter reads)
+-- =========================================
+
+BEGIN;
+
+-- =========================================
+-- 1) TABLES
+-- =========================================
+
+CREATE TABLE IF NOT EXISTS n8n_export_jobs (
+  job_id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+
+  -- Identity: target date plus filters; duplicate triggers share a key
+  dedupe_key text NOT NULL,
+  target_date date NOT NULL,
+  filters jsonb NOT NULL DEFAULT '{}',
+
+  -- State
+  status text NOT NULL DEFAULT 'queued',     -- 'queued', 'running', 'success', 'error'
+  progress jsonb NOT NULL DEFAULT '{}',      -- stage, uploaded_files, total_groups, ...
+  result jsonb,                              -- export_logs() result on success
+  error_message text,
+  requested_by text,                         -- e.g. 'cloud-scheduler'
+  duplicate_requests integer NOT NULL DEFAULT 0,
+
+  -- Timestamps
+  created_at timestamptz NOT NULL DEFAULT now(),
+  started_at timestamptz,
+  heartbeat_at timestamptz,                  -- refreshed while running
+  completed_at timestamptz,
+  updated_at timestamptz NOT NULL DEFAULT now(),
+
+  CONSTRAINT chk_export_jobs_status CHECK (status IN ('queued', 'running', 'success', 'error'))
+);
+
+-- =========================================
+-- 2) INDEXES
+-- =========================================
+
+-- At most one queued/running job per dedupe key; concurrent inserts collapse here
+CREATE UNIQUE INDEX IF NOT EXISTS uq_export_jobs_active_key
+  ON n8n_export_jobs (dedupe_key)
+  WHERE status IN ('queued', 'running');
+
+CREATE INDEX IF NOT EXISTS idx_export_jobs_key_created
+  ON n8n_export_jobs (dedupe_key, created_at DESC);
+
+CREATE INDEX IF NOT EXISTS idx_export_jobs_target_date
+  ON n8n_export_jobs (target_date);
+
+-- =========================================
+-- 3) TRIGGERS
+-- =========================================
+
+CREATE OR REPLACE FUNCTION touch_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at = now();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_export_jobs_touch ON n8n_export_jobs;
+CREATE TRIGGER trg_export_jobs_touch
+  BEFORE UPDATE ON n8n_export_jobs
+  FOR EACH ROW EXECUTE FUNCTION touch_updated_at();
+
+COMMIT;
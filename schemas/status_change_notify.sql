@@ -0,0 +1,100 @@
+-- =========================================
+-- Status Change Notifications
+-- NOTIFY on edge job and installed flow status transitions
+-- Version: 1.0
+-- Apply after base_channel_schema.sql (and time_partitioning_migration.sql if used)
+-- =========================================
+--
+-- Every status transition of saas_edge_jobs (job_status) and
+-- saas_channel_installed_flows (status), and every new row, sends a compact
+-- JSON payload on the channel 'saas_status_events':
+--
+--   {"kind": "job", "id": "...", "saas_edge_id": "...", "status": "running",
+--    "previous_status": "pending", "job_type": "catalog_sync",
+--    "updated_at": "2024-01-15T10:00:00.123+00:00"}
+--
+-- Flow events carry "channel_id" instead of "job_type". Notifications are
+-- delivered at commit, so listeners never see rolled-back transitions.
+--
+-- scripts/monitoring/status_event_stream.py listens, fans events out to
+-- callbacks or Server-Sent Events clients, and after a reconnect catches up
+-- by reading rows with updated_at past its cursor (indexes below).
+
+BEGIN;
+
+-- =========================================
+-- 1) TRIGGER FUNCTION
+-- =========================================
+
+CREATE OR REPLACE FUNCTION notify_status_change()
+RETURNS TRIGGER AS $$
+DECLARE
+  v_payload jsonb;
+BEGIN
+  -- OLD is NULL for inserts (PostgreSQL 11+), so previous_status is null then
+  IF TG_ARGV[0] = 'job' THEN
+    v_payload := jsonb_build_object(
+      'kind', 'job',
+      'id', NEW.job_id,
+      'saas_edge_id', NEW.saas_edge_id,
+      'status', NEW.job_status,
+      'previous_status', OLD.job_status,
+      'job_type', NEW.job_type,
+      'updated_at', NEW.updated_at
+    );
+  ELSE
+    v_payload := jsonb_build_object(
+      'kind', 'flow',
+      'id', NEW.saas_flow_id,
+      'saas_edge_id', NEW.saas_edge_id,
+      'status', NEW.status,
+      'previous_status', OLD.status,
+      'channel_id', NEW.channel_id,
+      'updated_at', NEW.updated_at
+    );
+  END IF;
+
+  PERFORM pg_notify('saas_status_events', v_payload::text);
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- =========================================
+-- 2) TRIGGERS
+-- =========================================
+
+DROP TRIGGER IF EXISTS trg_notify_edge_job_insert ON saas_edge_jobs;
+CREATE TRIGGER trg_notify_edge_job_insert
+  AFTER INSERT ON saas_edge_jobs
+  FOR EACH ROW EXECUTE FUNCTION notify_status_change('job');
+
+DROP TRIGGER IF EXISTS trg_notify_edge_job_status ON saas_edge_jobs;
+CREATE TRIGGER trg_notify_edge_job_status
+  AFTER UPDATE OF job_status ON saas_edge_jobs
+  FOR EACH ROW
+  WHEN (OLD.job_status IS DISTINCT FROM NEW.job_status)
+  EXECUTE FUNCTION notify_status_change('job');
+
+DROP TRIGGER IF EXISTS trg_notify_installed_flow_insert ON saas_channel_installed_flows;
+CREATE TRIGGER trg_notify_installed_flow_insert
+  AFTER INSERT ON saas_channel_installed_flows
+  FOR EACH ROW EXECUTE FUNCTION notify_status_change('flow');
+
+DROP TRIGGER IF EXISTS trg_notify_installed_flow_status ON saas_channel_installed_flows;
+CREATE TRIGGER trg_notify_installed_flow_status
+  AFTER UPDATE OF status ON saas_channel_installed_flows
+  FOR EACH ROW
+  WHEN (OLD.status IS DISTINCT FROM NEW.status)
+  EXECUTE FUNCTION notify_status_change('flow');
+
+-- =========================================
+-- 3) CATCH-UP INDEXES
+-- =========================================
+
+CREATE INDEX IF NOT EXISTS idx_edge_jobs_updated
+  ON saas_edge_jobs (updated_at);
+
+CREATE INDEX IF NOT EXISTS idx_installed_flows_updated
+  ON saas_channel_installed_flows (updated_at);
+
+COMMIT;
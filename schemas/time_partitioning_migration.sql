@@ -0,0 +1,416 @@
+-- =========================================
+-- Time-Partitioned Webhook Logs and Edge Jobs
+-- Declarative range partitioning with retention automation
+-- Version: 1.0
+-- Apply after base_channel_schema.sql and enhanced_channel_schema_migration.sql
+-- Requires PostgreSQL 13+
+-- =========================================
+--
+-- Converts saas_channel_webhook_logs (by received_at) and saas_edge_jobs
+-- (by started_at) into range-partitioned tables without copying rows:
+--
+--   1. The existing table is renamed to <table>_legacy
+--   2. A partitioned table with the original name, columns, defaults,
+--      indexes, foreign keys and triggers is created
+--   3. <table>_legacy is attached as the partition FROM (MINVALUE) TO
+--      (start of the next day/week), so existing rows stay where they are
+--   4. A DEFAULT partition and the next `premake` day/week partitions are
+--      created
+--   5. Views that read the table are recreated against the partitioned table
+--
+-- Attaching validates the legacy rows against the partition bound (one
+-- sequential scan) and replaces the id primary key with an (id, partition
+-- column) key, building its index under an exclusive lock on the table, so
+-- run the migration in a maintenance window on large tables. The legacy
+-- partition is dropped or detached by the retention job once its upper bound
+-- is older than the retention period.
+--
+-- Afterwards run scripts/monitoring/partition_maintenance.py (or
+-- SELECT * FROM run_time_partition_maintenance(); from pg_cron) at least
+-- daily to create future partitions and expire old ones.
+
+BEGIN;
+
+-- =========================================
+-- 1) POLICY TABLE
+-- =========================================
+
+-- Detached partitions are moved here for archiving before being dropped manually
+CREATE SCHEMA IF NOT EXISTS partition_archive;
+
+CREATE TABLE IF NOT EXISTS time_partition_policies (
+  parent_table text PRIMARY KEY,
+  partition_column text NOT NULL,
+  granularity text NOT NULL DEFAULT 'day',      -- 'day', 'week'
+  premake integer NOT NULL DEFAULT 7,           -- future partitions kept ahead of now()
+  retention interval,                           -- NULL keeps partitions forever
+  retention_action text NOT NULL DEFAULT 'detach', -- 'detach' (to partition_archive), 'drop'
+  created_at timestamptz NOT NULL DEFAULT now(),
+  updated_at timestamptz NOT NULL DEFAULT now(),
+
+  CONSTRAINT chk_partition_policy_granularity CHECK (granularity IN ('day', 'week')),
+  CONSTRAINT chk_partition_policy_action CHECK (retention_action IN ('detach', 'drop')),
+  CONSTRAINT chk_partition_policy_premake CHECK (premake >= 1)
+);
+
+-- Existing rows are kept so re-running the migration does not reset tuned policies
+INSERT INTO time_partition_policies (parent_table, partition_column, granularity, premake, retention, retention_action)
+VALUES
+  ('saas_channel_webhook_logs', 'received_at', 'day', 7, INTERVAL '30 days', 'detach'),
+  ('saas_edge_jobs', 'started_at', 'week', 4, INTERVAL '180 days', 'detach')
+ON CONFLICT (parent_table) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION touch_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at = now();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_touch_partition_policies ON time_partition_policies;
+CREATE TRIGGER trg_touch_partition_policies
+  BEFORE UPDATE ON time_partition_policies
+  FOR EACH ROW EXECUTE FUNCTION touch_updated_at();
+
+-- =========================================
+-- 2) PARTITION FUNCTIONS
+-- =========================================
+
+-- Start of the UTC day/week containing p_ts
+CREATE OR REPLACE FUNCTION time_partition_bucket(p_ts timestamptz, p_granularity text)
+RETURNS timestamptz AS $$
+  SELECT date_trunc(p_granularity, p_ts AT TIME ZONE 'UTC') AT TIME ZONE 'UTC';
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Partitions of a table with their bounds (range_start is -infinity for MINVALUE)
+CREATE OR REPLACE FUNCTION time_partitions(p_parent text)
+RETURNS TABLE (partition_name text, range_start timestamptz, range_end timestamptz, is_default boolean) AS $$
+  SELECT
+    c.relname::text,
+    CASE WHEN b.expr = 'DEFAULT' THEN NULL
+         WHEN b.expr LIKE 'FOR VALUES FROM (MINVALUE)%' THEN '-infinity'::timestamptz
+         ELSE substring(b.expr FROM $re$FROM \('([^']+)'\)$re$)::timestamptz END,
+    CASE WHEN b.expr = 'DEFAULT' THEN NULL
+         WHEN b.expr LIKE '%TO (MAXVALUE)' THEN 'infinity'::timestamptz
+         ELSE substring(b.expr FROM $re$TO \('([^']+)'\)$re$)::timestamptz END,
+    b.expr = 'DEFAULT'
+  FROM pg_inherits i
+  JOIN pg_class c ON c.oid = i.inhrelid
+  CROSS JOIN LATERAL (SELECT pg_get_expr(c.relpartbound, c.oid) AS expr) b
+  WHERE i.inhparent = p_parent::regclass
+  ORDER BY 3 NULLS LAST;
+$$ LANGUAGE sql STABLE;
+
+-- Create the missing day/week partitions from p_from (default now()) through
+-- `premake` buckets ahead. Rows already sitting in the DEFAULT partition for a
+-- new range are moved into it. Returns the partitions created (or, with
+-- p_dry_run, the ones that would be created).
+CREATE OR REPLACE FUNCTION ensure_time_partitions(
+  p_parent text,
+  p_from timestamptz DEFAULT NULL,
+  p_dry_run boolean DEFAULT false
+)
+RETURNS SETOF text AS $$
+DECLARE
+  v_policy time_partition_policies%ROWTYPE;
+  v_step interval;
+  v_start timestamptz;
+  v_end timestamptz;
+  v_next timestamptz;
+  v_name text;
+  v_default text;
+  v_default_rows boolean;
+BEGIN
+  SELECT * INTO v_policy FROM time_partition_policies WHERE parent_table = p_parent;
+  IF NOT FOUND THEN
+    RAISE EXCEPTION 'No time_partition_policies row for %', p_parent;
+  END IF;
+
+  v_step := ('1 ' || v_policy.granularity)::interval;
+  v_start := time_partition_bucket(COALESCE(p_from, now()), v_policy.granularity);
+  -- Never recreate ranges the retention job would expire straight away
+  IF v_policy.retention IS NOT NULL THEN
+    WHILE v_start + v_step <= now() - v_policy.retention LOOP
+      v_start := v_start + v_step;
+    END LOOP;
+  END IF;
+  v_end := time_partition_bucket(now(), v_policy.granularity) + v_step * v_policy.premake;
+  SELECT partition_name INTO v_default FROM time_partitions(p_parent) WHERE is_default;
+
+  WHILE v_start <= v_end LOOP
+    v_next := v_start + v_step;
+    v_name := p_parent || '_p' || to_char(v_start AT TIME ZONE 'UTC', 'YYYYMMDD');
+
+    IF NOT EXISTS (
+      SELECT 1 FROM time_partitions(p_parent)
+      WHERE NOT is_default AND range_start < v_next AND range_end > v_start
+    ) THEN
+      IF NOT p_dry_run THEN
+        v_default_rows := false;
+        IF v_default IS NOT NULL THEN
+          EXECUTE format('SELECT EXISTS (SELECT 1 FROM %I WHERE %I >= $1 AND %I < $2)',
+                         v_default, v_policy.partition_column, v_policy.partition_column)
+            INTO v_default_rows USING v_start, v_next;
+        END IF;
+
+        IF v_default_rows THEN
+          -- CREATE ... PARTITION OF fails while the default holds rows of the range
+          EXECUTE format('CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', v_name, p_parent);
+          EXECUTE format('WITH moved AS (DELETE FROM %I WHERE %I >= $1 AND %I < $2 RETURNING *) '
+                         'INSERT INTO %I SELECT * FROM moved',
+                         v_default, v_policy.partition_column, v_policy.partition_column, v_name)
+            USING v_start, v_next;
+          EXECUTE format('ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                         p_parent, v_name, v_start, v_next);
+        ELSE
+          EXECUTE format('CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                         v_name, p_parent, v_start, v_next);
+        END IF;
+      END IF;
+      RETURN NEXT v_name;
+    END IF;
+
+    v_start := v_next;
+  END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Detach (into partition_archive) or drop partitions whose upper bound is older
+-- than the retention period. The DEFAULT partition is never expired.
+CREATE OR REPLACE FUNCTION expire_time_partitions(p_parent text, p_dry_run boolean DEFAULT false)
+RETURNS TABLE (partition_name text, range_end timestamptz, action text) AS $$
+DECLARE
+  v_policy time_partition_policies%ROWTYPE;
+  v_partition record;
+BEGIN
+  SELECT * INTO v_policy FROM time_partition_policies WHERE parent_table = p_parent;
+  IF NOT FOUND THEN
+    RAISE EXCEPTION 'No time_partition_policies row for %', p_parent;
+  END IF;
+  IF v_policy.retention IS NULL THEN
+    RETURN;
+  END IF;
+
+  FOR v_partition IN
+    SELECT p.partition_name, p.range_end FROM time_partitions(p_parent) p
+    WHERE NOT p.is_default AND p.range_end <= now() - v_policy.retention
+    ORDER BY p.range_end
+  LOOP
+    IF NOT p_dry_run THEN
+      IF v_policy.retention_action = 'drop' THEN
+        EXECUTE format('DROP TABLE %I', v_partition.partition_name);
+      ELSE
+        EXECUTE format('ALTER TABLE %I DETACH PARTITION %I', p_parent, v_partition.partition_name);
+        EXECUTE format('ALTER TABLE %I SET SCHEMA partition_archive', v_partition.partition_name);
+      END IF;
+    END IF;
+    partition_name := v_partition.partition_name;
+    range_end := v_partition.range_end;
+    action := v_policy.retention_action;
+    RETURN NEXT;
+  END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- One maintenance pass over every policy: pre-create, expire, and report rows
+-- that landed in a DEFAULT partition (a sign premake is too small)
+CREATE OR REPLACE FUNCTION run_time_partition_maintenance(p_dry_run boolean DEFAULT false)
+RETURNS TABLE (parent_table text, partition_name text, action text, detail text) AS $$
+DECLARE
+  v_policy time_partition_policies%ROWTYPE;
+  v_name text;
+  v_default text;
+  v_rows bigint;
+  v_expired record;
+BEGIN
+  FOR v_policy IN SELECT * FROM time_partition_policies ORDER BY parent_table LOOP
+    IF to_regclass(v_policy.parent_table) IS NULL
+       OR (SELECT relkind FROM pg_class WHERE oid = to_regclass(v_policy.parent_table)) <> 'p' THEN
+      parent_table := v_policy.parent_table; partition_name := NULL;
+      action := 'skipped'; detail := 'table is not partitioned';
+      RETURN NEXT;
+      CONTINUE;
+    END IF;
+
+    FOR v_name IN SELECT * FROM ensure_time_partitions(v_policy.parent_table, NULL, p_dry_run) LOOP
+      parent_table := v_policy.parent_table; partition_name := v_name;
+      action := 'created'; detail := NULL;
+      RETURN NEXT;
+    END LOOP;
+
+    FOR v_expired IN SELECT * FROM expire_time_partitions(v_policy.parent_table, p_dry_run) LOOP
+      parent_table := v_policy.parent_table; partition_name := v_expired.partition_name;
+      action := CASE v_expired.action WHEN 'drop' THEN 'dropped' ELSE 'detached' END;
+      detail := 'range_end ' || v_expired.range_end;
+      RETURN NEXT;
+    END LOOP;
+
+    SELECT p.partition_name INTO v_default FROM time_partitions(v_policy.parent_table) p WHERE p.is_default;
+    IF v_default IS NOT NULL THEN
+      EXECUTE format('SELECT count(*) FROM %I', v_default) INTO v_rows;
+      IF v_rows > 0 THEN
+        parent_table := v_policy.parent_table; partition_name := v_default;
+        action := 'default_rows'; detail := v_rows || ' rows outside every range partition';
+        RETURN NEXT;
+      END IF;
+    END IF;
+  END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Convert an existing table to range partitions on its policy's column,
+-- attaching the current table as the <table>_legacy partition
+CREATE OR REPLACE FUNCTION convert_to_time_partitioned(p_table text)
+RETURNS void AS $$
+DECLARE
+  v_policy time_partition_policies%ROWTYPE;
+  v_legacy text := p_table || '_legacy';
+  v_cutoff timestamptz;
+  v_pk_columns text;
+  v_pk_name text;
+  v_pk_has_column boolean;
+  v_index_defs text[];
+  v_fk_defs text[];
+  v_trigger_defs text[];
+  v_trigger_names text[];
+  v_views text[];
+  v_view_defs text[];
+  v_def text;
+  v_name text;
+  i integer;
+BEGIN
+  SELECT * INTO v_policy FROM time_partition_policies WHERE parent_table = p_table;
+  IF NOT FOUND THEN
+    RAISE EXCEPTION 'No time_partition_policies row for %', p_table;
+  END IF;
+  IF to_regclass(p_table) IS NULL THEN
+    RAISE NOTICE '% does not exist, skipping', p_table;
+    RETURN;
+  END IF;
+  IF (SELECT relkind FROM pg_class WHERE oid = p_table::regclass) = 'p' THEN
+    RAISE NOTICE '% is already partitioned', p_table;
+    RETURN;
+  END IF;
+
+  -- Capture definitions while they still print the original table name
+  SELECT c.conname, string_agg(quote_ident(a.attname), ', ' ORDER BY k.ord),
+         bool_or(a.attname = v_policy.partition_column)
+    INTO v_pk_name, v_pk_columns, v_pk_has_column
+  FROM pg_constraint c
+  CROSS JOIN LATERAL unnest(c.conkey) WITH ORDINALITY k(attnum, ord)
+  JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = k.attnum
+  WHERE c.conrelid = p_table::regclass AND c.contype = 'p'
+  GROUP BY c.conname;
+
+  SELECT array_agg(pg_get_indexdef(ix.indexrelid)) INTO v_index_defs
+  FROM pg_index ix
+  WHERE ix.indrelid = p_table::regclass
+    AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = ix.indexrelid);
+
+  IF EXISTS (SELECT 1 FROM pg_index ix WHERE ix.indrelid = p_table::regclass AND ix.indisunique
+             AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = ix.indexrelid)) THEN
+    RAISE EXCEPTION '% has unique indexes that do not include %; partitioning would drop them',
+      p_table, v_policy.partition_column;
+  END IF;
+
+  SELECT array_agg(format('ALTER TABLE %I ADD CONSTRAINT %I %s', p_table, conname, pg_get_constraintdef(oid)))
+    INTO v_fk_defs
+  FROM pg_constraint WHERE conrelid = p_table::regclass AND contype = 'f';
+
+  SELECT array_agg(pg_get_triggerdef(oid)), array_agg(tgname::text)
+    INTO v_trigger_defs, v_trigger_names
+  FROM pg_trigger WHERE tgrelid = p_table::regclass AND NOT tgisinternal;
+
+  SELECT array_agg(v.oid::regclass::text ORDER BY v.oid), array_agg(pg_get_viewdef(v.oid) ORDER BY v.oid)
+    INTO v_views, v_view_defs
+  FROM pg_class v
+  WHERE v.relkind = 'v' AND v.oid IN (
+    SELECT r.ev_class FROM pg_depend d JOIN pg_rewrite r ON r.oid = d.objid
+    WHERE d.refobjid = p_table::regclass AND r.ev_class <> p_table::regclass);
+
+  -- 1) Move the current table out of the way
+  EXECUTE format('ALTER TABLE %I RENAME TO %I', p_table, v_legacy);
+  IF v_pk_name IS NOT NULL THEN
+    -- Replaced by the (id, partition column) key on attach. Fails if another
+    -- table references the old key; such foreign keys cannot survive partitioning.
+    EXECUTE format('ALTER TABLE %I DROP CONSTRAINT %I', v_legacy, v_pk_name);
+  END IF;
+  FOR v_name IN
+    SELECT c.relname FROM pg_index ix JOIN pg_class c ON c.oid = ix.indexrelid
+    WHERE ix.indrelid = v_legacy::regclass
+      AND NOT EXISTS (SELECT 1 FROM pg_constraint k WHERE k.conindid = ix.indexrelid)
+  LOOP
+    EXECUTE format('ALTER INDEX %I RENAME TO %I', v_name, left(v_name, 56) || '_legacy');
+  END LOOP;
+  FOR i IN 1 .. COALESCE(array_length(v_trigger_names, 1), 0) LOOP
+    EXECUTE format('DROP TRIGGER %I ON %I', v_trigger_names[i], v_legacy);
+  END LOOP;
+
+  -- 2) Partitioned table with the original name and shape
+  EXECUTE format('CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING COMMENTS) '
+                 'PARTITION BY RANGE (%I)', p_table, v_legacy, v_policy.partition_column);
+  IF v_pk_columns IS NOT NULL THEN
+    IF NOT v_pk_has_column THEN
+      v_pk_columns := v_pk_columns || ', ' || quote_ident(v_policy.partition_column);
+    END IF;
+    EXECUTE format('ALTER TABLE %I ADD CONSTRAINT %I PRIMARY KEY (%s)', p_table, p_table || '_pkey', v_pk_columns);
+  END IF;
+  FOREACH v_def IN ARRAY COALESCE(v_fk_defs, '{}') LOOP
+    EXECUTE v_def;
+  END LOOP;
+  FOREACH v_def IN ARRAY COALESCE(v_index_defs, '{}') LOOP
+    EXECUTE v_def;
+  END LOOP;
+
+  -- 3) Attach the existing rows as one partition ending at the next bucket.
+  -- The temporary CHECK lets ATTACH skip its own validation scan.
+  v_cutoff := time_partition_bucket(now(), v_policy.granularity) + ('1 ' || v_policy.granularity)::interval;
+  EXECUTE format('ALTER TABLE %I ADD CONSTRAINT %I CHECK (%I < %L)',
+                 v_legacy, v_legacy || '_range', v_policy.partition_column, v_cutoff);
+  EXECUTE format('ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (MINVALUE) TO (%L)',
+                 p_table, v_legacy, v_cutoff);
+  EXECUTE format('ALTER TABLE %I DROP CONSTRAINT %I', v_legacy, v_legacy || '_range');
+
+  -- 4) Default and future partitions
+  EXECUTE format('CREATE TABLE %I PARTITION OF %I DEFAULT', p_table || '_default', p_table);
+  PERFORM ensure_time_partitions(p_table, v_cutoff);
+
+  -- 5) Triggers (cloned to every partition) and dependent views
+  FOREACH v_def IN ARRAY COALESCE(v_trigger_defs, '{}') LOOP
+    EXECUTE v_def;
+  END LOOP;
+  FOR i IN 1 .. COALESCE(array_length(v_views, 1), 0) LOOP
+    EXECUTE format('CREATE OR REPLACE VIEW %s AS %s', v_views[i], v_view_defs[i]);
+  END LOOP;
+
+  RAISE NOTICE 'Partitioned % by % (%), legacy rows before %',
+    p_table, v_policy.partition_column, v_policy.granularity, v_cutoff;
+END;
+$$ LANGUAGE plpgsql;
+
+-- =========================================
+-- 3) CONVERT TABLES
+-- =========================================
+
+SELECT convert_to_time_partitioned('saas_channel_webhook_logs');
+SELECT convert_to_time_partitioned('saas_edge_jobs');
+
+COMMIT;
+
+-- =========================================
+-- MIGRATION COMPLETE
+-- =========================================
+
+DO $$
+BEGIN
+    RAISE NOTICE '==========================================';
+    RAISE NOTICE 'Time Partitioning Migration Applied';
+    RAISE NOTICE '==========================================';
+    RAISE NOTICE '';
+    RAISE NOTICE 'Partitioned tables:';
+    RAISE NOTICE '  - saas_channel_webhook_logs (received_at, daily, 30 day retention)';
+    RAISE NOTICE '  - saas_edge_jobs (started_at, weekly, 180 day retention)';
+    RAISE NOTICE '';
+    RAISE NOTICE 'Schedule scripts/monitoring/partition_maintenance.py daily.';
+END $$;
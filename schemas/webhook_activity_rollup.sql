@@ -0,0 +1,84 @@
+-- =========================================
+-- Hourly Webhook Activity Rollup
+-- Incrementally maintained replacement for the v_webhook_activity_summary aggregation
+-- Version: 1.0
+-- Apply after enhanced_channel_schema_migration.sql
+-- =========================================
+--
+-- webhook_activity_hourly holds one row per (hour, saas_edge_id, channel_id).
+-- scripts/monitoring/webhook_activity_rollup.py folds the webhook log rows
+-- received since the watermark in rollup_watermarks into it, so
+-- v_webhook_activity_summary becomes a read of ~24 rows per tenant and channel
+-- instead of an aggregation over a day of raw logs with two joins.
+--
+-- Percentiles cannot be added together, so each row also keeps a mergeable
+-- latency sketch (response_time_sketch, the DDSketch format used by the log
+-- exporters) from which p95_response_time_ms is recomputed on every merge.
+
+BEGIN;
+
+-- =========================================
+-- 1) TABLES
+-- =========================================
+
+CREATE TABLE IF NOT EXISTS webhook_activity_hourly (
+  activity_hour timestamptz NOT NULL,
+  saas_edge_id uuid NOT NULL,
+  channel_id uuid NOT NULL,
+  channel_name text,
+
+  -- Request counts
+  total_requests bigint NOT NULL DEFAULT 0,
+  successful_requests bigint NOT NULL DEFAULT 0,   -- processing_status = 'success'
+  error_requests bigint NOT NULL DEFAULT 0,        -- processing_status = 'error'
+  client_error_requests bigint NOT NULL DEFAULT 0, -- response_status 4xx
+  server_error_requests bigint NOT NULL DEFAULT 0, -- response_status 5xx
+
+  -- Latency (rows without response_time_ms are not counted here)
+  response_time_count bigint NOT NULL DEFAULT 0,
+  response_time_sum_ms bigint NOT NULL DEFAULT 0,
+  max_response_time_ms integer,
+  p95_response_time_ms double precision,
+  response_time_sketch jsonb,                       -- DDSketch, 1% relative accuracy
+
+  updated_at timestamptz NOT NULL DEFAULT now(),
+
+  PRIMARY KEY (activity_hour, saas_edge_id, channel_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_webhook_activity_hourly_edge
+  ON webhook_activity_hourly (saas_edge_id, activity_hour DESC);
+
+-- Progress of incremental rollups: everything received before watermark is folded in
+CREATE TABLE IF NOT EXISTS rollup_watermarks (
+  rollup_name text PRIMARY KEY,
+  watermark timestamptz NOT NULL,
+  updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+-- =========================================
+-- 2) VIEWS
+-- =========================================
+
+-- Same columns as before, plus HTTP error counts and p95. Hours are complete
+-- up to the rollup watermark (a few minutes behind real time).
+CREATE OR REPLACE VIEW v_webhook_activity_summary AS
+SELECT
+  h.saas_edge_id,
+  h.channel_id,
+  h.channel_name,
+  h.activity_hour,
+  h.total_requests,
+  h.successful_requests,
+  h.error_requests,
+  CASE WHEN h.response_time_count > 0
+       THEN h.response_time_sum_ms::numeric / h.response_time_count END as avg_response_time_ms,
+  h.max_response_time_ms,
+  h.client_error_requests,
+  h.server_error_requests,
+  h.p95_response_time_ms
+FROM webhook_activity_hourly h
+WHERE h.activity_hour >= date_trunc('hour', now() - INTERVAL '24 hours')
+ORDER BY h.activity_hour DESC;
+
+COMMIT;
@@ -0,0 +1,36 @@
+-- =========================================
+-- Webhook Body Offload
+-- Pointer columns for request/response bodies kept in object storage
+-- Version: 1.0
+-- Apply after enhanced_channel_schema_migration.sql (and time_partitioning_migration.sql if used)
+-- =========================================
+--
+-- Bodies larger than WEBHOOK_BODY_OFFLOAD_THRESHOLD_BYTES are written by
+-- scripts/monitoring/webhook_body_store.py to GCS (or a local directory) as
+-- <prefix>/<YYYY-MM-DD>/<saas_edge_id>/<sha256>.json.gz. For those rows
+-- request_body / response_body is NULL and *_ref holds the object path;
+-- *_size_bytes is the size of the serialized JSON, inline or not.
+--
+-- Adding nullable columns without defaults is a catalog-only change, also on
+-- the partitioned table, so this does not rewrite existing logs.
+
+BEGIN;
+
+ALTER TABLE saas_channel_webhook_logs
+  ADD COLUMN IF NOT EXISTS request_body_ref text,
+  ADD COLUMN IF NOT EXISTS request_body_size_bytes integer,
+  ADD COLUMN IF NOT EXISTS request_body_sha256 text,
+  ADD COLUMN IF NOT EXISTS response_body_ref text,
+  ADD COLUMN IF NOT EXISTS response_body_size_bytes integer,
+  ADD COLUMN IF NOT EXISTS response_body_sha256 text;
+
+COMMENT ON COLUMN saas_channel_webhook_logs.request_body_ref IS
+  'Object path of the offloaded request body; request_body is NULL when set';
+COMMENT ON COLUMN saas_channel_webhook_logs.request_body_sha256 IS
+  'SHA-256 (hex) of the offloaded request body JSON, verified on load';
+COMMENT ON COLUMN saas_channel_webhook_logs.response_body_ref IS
+  'Object path of the offloaded response body; response_body is NULL when set';
+COMMENT ON COLUMN saas_channel_webhook_logs.response_body_sha256 IS
+  'SHA-256 (hex) of the offloaded response body JSON, verified on load';
+
+COMMIT;
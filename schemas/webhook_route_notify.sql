@@ -0,0 +1,74 @@
+-- =========================================
+-- Webhook Route Notifications
+-- NOTIFY on writes that change which installed flow a webhook path reaches
+-- Version: 1.0
+-- Apply after enhanced_channel_schema_migration.sql
+-- =========================================
+--
+-- scripts/integration/webhook_router.py keeps every active installed flow's
+-- webhook path in an in-memory segment trie. Writes that can change a route
+-- are sent on the channel 'saas_webhook_route_changes':
+--
+--   {"saas_flow_id": "...", "changed_at": "..."}   installed flow added,
+--                                                  changed or removed
+--   {"n8n_flow_id": "...", "changed_at": "..."}    template webhook path or
+--                                                  operation changed; affects
+--                                                  every flow installed from it
+--
+-- The router reloads only the named flows. Updates to other columns (e.g.
+-- last_execution_at after every run) do not notify.
+
+BEGIN;
+
+-- =========================================
+-- 1) TRIGGER FUNCTION
+-- =========================================
+
+CREATE OR REPLACE FUNCTION notify_webhook_route_change()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF TG_TABLE_NAME = 'saas_n8n_flows' THEN
+    PERFORM pg_notify('saas_webhook_route_changes', jsonb_build_object(
+      'n8n_flow_id', NEW.n8n_flow_id,
+      'changed_at', clock_timestamp()
+    )::text);
+    RETURN NULL;
+  END IF;
+
+  PERFORM pg_notify('saas_webhook_route_changes', jsonb_build_object(
+    'saas_flow_id', COALESCE(NEW.saas_flow_id, OLD.saas_flow_id),
+    'changed_at', clock_timestamp()
+  )::text);
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- =========================================
+-- 2) TRIGGERS
+-- =========================================
+
+DROP TRIGGER IF EXISTS trg_notify_webhook_route_flows ON saas_channel_installed_flows;
+CREATE TRIGGER trg_notify_webhook_route_flows
+  AFTER INSERT OR DELETE ON saas_channel_installed_flows
+  FOR EACH ROW EXECUTE FUNCTION notify_webhook_route_change();
+
+DROP TRIGGER IF EXISTS trg_notify_webhook_route_flow_update ON saas_channel_installed_flows;
+CREATE TRIGGER trg_notify_webhook_route_flow_update
+  AFTER UPDATE OF status, saas_edge_id, channel_id, n8n_flow_id, flow_config ON saas_channel_installed_flows
+  FOR EACH ROW
+  WHEN (OLD.status IS DISTINCT FROM NEW.status
+        OR OLD.saas_edge_id IS DISTINCT FROM NEW.saas_edge_id
+        OR OLD.channel_id IS DISTINCT FROM NEW.channel_id
+        OR OLD.n8n_flow_id IS DISTINCT FROM NEW.n8n_flow_id
+        OR OLD.flow_config->'webhook_path' IS DISTINCT FROM NEW.flow_config->'webhook_path')
+  EXECUTE FUNCTION notify_webhook_route_change();
+
+DROP TRIGGER IF EXISTS trg_notify_webhook_route_templates ON saas_n8n_flows;
+CREATE TRIGGER trg_notify_webhook_route_templates
+  AFTER UPDATE OF n8n_webhook_path, operation ON saas_n8n_flows
+  FOR EACH ROW
+  WHEN (OLD.n8n_webhook_path IS DISTINCT FROM NEW.n8n_webhook_path
+        OR OLD.operation IS DISTINCT FROM NEW.operation)
+  EXECUTE FUNCTION notify_webhook_route_change();
+
+COMMIT;
@@ -46,6 +46,7 @@ fi
 # Deploy the Cloud Function
 echo -e "${YELLOW}Deploying Cloud Function: ${FUNCTION_NAME}${NC}"
 gcloud functions deploy "${FUNCTION_NAME}" \
+    --gen2 \
     --runtime python39 \
     --trigger-http \
     --entry-point export_logs_handler \
@@ -59,6 +60,10 @@ gcloud functions deploy "${FUNCTION_NAME}" \
     --vpc-connector n8n-connector \
     --egress-settings private-ranges-only
 
+# Exports run in the background after the 202 response, so keep CPU allocated
+echo -e "${YELLOW}Disabling CPU throttling for background export jobs${NC}"
+gcloud run services update "${FUNCTION_NAME}" --region="${REGION}" --no-cpu-throttling
+
 # Get the function URL
 FUNCTION_URL=$(gcloud functions describe "${FUNCTION_NAME}" --region="${REGION}" --format="value(url)")
 echo -e "${GREEN}Function deployed at: ${FUNCTION_URL}${NC}"
@@ -99,3 +104,4 @@ echo -e "1. Check the function logs: gcloud functions logs read ${FUNCTION_NAME}
 echo -e "2. Verify the scheduler job: gcloud scheduler jobs list --location=${REGION}"
 echo -e "3. Check GCS bucket for exported logs: gsutil ls gs://${GCS_BUCKET_NAME}/n8n/"
 echo -e "4. Test manual export: curl -X POST ${FUNCTION_URL} -H 'Content-Type: application/json' -d '{\"date\":\"yesterday\"}'"
+echo -e "5. Poll an export job: curl '${FUNCTION_URL}?job_id=<job_id>'"
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Credential Cache with NOTIFY Invalidation
+=========================================
+
+In-process cache of resolved tenant credentials for the credential resolver
+(credential_resolver_service.py):
+
+- one entry per (saas_edge_id, channel_key) holding every resolved field
+- entries expire after ``ttl_seconds``
+- negative caching: a pair with no credentials, or a request for a field the
+  entry does not have, is answered from the cache for ``negative_ttl_seconds``
+  instead of going back to the database
+- bounded by ``max_entries``, evicting the least recently used entry
+
+CredentialInvalidationListener LISTENs on 'saas_credential_changes' (see
+schemas/credential_cache_invalidation.sql) and drops the affected entries as
+soon as a write to saas_channel_installations, saas_channel_credentials or a
+channel's default_channel_config commits. While the listener is disconnected,
+notifications may be lost, so entries are then only served for the negative
+TTL, and the whole cache is cleared when the listener reconnects.
+
+Usage:
+    python credential_cache.py --watch   # print invalidations as they arrive
+
+Requirements:
+    pip install psycopg2-binary python-dotenv
+"""
+
+import os
+import json
+import time
+import select
+import logging
+import argparse
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Any, Tuple
+import psycopg2
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+CREDENTIAL_CHANNEL = 'saas_credential_changes'
+
+Pair = Tuple[str, str]
+
+
+class CredentialCache:
+    """Thread-safe LRU of resolved credentials with TTL and negative caching"""
+
+    def __init__(self,
+                 ttl_seconds: float = 300.0,
+                 negative_ttl_seconds: float = 30.0,
+                 max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = min(negative_ttl_seconds, ttl_seconds)
+        self.max_entries = max_entries
+
+        # pair -> {'credentials': dict, 'loaded_at': monotonic, 'expires_at': monotonic}
+        self.entries: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+        # Bumped by every invalidation; loads that started before one are not stored
+        self.generation = 0
+        self.invalidation_live = True
+        self.stats = {'hits': 0, 'negative_hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0,
+                      'invalidations': 0, 'invalidated_entries': 0, 'discarded_loads': 0}
+        self.hit_age_total = 0.0
+        self.hit_age_max = 0.0
+        self.invalidation_lag_last: Optional[float] = None
+        self.invalidation_lag_max = 0.0
+
+    def get(self, pair: Pair, fields: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """Cached credentials for pair, or None when the database must be asked"""
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(pair)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+
+            age = now - entry['loaded_at']
+            max_age = entry['expires_at'] - entry['loaded_at']
+            if not self.invalidation_live:
+                max_age = min(max_age, self.negative_ttl_seconds)
+            if age >= max_age:
+                del self.entries[pair]
+                self.stats['expired'] += 1
+                self.stats['misses'] += 1
+                return None
+
+            credentials = entry['credentials']
+            negative = not credentials or (fields and any(field not in credentials for field in fields))
+            if negative:
+                if age >= self.negative_ttl_seconds:
+                    # The missing field may have been added since; reload
+                    self.stats['misses'] += 1
+                    return None
+                self.stats['negative_hits'] += 1
+
+            self.stats['hits'] += 1
+            self.hit_age_total += age
+            self.hit_age_max = max(self.hit_age_max, age)
+            self.entries.move_to_end(pair)
+            return credentials
+
+    def put(self, pair: Pair, credentials: Dict[str, Any], generation: int) -> bool:
+        """Store a load that started at generation; False if it may be stale"""
+        if self.ttl_seconds <= 0:
+            return False
+        now = time.monotonic()
+        with self.lock:
+            if generation != self.generation:
+                self.stats['discarded_loads'] += 1
+                return False
+            ttl = self.ttl_seconds if credentials else self.negative_ttl_seconds
+            self.entries[pair] = {'credentials': credentials, 'loaded_at': now, 'expires_at': now + ttl}
+            self.entries.move_to_end(pair)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.stats['evictions'] += 1
+            return True
+
+    def invalidate(self, saas_edge_id: Optional[str] = None, channel_key: Optional[str] = None) -> int:
+        """Drop one tenant channel, one channel for all tenants, or everything"""
+        with self.lock:
+            self.generation += 1
+            self.stats['invalidations'] += 1
+            if saas_edge_id and channel_key:
+                removed = 1 if self.entries.pop((saas_edge_id, channel_key), None) is not None else 0
+            elif channel_key or saas_edge_id:
+                matches = [pair for pair in self.entries
+                           if (not saas_edge_id or pair[0] == saas_edge_id)
+                           and (not channel_key or pair[1] == channel_key)]
+                for pair in matches:
+                    del self.entries[pair]
+                removed = len(matches)
+            else:
+                removed = len(self.entries)
+                self.entries.clear()
+            self.stats['invalidated_entries'] += removed
+            return removed
+
+    def record_invalidation_lag(self, seconds: float) -> None:
+        with self.lock:
+            self.invalidation_lag_last = seconds
+            self.invalidation_lag_max = max(self.invalidation_lag_max, seconds)
+
+    def set_invalidation_live(self, live: bool) -> None:
+        with self.lock:
+            self.invalidation_live = live
+
+    def metrics(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self.lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            oldest = next(iter(self.entries.values()), None)
+            return {
+                **self.stats,
+                'entries': len(self.entries),
+                'hit_ratio': round(self.stats['hits'] / lookups, 4) if lookups else None,
+                'invalidation_live': self.invalidation_live,
+                # Staleness: how old served entries were, and how long changes took to arrive
+                'hit_age_avg_seconds': round(self.hit_age_total / self.stats['hits'], 3) if self.stats['hits'] else None,
+                'hit_age_max_seconds': round(self.hit_age_max, 3),
+                'lru_entry_age_seconds': round(now - oldest['loaded_at'], 3) if oldest else None,
+                'invalidation_lag_ms_last': (round(self.invalidation_lag_last * 1000, 2)
+                                             if self.invalidation_lag_last is not None else None),
+                'invalidation_lag_ms_max': round(self.invalidation_lag_max * 1000, 2)
+            }
+
+
+class CredentialInvalidationListener:
+    """LISTENs for credential changes and invalidates a CredentialCache"""
+
+    def __init__(self,
+                 db_config: Dict[str, Any],
+                 cache: CredentialCache,
+                 keepalive_interval: float = 30.0,
+                 reconnect_max_delay: float = 30.0):
+        self.db_config = db_config
+        self.cache = cache
+        self.keepalive_interval = keepalive_interval
+        self.reconnect_max_delay = reconnect_max_delay
+
+        self.stop_event = threading.Event()
+        self.connected = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        self.conn = None
+        self.stats = {'notifications': 0, 'reconnects': 0}
+
+    def start(self) -> 'CredentialInvalidationListener':
+        if self.thread is None:
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self.run, name='credential-invalidation', daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+            self.thread = None
+
+    def metrics(self) -> Dict[str, Any]:
+        return {**self.stats, 'connected': self.connected.is_set()}
+
+    def run(self) -> None:
+        """Listen until stop(), reconnecting with backoff"""
+        delay = 1.0
+        while not self.stop_event.is_set():
+            try:
+                self._connect()
+                delay = 1.0
+                self._listen()
+            except (psycopg2.Error, OSError) as e:
+                self._disconnect()
+                self.stats['reconnects'] += 1
+                logger.warning(f"Credential invalidation connection lost ({e}); reconnecting in {delay:.0f}s")
+                self.stop_event.wait(delay)
+                delay = min(delay * 2, self.reconnect_max_delay)
+            finally:
+                self._disconnect()
+
+    def _disconnect(self) -> None:
+        self.connected.clear()
+        self.cache.set_invalidation_live(False)
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def _connect(self) -> None:
+        self.conn = psycopg2.connect(**self.db_config)
+        self.conn.autocommit = True
+        with self.conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {CREDENTIAL_CHANNEL};")
+        # Changes committed while we were not listening are unknown
+        self.cache.invalidate()
+        self.cache.set_invalidation_live(True)
+        self.connected.set()
+        logger.info(f"Listening on {CREDENTIAL_CHANNEL}")
+
+    def _listen(self) -> None:
+        idle = 0.0
+        while not self.stop_event.is_set():
+            if select.select([self.conn], [], [], 1.0) == ([], [], []):
+                idle += 1.0
+                if idle >= self.keepalive_interval:
+                    # Detects a silently dropped connection
+                    with self.conn.cursor() as cursor:
+                        cursor.execute("SELECT 1;")
+                    idle = 0.0
+                continue
+            idle = 0.0
+            self.conn.poll()
+            while self.conn.notifies:
+                notify = self.conn.notifies.pop(0)
+                self.stats['notifications'] += 1
+                self._handle(notify.payload)
+
+    def _handle(self, payload: str) -> None:
+        try:
+            change = json.loads(payload)
+        except ValueError:
+            change = None
+        if not isinstance(change, dict):
+            logger.warning(f"Malformed credential change, clearing cache: {payload[:200]}")
+            self.cache.invalidate()
+            return
+
+        channel_key = change.get('channel_key')
+        if channel_key:
+            self.cache.invalidate(change.get('saas_edge_id'), channel_key)
+        else:
+            # Channel already gone, so its key is unknown
+            self.cache.invalidate()
+
+        if change.get('changed_at'):
+            try:
+                changed_at = datetime.fromisoformat(change['changed_at'])
+                lag = (datetime.now(timezone.utc) - changed_at).total_seconds()
+            except (TypeError, ValueError):
+                # Lag is only a metric; the invalidation above already happened
+                logger.warning(f"Unparseable changed_at in credential change: {change['changed_at']!r}")
+                return
+            self.cache.record_invalidation_lag(max(lag, 0.0))
+
+
+def create_db_config() -> Dict[str, Any]:
+    """SaaS database connection settings from the environment"""
+    return {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'port': int(os.getenv('DB_PORT', '5432')),
+        'database': os.getenv('DB_NAME', 'catalog-edge-db'),
+        'user': os.getenv('DB_USER', 'postgres'),
+        'password': os.getenv('DB_PASSWORD', '')
+    }
+
+
+def main():
+    """Main CLI entry point"""
+    load_dotenv()
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description="Watch credential cache invalidations")
+    parser.add_argument("--watch", action="store_true", help="Print each credential change notification")
+
+    args = parser.parse_args()
+    if not args.watch:
+        parser.print_help()
+        return
+
+    try:
+        conn = psycopg2.connect(**create_db_config())
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {CREDENTIAL_CHANNEL};")
+        logger.info(f"Watching {CREDENTIAL_CHANNEL}")
+        while True:
+            if select.select([conn], [], [], 30.0) != ([], [], []):
+                conn.poll()
+                while conn.notifies:
+                    print(conn.notifies.pop(0).payload, flush=True)
+
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        logger.error(f"Credential change watch failed: {e}")
+        print(json.dumps({"status": "error", "message": str(e)}, indent=2))
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
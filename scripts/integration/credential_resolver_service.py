@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+"""
+Local Credential Resolver Service
+=================================
+
+Small HTTP sidecar that n8n Code nodes call for tenant credentials instead of
+opening a new PostgreSQL connection (TCP, TLS and auth handshake) for every
+lookup. The service keeps:
+
+- a pool of open, read-only database connections
+- a micro-batcher: lookups arriving within ``batch_window_ms`` of each other are
+  coalesced into one ``get_tenant_credentials_bulk`` query (identical pairs
+  already in flight share the same query)
+- a CredentialCache (credential_cache.py) of resolved (saas_edge_id,
+  channel_key) entries with TTL, negative caching and an LRU bound, kept
+  fresh by NOTIFY-driven invalidation, so repeated lookups are answered from
+  memory
+- with CREDENTIAL_ENCRYPTION_KEY set, a CredentialVault (credential_vault.py):
+  fields of the tenant's envelope-encrypted credential blob are decrypted on
+  a cache miss and override the installation_config values
+
+Requires the functions created by
+``N8NCredentialExpressions.create_database_function_for_n8n()``, and
+schemas/credential_cache_invalidation.sql for invalidation.
+
+Endpoints (HTTP/1.1 keep-alive, JSON):
+    GET  /credentials/<saas_edge_id>/<channel_key>?fields=a,b   -> {field: value}
+    POST /credentials/bulk  {"pairs": [[edge, key], ...], "fields": [...]}
+         -> {"credentials": {"<edge>|<key>": {field: value}}}
+    GET  /health                                              -> counters, cache metrics
+
+The service returns secrets: bind it to localhost (the default) and set
+CREDENTIAL_RESOLVER_TOKEN so callers must send it as ``X-Resolver-Token``.
+The token is required to bind to any non-loopback address. Pairs whose
+saas_edge_id is not a UUID are rejected before batching (400 for a single
+lookup, an empty result in a bulk lookup), so they cannot fail the batched
+query for other tenants.
+
+Usage:
+    python credential_resolver_service.py [--port 8787] [--max-connections 8]
+    python credential_resolver_service.py --cache-ttl 600 --negative-ttl 30 --cache-size 50000
+
+Requirements:
+    pip install psycopg2-binary python-dotenv
+"""
+
+import os
+import json
+import time
+import hmac
+import uuid
+import ipaddress
+import logging
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Any, Iterable, Tuple
+from urllib.parse import urlparse, parse_qs, unquote
+import psycopg2
+from psycopg2.pool import ThreadedConnectionPool
+from dotenv import load_dotenv
+from credential_cache import CredentialCache, CredentialInvalidationListener
+from credential_vault import CredentialVault
+
+logger = logging.getLogger(__name__)
+
+BULK_QUERY = """
+SELECT saas_edge_id::text, channel_key, credentials
+FROM get_tenant_credentials_bulk(%s::uuid[], %s::text[], NULL);
+"""
+
+Pair = Tuple[str, str]
+
+
+def pair_key(pair: Pair) -> str:
+    return f"{pair[0]}|{pair[1]}"
+
+
+def canonical_pair(saas_edge_id: Any, channel_key: Any) -> Optional[Pair]:
+    """Pair with the saas_edge_id in canonical UUID form; None if it is not a UUID"""
+    if not isinstance(saas_edge_id, str) or not isinstance(channel_key, str) or not channel_key:
+        return None
+    try:
+        return str(uuid.UUID(saas_edge_id)), channel_key
+    except ValueError:
+        return None
+
+
+def is_loopback(host: str) -> bool:
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class CredentialResolver:
+    """Pooled, batched and cached credential lookups"""
+
+    def __init__(self,
+                 db_config: Dict[str, Any],
+                 min_connections: int = 1,
+                 max_connections: int = 8,
+                 batch_window_ms: float = 2.0,
+                 max_batch_size: int = 200,
+                 cache: Optional[CredentialCache] = None,
+                 lookup_timeout: float = 5.0,
+                 vault: Optional[CredentialVault] = None):
+        self.pool = ThreadedConnectionPool(min_connections, max_connections, **db_config)
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.cache = cache if cache is not None else CredentialCache()
+        self.lookup_timeout = lookup_timeout
+        self.vault = vault
+
+        self.pending: deque = deque()
+        self.inflight: Dict[Pair, Future] = {}
+        self.condition = threading.Condition()
+        self.stopping = False
+        self.executor = ThreadPoolExecutor(max_connections, thread_name_prefix='credential-batch')
+        self.batcher = threading.Thread(target=self._batch_loop, name='credential-batcher', daemon=True)
+        self.batcher.start()
+
+        self.stats = {'lookups': 0, 'coalesced': 0, 'batches': 0,
+                      'batched_pairs': 0, 'errors': 0, 'query_seconds': 0.0}
+
+    def close(self) -> None:
+        with self.condition:
+            self.stopping = True
+            self.condition.notify_all()
+        self.batcher.join(5)
+        self.executor.shutdown(wait=True)
+        self.pool.closeall()
+        if self.vault is not None:
+            self.vault.close()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self.condition:
+            return {**self.stats, 'inflight': len(self.inflight), 'cache': self.cache.metrics()}
+
+    def resolve(self, saas_edge_id: str, channel_key: str,
+                fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        return self.resolve_many([(saas_edge_id, channel_key)], fields)[(saas_edge_id, channel_key)]
+
+    def resolve_many(self, pairs: Iterable[Pair],
+                     fields: Optional[List[str]] = None) -> Dict[Pair, Dict[str, Any]]:
+        """Credentials per pair as given, restricted to fields when given
+
+        A pair whose saas_edge_id is not a UUID gets an empty result and is
+        never batched with other callers' lookups.
+        """
+        requested = {pair: canonical_pair(*pair) for pair in pairs}
+        results: Dict[Pair, Dict[str, Any]] = {}
+        futures: Dict[Pair, Future] = {}
+        with self.condition:
+            for pair in dict.fromkeys(pair for pair in requested.values() if pair is not None):
+                self.stats['lookups'] += 1
+                cached = self.cache.get(pair, fields)
+                if cached is not None:
+                    results[pair] = cached
+                elif pair in self.inflight:
+                    self.stats['coalesced'] += 1
+                    futures[pair] = self.inflight[pair]
+                else:
+                    future: Future = Future()
+                    self.inflight[pair] = future
+                    self.pending.append(pair)
+                    futures[pair] = future
+            if futures:
+                self.condition.notify_all()
+
+        for pair, future in futures.items():
+            results[pair] = future.result(self.lookup_timeout)
+
+        resolved = {pair: results[canonical] if canonical is not None else {}
+                    for pair, canonical in requested.items()}
+        if fields:
+            return {pair: {field: value for field, value in credentials.items() if field in fields}
+                    for pair, credentials in resolved.items()}
+        return resolved
+
+    def _batch_loop(self) -> None:
+        while True:
+            with self.condition:
+                while not self.pending and not self.stopping:
+                    self.condition.wait()
+                if self.stopping and not self.pending:
+                    return
+                # Give concurrent callers batch_window to join this batch
+                deadline = time.monotonic() + self.batch_window
+                while len(self.pending) < self.max_batch_size and not self.stopping:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                batch = [self.pending.popleft() for _ in range(min(len(self.pending), self.max_batch_size))]
+            self.executor.submit(self._load_batch, batch)
+
+    def _load_batch(self, batch: List[Pair]) -> None:
+        started = time.monotonic()
+        conn = None
+        broken = False
+        try:
+            # Read before the query so an invalidation during it discards the result
+            generation = self.cache.generation
+            conn = self.pool.getconn()
+            if not conn.autocommit:
+                conn.set_session(readonly=True, autocommit=True)
+            with conn.cursor() as cursor:
+                cursor.execute(BULK_QUERY, ([edge for edge, _ in batch], [key for _, key in batch]))
+                loaded = {(edge, key): credentials or {} for edge, key, credentials in cursor.fetchall()}
+        except Exception as e:
+            # Includes an exhausted pool: every waiter must still be released
+            broken = isinstance(e, psycopg2.OperationalError)
+            logger.error(f"Credential batch of {len(batch)} pairs failed: {e}")
+            with self.condition:
+                self.stats['errors'] += 1
+                for pair in batch:
+                    future = self.inflight.pop(pair, None)
+                    if future is not None:
+                        future.set_exception(e)
+            return
+        finally:
+            if conn is not None:
+                self.pool.putconn(conn, close=broken)
+
+        results: Dict[Pair, Any] = {}
+        for pair in batch:
+            credentials = loaded.get(pair, {})
+            if self.vault is not None:
+                # Outside the lock: a blob decrypt is a database round trip
+                try:
+                    credentials = {**credentials, **self.vault.get_credentials(*pair)}
+                except Exception as e:
+                    logger.error(f"Credential blob of {pair_key(pair)} failed: {e}")
+                    credentials = e
+            results[pair] = credentials
+
+        with self.condition:
+            self.stats['batches'] += 1
+            self.stats['batched_pairs'] += len(batch)
+            self.stats['query_seconds'] += time.monotonic() - started
+            for pair, credentials in results.items():
+                future = self.inflight.pop(pair)
+                if isinstance(credentials, Exception):
+                    self.stats['errors'] += 1
+                    future.set_exception(credentials)
+                    continue
+                self.cache.put(pair, credentials, generation)
+                future.set_result(credentials)
+
+
+class CredentialResolverServer:
+    """HTTP front end for a CredentialResolver"""
+
+    def __init__(self, resolver: CredentialResolver, host: str = '127.0.0.1', port: int = 8787,
+                 token: Optional[str] = None, listener: Optional[CredentialInvalidationListener] = None,
+                 idle_timeout: float = 30.0):
+        if not token and not is_loopback(host):
+            raise ValueError(f"CREDENTIAL_RESOLVER_TOKEN is required to serve credentials on {host}")
+        self.resolver = resolver
+        self.listener = listener
+        self.token = token
+        self.idle_timeout = idle_timeout
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+
+    def serve_forever(self) -> None:
+        logger.info(f"Credential resolver listening on http://{self.httpd.server_address[0]}:"
+                    f"{self.httpd.server_address[1]}")
+        self.httpd.serve_forever()
+
+    def shutdown(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive: n8n reuses the TCP connection between lookups
+            protocol_version = 'HTTP/1.1'
+            # Headers and body are separate writes; without this a keep-alive
+            # response can wait ~40 ms on the client's delayed ACK
+            disable_nagle_algorithm = True
+            # Closes idle keep-alive connections so their handler threads exit
+            timeout = server.idle_timeout
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+            def _json(self, status: int, body: Dict[str, Any]) -> None:
+                data = json.dumps(body, default=str).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.send_header('Cache-Control', 'no-store')
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _authorized(self) -> bool:
+                if server.token and not hmac.compare_digest(self.headers.get('X-Resolver-Token', ''), server.token):
+                    self._json(401, {'status': 'error', 'message': 'invalid resolver token'})
+                    return False
+                return True
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                parts = [unquote(part) for part in url.path.strip('/').split('/')]
+                if parts == ['health']:
+                    metrics = server.resolver.metrics()
+                    if server.listener is not None:
+                        metrics['invalidation'] = server.listener.metrics()
+                    self._json(200, {'status': 'success', **metrics})
+                    return
+                if not self._authorized():
+                    return
+                if len(parts) != 3 or parts[0] != 'credentials':
+                    self._json(404, {'status': 'error', 'message': 'not found'})
+                    return
+                if canonical_pair(parts[1], parts[2]) is None:
+                    self._json(400, {'status': 'error', 'message': f"invalid saas_edge_id: {parts[1]!r}"})
+                    return
+                fields = parse_qs(url.query).get('fields', [''])[0]
+                try:
+                    self._json(200, server.resolver.resolve(parts[1], parts[2],
+                                                            fields.split(',') if fields else None))
+                except Exception as e:
+                    self._json(502, {'status': 'error', 'message': str(e)})
+
+            def do_POST(self):
+                # Read the body first so the connection stays usable on errors
+                raw = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                if not self._authorized():
+                    return
+                if urlparse(self.path).path.rstrip('/') != '/credentials/bulk':
+                    self._json(404, {'status': 'error', 'message': 'not found'})
+                    return
+                try:
+                    body = json.loads(raw or b'{}')
+                    pairs = [(str(edge), str(key)) for edge, key in body.get('pairs', [])]
+                except (ValueError, TypeError) as e:
+                    self._json(400, {'status': 'error', 'message': f"invalid request: {e}"})
+                    return
+                try:
+                    # Invalid pairs (e.g. a null saas_edge_id) come back empty
+                    resolved = server.resolver.resolve_many(pairs, body.get('fields'))
+                    self._json(200, {'credentials': {pair_key(pair): creds for pair, creds in resolved.items()}})
+                except Exception as e:
+                    self._json(502, {'status': 'error', 'message': str(e)})
+
+        return Handler
+
+
+def create_db_config() -> Dict[str, Any]:
+    """SaaS database connection settings from the environment"""
+    return {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'port': int(os.getenv('DB_PORT', '5432')),
+        'database': os.getenv('DB_NAME', 'catalog-edge-db'),
+        'user': os.getenv('DB_USER', 'postgres'),
+        'password': os.getenv('DB_PASSWORD', '')
+    }
+
+
+def main():
+    """Main CLI entry point"""
+    load_dotenv()
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description="Serve pooled, batched and cached tenant credential lookups")
+    parser.add_argument("--host", default=os.getenv('CREDENTIAL_RESOLVER_HOST', '127.0.0.1'), help="Bind address")
+    parser.add_argument("--port", type=int, default=int(os.getenv('CREDENTIAL_RESOLVER_PORT', '8787')),
+                        help="Port")
+    parser.add_argument("--max-connections", type=int, default=8, help="Database connection pool size")
+    parser.add_argument("--batch-window-ms", type=float, default=2.0, help="Time to gather lookups into one query")
+    parser.add_argument("--cache-ttl", type=float, default=300.0, help="Seconds a resolved entry is reused (0 = off)")
+    parser.add_argument("--negative-ttl", type=float, default=30.0,
+                        help="Seconds a missing tenant channel or field is remembered")
+    parser.add_argument("--cache-size", type=int, default=10000, help="Maximum cached tenant channels")
+    parser.add_argument("--idle-timeout", type=float, default=30.0,
+                        help="Seconds before an idle keep-alive connection is closed")
+    parser.add_argument("--no-invalidation", action="store_true",
+                        help="Do not LISTEN for credential changes (entries live until their TTL)")
+
+    args = parser.parse_args()
+
+    try:
+        db_config = create_db_config()
+        cache = CredentialCache(ttl_seconds=args.cache_ttl, negative_ttl_seconds=args.negative_ttl,
+                                max_entries=args.cache_size)
+        listener = None
+        if not args.no_invalidation and args.cache_ttl > 0:
+            listener = CredentialInvalidationListener(db_config, cache).start()
+        vault = None
+        if os.getenv('CREDENTIAL_ENCRYPTION_KEY'):
+            # Resolved entries are cached above; the vault keeps only data keys
+            vault = CredentialVault(db_config, os.getenv('CREDENTIAL_ENCRYPTION_KEY'),
+                                    cache=CredentialCache(ttl_seconds=0))
+        resolver = CredentialResolver(db_config, max_connections=args.max_connections,
+                                      batch_window_ms=args.batch_window_ms, cache=cache, vault=vault)
+        server = CredentialResolverServer(resolver, args.host, args.port,
+                                          token=os.getenv('CREDENTIAL_RESOLVER_TOKEN'), listener=listener,
+                                          idle_timeout=args.idle_timeout)
+        try:
+            server.serve_forever()
+        finally:
+            if listener is not None:
+                listener.stop()
+            resolver.close()
+
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        logger.error(f"Credential resolver failed: {e}")
+        print(json.dumps({"status": "error", "message": str(e)}, indent=2))
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
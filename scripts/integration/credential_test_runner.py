@@ -0,0 +1,532 @@
+#!/usr/bin/env python3
+"""
+Bulk Credential Test Runner
+===========================
+
+Tests many tenant credentials concurrently against their channel APIs and
+records the results, so credentials do not drift into ``stale`` on the
+credential health dashboard (30 days without a test).
+
+- Picks credentials not tested for ``--older-than-days``, oldest first
+- Tests each row with its own fields, taken from its envelope-encrypted
+  ``encrypted_blob`` (credential_vault.py, needs CREDENTIAL_ENCRYPTION_KEY).
+  ``portal_credential_data`` is documented as encrypted in a format nothing
+  here can decrypt, so it is used only with ``--plaintext-portal-data``, for
+  deployments that store it in clear. Rows without readable fields are
+  skipped, not failed. Calls the channel's test endpoint
+  (``test_endpoints.health_check`` or ``portal_config.test_endpoint``)
+- Per-channel token buckets from ``capabilities.rate_limits`` (or the
+  ``rate_limits`` column): ``requests_per_minute`` scaled by
+  ``--rate-limit-fraction`` to leave headroom for production traffic,
+  ``burst_limit`` as bucket size, ``daily_limit`` as a cap per run. A 429
+  drains the bucket for Retry-After and the test is retried once
+- Global concurrency cap and per-test timeout
+- Results are written in batches: one INSERT into
+  ``saas_channel_credential_test_history`` and one UPDATE of
+  ``saas_channel_credentials.last_tested_at``/``test_result`` per batch. A
+  write that still fails after ``WRITE_ATTEMPTS`` connection retries stops
+  the run, so no tests run whose results cannot be recorded. Runs against
+  ``--mock`` or ``--base-url`` record nothing: their results say nothing
+  about the real channel
+
+The event loop schedules and rate-limits tests; the HTTP calls run on a
+thread pool sized to the concurrency cap, with a pooled ``requests`` session
+per thread.
+
+Usage:
+    python credential_test_runner.py --older-than-days 25 --concurrency 50
+    python credential_test_runner.py --channels SHOPIFY,EBAY --limit 1000 --dry-run
+    python credential_test_runner.py --mock   # every channel points at a local mock_channel_api.py; nothing is recorded
+
+Requirements:
+    pip install psycopg2-binary python-dotenv requests
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+import argparse
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Any, Tuple
+import psycopg2
+from psycopg2.extras import RealDictCursor, execute_values
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+from credential_vault import CredentialVault
+
+logger = logging.getLogger(__name__)
+
+CANDIDATES_QUERY = """
+SELECT
+    c.credential_id::text,
+    c.saas_edge_id::text,
+    c.portal_credential_data,
+    c.data_key_id::text,
+    c.encrypted_blob,
+    cm.channel_key,
+    cm.base_url,
+    COALESCE(cm.test_endpoints->>'health_check', cm.portal_config->>'test_endpoint') AS test_endpoint,
+    COALESCE(cm.capabilities->'rate_limits', NULLIF(cm.rate_limits, '{}'::jsonb), '{}'::jsonb) AS rate_limits
+FROM saas_channel_credentials c
+JOIN saas_channel_master cm ON cm.channel_id = c.channel_id
+WHERE c.status = ANY(%(statuses)s)
+  AND (c.last_tested_at IS NULL OR c.last_tested_at < now() - make_interval(days => %(older_than_days)s))
+  AND (%(channels)s::text[] IS NULL OR cm.channel_key = ANY(%(channels)s::text[]))
+ORDER BY c.last_tested_at NULLS FIRST, c.credential_id
+LIMIT %(limit)s;
+"""
+
+# Result writes retried after a connection error before the run is stopped
+WRITE_ATTEMPTS = 3
+
+# Header carrying an access token, where a channel does not use "Authorization: Bearer"
+TOKEN_HEADERS = {'SHOPIFY': 'X-Shopify-Access-Token'}
+
+
+class TokenBucket:
+    """Asyncio token bucket: rate tokens per second, up to capacity"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(capacity, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        # Waiters queue on the lock, so tokens are handed out in order
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no tokens for `seconds` (server asked us to back off)"""
+        # Several 429s for the same window must not stack into a longer pause
+        self.tokens = min(self.tokens, -seconds * self.rate)
+
+
+def build_test_request(candidate: Dict[str, Any], credentials: Dict[str, Any],
+                       base_url_override: Optional[str] = None) -> Tuple[str, Dict[str, str]]:
+    """URL and headers of a credential's test call"""
+    base_url = base_url_override or credentials.get('api_base_url') or candidate['base_url'] or ''
+    url = f"{base_url.rstrip('/')}/{candidate['test_endpoint'].lstrip('/')}"
+
+    headers = {'Accept': 'application/json', 'User-Agent': 'credential-test-runner'}
+    token = credentials.get('access_token') or credentials.get('token')
+    if token:
+        header = TOKEN_HEADERS.get(candidate['channel_key'])
+        if header:
+            headers[header] = token
+        else:
+            headers['Authorization'] = f"Bearer {token}"
+    elif credentials.get('api_key'):
+        headers['X-API-Key'] = credentials['api_key']
+    return url, headers
+
+
+class CredentialTestRunner:
+    """Rate-limited, concurrent credential tests with batched result writes"""
+
+    def __init__(self,
+                 db_config: Dict[str, Any],
+                 concurrency: int = 50,
+                 timeout: float = 10.0,
+                 rate_limit_fraction: float = 0.5,
+                 default_requests_per_minute: float = 60.0,
+                 write_batch_size: int = 200,
+                 flush_interval: float = 2.0,
+                 base_url_override: Optional[str] = None,
+                 tested_by: str = 'credential_test_runner',
+                 vault: Optional[CredentialVault] = None,
+                 plaintext_portal_data: bool = False,
+                 record_results: bool = True):
+        self.db_config = db_config
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.rate_limit_fraction = rate_limit_fraction
+        self.default_requests_per_minute = default_requests_per_minute
+        self.write_batch_size = write_batch_size
+        self.flush_interval = flush_interval
+        self.base_url_override = base_url_override
+        self.tested_by = tested_by
+        self.vault = vault
+        self.plaintext_portal_data = plaintext_portal_data
+        self.record_results = record_results
+
+        self.local = threading.local()
+        self.writer_conn = None
+        self.stats = {'candidates': 0, 'tested': 0, 'skipped': 0, 'encrypted_skipped': 0, 'over_daily_limit': 0,
+                      'retried': 0, 'written': 0, 'write_batches': 0, 'write_retries': 0, 'unrecorded': 0,
+                      'by_status': defaultdict(int)}
+
+    def get_db_connection(self):
+        return psycopg2.connect(**self.db_config)
+
+    def load_candidates(self, older_than_days: int = 25, limit: int = 10000,
+                        channels: Optional[List[str]] = None,
+                        statuses: Tuple[str, ...] = ('active',)) -> List[Dict[str, Any]]:
+        """Credentials due for a test, each with its own row's fields
+
+        ``credentials`` is None when the row's fields cannot be read: a blob
+        without a vault, or only portal_credential_data without
+        plaintext_portal_data. A row whose blob does not decrypt gets
+        ``decrypt_error``.
+        """
+        conn = self.get_db_connection()
+        try:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                cursor.execute(CANDIDATES_QUERY, {'statuses': list(statuses), 'older_than_days': older_than_days,
+                                                  'channels': channels, 'limit': limit})
+                candidates = [dict(row) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+
+        for candidate in candidates:
+            portal_data = candidate.pop('portal_credential_data') or {}
+            credentials = dict(portal_data) if self.plaintext_portal_data else None
+            key_id, encrypted_blob = candidate.pop('data_key_id'), candidate.pop('encrypted_blob')
+            if encrypted_blob:
+                if self.vault is None:
+                    credentials = None
+                else:
+                    credentials = credentials or {}
+                    try:
+                        credentials.update(self.vault.decrypt_blob(candidate['credential_id'], key_id,
+                                                                   encrypted_blob))
+                    except Exception as e:
+                        candidate['decrypt_error'] = str(e)[:500]
+            candidate['credentials'] = credentials
+        return candidates
+
+    def run(self, candidates: List[Dict[str, Any]]) -> Dict[str, Any]:
+        started = time.monotonic()
+        asyncio.run(self._run(candidates))
+        elapsed = time.monotonic() - started
+        return {**self.stats, 'by_status': dict(self.stats['by_status']), 'seconds': round(elapsed, 2),
+                'tests_per_sec': round(self.stats['tested'] / elapsed, 1) if elapsed else 0}
+
+    def _buckets(self, candidates: List[Dict[str, Any]]) -> Dict[str, Tuple[TokenBucket, Optional[int]]]:
+        buckets = {}
+        for candidate in candidates:
+            key = candidate['channel_key']
+            if key in buckets:
+                continue
+            limits = candidate['rate_limits'] or {}
+            per_minute = float(limits.get('requests_per_minute') or self.default_requests_per_minute)
+            rate = per_minute * self.rate_limit_fraction / 60
+            burst = float(limits.get('burst_limit') or per_minute / 60) * self.rate_limit_fraction
+            daily = limits.get('daily_limit')
+            buckets[key] = (TokenBucket(rate, burst),
+                            int(daily * self.rate_limit_fraction) if daily else None)
+        return buckets
+
+    async def _run(self, candidates: List[Dict[str, Any]]) -> None:
+        self.stats['candidates'] = len(candidates)
+        buckets = self._buckets(candidates)
+        by_channel: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for candidate in candidates:
+            by_channel[candidate['channel_key']].append(candidate)
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results: asyncio.Queue = asyncio.Queue()
+        executor = ThreadPoolExecutor(self.concurrency, thread_name_prefix='credential-test')
+        writer = asyncio.create_task(self._write_results(results))
+        running = set()
+        main = asyncio.current_task()
+        draining = False
+
+        def writer_stopped(task: asyncio.Task) -> None:
+            # The writer only ends early when results can no longer be stored
+            if not draining and not task.cancelled() and task.exception() is not None:
+                main.cancel()
+
+        writer.add_done_callback(writer_stopped)
+
+        async def test(candidate: Dict[str, Any], bucket: TokenBucket) -> None:
+            try:
+                result = await self._test(candidate, bucket, executor)
+            finally:
+                semaphore.release()
+            self.stats['tested'] += 1
+            self.stats['by_status'][result['test_status']] += 1
+            await results.put(result)
+
+        async def dispatch(channel_key: str, channel_candidates: List[Dict[str, Any]]) -> None:
+            # Token first, then a concurrency slot, then start: tokens cannot pile up
+            # while tests wait for slots and leave in a burst above the channel's rate
+            bucket, daily_cap = buckets[channel_key]
+            issued = 0
+            for candidate in channel_candidates:
+                if not candidate['test_endpoint']:
+                    self.stats['skipped'] += 1
+                    continue
+                if candidate['credentials'] is None:
+                    # Fields we cannot read: untested, not failed
+                    self.stats['encrypted_skipped'] += 1
+                    continue
+                if daily_cap is not None and issued >= daily_cap:
+                    self.stats['over_daily_limit'] += 1
+                    continue
+                if candidate['credentials'] and not candidate.get('decrypt_error'):
+                    issued += 1
+                    await bucket.acquire()
+                await semaphore.acquire()
+                task = asyncio.create_task(test(candidate, bucket))
+                running.add(task)
+                task.add_done_callback(running.discard)
+
+        try:
+            await asyncio.gather(*(dispatch(key, items) for key, items in by_channel.items()))
+            while running:
+                await asyncio.gather(*list(running))
+        except BaseException:
+            for task in list(running):
+                task.cancel()
+            raise
+        finally:
+            draining = True
+            try:
+                await results.put(None)
+                # Raises the write error that stopped the run, if any
+                await writer
+            finally:
+                executor.shutdown(wait=True)
+
+    async def _test(self, candidate: Dict[str, Any], bucket: TokenBucket,
+                    executor: ThreadPoolExecutor) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        credentials = candidate['credentials']
+        url, headers = build_test_request(candidate, credentials, self.base_url_override)
+        if candidate.get('decrypt_error'):
+            return self._result(candidate, url, 'failure', candidate['decrypt_error'], 'decrypt_failed')
+        if not credentials:
+            return self._result(candidate, url, 'failure', 'No credentials configured', 'missing_credentials')
+
+        for attempt in range(2):
+            started = time.monotonic()
+            try:
+                response = await asyncio.wait_for(
+                    loop.run_in_executor(executor, self._get, url, headers), self.timeout + 1)
+            except (asyncio.TimeoutError, requests.Timeout):
+                return self._result(candidate, url, 'timeout', f"No response within {self.timeout}s",
+                                    'timeout', started)
+            except requests.RequestException as e:
+                return self._result(candidate, url, 'failure', str(e)[:500], 'connection_error', started)
+
+            if response.status_code == 429 and attempt == 0:
+                self.stats['retried'] += 1
+                bucket.pause(float(response.headers.get('Retry-After') or 1))
+                await bucket.acquire()
+                continue
+            if 200 <= response.status_code < 300:
+                return self._result(candidate, url, 'success', f"HTTP {response.status_code}", None, started,
+                                    response.status_code)
+            return self._result(candidate, url, 'failure', f"HTTP {response.status_code}",
+                                'rate_limited' if response.status_code == 429 else f"http_{response.status_code}",
+                                started, response.status_code)
+
+    def _get(self, url: str, headers: Dict[str, str]) -> requests.Response:
+        session = getattr(self.local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.mount('http://', HTTPAdapter(pool_maxsize=4))
+            session.mount('https://', HTTPAdapter(pool_maxsize=4))
+            self.local.session = session
+        response = session.get(url, headers=headers, timeout=self.timeout, allow_redirects=False)
+        response.close()
+        return response
+
+    def _result(self, candidate: Dict[str, Any], url: str, status: str, message: str,
+                error_code: Optional[str], started: Optional[float] = None,
+                http_status: Optional[int] = None) -> Dict[str, Any]:
+        return {
+            'credential_id': candidate['credential_id'],
+            'test_status': status,
+            'test_message': message,
+            'error_code': error_code,
+            # Status only; response bodies may contain account data
+            'response_data': {'http_status': http_status} if http_status else None,
+            'response_time_ms': int((time.monotonic() - started) * 1000) if started else None,
+            'tested_endpoint': candidate['test_endpoint'],
+            'tested_at': datetime.now(timezone.utc)
+        }
+
+    async def _write_results(self, results: asyncio.Queue) -> None:
+        """Drain results into batched writes until a None arrives"""
+        batch: List[Dict[str, Any]] = []
+        deadline = time.monotonic() + self.flush_interval
+        done = False
+        while not done:
+            try:
+                result = await asyncio.wait_for(results.get(), max(deadline - time.monotonic(), 0.01))
+                if result is None:
+                    done = True
+                else:
+                    batch.append(result)
+            except asyncio.TimeoutError:
+                pass
+            if batch and (done or len(batch) >= self.write_batch_size or time.monotonic() >= deadline):
+                for attempt in range(WRITE_ATTEMPTS):
+                    try:
+                        await asyncio.to_thread(self._write_batch, batch)
+                        break
+                    except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+                        # The batch was rolled back; reconnect and write it again
+                        self.close()
+                        if attempt == WRITE_ATTEMPTS - 1:
+                            raise
+                        self.stats['write_retries'] += 1
+                        logger.warning(f"Writing {len(batch)} test results failed, retrying: {e}")
+                        await asyncio.sleep(2 ** attempt)
+                batch = []
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_interval
+
+    def _write_batch(self, batch: List[Dict[str, Any]]) -> None:
+        if not self.record_results:
+            self.stats['unrecorded'] += len(batch)
+            return
+        conn = self.writer_conn
+        if conn is None or conn.closed:
+            conn = self.writer_conn = self.get_db_connection()
+        with conn, conn.cursor() as cursor:
+            execute_values(cursor, """
+                INSERT INTO saas_channel_credential_test_history
+                    (credential_id, test_status, test_message, error_code, response_data,
+                     response_time_ms, tested_endpoint, tested_at, tested_by)
+                VALUES %s;
+            """, [(r['credential_id'], r['test_status'], r['test_message'], r['error_code'],
+                   json.dumps(r['response_data']) if r['response_data'] else None,
+                   r['response_time_ms'], r['tested_endpoint'], r['tested_at'], self.tested_by)
+                  for r in batch],
+                template="(%s::uuid, %s, %s, %s, %s::jsonb, %s, %s, %s, %s)")
+            execute_values(cursor, """
+                UPDATE saas_channel_credentials c
+                SET last_tested_at = v.tested_at, test_result = v.test_result
+                FROM (VALUES %s) v(credential_id, tested_at, test_result)
+                WHERE c.credential_id = v.credential_id;
+            """, [(r['credential_id'], r['tested_at'],
+                   json.dumps({'status': r['test_status'], 'message': r['test_message'],
+                               'error_code': r['error_code'], 'response_time_ms': r['response_time_ms']}))
+                  for r in batch],
+                template="(%s::uuid, %s::timestamptz, %s::jsonb)")
+        self.stats['written'] += len(batch)
+        self.stats['write_batches'] += 1
+
+    def close(self) -> None:
+        if self.writer_conn is not None:
+            self.writer_conn.close()
+            self.writer_conn = None
+
+
+def create_db_config() -> Dict[str, Any]:
+    """SaaS database connection settings from the environment"""
+    return {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'port': int(os.getenv('DB_PORT', '5432')),
+        'database': os.getenv('DB_NAME', 'catalog-edge-db'),
+        'user': os.getenv('DB_USER', 'postgres'),
+        'password': os.getenv('DB_PASSWORD', '')
+    }
+
+
+def main():
+    """Main CLI entry point"""
+    load_dotenv()
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description="Test tenant credentials in bulk")
+    parser.add_argument("--older-than-days", type=int, default=25, help="Test credentials not tested for this long")
+    parser.add_argument("--limit", type=int, default=10000, help="Maximum credentials per run")
+    parser.add_argument("--channels", help="Comma-separated channel keys")
+    parser.add_argument("--statuses", default="active", help="Comma-separated credential statuses to test")
+    parser.add_argument("--concurrency", type=int, default=50, help="Tests in flight at once")
+    parser.add_argument("--timeout", type=float, default=10.0, help="Seconds per test call")
+    parser.add_argument("--rate-limit-fraction", type=float, default=0.5,
+                        help="Share of each channel's published rate limit to use")
+    parser.add_argument("--default-rpm", type=float, default=60.0,
+                        help="Requests per minute for channels without rate_limits")
+    parser.add_argument("--batch-size", type=int, default=200, help="Results per database write")
+    parser.add_argument("--base-url", help="Send every test to this base URL instead of the channel's")
+    parser.add_argument("--mock", action="store_true", help="Start a local mock channel API and test against it")
+    parser.add_argument("--plaintext-portal-data", action="store_true",
+                        help="Use portal_credential_data as is (only where it is stored unencrypted)")
+    parser.add_argument("--dry-run", action="store_true", help="Only report the credentials that are due")
+
+    args = parser.parse_args()
+
+    mock = None
+    vault = None
+    try:
+        base_url = args.base_url
+        if args.mock:
+            from mock_channel_api import MockChannelAPI
+            mock = MockChannelAPI(latency_ms=50).start()
+            base_url = mock.url
+
+        db_config = create_db_config()
+        if os.getenv('CREDENTIAL_ENCRYPTION_KEY'):
+            vault = CredentialVault(db_config, os.getenv('CREDENTIAL_ENCRYPTION_KEY'))
+        runner = CredentialTestRunner(
+            db_config,
+            concurrency=args.concurrency,
+            timeout=args.timeout,
+            rate_limit_fraction=args.rate_limit_fraction,
+            default_requests_per_minute=args.default_rpm,
+            write_batch_size=args.batch_size,
+            base_url_override=base_url,
+            vault=vault,
+            plaintext_portal_data=args.plaintext_portal_data,
+            # A mock or redirected endpoint says nothing about the real channel
+            record_results=not (args.mock or args.base_url)
+        )
+        candidates = runner.load_candidates(
+            older_than_days=args.older_than_days,
+            limit=args.limit,
+            channels=args.channels.split(',') if args.channels else None,
+            statuses=tuple(args.statuses.split(','))
+        )
+        if args.dry_run:
+            per_channel: Dict[str, int] = defaultdict(int)
+            for candidate in candidates:
+                per_channel[candidate['channel_key']] += 1
+            print(json.dumps({'status': 'success', 'due': len(candidates), 'per_channel': per_channel}, indent=2))
+            return
+
+        try:
+            result = runner.run(candidates)
+        finally:
+            runner.close()
+        if mock is not None:
+            result['mock'] = mock.stats()
+        print(json.dumps(result, indent=2, default=str))
+
+    except Exception as e:
+        logger.error(f"Credential test run failed: {e}")
+        print(json.dumps({"status": "error", "message": str(e)}, indent=2))
+        exit(1)
+
+    finally:
+        if mock is not None:
+            mock.stop()
+        if vault is not None:
+            vault.close()
+
+
+if __name__ == "__main__":
+    main()
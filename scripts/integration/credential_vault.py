@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Decrypt-Once Credential Vault
+=============================
+
+Serves field lookups for encrypted tenant credentials without a database
+decrypt per field per execution. Uses the envelope encryption layout from
+schemas/credential_envelope_encryption.sql:
+
+- each tenant has a data key, stored wrapped with the master key
+  (CREDENTIAL_ENCRYPTION_KEY)
+- all fields of a saas_channel_credentials row are encrypted together as
+  ``encrypted_blob`` with that data key
+
+On a miss the vault unwraps the tenant's data key (kept for
+``data_key_ttl_seconds``), decrypts the whole blob with one
+``decrypt_credential_data_strict`` call (a wrong key or corrupt blob raises
+ValueError instead of reading as no credentials), and keeps the plaintext only in a locked,
+size-bounded, TTL-expiring CredentialCache (credential_cache.py). Concurrent
+misses for the same tenant channel share one decrypt. Database crypto work is
+therefore about one blob decrypt per tenant channel per TTL window.
+
+Usage:
+    python credential_vault.py --saas-edge-id <uuid> --channel-key SHOPIFY [--fields api_key] [--reveal]
+    python credential_vault.py --saas-edge-id <uuid> --channel-key SHOPIFY --store '{"api_key": "..."}'
+
+Requirements:
+    pip install psycopg2-binary python-dotenv
+"""
+
+import os
+import json
+import time
+import logging
+import argparse
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Any, Tuple
+from psycopg2.pool import ThreadedConnectionPool
+from dotenv import load_dotenv
+from credential_cache import CredentialCache
+
+logger = logging.getLogger(__name__)
+
+# Latest active, blob-encrypted credential of a tenant channel
+BLOB_QUERY = """
+SELECT c.credential_id, c.data_key_id, c.encrypted_blob
+FROM saas_channel_credentials c
+JOIN saas_channel_master m ON m.channel_id = c.channel_id
+WHERE c.saas_edge_id = %s::uuid AND m.channel_key = %s
+  AND c.status = 'active' AND c.encrypted_blob IS NOT NULL
+ORDER BY c.updated_at DESC
+LIMIT 1;
+"""
+
+CREDENTIAL_ROW_QUERY = """
+SELECT c.credential_id
+FROM saas_channel_credentials c
+JOIN saas_channel_master m ON m.channel_id = c.channel_id
+WHERE c.saas_edge_id = %s::uuid AND m.channel_key = %s AND c.status = 'active'
+ORDER BY c.updated_at DESC
+LIMIT 1;
+"""
+
+Pair = Tuple[str, str]
+
+
+class CredentialVault:
+    """Decrypts each tenant channel's credential blob once per TTL"""
+
+    def __init__(self,
+                 db_config: Dict[str, Any],
+                 master_key: str,
+                 cache: Optional[CredentialCache] = None,
+                 data_key_ttl_seconds: float = 3600.0,
+                 max_data_keys: int = 1000,
+                 min_connections: int = 1,
+                 max_connections: int = 4):
+        if not master_key:
+            raise ValueError("A master key (CREDENTIAL_ENCRYPTION_KEY) is required")
+        self.master_key = master_key
+        self.pool = ThreadedConnectionPool(min_connections, max_connections, **db_config)
+        self.cache = cache if cache is not None else CredentialCache()
+        self.data_key_ttl_seconds = data_key_ttl_seconds
+        self.max_data_keys = max_data_keys
+
+        # key_id -> (expires_at, plaintext data key), LRU-bounded
+        self.data_keys: OrderedDict = OrderedDict()
+        self.loading: Dict[Pair, Future] = {}
+        self.lock = threading.Lock()
+        self.stats = {'loads': 0, 'coalesced': 0, 'blob_decrypts': 0, 'key_unwraps': 0, 'errors': 0}
+
+    def close(self) -> None:
+        """Drop every plaintext credential and data key, and close the pool"""
+        self.cache.invalidate()
+        with self.lock:
+            self.data_keys.clear()
+        self.pool.closeall()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self.lock:
+            return {**self.stats, 'data_keys': len(self.data_keys), 'cache': self.cache.metrics()}
+
+    def get_field(self, saas_edge_id: str, channel_key: str, field: str, default: Any = None) -> Any:
+        return self.get_credentials(saas_edge_id, channel_key, [field]).get(field, default)
+
+    def get_credentials(self, saas_edge_id: str, channel_key: str,
+                        fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Decrypted credentials of a tenant channel, restricted to fields when given"""
+        pair = (str(saas_edge_id), channel_key)
+        credentials = self.cache.get(pair, fields)
+        if credentials is None:
+            with self.lock:
+                future = self.loading.get(pair)
+                owner = future is None
+                if owner:
+                    future = Future()
+                    self.loading[pair] = future
+                else:
+                    self.stats['coalesced'] += 1
+
+            if owner:
+                generation = self.cache.generation
+                try:
+                    loaded = self._load(pair)
+                    self.cache.put(pair, loaded, generation)
+                    future.set_result(loaded)
+                except Exception as e:
+                    with self.lock:
+                        self.stats['errors'] += 1
+                    future.set_exception(e)
+                finally:
+                    with self.lock:
+                        self.loading.pop(pair, None)
+            credentials = future.result()
+
+        if fields:
+            return {field: value for field, value in credentials.items() if field in fields}
+        return credentials
+
+    def store_credentials(self, saas_edge_id: str, channel_key: str, credentials: Dict[str, Any]) -> str:
+        """Encrypt credentials as one blob under the tenant's data key; returns credential_id"""
+        pair = (str(saas_edge_id), channel_key)
+        conn = self.pool.getconn()
+        try:
+            with conn, conn.cursor() as cursor:
+                cursor.execute(CREDENTIAL_ROW_QUERY, pair)
+                row = cursor.fetchone()
+                if row is None:
+                    raise ValueError(f"No active saas_channel_credentials row for {channel_key} "
+                                     f"of tenant {saas_edge_id}")
+                credential_id = row[0]
+
+                cursor.execute("""
+                    SELECT key_id FROM saas_credential_data_keys
+                    WHERE saas_edge_id = %s::uuid AND status = 'active';
+                """, (pair[0],))
+                row = cursor.fetchone()
+                if row is None:
+                    cursor.execute("SELECT create_credential_data_key(%s::uuid, %s);", (pair[0], self.master_key))
+                    row = cursor.fetchone()
+                key_id = row[0]
+
+                cursor.execute("""
+                    UPDATE saas_channel_credentials
+                    SET encrypted_blob = encrypt_credential_data(%s::jsonb, %s),
+                        data_key_id = %s,
+                        updated_at = now()
+                    WHERE credential_id = %s;
+                """, (json.dumps(credentials), self._data_key(cursor, key_id), key_id, credential_id))
+        finally:
+            self.pool.putconn(conn)
+
+        self.cache.invalidate(*pair)
+        return str(credential_id)
+
+    def _load(self, pair: Pair) -> Dict[str, Any]:
+        with self.lock:
+            self.stats['loads'] += 1
+        conn = self.pool.getconn()
+        try:
+            with conn, conn.cursor() as cursor:
+                cursor.execute(BLOB_QUERY, pair)
+                row = cursor.fetchone()
+                if row is None:
+                    return {}
+                return self._decrypt(cursor, *row)
+        finally:
+            self.pool.putconn(conn)
+
+    def decrypt_blob(self, credential_id: str, key_id: str, encrypted_blob: str) -> Dict[str, Any]:
+        """Fields of one credential row's blob, bypassing the per-channel cache"""
+        conn = self.pool.getconn()
+        try:
+            with conn, conn.cursor() as cursor:
+                return self._decrypt(cursor, credential_id, key_id, encrypted_blob)
+        finally:
+            self.pool.putconn(conn)
+
+    def _decrypt(self, cursor, credential_id, key_id, encrypted_blob: str) -> Dict[str, Any]:
+        data_key = self._data_key(cursor, key_id)
+        # NULL rather than an error, so the key never reaches the server log
+        cursor.execute("SELECT decrypt_credential_data_strict(%s, %s);", (encrypted_blob, data_key))
+        credentials = cursor.fetchone()[0]
+        with self.lock:
+            self.stats['blob_decrypts'] += 1
+        if credentials is None:
+            raise ValueError(f"Could not decrypt credential {credential_id}; wrong data key or corrupt blob")
+        return credentials
+
+    def _data_key(self, cursor, key_id) -> str:
+        key_id = str(key_id)
+        now = time.monotonic()
+        with self.lock:
+            cached = self.data_keys.get(key_id)
+            if cached is not None and cached[0] > now:
+                self.data_keys.move_to_end(key_id)
+                return cached[1]
+
+        cursor.execute("SELECT unwrap_credential_data_key(%s::uuid, %s);", (key_id, self.master_key))
+        data_key = cursor.fetchone()[0]
+        if not data_key:
+            raise ValueError(f"Could not unwrap data key {key_id}; check CREDENTIAL_ENCRYPTION_KEY")
+
+        with self.lock:
+            self.stats['key_unwraps'] += 1
+            self.data_keys[key_id] = (now + self.data_key_ttl_seconds, data_key)
+            self.data_keys.move_to_end(key_id)
+            while len(self.data_keys) > self.max_data_keys:
+                self.data_keys.popitem(last=False)
+        return data_key
+
+
+def create_db_config() -> Dict[str, Any]:
+    """SaaS database connection settings from the environment"""
+    return {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'port': int(os.getenv('DB_PORT', '5432')),
+        'database': os.getenv('DB_NAME', 'catalog-edge-db'),
+        'user': os.getenv('DB_USER', 'postgres'),
+        'password': os.getenv('DB_PASSWORD', '')
+    }
+
+
+def main():
+    """Main CLI entry point"""
+    load_dotenv()
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description="Read or store envelope-encrypted tenant credentials")
+    parser.add_argument("--saas-edge-id", required=True, help="Tenant saas_edge_id")
+    parser.add_argument("--channel-key", required=True, help="Channel key, e.g. SHOPIFY")
+    parser.add_argument("--fields", help="Comma-separated fields to read")
+    parser.add_argument("--reveal", action="store_true", help="Print values instead of masking them")
+    parser.add_argument("--store", help="JSON object of credentials to encrypt and store")
+
+    args = parser.parse_args()
+
+    try:
+        vault = CredentialVault(create_db_config(), os.getenv('CREDENTIAL_ENCRYPTION_KEY', ''))
+        try:
+            if args.store:
+                credential_id = vault.store_credentials(args.saas_edge_id, args.channel_key, json.loads(args.store))
+                print(json.dumps({"status": "success", "credential_id": credential_id}, indent=2))
+                return
+
+            fields = args.fields.split(',') if args.fields else None
+            credentials = vault.get_credentials(args.saas_edge_id, args.channel_key, fields)
+            if not args.reveal:
+                credentials = {field: '***' for field in credentials}
+            print(json.dumps({"status": "success", "credentials": credentials}, indent=2))
+        finally:
+            vault.close()
+
+    except Exception as e:
+        logger.error(f"Credential vault operation failed: {e}")
+        print(json.dumps({"status": "error", "message": str(e)}, indent=2))
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
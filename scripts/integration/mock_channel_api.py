@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Mock Channel API for Credential Tests
+=====================================
+
+Local HTTP server that stands in for channel APIs (Shopify, eBay, Amazon...)
+when running credential_test_runner.py without touching real accounts.
+
+Every GET is answered after ``latency_ms`` (plus jitter):
+
+- 401 when no credential header is sent or the token starts with "invalid"
+- 429 with Retry-After when a path gets more than ``rate_limit_per_second``
+  requests in one second
+- 500 for a ``failure_rate`` fraction of requests
+- 200 with a small JSON body otherwise
+
+``stats()`` reports the peak requests per second seen on each path, which
+shows whether a client kept to its per-channel rate limits.
+
+Usage:
+    python mock_channel_api.py --port 8095 --latency-ms 50
+    python mock_channel_api.py --port 8095 --failure-rate 0.05 --rate-limit-per-second 20
+
+Requirements:
+    Python standard library only
+"""
+
+import json
+import time
+import random
+import logging
+import argparse
+import threading
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Any
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+CREDENTIAL_HEADERS = ('Authorization', 'X-API-Key', 'X-Shopify-Access-Token')
+
+
+class MockChannelAPI:
+    """Threaded HTTP server answering credential test requests"""
+
+    def __init__(self,
+                 host: str = '127.0.0.1',
+                 port: int = 0,
+                 latency_ms: float = 50.0,
+                 jitter_ms: float = 10.0,
+                 failure_rate: float = 0.0,
+                 rate_limit_per_second: Optional[float] = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self.rate_limit_per_second = rate_limit_per_second
+
+        self.lock = threading.Lock()
+        # path -> {second: requests}
+        self.per_second: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.by_status: Dict[int, int] = defaultdict(int)
+        self.requests = 0
+
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'MockChannelAPI':
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='mock-channel-api', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'requests': self.requests,
+                'by_status': dict(self.by_status),
+                'peak_requests_per_second': {path: max(seconds.values())
+                                             for path, seconds in self.per_second.items()}
+            }
+
+    def _respond(self, path: str, headers) -> int:
+        second = int(time.time())
+        with self.lock:
+            self.requests += 1
+            self.per_second[path][second] += 1
+            over_limit = (self.rate_limit_per_second is not None
+                          and self.per_second[path][second] > self.rate_limit_per_second)
+
+        time.sleep(max(self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms), 0) / 1000)
+
+        token = next((headers.get(name) for name in CREDENTIAL_HEADERS if headers.get(name)), None)
+        if token and token.startswith('Bearer '):
+            token = token[len('Bearer '):]
+        if over_limit:
+            return 429
+        if not token or token.startswith('invalid'):
+            return 401
+        if random.random() < self.failure_rate:
+            return 500
+        return 200
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+            def do_GET(self):
+                path = urlparse(self.path).path
+                status = server._respond(path, self.headers)
+                with server.lock:
+                    server.by_status[status] += 1
+                body = json.dumps({'ok': status == 200, 'path': path, 'status': status}).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                if status == 429:
+                    self.send_header('Retry-After', '1')
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+
+def main():
+    """Main CLI entry point"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description="Serve a mock channel API for credential tests")
+    parser.add_argument("--host", default='127.0.0.1', help="Bind address")
+    parser.add_argument("--port", type=int, default=8095, help="Port")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Response latency")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of 500 responses")
+    parser.add_argument("--rate-limit-per-second", type=float, help="Answer 429 above this rate per path")
+
+    args = parser.parse_args()
+
+    api = MockChannelAPI(args.host, args.port, latency_ms=args.latency_ms, failure_rate=args.failure_rate,
+                         rate_limit_per_second=args.rate_limit_per_second)
+    logger.info(f"Mock channel API listening on {api.url}")
+    try:
+        api.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(api.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
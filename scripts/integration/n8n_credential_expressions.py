@@ -11,6 +11,7 @@ Features:
 - Multi-tenant credential isolation
 - Secure credential handling
 - Dynamic configuration injection
+- Workflow templates compiled once and filled per tenant (n8n_workflow_templates.py)
 """
 
 import os
@@ -21,13 +22,16 @@ from typing import Dict, List, Optional, Any
 import logging
 from datetime import datetime
 
+from n8n_workflow_templates import CompiledWorkflowTemplate, WorkflowTemplateEngine, default_engine, slot
+
 logger = logging.getLogger(__name__)
 
 class N8NCredentialExpressions:
     """Generates n8n expressions for dynamic credential retrieval"""
     
-    def __init__(self, db_config: Dict[str, str]):
+    def __init__(self, db_config: Dict[str, str], template_engine: Optional[WorkflowTemplateEngine] = None):
         self.db_config = db_config
+        self.template_engine = template_engine or default_engine
     
     def create_credential_lookup_expression(
         self, 
@@ -79,7 +83,6 @@ class N8NCredentialExpressions:
         AS $$
         DECLARE
             credential_value TEXT;
-            installation_config JSONB;
         BEGIN
             -- Get credential from channel installations
             SELECT 
@@ -88,7 +91,7 @@ class N8NCredentialExpressions:
             JOIN saas_channel_master scm ON sci.channel_id = scm.channel_id
             WHERE sci.saas_edge_id = p_saas_edge_id 
             AND scm.channel_key = p_channel_key
-            AND sci.installation_status = 'active'
+            AND sci.status = 'active'
             LIMIT 1;
             
             -- If not found in installations, check global defaults
@@ -129,77 +132,324 @@ class N8NCredentialExpressions:
         -- Create index for performance
         CREATE INDEX IF NOT EXISTS idx_credential_errors_edge_channel 
         ON credential_lookup_errors (saas_edge_id, channel_key, created_at);
+
+        -- Bulk variant: every requested field (NULL = all) for many
+        -- (saas_edge_id, channel_key) pairs in one call. Installation values
+        -- override channel defaults field by field, like get_tenant_credential.
+        -- Returns one row per pair, in input order; unknown pairs get an empty object.
+        CREATE OR REPLACE FUNCTION get_tenant_credentials_bulk(
+            p_saas_edge_ids UUID[],
+            p_channel_keys TEXT[],
+            p_credential_fields TEXT[] DEFAULT NULL
+        )
+        RETURNS TABLE (saas_edge_id UUID, channel_key TEXT, credentials JSONB)
+        LANGUAGE sql
+        STABLE
+        SECURITY DEFINER
+        AS $$
+            SELECT
+                pair.saas_edge_id,
+                pair.channel_key,
+                COALESCE((
+                    SELECT jsonb_object_agg(field.key, field.value)
+                    FROM jsonb_each(
+                        COALESCE(jsonb_strip_nulls(scm.default_channel_config), '{}'::jsonb) ||
+                        COALESCE(jsonb_strip_nulls(sci.installation_config), '{}'::jsonb)
+                    ) AS field
+                    WHERE p_credential_fields IS NULL OR field.key = ANY(p_credential_fields)
+                ), '{}'::jsonb) AS credentials
+            FROM unnest(p_saas_edge_ids, p_channel_keys) WITH ORDINALITY
+                AS pair(saas_edge_id, channel_key, position)
+            LEFT JOIN saas_channel_master scm ON scm.channel_key = pair.channel_key
+            LEFT JOIN LATERAL (
+                SELECT i.installation_config
+                FROM saas_channel_installations i
+                WHERE i.saas_edge_id = pair.saas_edge_id
+                AND i.channel_id = scm.channel_id
+                AND i.status = 'active'
+                LIMIT 1
+            ) sci ON true
+            ORDER BY pair.position;
+        $$;
+
+        -- All fields of one tenant channel as a JSON object
+        CREATE OR REPLACE FUNCTION get_tenant_credentials(
+            p_saas_edge_id UUID,
+            p_channel_key TEXT,
+            p_credential_fields TEXT[] DEFAULT NULL
+        )
+        RETURNS JSONB
+        LANGUAGE plpgsql
+        STABLE
+        SECURITY DEFINER
+        AS $$
+        DECLARE
+            credentials JSONB;
+        BEGIN
+            SELECT b.credentials INTO credentials
+            FROM get_tenant_credentials_bulk(
+                ARRAY[p_saas_edge_id], ARRAY[p_channel_key], p_credential_fields
+            ) b;
+
+            RETURN COALESCE(credentials, '{}'::jsonb);
+
+        EXCEPTION WHEN OTHERS THEN
+            -- STABLE functions cannot write to credential_lookup_errors
+            RAISE WARNING 'get_tenant_credentials(%, %) failed: %', p_saas_edge_id, p_channel_key, SQLERRM;
+            RETURN '{}'::jsonb;
+        END;
+        $$;
+
+        -- One index probe per pair instead of an edge scan plus a channel filter
+        CREATE INDEX IF NOT EXISTS idx_installations_edge_channel
+        ON saas_channel_installations (saas_edge_id, channel_id);
         """
     
-    def create_n8n_custom_function(self) -> str:
-        """
-        Create a custom JavaScript function for n8n to call the database function
-        This goes in your n8n Code node or as a custom function
-        """
+    def _credential_lookup_js(self) -> str:
+        """JavaScript credential lookup functions shared by the n8n Code nodes"""
         return """
-        // N8N Custom Function: Database Credential Lookup
-        // Add this to a Code node in your n8n workflows
+        // Lookups go to the local credential resolver sidecar
+        // (scripts/integration/credential_resolver_service.py), which keeps a
+        // database connection pool, batches concurrent lookups and caches
+        // results. Needs NODE_FUNCTION_ALLOW_BUILTIN=http on the n8n instance.
+        // The keep-alive agent lives for one node run: call
+        // closeCredentialResolver() when the node is done with lookups.
+        const http = require('http');
         
-        const { Client } = require('pg');
+        const resolverUrl = new URL($env.CREDENTIAL_RESOLVER_URL || 'http://127.0.0.1:8787');
+        const resolverToken = $env.CREDENTIAL_RESOLVER_TOKEN || '';
+        const resolverAgent = new http.Agent({ keepAlive: true, maxSockets: 8 });
         
-        // Database connection configuration
-        const dbConfig = {
-            host: '${{$env.DB_HOST}}',
-            port: parseInt('${{$env.DB_PORT}}'),
-            database: '${{$env.DB_NAME}}',
-            user: '${{$env.DB_USER}}',
-            password: '${{$env.DB_PASSWORD}}'
-        };
+        function closeCredentialResolver() {
+            resolverAgent.destroy();
+        }
+        
+        function callResolver(path, body) {
+            const payload = JSON.stringify(body);
+            return new Promise((resolve, reject) => {
+                const request = http.request({
+                    hostname: resolverUrl.hostname,
+                    port: resolverUrl.port || 80,
+                    path,
+                    method: 'POST',
+                    agent: resolverAgent,
+                    timeout: 5000,
+                    headers: {
+                        'Content-Type': 'application/json',
+                        'Content-Length': Buffer.byteLength(payload),
+                        'X-Resolver-Token': resolverToken
+                    }
+                }, response => {
+                    let data = '';
+                    response.setEncoding('utf8');
+                    response.on('data', chunk => { data += chunk; });
+                    response.on('end', () => {
+                        if (response.statusCode !== 200) {
+                            reject(new Error(`Credential resolver returned ${response.statusCode}: ${data}`));
+                            return;
+                        }
+                        try {
+                            resolve(JSON.parse(data));
+                        } catch (error) {
+                            reject(error);
+                        }
+                    });
+                });
+                request.on('timeout', () => request.destroy(new Error('Credential resolver timed out')));
+                request.on('error', reject);
+                request.end(payload);
+            });
+        }
         
         async function getCredential(saasEdgeId, channelKey, credentialField, fallbackValue = null) {
-            const client = new Client(dbConfig);
+            const credentials = await getCredentials(saasEdgeId, channelKey, [credentialField]);
+            return credentials[credentialField] ?? fallbackValue;
+        }
+        
+        // Every field (or the listed ones) for many [saasEdgeId, channelKey]
+        // pairs in one request. Resolves to { 'edgeId|CHANNEL': { field: value } }.
+        async function getCredentialsBulk(pairs, credentialFields = null) {
+            const unique = [...new Map(pairs.map(([edge, key]) => [`${edge}|${key}`, [edge, key]])).values()];
+            if (unique.length === 0) {
+                return {};
+            }
             
             try {
-                await client.connect();
-                
-                const result = await client.query(
-                    'SELECT get_tenant_credential($1, $2, $3, $4) as credential_value',
-                    [saasEdgeId, channelKey, credentialField, fallbackValue]
-                );
-                
-                return result.rows[0]?.credential_value || fallbackValue;
+                const result = await callResolver('/credentials/bulk', { pairs: unique, fields: credentialFields });
+                return result.credentials || {};
                 
             } catch (error) {
                 console.error('Credential lookup failed:', error);
-                return fallbackValue;
-            } finally {
-                await client.end();
+                return {};
             }
         }
         
+        // All fields of one tenant channel as an object
+        async function getCredentials(saasEdgeId, channelKey, credentialFields = null) {
+            const resolved = await getCredentialsBulk([[saasEdgeId, channelKey]], credentialFields);
+            return resolved[`${saasEdgeId}|${channelKey}`] || {};
+        }
+        """
+    
+    def create_n8n_custom_function(self) -> str:
+        """
+        Create a custom JavaScript function for n8n to call the database function
+        This goes in your n8n Code node or as a custom function
+        """
+        return """
+        // N8N Custom Function: Database Credential Lookup
+        // Add this to a Code node in your n8n workflows
+        """ + self._credential_lookup_js() + """
         // Usage in n8n expressions:
         // {{ $getCredential('tenant-uuid', 'SHOPIFY', 'api_key', 'default-key') }}
+        // const shopify = await getCredentials('tenant-uuid', 'SHOPIFY');  // all fields, one request
+        // closeCredentialResolver();  // when the node has finished its lookups
         
-        // Make function available globally
+        // Make functions available globally
         global.getCredential = getCredential;
+        global.getCredentials = getCredentials;
+        global.getCredentialsBulk = getCredentialsBulk;
+        global.closeCredentialResolver = closeCredentialResolver;
         
         // For the current workflow execution
         return {
-            getCredential: getCredential
+            getCredential: getCredential,
+            getCredentials: getCredentials,
+            getCredentialsBulk: getCredentialsBulk,
+            closeCredentialResolver: closeCredentialResolver
         };
         """
     
+    def create_credential_loader_code(self, channel_key: str, required_credentials: List[str]) -> str:
+        """
+        Code node that resolves every required field for all incoming items
+        with a single credential resolver request and attaches them as
+        $json.credentials for the channel node. Workflows built by
+        _build_workflow_template drop the field again right after that node
+        (create_credential_strip_code), so no later node, log row or export
+        of downstream data carries the secrets.
+        """
+        return """
+        // N8N Code Node: Load Credentials (run once for all items)
+        """ + self._credential_lookup_js() + f"""
+        const channelKey = {json.dumps(channel_key)};
+        const requiredFields = {json.dumps(required_credentials)};
+        const items = $input.all();
+        
+        let resolved;
+        try {{
+            resolved = await getCredentialsBulk(
+                items.map(item => [item.json.saas_edge_id, channelKey]),
+                requiredFields
+            );
+        }} finally {{
+            closeCredentialResolver();
+        }}
+        
+        return items.map(item => ({{
+            json: {{
+                ...item.json,
+                credentials: resolved[`${{item.json.saas_edge_id}}|${{channelKey}}`] || {{}}
+            }}
+        }}));
+        """
+    
+    def create_credential_strip_code(self) -> str:
+        """
+        Code node placed after the channel node: drops $json.credentials from
+        every item, in case the node passed its input through
+        """
+        return """
+        // N8N Code Node: Strip Credentials (run once for all items)
+        return $input.all().map(item => {
+            const { credentials, ...json } = item.json;
+            return { json, pairedItem: item.pairedItem };
+        });
+        """
+    
+    def compile_workflow_template(
+        self,
+        node_type: str,
+        channel_key: str,
+        operation: str,
+        required_credentials: List[str]
+    ) -> CompiledWorkflowTemplate:
+        """
+        Dynamic credential workflow template, built and serialized once per
+        (node_type, channel_key, operation, required_credentials)
+        """
+        key = ('dynamic_credentials', node_type, channel_key, operation, tuple(required_credentials))
+        return self.template_engine.compile(
+            key,
+            lambda: self._build_workflow_template(node_type, channel_key, operation, required_credentials)
+        )
+    
+    def workflow_template_values(
+        self,
+        channel_key: str,
+        operation: str,
+        saas_edge_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Slot values of a dynamic credential workflow. With saas_edge_id the
+        webhook path and id are scoped to the tenant (same prefix as
+        generate_installation_webhook_paths), so tenant workflows can be
+        active side by side.
+        """
+        prefix = saas_edge_id.replace('-', '')[:8] if saas_edge_id else None
+        webhook_path = f"/{channel_key.lower()}/{operation}"
+        webhook_id = f"{channel_key.lower()}-{operation}-webhook"
+        return {
+            'webhook_path': f"/{prefix}{webhook_path}" if prefix else webhook_path,
+            'webhook_id': f"{prefix}-{webhook_id}" if prefix else webhook_id,
+            'now': datetime.now().isoformat()
+        }
+    
     def create_workflow_template_with_dynamic_credentials(
         self, 
         node_type: str,
         channel_key: str,
         operation: str,
-        required_credentials: List[str]
+        required_credentials: List[str],
+        saas_edge_id: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Create an n8n workflow template that uses dynamic credentials
         """
+        template = self.compile_workflow_template(node_type, channel_key, operation, required_credentials)
+        return template.instantiate(**self.workflow_template_values(channel_key, operation, saas_edge_id))
+    
+    def render_workflow_template_with_dynamic_credentials(
+        self,
+        node_type: str,
+        channel_key: str,
+        operation: str,
+        required_credentials: List[str],
+        saas_edge_id: Optional[str] = None
+    ) -> str:
+        """
+        Same workflow as JSON text, ready to store in n8n_workflow_json or
+        send to the n8n API without building or serializing a dict
+        """
+        template = self.compile_workflow_template(node_type, channel_key, operation, required_credentials)
+        return template.render(**self.workflow_template_values(channel_key, operation, saas_edge_id))
+    
+    def _build_workflow_template(
+        self,
+        node_type: str,
+        channel_key: str,
+        operation: str,
+        required_credentials: List[str]
+    ) -> Dict[str, Any]:
+        """Workflow structure with slots for the webhook and timestamps"""
         
-        # Create credential expressions for each required field
+        # Fields are resolved once by the Load Credentials node (one request for
+        # all fields and items) and read from its output by the channel node;
+        # Strip Credentials removes them before the result is checked and logged
         credential_expressions = {}
         for cred_field in required_credentials:
             credential_expressions[cred_field] = (
-                f"={{{{ $getCredential($json.saas_edge_id, '{channel_key}', '{cred_field}') }}}}"
+                f"={{{{ $('Load Credentials').item.json.credentials['{cred_field}'] }}}}"
             )
         
         workflow = {
@@ -210,7 +460,7 @@ class N8NCredentialExpressions:
                 {
                     "parameters": {
                         "httpMethod": "POST",
-                        "path": f"/{channel_key.lower()}/{operation}",
+                        "path": slot('webhook_path'),
                         "responseMode": "onReceived",
                         "options": {}
                     },
@@ -219,11 +469,12 @@ class N8NCredentialExpressions:
                     "type": "n8n-nodes-base.webhook",
                     "typeVersion": 1,
                     "position": [300, 300],
-                    "webhookId": f"{channel_key.lower()}-{operation}-webhook"
+                    "webhookId": slot('webhook_id')
                 },
                 {
                     "parameters": {
-                        "jsCode": self.create_n8n_custom_function()
+                        "mode": "runOnceForAllItems",
+                        "jsCode": self.create_credential_loader_code(channel_key, required_credentials)
                     },
                     "id": "credential-loader",
                     "name": "Load Credentials",
@@ -246,6 +497,17 @@ class N8NCredentialExpressions:
                     "typeVersion": 1,
                     "position": [700, 300]
                 },
+                {
+                    "parameters": {
+                        "mode": "runOnceForAllItems",
+                        "jsCode": self.create_credential_strip_code()
+                    },
+                    "id": "credential-strip",
+                    "name": "Strip Credentials",
+                    "type": "n8n-nodes-base.code",
+                    "typeVersion": 2,
+                    "position": [900, 300]
+                },
                 {
                     "parameters": {
                         "conditions": {
@@ -272,7 +534,7 @@ class N8NCredentialExpressions:
                     "name": "Success Check",
                     "type": "n8n-nodes-base.if",
                     "typeVersion": 2,
-                    "position": [900, 300]
+                    "position": [1100, 300]
                 },
                 {
                     "parameters": {
@@ -295,7 +557,7 @@ class N8NCredentialExpressions:
                     "name": "Log Success",
                     "type": "n8n-nodes-base.postgres",
                     "typeVersion": 2.5,
-                    "position": [1100, 200]
+                    "position": [1300, 200]
                 },
                 {
                     "parameters": {
@@ -318,7 +580,7 @@ class N8NCredentialExpressions:
                     "name": "Log Error",
                     "type": "n8n-nodes-base.postgres",
                     "typeVersion": 2.5,
-                    "position": [1100, 400]
+                    "position": [1300, 400]
                 }
             ],
             "connections": {
@@ -345,6 +607,17 @@ class N8NCredentialExpressions:
                     ]
                 },
                 f"{channel_key} {operation.title()}": {
+                    "main": [
+                        [
+                            {
+                                "node": "Strip Credentials",
+                                "type": "main",
+                                "index": 0
+                            }
+                        ]
+                    ]
+                },
+                "Strip Credentials": {
                     "main": [
                         [
                             {
@@ -381,14 +654,14 @@ class N8NCredentialExpressions:
             "staticData": {},
             "tags": [
                 {
-                    "createdAt": datetime.now().isoformat(),
-                    "updatedAt": datetime.now().isoformat(),
+                    "createdAt": slot('now'),
+                    "updatedAt": slot('now'),
                     "id": f"tag-{channel_key.lower()}",
                     "name": channel_key
                 }
             ],
             "triggerCount": 1,
-            "updatedAt": datetime.now().isoformat(),
+            "updatedAt": slot('now'),
             "versionId": "1"
         }
         
@@ -492,6 +765,34 @@ class N8NCredentialExpressions:
             pass
         '''
     
+    def resolve_credentials(
+        self,
+        pairs: List[tuple],
+        credential_fields: Optional[List[str]] = None
+    ) -> Dict[tuple, Dict[str, Any]]:
+        """
+        Resolve credentials for many (saas_edge_id, channel_key) pairs in one
+        round trip via get_tenant_credentials_bulk
+        
+        Returns:
+            {(saas_edge_id, channel_key): {field: value}}
+        """
+        unique_pairs = list(dict.fromkeys((str(edge), key) for edge, key in pairs))
+        if not unique_pairs:
+            return {}
+        
+        conn = psycopg2.connect(**self.db_config)
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "SELECT saas_edge_id::text, channel_key, credentials "
+                    "FROM get_tenant_credentials_bulk(%s::uuid[], %s::text[], %s::text[])",
+                    ([edge for edge, _ in unique_pairs], [key for _, key in unique_pairs], credential_fields)
+                )
+                return {(edge, key): credentials or {} for edge, key, credentials in cursor.fetchall()}
+        finally:
+            conn.close()
+    
     def generate_installation_webhook_paths(self, saas_edge_id: str, channel_key: str) -> Dict[str, str]:
         """Generate webhook paths for a tenant installation"""
         base_path = f"/webhook/{saas_edge_id.replace('-', '')[:8]}/{channel_key.lower()}"
@@ -535,11 +836,5 @@ def main():
     for field, expr in expressions.items():
         print(f"{field}: {expr}")
 
-if __name__ == "__main__":
-    main()
-        '''.strip()
-
-        return credential_system.create_installation_webhook_paths('test-tenant', 'SHOPIFY')
-
 if __name__ == "__main__":
     main()
@@ -24,6 +24,8 @@ from typing import Dict, List, Optional, Any
 import logging
 from dataclasses import dataclass
 
+from n8n_workflow_templates import CompiledWorkflowTemplate, default_engine
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -53,6 +55,7 @@ class N8NIntegrationSync:
         self.n8n_base_url = n8n_base_url.rstrip('/')
         self.n8n_api_key = n8n_api_key
         self.db_config = db_config
+        self.template_engine = default_engine
         
         # Configure requests session
         self.session = requests.Session()
@@ -350,8 +353,8 @@ class N8NIntegrationSync:
                     if cursor.fetchone():
                         continue
                     
-                    # Create basic n8n workflow template
-                    workflow_json = self._create_basic_workflow_template(node_info, operation)
+                    # Create basic n8n workflow template (compiled once per node and operation)
+                    workflow_json = self._compile_basic_workflow_template(node_info, operation).render()
                     
                     # Insert n8n flow first
                     flow_insert_sql = """
@@ -368,7 +371,7 @@ class N8NIntegrationSync:
                     
                     cursor.execute(flow_insert_sql, (
                         flow_name, 'v1.0', channel_key, operation,
-                        json.dumps(workflow_json),
+                        workflow_json,
                         json.dumps(node_info.defaults),
                         json.dumps(credentials_schema)
                     ))
@@ -412,8 +415,18 @@ class N8NIntegrationSync:
         
         return created_count
     
+    def _compile_basic_workflow_template(self, node_info: N8NNodeInfo, operation: str) -> CompiledWorkflowTemplate:
+        """Basic workflow template, built and serialized once per node type, operation and credentials"""
+        key = ('basic', node_info.node_type, operation, node_info.version, node_info.display_name,
+               tuple(cred.get('name', '') for cred in node_info.credentials),
+               json.dumps(node_info.defaults, sort_keys=True, default=str))
+        return self.template_engine.compile(key, lambda: self._build_basic_workflow_template(node_info, operation))
+    
     def _create_basic_workflow_template(self, node_info: N8NNodeInfo, operation: str) -> Dict[str, Any]:
         """Create a basic n8n workflow template"""
+        return self._compile_basic_workflow_template(node_info, operation).instantiate()
+    
+    def _build_basic_workflow_template(self, node_info: N8NNodeInfo, operation: str) -> Dict[str, Any]:
         return {
             "nodes": [
                 {
@@ -17,6 +17,10 @@ Usage:
     python n8n_integration_sync_enhanced.py sync --n8n-url https://spinner.saastify.ai --api-key YOUR_KEY
     python n8n_integration_sync_enhanced.py validate --dry-run
     python n8n_integration_sync_enhanced.py status
+
+Requirements:
+    scripts/monitoring on PYTHONPATH (for db_replicas.py), e.g.
+    export PYTHONPATH=../monitoring
 """
 
 import os
@@ -32,6 +36,8 @@ from typing import Dict, List, Optional, Any, Union
 from urllib.parse import urljoin, urlparse
 import time
 from dataclasses import dataclass, asdict
+# db_replicas.py lives in scripts/monitoring, which must be on PYTHONPATH
+from db_replicas import ReplicaRouter
 
 # Configure logging
 logging.basicConfig(
@@ -188,6 +194,7 @@ class N8NIntegrationSyncEnhanced:
     def __init__(self, db_config: Dict[str, str], n8n_config: Optional[Dict[str, str]] = None):
         """Initialize the sync system"""
         self.db_config = db_config
+        self.replica_router = ReplicaRouter.from_env(db_config)
         self.n8n_config = n8n_config or {}
         
         # Initialize HTTP session for N8N API
@@ -200,10 +207,13 @@ class N8NIntegrationSyncEnhanced:
         
         logger.info("N8N Integration Sync Enhanced initialized")
     
-    def get_database_connection(self):
+    def get_database_connection(self, read_only: bool = False):
         """Get database connection with proper configuration"""
         try:
-            conn = psycopg2.connect(**self.db_config)
+            if read_only:
+                conn = self.replica_router.get_read_connection()
+            else:
+                conn = psycopg2.connect(**self.db_config)
             conn.autocommit = False
             return conn
         except Exception as e:
@@ -694,7 +704,7 @@ class N8NIntegrationSyncEnhanced:
     
     def get_sync_status(self) -> Dict[str, Any]:
         """Get current sync status from database"""
-        conn = self.get_database_connection()
+        conn = self.get_database_connection(read_only=True)
         try:
             cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
             
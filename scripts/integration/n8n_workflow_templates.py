@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Compiled N8N Workflow Templates
+===============================
+
+A workflow template depends on a few inputs (node type, operation,
+credential fields) but is instantiated once per tenant. Building the nested
+workflow dict, its expression strings and the embedded Code node source,
+then serializing all of it again, is most of the cost of provisioning.
+
+``WorkflowTemplateEngine.compile(key, build)`` calls ``build()`` once per key
+and compiles the result two ways:
+
+- ``render()`` returns JSON text. The template is serialized once and split at
+  its placeholders; rendering JSON-encodes the placeholder values and joins
+  them with the precompiled segments, so the template is never escaped again.
+- ``instantiate()`` returns a fresh dict. The template is turned into one
+  Python expression and compiled once; instantiating evaluates it with the
+  placeholder values, without walking or copying a template tree.
+
+Placeholders come from ``slot(name)``:
+
+- a slot that is a whole value (``{"createdAt": slot('now')}``) is filled
+  with any JSON-serializable value
+- a slot inside a longer string (``'/' + slot('tenant') + '/sync'``) is
+  filled with the string form of its value
+
+Usage:
+    engine = WorkflowTemplateEngine()
+    template = engine.compile(('n8n-nodes-base.shopify', 'sync'), lambda: {
+        'path': '/' + slot('tenant') + '/sync',
+        'createdAt': slot('now')
+    })
+    workflow_json = template.render(tenant='a1b2c3d4', now=datetime.now().isoformat())
+    workflow = template.instantiate(tenant='a1b2c3d4', now=datetime.now().isoformat())
+
+Requirements:
+    Python standard library only
+"""
+
+import re
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Tuple, Any, Callable, Hashable
+
+SLOT_MARKER = '\x00'
+
+_SLOT = re.compile(r'\x00([A-Za-z_][A-Za-z0-9_]*)\x00')
+
+# A slot as serialized by json.dumps. The quotes are captured separately:
+# both present means the slot is the whole string value.
+_SERIALIZED_SLOT = re.compile(r'((?<!\\)")?\\u0000([A-Za-z_][A-Za-z0-9_]*)\\u0000(")?')
+
+
+def slot(name: str) -> str:
+    """Placeholder for a value filled in at instantiation"""
+    return f"{SLOT_MARKER}{name}{SLOT_MARKER}"
+
+
+def _builder_source(value: Any) -> str:
+    """Python expression rebuilding value, reading slots from _values/_strings"""
+    if isinstance(value, dict):
+        return '{' + ', '.join(f"{_builder_source(str(k))}: {_builder_source(v)}"
+                               for k, v in value.items()) + '}'
+    if isinstance(value, (list, tuple)):
+        return '[' + ', '.join(_builder_source(item) for item in value) + ']'
+    if isinstance(value, str):
+        parts = _SLOT.split(value)
+        if len(parts) == 1:
+            return repr(value)
+        if len(parts) == 3 and not parts[0] and not parts[2]:
+            return f"_values[{parts[1]!r}]"
+        pieces = [f"_strings[{part!r}]" if index % 2 else repr(part)
+                  for index, part in enumerate(parts) if index % 2 or part]
+        return '(' + ' + '.join(pieces) + ')'
+    if value is None or isinstance(value, (bool, int, float)):
+        return repr(value)
+    raise TypeError(f"Unsupported value in workflow template: {type(value).__name__}")
+
+
+class CompiledWorkflowTemplate:
+    """Template serialized and split at its slots, plus a compiled dict builder"""
+
+    def __init__(self, template: Any):
+        text = json.dumps(template)
+        self.segments: List[str] = []
+        self.slots: List[Tuple[str, bool]] = []
+
+        position = 0
+        for match in _SERIALIZED_SLOT.finditer(text):
+            opening, name, closing = match.groups()
+            whole = bool(opening and closing)
+            segment = text[position:match.start()]
+            if opening and not whole:
+                segment += opening
+            self.segments.append(segment)
+            self.slots.append((name, whole))
+            position = match.end()
+            if closing and not whole:
+                position -= len(closing)
+        self.segments.append(text[position:])
+
+        self.slot_names = frozenset(name for name, _ in self.slots)
+        self.string_slots = frozenset(name for name, whole in self.slots if not whole)
+        self._build = eval(compile(f"lambda _values, _strings: {_builder_source(template)}",
+                                   '<workflow template>', 'eval'))
+
+    def _check(self, values: Dict[str, Any]) -> None:
+        missing = self.slot_names.difference(values)
+        if missing:
+            raise ValueError(f"Missing template values: {', '.join(sorted(missing))}")
+
+    def render(self, **values: Any) -> str:
+        """Workflow JSON text with every slot filled"""
+        self._check(values)
+
+        encoded: Dict[Tuple[str, bool], str] = {}
+        parts = [self.segments[0]]
+        for (name, whole), segment in zip(self.slots, self.segments[1:]):
+            text = encoded.get((name, whole))
+            if text is None:
+                value = values[name]
+                text = json.dumps(value, default=str) if whole else json.dumps(str(value))[1:-1]
+                encoded[(name, whole)] = text
+            parts.append(text)
+            parts.append(segment)
+        return ''.join(parts)
+
+    def instantiate(self, **values: Any) -> Dict[str, Any]:
+        """Workflow dict with every slot filled. Containers are new on every
+        call; whole-value slots hold the objects passed in."""
+        self._check(values)
+        return self._build(values, {name: str(values[name]) for name in self.string_slots})
+
+
+class WorkflowTemplateEngine:
+    """Compiles each distinct workflow template once and keeps it in a bounded cache"""
+
+    def __init__(self, max_templates: int = 4096):
+        self.max_templates = max_templates
+        self.templates: 'OrderedDict[Hashable, CompiledWorkflowTemplate]' = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {'compiled': 0, 'hits': 0, 'evicted': 0}
+
+    def compile(self, key: Hashable, build: Callable[[], Any]) -> CompiledWorkflowTemplate:
+        """Compiled template for key; build() is only called on a cache miss"""
+        with self.lock:
+            template = self.templates.get(key)
+            if template is not None:
+                self.templates.move_to_end(key)
+                self.stats['hits'] += 1
+                return template
+
+        template = CompiledWorkflowTemplate(build())
+
+        with self.lock:
+            template = self.templates.setdefault(key, template)
+            self.templates.move_to_end(key)
+            self.stats['compiled'] += 1
+            while len(self.templates) > self.max_templates:
+                self.templates.popitem(last=False)
+                self.stats['evicted'] += 1
+        return template
+
+    def clear(self) -> None:
+        with self.lock:
+            self.templates.clear()
+
+
+# Shared by N8NCredentialExpressions and N8NIntegrationSync so templates
+# outlive the instances that compiled them
+default_engine = WorkflowTemplateEngine()
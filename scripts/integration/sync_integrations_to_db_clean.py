@@ -5,6 +5,10 @@ N8N Integration Database Sync
 
 This script takes the processed n8n integration data and syncs it to your
 catalog-edge-db database using the proper schema mappings.
+
+Requirements:
+    scripts/monitoring on PYTHONPATH (for db_replicas.py), e.g.
+    export PYTHONPATH=scripts/monitoring
 """
 
 import os
@@ -15,6 +19,8 @@ import logging
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 import argparse
+# db_replicas.py lives in scripts/monitoring, which must be on PYTHONPATH
+from db_replicas import ReplicaRouter
 
 # Configure logging
 logging.basicConfig(
@@ -29,12 +35,16 @@ class IntegrationDatabaseSync:
     def __init__(self, db_config: Dict[str, str]):
         """Initialize with database configuration"""
         self.db_config = db_config
+        self.replica_router = ReplicaRouter.from_env(db_config)
         logger.info("Initialized Integration Database Sync")
     
-    def get_database_connection(self):
+    def get_database_connection(self, read_only: bool = False):
         """Get database connection"""
         try:
-            conn = psycopg2.connect(**self.db_config)
+            if read_only:
+                conn = self.replica_router.get_read_connection()
+            else:
+                conn = psycopg2.connect(**self.db_config)
             conn.autocommit = False
             return conn
         except Exception as e:
@@ -265,7 +275,7 @@ class IntegrationDatabaseSync:
     
     def get_sync_summary(self) -> Dict[str, Any]:
         """Get summary of current database state"""
-        conn = self.get_database_connection()
+        conn = self.get_database_connection(read_only=True)
         
         try:
             cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
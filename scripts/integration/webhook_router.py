@@ -0,0 +1,525 @@
+#!/usr/bin/env python3
+"""
+Webhook Path Router
+===================
+
+Resolves an incoming webhook path such as
+``/webhook/1a2b3c4d/shopify/product-sync`` to the installed flow that serves
+it, ``(saas_edge_id, channel_key, saas_flow_id)``, from memory instead of
+querying the database on every hit.
+
+WebhookRouter is a segment trie: one node per path segment, a dict of static
+children and at most one ``:parameter`` child. Resolving walks one dict lookup
+per segment, so it costs the same with 100 or 100,000 routes, and a
+parameter segment (``/orders/:order_id``) matches any value. Static segments
+win over parameters; when a static branch dead-ends, the lookup backtracks to
+the parameter branch it passed. Parameter names belong to each route, so
+``/x/:order_id/status`` and ``/x/:sku/stock`` share a node but name their
+values differently. When two flows claim the same path, the first keeps it
+and the second takes over if the first is removed.
+
+WebhookRouteIndex builds the router from active rows of
+saas_channel_installed_flows and keeps it current. It LISTENs on
+'saas_webhook_route_changes' (schemas/webhook_route_notify.sql) and reloads
+only the flows named in each notification. After a reconnect, notifications
+may have been missed, so it rebuilds the whole router in the background and
+swaps it in.
+
+A flow's path is, in order of preference:
+
+1. ``flow_config.webhook_path`` of the installed flow
+2. the template's ``n8n_webhook_path`` (``/webhook/<channel>/<suffix>``)
+   under the tenant prefix: ``/webhook/<edge8>/<channel>/<suffix>``
+3. ``/webhook/<edge8>/<channel>/<operation>``, the path used by
+   ``N8NCredentialExpressions.create_workflow_template_with_dynamic_credentials``
+   for a tenant
+
+``<edge8>`` is the first 8 hex digits of saas_edge_id, as in
+``generate_installation_webhook_paths``.
+
+Usage:
+    index = WebhookRouteIndex(create_db_config()).start()
+    route = index.resolve('/webhook/1a2b3c4d/shopify/product-sync')
+    if route:
+        route.saas_edge_id, route.channel_key, route.saas_flow_id
+
+    python webhook_router.py --resolve /webhook/1a2b3c4d/shopify/product-sync
+    python webhook_router.py --list --limit 20
+
+Requirements:
+    pip install psycopg2-binary python-dotenv
+"""
+
+import os
+import json
+import time
+import select
+import logging
+import argparse
+import threading
+from typing import Dict, List, Optional, Any, Iterable, NamedTuple, Tuple
+import psycopg2
+from psycopg2.extras import RealDictCursor
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+ROUTE_CHANNEL = 'saas_webhook_route_changes'
+
+ROUTES_QUERY = """
+SELECT f.saas_flow_id::text AS saas_flow_id, f.saas_edge_id::text AS saas_edge_id,
+       cm.channel_key, nf.operation, nf.n8n_webhook_path,
+       f.flow_config->>'webhook_path' AS webhook_path
+FROM saas_channel_installed_flows f
+JOIN saas_channel_master cm ON cm.channel_id = f.channel_id
+JOIN saas_n8n_flows nf ON nf.n8n_flow_id = f.n8n_flow_id
+WHERE f.status = 'active'
+"""
+
+# Oldest flow first, so a full rebuild hands a contested path to the same owner
+ROUTES_ORDER = " ORDER BY f.created_at, f.saas_flow_id"
+
+
+class WebhookRoute(NamedTuple):
+    saas_edge_id: str
+    channel_key: str
+    saas_flow_id: str
+
+
+def webhook_base_path(saas_edge_id: str, channel_key: str) -> str:
+    """Tenant prefix of installation webhook paths"""
+    return f"/webhook/{saas_edge_id.replace('-', '')[:8]}/{channel_key.lower()}"
+
+
+def installed_flow_webhook_path(row: Dict[str, Any]) -> str:
+    """Webhook path of one ROUTES_QUERY row"""
+    if row.get('webhook_path'):
+        return row['webhook_path']
+
+    base = webhook_base_path(row['saas_edge_id'], row['channel_key'])
+    template_path = (row.get('n8n_webhook_path') or '').strip('/')
+    if template_path:
+        segments = template_path.split('/')
+        if segments[0] == 'webhook':
+            segments = segments[1:]
+        if segments and segments[0].lower() == row['channel_key'].lower():
+            segments = segments[1:]
+        if segments:
+            return f"{base}/{'/'.join(segments)}"
+    return f"{base}/{row['operation']}"
+
+
+class _Node:
+    __slots__ = ('children', 'param', 'target', 'routes', 'param_names')
+
+    def __init__(self):
+        self.children: Dict[str, '_Node'] = {}
+        self.param: Optional['_Node'] = None
+        # (routes[0], its parameter names), one reference read on the hot path
+        self.target: Optional[Tuple[WebhookRoute, Tuple[str, ...]]] = None
+        self.routes: List[WebhookRoute] = []          # claimants in registration order
+        self.param_names: Dict[str, Tuple[str, ...]] = {}   # saas_flow_id -> :names along its path
+
+    def retarget(self) -> None:
+        route = self.routes[0] if self.routes else None
+        self.target = (route, self.param_names[route.saas_flow_id]) if route else None
+
+
+def _segments(path: str) -> List[str]:
+    query = path.find('?')
+    if query >= 0:
+        path = path[:query]
+    return [segment for segment in path.split('/') if segment]
+
+
+def _shape(path: str) -> Tuple[str, ...]:
+    """Trie node a path ends at: parameter names do not matter"""
+    return tuple(':' if segment.startswith(':') else segment for segment in _segments(path))
+
+
+class WebhookRouter:
+    """Segment trie from webhook paths to installed flows.
+
+    Lookups take no lock; writers serialize on a lock and only ever replace
+    single references, so a concurrent lookup sees the route before or after
+    the change."""
+
+    def __init__(self):
+        self.root = _Node()
+        self.lock = threading.Lock()
+        self.flow_paths: Dict[str, str] = {}          # saas_flow_id -> registered path
+        self.stats = {'routes': 0, 'conflicts': 0}
+
+    def __len__(self) -> int:
+        return len(self.flow_paths)
+
+    def match(self, path: str) -> Tuple[Optional[WebhookRoute], Dict[str, str]]:
+        """Route for path and the values of its :parameter segments"""
+        if '?' in path:
+            path = path[:path.index('?')]
+        segments = path.split('/')
+        # Greedy walk, static children first; it is what the backtracking
+        # search would try first, so its hit is the answer
+        node = self.root
+        values = None
+        for segment in segments:
+            child = node.children.get(segment)
+            if child is None:
+                if not segment:
+                    continue
+                child = node.param
+                if child is None:
+                    return self._backtrack(segments)
+                if values is None:
+                    values = []
+                values.append(segment)
+            node = child
+        if node.target is None:
+            return self._backtrack(segments)
+        route, names = node.target
+        return route, dict(zip(names, values)) if values else {}
+
+    def _backtrack(self, segments: List[str]) -> Tuple[Optional[WebhookRoute], Dict[str, str]]:
+        """Depth-first match that retries the parameter branch where a static branch dead-ended"""
+        segments = [segment for segment in segments if segment]
+        values: List[str] = []
+        # (next segment index, parameter node, len(values)) passed over for a static child
+        fallbacks: List[Tuple[int, _Node, int]] = []
+        node: Optional[_Node] = self.root
+        i = 0
+        while True:
+            while node is not None and i < len(segments):
+                segment = segments[i]
+                i += 1
+                child = node.children.get(segment)
+                if child is not None:
+                    if node.param is not None:
+                        fallbacks.append((i, node.param, len(values)))
+                    node = child
+                elif node.param is not None:
+                    values.append(segment)
+                    node = node.param
+                else:
+                    node = None
+            if node is not None and node.target is not None:
+                route, names = node.target
+                return route, dict(zip(names, values))
+            if not fallbacks:
+                return None, {}
+            i, node, depth = fallbacks.pop()
+            del values[depth:]
+            values.append(segments[i - 1])
+
+    def resolve(self, path: str) -> Optional[WebhookRoute]:
+        return self.match(path)[0]
+
+    def add(self, path: str, route: WebhookRoute) -> bool:
+        """Register (or move) route's flow at path; False if another flow already serves path"""
+        with self.lock:
+            previous = self.flow_paths.get(route.saas_flow_id)
+
+            node = self.root
+            names = []
+            for segment in _segments(path):
+                if segment.startswith(':'):
+                    names.append(segment[1:])
+                    if node.param is None:
+                        node.param = _Node()
+                    node = node.param
+                else:
+                    child = node.children.get(segment)
+                    if child is None:
+                        child = _Node()
+                        node.children[segment] = child
+                    node = child
+
+            node.param_names[route.saas_flow_id] = tuple(names)
+            # A claimant that is re-added keeps its place, so a conflicting
+            # flow cannot take the path over by a reload of the owner
+            if any(r.saas_flow_id == route.saas_flow_id for r in node.routes):
+                node.routes = [route if r.saas_flow_id == route.saas_flow_id else r for r in node.routes]
+            else:
+                node.routes = node.routes + [route]
+            node.retarget()
+            # Unlinked only after the new path serves, so lookups never miss a moving flow
+            if previous is not None and _shape(previous) != _shape(path):
+                self._unlink(previous, route.saas_flow_id)
+            self.flow_paths[route.saas_flow_id] = path
+            self.stats['routes'] = len(self.flow_paths)
+
+            if node.routes[0].saas_flow_id != route.saas_flow_id:
+                self.stats['conflicts'] += 1
+                logger.warning(f"Webhook path {path} of flow {route.saas_flow_id} is already "
+                               f"served by flow {node.routes[0].saas_flow_id}")
+                return False
+            return True
+
+    def remove(self, saas_flow_id: str) -> bool:
+        with self.lock:
+            path = self.flow_paths.pop(saas_flow_id, None)
+            if path is None:
+                return False
+            self._unlink(path, saas_flow_id)
+            self.stats['routes'] = len(self.flow_paths)
+            return True
+
+    def _unlink(self, path: str, saas_flow_id: str) -> None:
+        """Drop the flow from its node and prune nodes left without routes or children"""
+        trail: List[Tuple[_Node, str]] = []
+        node = self.root
+        for segment in _segments(path):
+            key = ':' if segment.startswith(':') else segment
+            child = node.param if key == ':' else node.children.get(key)
+            if child is None:
+                return
+            trail.append((node, key))
+            node = child
+
+        node.routes = [r for r in node.routes if r.saas_flow_id != saas_flow_id]
+        node.retarget()
+        node.param_names.pop(saas_flow_id, None)
+
+        for parent, key in reversed(trail):
+            if node.routes or node.children or node.param is not None:
+                break
+            if key == ':':
+                parent.param = None
+            else:
+                del parent.children[key]
+            node = parent
+
+    def routes(self) -> Iterable[Tuple[str, WebhookRoute]]:
+        """(path, route) for every registered flow"""
+        for saas_flow_id, path in list(self.flow_paths.items()):
+            node = self.root
+            for segment in _segments(path):
+                node = node.param if segment.startswith(':') else node.children.get(segment)
+                if node is None:
+                    break
+            if node is not None:
+                for route in node.routes:
+                    if route.saas_flow_id == saas_flow_id:
+                        yield path, route
+
+
+class WebhookRouteIndex:
+    """WebhookRouter loaded from the database and kept current with LISTEN/NOTIFY"""
+
+    def __init__(self,
+                 db_config: Dict[str, Any],
+                 keepalive_interval: float = 30.0,
+                 reconnect_max_delay: float = 30.0):
+        self.db_config = db_config
+        self.keepalive_interval = keepalive_interval
+        self.reconnect_max_delay = reconnect_max_delay
+
+        self.router = WebhookRouter()
+        self.stop_event = threading.Event()
+        self.connected = threading.Event()
+        self.loaded = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        self.conn = None
+        self.stats = {'notifications': 0, 'reconnects': 0, 'rebuilds': 0, 'flows_reloaded': 0,
+                      'last_rebuild_seconds': None}
+
+    def resolve(self, path: str) -> Optional[WebhookRoute]:
+        return self.router.resolve(path)
+
+    def match(self, path: str) -> Tuple[Optional[WebhookRoute], Dict[str, str]]:
+        return self.router.match(path)
+
+    def get_db_connection(self):
+        return psycopg2.connect(**self.db_config)
+
+    # -----------------------------------------
+    # Loading
+    # -----------------------------------------
+
+    def rebuild(self) -> int:
+        """Build a new router from every active installed flow and swap it in"""
+        started = time.monotonic()
+        router = WebhookRouter()
+        conn = self.get_db_connection()
+        try:
+            # Server-side cursor: rows are streamed, not held in memory twice
+            with conn, conn.cursor(name='webhook_routes', cursor_factory=RealDictCursor) as cursor:
+                cursor.itersize = 10000
+                cursor.execute(ROUTES_QUERY + ROUTES_ORDER + ";")
+                for row in cursor:
+                    router.add(installed_flow_webhook_path(row),
+                               WebhookRoute(row['saas_edge_id'], row['channel_key'], row['saas_flow_id']))
+        finally:
+            conn.close()
+
+        self.router = router
+        self.loaded.set()
+        self.stats['rebuilds'] += 1
+        self.stats['last_rebuild_seconds'] = round(time.monotonic() - started, 3)
+        logger.info(f"Loaded {len(router)} webhook routes in {self.stats['last_rebuild_seconds']}s")
+        return len(router)
+
+    def reload_flows(self, conn, saas_flow_ids: List[str]) -> int:
+        """Re-read the given installed flows; flows no longer active are removed"""
+        with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute(ROUTES_QUERY + " AND f.saas_flow_id = ANY(%s::uuid[])" + ROUTES_ORDER + ";",
+                           (saas_flow_ids,))
+            rows = {row['saas_flow_id']: row for row in cursor.fetchall()}
+        for saas_flow_id in saas_flow_ids:
+            row = rows.get(saas_flow_id)
+            if row is None:
+                self.router.remove(saas_flow_id)
+            else:
+                self.router.add(installed_flow_webhook_path(row),
+                                WebhookRoute(row['saas_edge_id'], row['channel_key'], saas_flow_id))
+        self.stats['flows_reloaded'] += len(saas_flow_ids)
+        return len(rows)
+
+    def reload_template(self, conn, n8n_flow_id: str) -> int:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT saas_flow_id::text FROM saas_channel_installed_flows WHERE n8n_flow_id = %s;
+            """, (n8n_flow_id,))
+            saas_flow_ids = [row[0] for row in cursor.fetchall()]
+        return self.reload_flows(conn, saas_flow_ids) if saas_flow_ids else 0
+
+    # -----------------------------------------
+    # Listener
+    # -----------------------------------------
+
+    def start(self, wait: bool = True, timeout: float = 60.0) -> 'WebhookRouteIndex':
+        """Start listening; with wait, return once the first rebuild finished"""
+        if self.thread is None:
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self.run, name='webhook-routes', daemon=True)
+            self.thread.start()
+        if wait and not self.loaded.wait(timeout):
+            raise TimeoutError("Webhook routes were not loaded in time")
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+            self.thread = None
+
+    def metrics(self) -> Dict[str, Any]:
+        return {**self.stats, **self.router.stats, 'connected': self.connected.is_set()}
+
+    def run(self) -> None:
+        """Listen until stop(), reconnecting with backoff"""
+        delay = 1.0
+        while not self.stop_event.is_set():
+            try:
+                self._connect()
+                delay = 1.0
+                self._listen()
+            except (psycopg2.Error, OSError) as e:
+                self._disconnect()
+                self.stats['reconnects'] += 1
+                logger.warning(f"Webhook route listener connection lost ({e}); reconnecting in {delay:.0f}s")
+                self.stop_event.wait(delay)
+                delay = min(delay * 2, self.reconnect_max_delay)
+            finally:
+                self._disconnect()
+
+    def _disconnect(self) -> None:
+        self.connected.clear()
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def _connect(self) -> None:
+        self.conn = psycopg2.connect(**self.db_config)
+        self.conn.autocommit = True
+        with self.conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {ROUTE_CHANNEL};")
+        # Listening before the rebuild: changes committed during it are
+        # delivered afterwards and re-applied, which is harmless
+        self.rebuild()
+        self.connected.set()
+        logger.info(f"Listening on {ROUTE_CHANNEL}")
+
+    def _listen(self) -> None:
+        idle = 0.0
+        while not self.stop_event.is_set():
+            if select.select([self.conn], [], [], 1.0) == ([], [], []):
+                idle += 1.0
+                if idle >= self.keepalive_interval:
+                    # Detects a silently dropped connection
+                    with self.conn.cursor() as cursor:
+                        cursor.execute("SELECT 1;")
+                    idle = 0.0
+                continue
+            idle = 0.0
+            self.conn.poll()
+            flow_ids: List[str] = []
+            templates: List[str] = []
+            while self.conn.notifies:
+                notify = self.conn.notifies.pop(0)
+                self.stats['notifications'] += 1
+                try:
+                    change = json.loads(notify.payload)
+                except ValueError:
+                    logger.warning(f"Malformed webhook route change, rebuilding: {notify.payload[:200]}")
+                    self.rebuild()
+                    continue
+                if change.get('saas_flow_id'):
+                    flow_ids.append(change['saas_flow_id'])
+                elif change.get('n8n_flow_id'):
+                    templates.append(change['n8n_flow_id'])
+            # A burst of notifications becomes one query
+            if flow_ids:
+                self.reload_flows(self.conn, list(dict.fromkeys(flow_ids)))
+            for n8n_flow_id in dict.fromkeys(templates):
+                self.reload_template(self.conn, n8n_flow_id)
+
+
+def create_db_config() -> Dict[str, Any]:
+    """SaaS database connection settings from the environment"""
+    return {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'port': int(os.getenv('DB_PORT', '5432')),
+        'database': os.getenv('DB_NAME', 'catalog-edge-db'),
+        'user': os.getenv('DB_USER', 'postgres'),
+        'password': os.getenv('DB_PASSWORD', '')
+    }
+
+
+def main():
+    """Main CLI entry point"""
+    load_dotenv()
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description="Resolve webhook paths to installed flows")
+    parser.add_argument("--resolve", nargs='+', metavar="PATH", help="Paths to resolve")
+    parser.add_argument("--list", action="store_true", help="Print registered routes")
+    parser.add_argument("--limit", type=int, default=100, help="Routes printed by --list")
+
+    args = parser.parse_args()
+
+    try:
+        index = WebhookRouteIndex(create_db_config())
+        index.rebuild()
+        result: Dict[str, Any] = {'status': 'success', **index.metrics()}
+        if args.resolve:
+            resolved = {}
+            for path in args.resolve:
+                route, params = index.match(path)
+                resolved[path] = {**route._asdict(), 'params': params} if route else None
+            result['resolved'] = resolved
+        if args.list:
+            result['routes'] = [{'path': path, **route._asdict()}
+                                for path, route in list(index.router.routes())[:args.limit]]
+        print(json.dumps(result, indent=2))
+
+    except Exception as e:
+        logger.error(f"Webhook routing failed: {e}")
+        print(json.dumps({"status": "error", "message": str(e)}, indent=2))
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
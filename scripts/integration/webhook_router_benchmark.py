@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the Webhook Path Router
+=====================================
+
+Registers ``--routes`` synthetic installation webhook paths in a
+``WebhookRouter``. Each tenant gets the six paths of
+``generate_installation_webhook_paths`` per channel, and a share of channels
+also gets a ``:parameter`` route. The benchmark then resolves random paths
+and reports:
+
+- build time and memory
+- resolve throughput, plus p50/p99/max latency from individually timed
+  lookups
+- the cost of incremental add/remove updates
+
+A ``--miss-rate`` fraction of lookups uses unregistered paths. No database is
+needed.
+
+Usage:
+    python webhook_router_benchmark.py --routes 100000
+    python webhook_router_benchmark.py --routes 100000 --lookups 2000000 --miss-rate 0.2
+
+Requirements:
+    pip install psycopg2-binary python-dotenv   # imported by webhook_router
+"""
+
+import gc
+import json
+import time
+import uuid
+import random
+import logging
+import argparse
+import tracemalloc
+from typing import Dict, List, Any, Tuple
+from webhook_router import WebhookRouter, WebhookRoute, webhook_base_path
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+CHANNELS = ['SHOPIFY', 'EBAY', 'AMAZON', 'WOOCOMMERCE', 'ETSY', 'BIGCOMMERCE', 'MAGENTO', 'WALMART']
+
+# Same suffixes as N8NCredentialExpressions.generate_installation_webhook_paths
+SUFFIXES = ['products/import', 'products/export', 'orders/import', 'orders/export',
+            'inventory/sync', 'customers/sync']
+
+
+def generate_routes(count: int, param_share: float, seed: int) -> List[Tuple[str, str, WebhookRoute]]:
+    """(registered path, sample request path, route) for count flows"""
+    rng = random.Random(seed)
+    routes = []
+    while len(routes) < count:
+        saas_edge_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        for channel_key in rng.sample(CHANNELS, 2):
+            base = webhook_base_path(saas_edge_id, channel_key)
+            suffixes = list(SUFFIXES)
+            if rng.random() < param_share:
+                suffixes.append('orders/:order_id/fulfillment')
+            for suffix in suffixes:
+                route = WebhookRoute(saas_edge_id, channel_key, str(uuid.UUID(int=rng.getrandbits(128))))
+                path = f"{base}/{suffix}"
+                request_path = path.replace(':order_id', str(rng.randrange(10 ** 9)))
+                routes.append((path, request_path, route))
+                if len(routes) == count:
+                    return routes
+    return routes
+
+
+def percentile(sorted_values: List[int], fraction: float) -> float:
+    return sorted_values[min(int(len(sorted_values) * fraction), len(sorted_values) - 1)]
+
+
+def benchmark(args) -> Dict[str, Any]:
+    routes = generate_routes(args.routes, args.param_share, args.seed)
+    rng = random.Random(args.seed + 1)
+
+    gc.collect()
+    started = time.perf_counter()
+    router = WebhookRouter()
+    for path, _, route in routes:
+        router.add(path, route)
+    build_seconds = time.perf_counter() - started
+
+    # Second build only for its memory; tracing would distort the timing above
+    tracemalloc.start()
+    traced = WebhookRouter()
+    for path, _, route in routes:
+        traced.add(path, route)
+    memory_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del traced
+
+    # Lookup mix: registered request paths and unknown tenants' paths
+    lookups = []
+    expected = []
+    for _ in range(min(args.lookups, 200000)):
+        if rng.random() < args.miss_rate:
+            lookups.append(f"/webhook/{rng.getrandbits(32):08x}/shopify/{rng.choice(SUFFIXES)}")
+            expected.append(None)
+        else:
+            _, request_path, route = rng.choice(routes)
+            lookups.append(request_path)
+            expected.append(route.saas_flow_id)
+
+    mismatches = sum(1 for path, flow_id in zip(lookups, expected)
+                     if (router.resolve(path) or WebhookRoute('', '', None)).saas_flow_id != flow_id)
+
+    resolve = router.resolve
+    rounds = max(args.lookups // len(lookups), 1)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for path in lookups:
+            resolve(path)
+    resolve_seconds = time.perf_counter() - started
+    resolved = rounds * len(lookups)
+
+    # Per-lookup latency (includes the timer overhead)
+    perf_counter_ns = time.perf_counter_ns
+    samples = []
+    for path in lookups[:args.samples]:
+        t0 = perf_counter_ns()
+        resolve(path)
+        samples.append(perf_counter_ns() - t0)
+    samples.sort()
+
+    # Incremental updates: re-point flows to new paths and remove/re-add them
+    updated = routes[:args.updates]
+    started = time.perf_counter()
+    for path, _, route in updated:
+        router.add(path + '-v2', route)
+    for path, _, route in updated:
+        router.remove(route.saas_flow_id)
+        router.add(path, route)
+    update_seconds = time.perf_counter() - started
+
+    return {
+        'routes': len(router),
+        'conflicts': router.stats['conflicts'],
+        'build_seconds': round(build_seconds, 3),
+        'memory_mb': round(memory_bytes / 1024 / 1024, 1),
+        'lookups': resolved,
+        'miss_rate': args.miss_rate,
+        'mismatches': mismatches,
+        'resolves_per_sec': round(resolved / resolve_seconds),
+        'mean_resolve_us': round(resolve_seconds / resolved * 1e6, 3),
+        'p50_resolve_us': round(percentile(samples, 0.50) / 1000, 3),
+        'p99_resolve_us': round(percentile(samples, 0.99) / 1000, 3),
+        'max_resolve_us': round(samples[-1] / 1000, 3),
+        'update_us': round(update_seconds / (len(updated) * 3) * 1e6, 3) if updated else None
+    }
+
+
+def main():
+    """Main CLI entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark the segment-trie webhook router")
+    parser.add_argument("--routes", type=int, default=100000, help="Registered webhook paths")
+    parser.add_argument("--lookups", type=int, default=1000000, help="Timed resolves")
+    parser.add_argument("--miss-rate", type=float, default=0.1, help="Fraction of unregistered paths")
+    parser.add_argument("--param-share", type=float, default=0.2,
+                        help="Share of tenant channels with a :parameter route")
+    parser.add_argument("--samples", type=int, default=100000, help="Individually timed resolves")
+    parser.add_argument("--updates", type=int, default=10000, help="Flows moved and re-added")
+    parser.add_argument("--seed", type=int, default=42)
+
+    args = parser.parse_args()
+
+    try:
+        results = {'config': vars(args), 'router': benchmark(args)}
+        print(json.dumps(results, indent=2))
+
+    except Exception as e:
+        logger.error(f"Benchmark failed: {e}")
+        print(json.dumps({"status": "error", "message": str(e)}, indent=2))
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -23,6 +23,14 @@ Cloud Scheduler:
         --headers="Content-Type=application/json" \
         --message-body='{"date":"yesterday"}'
 
+Asynchronous jobs:
+    POST returns 202 with a job id while the export runs in the background;
+    duplicate triggers for the same date and filters collapse into one job.
+    Poll GET ?job_id=<id> for progress and the result. Requires the
+    n8n_export_jobs table (schemas/n8n_export_jobs.sql) and a 2nd gen
+    function (--gen2) with CPU always allocated:
+    gcloud run services update n8n-log-exporter --no-cpu-throttling
+
 Requirements (requirements.txt):
     google-cloud-storage==2.10.0
     psycopg2-binary==2.9.7
@@ -30,18 +38,33 @@ Requirements (requirements.txt):
 """
 
 import os
-import json
+import time
 import logging
+import threading
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any, Iterator, Tuple, Union
 import psycopg2
 from google.cloud import storage
 import functions_framework
+from db_replicas import ReplicaRouter
+from export_jobs import ACTIVE_JOB_STATUSES, ExportJobStore, serialize_job
+from export_manifest import ExportManifestBuilder, manifest_path, serialize_export, time_range
+from latency_sketch import LatencySketch, duration_fields
+from retry_chains import RetryChainIndex
+from export_stream import AdaptiveBatchSizer, UploadPipeline, iter_row_groups
+from export_sampling import SamplingPolicy
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Minimum seconds between progress writes for asynchronous export jobs
+PROGRESS_INTERVAL_SECONDS = 5
+
+# Seconds between heartbeats of a running export job; well under the
+# ExportJobStore stale_after_seconds (900)
+HEARTBEAT_INTERVAL_SECONDS = 60
+
 class N8NLogExporter:
     """N8N log exporter to Google Cloud Storage (Cloud Function version)"""
     
@@ -60,6 +83,12 @@ class N8NLogExporter:
         if not all([self.db_config['host'], self.db_config['password']]):
             raise ValueError("Missing required database configuration")
         
+        # Read-only queries go to replicas when configured
+        self.replica_router = ReplicaRouter.from_env(self.db_config)
+        
+        # Optional sampling of oversized tenants / job types (None = export everything)
+        self.sampling_policy = SamplingPolicy.from_env()
+        
         # GCS configuration
         self.bucket_name = os.environ.get('GCS_BUCKET_NAME', 'saas_job_logs')
         self.gcs_prefix = 'n8n'
@@ -70,12 +99,19 @@ class N8NLogExporter:
         
         logger.info(f"Initialized N8N Log Exporter for bucket: {self.bucket_name}")
     
-    def get_db_connection(self):
-        """Get database connection with retry logic"""
+    def get_db_connection(self, read_only: bool = False):
+        """Get database connection with retry logic
+        
+        Read-only connections are routed to a healthy replica when one is
+        configured and within the lag threshold, otherwise to the primary.
+        """
         max_retries = 3
         for attempt in range(max_retries):
             try:
-                conn = psycopg2.connect(**self.db_config)
+                if read_only:
+                    conn = self.replica_router.get_read_connection()
+                else:
+                    conn = psycopg2.connect(**self.db_config)
                 logger.info("Database connection established")
                 return conn
             except psycopg2.Error as e:
@@ -84,12 +120,17 @@ class N8NLogExporter:
                     raise
         return None
     
-    def extract_execution_logs(self, 
-                             target_date: str,
-                             saas_edge_id: Optional[str] = None,
-                             job_type: Optional[str] = None,
-                             channel: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Extract execution logs from database"""
+    def stream_execution_logs(self,
+                              target_date: str,
+                              saas_edge_id: Optional[str] = None,
+                              job_type: Optional[str] = None,
+                              channel: Optional[str] = None) -> Iterator[Tuple[tuple, List[Dict[str, Any]], int, bool]]:
+        """Stream execution logs from database as (group key, rows, part, last part)
+        
+        Rows are read through a server-side cursor in fetchmany batches sized
+        from the observed bytes per row, and each (saas_edge_id, job_type,
+        channel) group is yielded in size-bounded parts (see export_stream.py).
+        """
         
         query = """
         WITH workflow_metadata AS (
@@ -105,9 +146,9 @@ class N8NLogExporter:
               meta->>'job_type',
               settings->>'job_type',
               CASE 
-                WHEN name ILIKE '%webhook%' THEN 'webhook'
-                WHEN name ILIKE '%schedule%' THEN 'scheduled'
-                WHEN name ILIKE '%trigger%' THEN 'trigger'
+                WHEN name ILIKE '%%webhook%%' THEN 'webhook'
+                WHEN name ILIKE '%%schedule%%' THEN 'scheduled'
+                WHEN name ILIKE '%%trigger%%' THEN 'trigger'
                 ELSE 'workflow'
               END
             ) as job_type,
@@ -117,7 +158,7 @@ class N8NLogExporter:
               'production'
             ) as channel
           FROM workflow_entity
-          WHERE deletedAt IS NULL
+          WHERE "deletedAt" IS NULL
         )
         SELECT 
           e.id as execution_id,
@@ -127,49 +168,43 @@ class N8NLogExporter:
           w.name as workflow_name,
           e.status,
           e.mode,
-          e.startedAt,
-          e.stoppedAt,
-          e.createdAt,
+          e."startedAt",
+          e."stoppedAt",
+          e."createdAt",
           e.finished,
-          e.retryOf,
-          DATE(COALESCE(e.startedAt, e.createdAt)) as execution_date,
+          e."retryOf",
+          DATE(COALESCE(e."startedAt", e."createdAt")) as execution_date,
           CASE 
-            WHEN e.startedAt IS NOT NULL AND e.stoppedAt IS NOT NULL 
-            THEN EXTRACT(EPOCH FROM (e.stoppedAt - e.startedAt)) * 1000
+            WHEN e."startedAt" IS NOT NULL AND e."stoppedAt" IS NOT NULL 
+            THEN EXTRACT(EPOCH FROM (e."stoppedAt" - e."startedAt")) * 1000
             ELSE NULL 
           END as duration_ms
         FROM execution_entity e
-        INNER JOIN workflow_metadata w ON e.workflowId = w.workflow_id
-        WHERE e.deletedAt IS NULL
-          AND DATE(COALESCE(e.startedAt, e.createdAt)) = %s
+        INNER JOIN workflow_metadata w ON e."workflowId" = w.workflow_id
+        WHERE e."deletedAt" IS NULL
+          AND DATE(COALESCE(e."startedAt", e."createdAt")) = %s
           AND (%s IS NULL OR w.saas_edge_id = %s)
           AND (%s IS NULL OR w.job_type = %s)
           AND (%s IS NULL OR w.channel = %s)
-        ORDER BY w.saas_edge_id, w.job_type, w.channel, e.createdAt DESC;
+        ORDER BY w.saas_edge_id, w.job_type, w.channel, e."createdAt" DESC;
         """
         
-        conn = self.get_db_connection()
+        conn = self.get_db_connection(read_only=True)
         try:
-            with conn.cursor() as cursor:
+            with conn.cursor(name='n8n_execution_logs') as cursor:
                 cursor.execute(query, (
                     target_date, saas_edge_id, saas_edge_id,
                     job_type, job_type, channel, channel
                 ))
                 
-                columns = [desc[0] for desc in cursor.description]
-                rows = cursor.fetchall()
-                
-                logs = []
-                for row in rows:
-                    log_entry = dict(zip(columns, row))
-                    # Convert datetime objects to ISO strings
-                    for key, value in log_entry.items():
-                        if isinstance(value, datetime):
-                            log_entry[key] = value.isoformat()
-                    logs.append(log_entry)
+                sizer = AdaptiveBatchSizer.from_env()
+                total_logs = 0
+                for group_key, logs, part, last in iter_row_groups(cursor, sizer):
+                    total_logs += len(logs)
+                    yield group_key, logs, part, last
                 
-                logger.info(f"Extracted {len(logs)} execution logs for date: {target_date}")
-                return logs
+                logger.info(f"Extracted {total_logs} execution logs for date: {target_date} "
+                            f"(~{sizer.bytes_per_row or 0:.0f} bytes/row, last batch {sizer.batch_size} rows)")
                 
         except Exception as e:
             logger.error(f"Error extracting logs: {e}")
@@ -177,6 +212,85 @@ class N8NLogExporter:
         finally:
             conn.close()
     
+    def extract_execution_logs(self, 
+                             target_date: str,
+                             saas_edge_id: Optional[str] = None,
+                             job_type: Optional[str] = None,
+                             channel: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Extract execution logs from database"""
+        return [log for _, logs, _, _ in self.stream_execution_logs(target_date, saas_edge_id, job_type, channel)
+                for log in logs]
+    
+    def extract_retry_chains(self,
+                             target_date: str,
+                             saas_edge_id: Optional[str] = None,
+                             job_type: Optional[str] = None,
+                             channel: Optional[str] = None) -> Dict[tuple, List[Dict[str, Any]]]:
+        """Executions that retry or were retried, per (saas_edge_id, job_type, channel)
+        
+        Only id, retryOf and status are read, so retry chains can be resolved
+        before a group's executions are streamed in parts.
+        """
+        
+        query = """
+        WITH workflow_metadata AS (
+          SELECT 
+            id as workflow_id,
+            COALESCE(
+              meta->>'saas_edge_id',
+              settings->>'saas_edge_id',
+              'unknown'
+            ) as saas_edge_id,
+            COALESCE(
+              meta->>'job_type',
+              settings->>'job_type',
+              CASE 
+                WHEN name ILIKE '%%webhook%%' THEN 'webhook'
+                WHEN name ILIKE '%%schedule%%' THEN 'scheduled'
+                WHEN name ILIKE '%%trigger%%' THEN 'trigger'
+                ELSE 'workflow'
+              END
+            ) as job_type,
+            COALESCE(
+              meta->>'channel',
+              settings->>'channel',
+              'production'
+            ) as channel
+          FROM workflow_entity
+          WHERE "deletedAt" IS NULL
+        ),
+        day_executions AS (
+          SELECT e.id, e."retryOf", e.status, w.saas_edge_id, w.job_type, w.channel
+          FROM execution_entity e
+          INNER JOIN workflow_metadata w ON e."workflowId" = w.workflow_id
+          WHERE e."deletedAt" IS NULL
+            AND DATE(COALESCE(e."startedAt", e."createdAt")) = %s
+            AND (%s IS NULL OR w.saas_edge_id = %s)
+            AND (%s IS NULL OR w.job_type = %s)
+            AND (%s IS NULL OR w.channel = %s)
+        )
+        SELECT d.id as execution_id, d."retryOf", d.status, d.saas_edge_id, d.job_type, d.channel
+        FROM day_executions d
+        WHERE d."retryOf" IS NOT NULL
+           OR d.id::text IN (SELECT "retryOf"::text FROM day_executions WHERE "retryOf" IS NOT NULL);
+        """
+        
+        conn = self.get_db_connection(read_only=True)
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(query, (
+                    target_date, saas_edge_id, saas_edge_id,
+                    job_type, job_type, channel, channel
+                ))
+                chains = {}
+                for execution_id, retry_of, status, edge_id, j_type, chan in cursor.fetchall():
+                    chains.setdefault((edge_id, j_type, chan), []).append(
+                        {'execution_id': execution_id, 'retryOf': retry_of, 'status': status}
+                    )
+                return chains
+        finally:
+            conn.close()
+    
     def extract_summary_stats(self,
                             target_date: str,
                             saas_edge_id: Optional[str] = None,
@@ -198,9 +312,9 @@ class N8NLogExporter:
               meta->>'job_type',
               settings->>'job_type',
               CASE 
-                WHEN name ILIKE '%webhook%' THEN 'webhook'
-                WHEN name ILIKE '%schedule%' THEN 'scheduled'
-                WHEN name ILIKE '%trigger%' THEN 'trigger'
+                WHEN name ILIKE '%%webhook%%' THEN 'webhook'
+                WHEN name ILIKE '%%schedule%%' THEN 'scheduled'
+                WHEN name ILIKE '%%trigger%%' THEN 'trigger'
                 ELSE 'workflow'
               END
             ) as job_type,
@@ -210,14 +324,14 @@ class N8NLogExporter:
               'production'
             ) as channel
           FROM workflow_entity
-          WHERE deletedAt IS NULL
+          WHERE "deletedAt" IS NULL
         ),
         daily_stats AS (
           SELECT 
             w.saas_edge_id,
             w.job_type,
             w.channel,
-            DATE(COALESCE(e.startedAt, e.createdAt)) as execution_date,
+            DATE(COALESCE(e."startedAt", e."createdAt")) as execution_date,
             COUNT(*) as total_executions,
             COUNT(CASE WHEN e.status = 'success' THEN 1 END) as successful,
             COUNT(CASE WHEN e.status = 'error' THEN 1 END) as failed,
@@ -225,22 +339,22 @@ class N8NLogExporter:
             COUNT(CASE WHEN e.status = 'waiting' THEN 1 END) as waiting,
             AVG(
               CASE 
-                WHEN e.startedAt IS NOT NULL AND e.stoppedAt IS NOT NULL 
-                THEN EXTRACT(EPOCH FROM (e.stoppedAt - e.startedAt)) * 1000
+                WHEN e."startedAt" IS NOT NULL AND e."stoppedAt" IS NOT NULL 
+                THEN EXTRACT(EPOCH FROM (e."stoppedAt" - e."startedAt")) * 1000
                 ELSE NULL 
               END
             ) as avg_duration_ms,
-            MIN(e.startedAt) as first_execution,
-            MAX(e.stoppedAt) as last_execution,
+            MIN(e."startedAt") as first_execution,
+            MAX(e."stoppedAt") as last_execution,
             COUNT(DISTINCT w.workflow_id) as unique_workflows
           FROM execution_entity e
-          INNER JOIN workflow_metadata w ON e.workflowId = w.workflow_id
-          WHERE e.deletedAt IS NULL
-            AND DATE(COALESCE(e.startedAt, e.createdAt)) = %s
+          INNER JOIN workflow_metadata w ON e."workflowId" = w.workflow_id
+          WHERE e."deletedAt" IS NULL
+            AND DATE(COALESCE(e."startedAt", e."createdAt")) = %s
             AND (%s IS NULL OR w.saas_edge_id = %s)
             AND (%s IS NULL OR w.job_type = %s)
             AND (%s IS NULL OR w.channel = %s)
-          GROUP BY w.saas_edge_id, w.job_type, w.channel, DATE(COALESCE(e.startedAt, e.createdAt))
+          GROUP BY w.saas_edge_id, w.job_type, w.channel, DATE(COALESCE(e."startedAt", e."createdAt"))
         )
         SELECT 
           *,
@@ -250,7 +364,7 @@ class N8NLogExporter:
         ORDER BY saas_edge_id, job_type, channel;
         """
         
-        conn = self.get_db_connection()
+        conn = self.get_db_connection(read_only=True)
         try:
             with conn.cursor() as cursor:
                 cursor.execute(query, (
@@ -281,14 +395,12 @@ class N8NLogExporter:
         finally:
             conn.close()
     
-    def upload_to_gcs(self, data: Dict[str, Any], blob_path: str) -> bool:
-        """Upload data to Google Cloud Storage"""
+    def upload_to_gcs(self, data: Union[Dict[str, Any], bytes], blob_path: str) -> bool:
+        """Upload data (or an already serialized payload) to Google Cloud Storage"""
         try:
+            payload = data if isinstance(data, bytes) else serialize_export(data)
             blob = self.bucket.blob(blob_path)
-            blob.upload_from_string(
-                json.dumps(data, indent=2, default=str),
-                content_type='application/json'
-            )
+            blob.upload_from_string(payload, content_type='application/json')
             logger.info(f"Successfully uploaded to: gs://{self.bucket_name}/{blob_path}")
             return True
         except Exception as e:
@@ -300,35 +412,46 @@ class N8NLogExporter:
         """Generate GCS blob path following the required structure"""
         return f"{self.gcs_prefix}/{saas_edge_id}/{job_type}/{channel}/{date}/{filename}"
     
+    def write_manifest(self, manifest: ExportManifestBuilder, target_date: str) -> Optional[str]:
+        """Upload the export manifest for the date (and shard, if filtered)"""
+        blob_path = manifest_path(self.gcs_prefix, target_date, manifest.shard)
+        if self.upload_to_gcs(manifest.build(), blob_path):
+            return blob_path
+        return None
+    
     def export_logs(self, 
                    target_date: str,
                    saas_edge_id: Optional[str] = None,
                    job_type: Optional[str] = None,
-                   channel: Optional[str] = None) -> Dict[str, Any]:
-        """Main export function"""
+                   channel: Optional[str] = None,
+                   progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """Main export function
         
-        logger.info(f"Starting log export for date: {target_date}")
+        progress_callback, if given, receives progress dicts (stage, counts)
+        as the export advances; used by the asynchronous job mode.
+        """
         
-        # Extract logs and summary stats
-        logs = self.extract_execution_logs(target_date, saas_edge_id, job_type, channel)
-        stats = self.extract_summary_stats(target_date, saas_edge_id, job_type, channel)
+        def report(**progress):
+            if progress_callback:
+                progress_callback(progress)
         
-        if not logs and not stats:
-            logger.info("No logs found for the specified criteria")
-            return {"status": "success", "message": "No logs found", "uploaded_files": []}
+        logger.info(f"Starting log export for date: {target_date}")
+        report(stage='extracting')
         
-        # Group logs by saas_edge_id, job_type, channel for separate files
-        grouped_logs = {}
-        for log in logs:
-            key = (log['saas_edge_id'], log['job_type'], log['channel'])
-            if key not in grouped_logs:
-                grouped_logs[key] = []
-            grouped_logs[key].append(log)
+        # Summary stats come from one aggregate query; executions are streamed
+        stats = self.extract_summary_stats(target_date, saas_edge_id, job_type, channel)
         
+        manifest = ExportManifestBuilder(target_date, "1.0.0", saas_edge_id, job_type, channel)
         uploaded_files = []
+        upload_lock = threading.Lock()
+        duration_sketches = {}
+        logical_counts = {}
+        total_executions = 0
+        sampled_groups = 0
         
-        # Upload grouped logs
-        for (edge_id, j_type, chan), log_group in grouped_logs.items():
+        def upload_group(group_key: tuple, log_group: List[Dict[str, Any]], part: int, last: bool,
+                         logical_jobs: int, sampling: Optional[Dict[str, Any]]):
+            edge_id, j_type, chan = group_key
             # Prepare log data structure
             log_data = {
                 "export_metadata": {
@@ -337,19 +460,96 @@ class N8NLogExporter:
                     "saas_edge_id": edge_id,
                     "job_type": j_type,
                     "channel": chan,
-                    "total_executions": len(log_group),
+                    "total_executions": sampling['population_executions'] if sampling else len(log_group),
+                    "logical_jobs": logical_jobs,
                     "exporter_version": "1.0.0"
                 },
                 "executions": log_group
             }
+            sampling_fields = {}
+            if sampling:
+                log_data["export_metadata"]["exported_executions"] = len(log_group)
+                log_data["export_metadata"]["sampling"] = sampling
+                sampling_fields = {'population_row_count': sampling['population_executions'],
+                                   'sampling_rate': sampling['rate']}
             
-            # Generate file path
-            filename = f"executions_{target_date.replace('-', '')}.json"
+            # Generate file path; groups too large for one part get one file per part
+            if part == 1 and last:
+                filename = f"executions_{target_date.replace('-', '')}.json"
+            else:
+                filename = f"executions_{target_date.replace('-', '')}_part{part:03d}.json"
+                log_data["export_metadata"]["part"] = part
+                log_data["export_metadata"]["last_part"] = last
             blob_path = self.generate_gcs_path(edge_id, j_type, chan, target_date, filename)
             
             # Upload to GCS
-            if self.upload_to_gcs(log_data, blob_path):
-                uploaded_files.append(blob_path)
+            payload = serialize_export(log_data)
+            uploaded = self.upload_to_gcs(payload, blob_path)
+            with upload_lock:
+                if uploaded:
+                    uploaded_files.append(blob_path)
+                    report(stage='uploading', uploaded_files=len(uploaded_files))
+                    manifest.add_object(
+                        blob_path, 'executions', payload, edge_id, j_type, chan,
+                        row_count=len(log_group),
+                        **time_range(log['startedAt'] or log['createdAt'] for log in log_group),
+                        **sampling_fields
+                    )
+                else:
+                    manifest.add_failure(blob_path)
+        
+        # Upload each part of a group as soon as it is complete; submit() blocks
+        # while the upload queue is full, which pauses fetching (backpressure)
+        chain_executions = self.extract_retry_chains(target_date, saas_edge_id, job_type, channel)
+        pipeline = UploadPipeline.from_env(upload_group)
+        try:
+            for group_key, log_group, part, last in self.stream_execution_logs(target_date, saas_edge_id,
+                                                                               job_type, channel):
+                if part == 1:
+                    duration_sketches[group_key] = LatencySketch()
+                    retry_chains = RetryChainIndex(chain_executions.pop(group_key, []))
+                
+                # Sketch durations and annotate retry chains while the part is in memory
+                sketch = duration_sketches[group_key]
+                for log in log_group:
+                    if log['duration_ms'] is not None:
+                        sketch.add(float(log['duration_ms']))
+                    retry_chains.annotate(log)
+                logical_jobs = len({log['root_execution_id'] for log in log_group})
+                if last:
+                    logical_counts[group_key] = retry_chains.finish()
+                total_executions += len(log_group)
+                
+                # Sample only after the full-population sketch and counts above
+                sampling = None
+                if self.sampling_policy:
+                    log_group, sampling = self.sampling_policy.apply(group_key, log_group)
+                    if sampling and part == 1:
+                        sampled_groups += 1
+                
+                pipeline.submit(group_key, log_group, part, last, logical_jobs, sampling)
+                report(stage='uploading', executions_processed=total_executions,
+                       groups_processed=len(logical_counts))
+        except BaseException:
+            # Upload failures must not replace the error that stopped the export
+            pipeline.close(raise_errors=False)
+            raise
+        pipeline.close()
+        
+        if pipeline.blocked_seconds:
+            logger.info(f"Fetching waited {pipeline.blocked_seconds:.1f}s on the upload queue")
+        
+        if not logical_counts and not stats:
+            logger.info("No logs found for the specified criteria")
+            # An empty manifest still records that the date was exported
+            manifest_blob_path = self.write_manifest(manifest, target_date)
+            return {"status": "success", "message": "No logs found", "uploaded_files": [],
+                    "manifest": manifest_blob_path}
+        
+        for stat in stats:
+            key = (stat['saas_edge_id'], stat['job_type'], stat['channel'])
+            stat.update(logical_counts.get(key, {}))
+            stat.update(duration_fields(duration_sketches.get(key)))
         
         # Upload summary stats (if any)
         if stats:
@@ -385,56 +585,157 @@ class N8NLogExporter:
                     )]
                 }
                 
-                if self.upload_to_gcs(filtered_summary, blob_path):
+                payload = serialize_export(filtered_summary)
+                group_stats = filtered_summary['summary_stats']
+                if self.upload_to_gcs(payload, blob_path):
                     uploaded_files.append(blob_path)
+                    manifest.add_object(
+                        blob_path, 'summary', payload,
+                        stat['saas_edge_id'], stat['job_type'], stat['channel'],
+                        row_count=len(group_stats),
+                        **time_range([s['first_execution'] for s in group_stats] +
+                                     [s['last_execution'] for s in group_stats])
+                    )
+                else:
+                    manifest.add_failure(blob_path)
+        
+        # Write the manifest last so every object it lists already exists
+        report(stage='writing_manifest', uploaded_files=len(uploaded_files))
+        manifest_blob_path = self.write_manifest(manifest, target_date)
         
         logger.info(f"Export completed. Uploaded {len(uploaded_files)} files to GCS")
         
         return {
             "status": "success",
             "target_date": target_date,
-            "total_executions": len(logs),
-            "total_groups": len(grouped_logs),
-            "uploaded_files": uploaded_files
+            "total_executions": total_executions,
+            "total_groups": len(logical_counts),
+            "sampled_groups": sampled_groups,
+            "uploaded_files": uploaded_files,
+            "manifest": manifest_blob_path
         }
 
+def resolve_target_date(date_param: str) -> str:
+    """Translate 'yesterday'/'today' into YYYY-MM-DD"""
+    if date_param == 'yesterday':
+        return (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+    if date_param == 'today':
+        return datetime.now().strftime("%Y-%m-%d")
+    return date_param
+
+def run_export_job(exporter: N8NLogExporter, job_store: ExportJobStore, job: Dict[str, Any]):
+    """Run a queued export job, recording progress and the outcome"""
+    job_id = job['job_id']
+    filters = job['filters']
+    last_update = {'at': 0.0, 'stage': None}
+    progress_lock = threading.Lock()
+    stop_heartbeat = threading.Event()
+    
+    def on_progress(progress: Dict[str, Any]):
+        # Called from the upload workers too. Throttle database writes; stage
+        # changes are always recorded
+        with progress_lock:
+            now = time.monotonic()
+            if progress.get('stage') != last_update['stage'] or now - last_update['at'] >= PROGRESS_INTERVAL_SECONDS:
+                job_store.update_progress(job_id, progress)
+                last_update.update(at=now, stage=progress.get('stage'))
+    
+    def heartbeat():
+        # Keeps the job alive through stages that report no progress
+        # (e.g. the summary stats query)
+        while not stop_heartbeat.wait(HEARTBEAT_INTERVAL_SECONDS):
+            try:
+                job_store.heartbeat(job_id)
+            except psycopg2.Error as e:
+                logger.warning(f"Heartbeat for export job {job_id} failed: {e}")
+    
+    heartbeat_thread = threading.Thread(target=heartbeat, name=f"export-job-heartbeat-{job_id}", daemon=True)
+    try:
+        job_store.start(job_id)
+        heartbeat_thread.start()
+        result = exporter.export_logs(
+            target_date=job['target_date'],
+            saas_edge_id=filters.get('saas_edge_id'),
+            job_type=filters.get('job_type'),
+            channel=filters.get('channel'),
+            progress_callback=on_progress
+        )
+        job_store.update_progress(job_id, {'stage': 'done', 'uploaded_files': len(result.get('uploaded_files', []))})
+        job_store.complete(job_id, result)
+        logger.info(f"Export job {job_id} completed")
+    except Exception as e:
+        logger.error(f"Export job {job_id} failed: {e}", exc_info=True)
+        job_store.fail(job_id, str(e))
+    finally:
+        stop_heartbeat.set()
+
+def job_response(job: Dict[str, Any], status_code: int, created: bool = False):
+    body = serialize_job(job)
+    body['created'] = created
+    body['status_url'] = f"?job_id={job['job_id']}"
+    return {"statusCode": status_code, "body": body}, status_code
+
 @functions_framework.http
 def export_logs_handler(request):
-    """Cloud Function HTTP handler for log exports"""
+    """Cloud Function HTTP handler for log exports
+    
+    POST starts an export job and returns 202 with its job id; duplicate
+    triggers for the same date and filters return the job already in flight
+    (or, unless "force" is set, the last successful one). GET with ?job_id=
+    (or a POST body with only "job_id") returns the job's status, progress and
+    result. Send "wait": true to run the export inside the request as before.
+    
+    The export continues after the 202 response, so the function needs CPU
+    allocated outside requests (see the module docstring).
+    """
     try:
         # Parse request data
         request_json = request.get_json(silent=True)
         if not request_json:
             request_json = {}
         
+        exporter = N8NLogExporter()
+        job_store = ExportJobStore(exporter.db_config)
+        
+        # Status polling
+        job_id = request.args.get('job_id') or request_json.get('job_id')
+        if request.method == 'GET' or job_id:
+            if not job_id:
+                return {"statusCode": 400, "body": {"status": "error", "message": "job_id is required"}}, 400
+            job = job_store.get(job_id)
+            if not job:
+                return {"statusCode": 404, "body": {"status": "error", "message": f"Unknown job: {job_id}"}}, 404
+            return job_response(job, 200)
+        
         # Determine target date
-        date_param = request_json.get('date', 'yesterday')
-        if date_param == 'yesterday':
-            target_date = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
-        elif date_param == 'today':
-            target_date = datetime.now().strftime("%Y-%m-%d")
-        else:
-            target_date = date_param
+        target_date = resolve_target_date(request_json.get('date', 'yesterday'))
         
         # Extract optional filters
         saas_edge_id = request_json.get('saas_edge_id')
         job_type = request_json.get('job_type')
         channel = request_json.get('channel')
         
-        # Initialize exporter and run export
-        exporter = N8NLogExporter()
-        result = exporter.export_logs(
-            target_date=target_date,
-            saas_edge_id=saas_edge_id,
-            job_type=job_type,
-            channel=channel
+        if request_json.get('wait'):
+            result = exporter.export_logs(
+                target_date=target_date,
+                saas_edge_id=saas_edge_id,
+                job_type=job_type,
+                channel=channel
+            )
+            return {"statusCode": 200, "body": result}, 200
+        
+        job, created = job_store.submit(
+            target_date, saas_edge_id, job_type, channel,
+            requested_by=request.headers.get('User-Agent'),
+            force=bool(request_json.get('force'))
         )
+        if created:
+            threading.Thread(target=run_export_job, args=(exporter, job_store, job),
+                             name=f"export-{job['job_id']}").start()
+            return job_response(job, 202, created=True)
         
-        # Return success response
-        return {
-            "statusCode": 200,
-            "body": result
-        }
+        # Duplicate trigger: report the existing job instead of exporting again
+        return job_response(job, 202 if job['status'] in ACTIVE_JOB_STATUSES else 200)
         
     except Exception as e:
         logger.error(f"Export failed: {e}", exc_info=True)
@@ -445,4 +746,4 @@ def export_logs_handler(request):
                 "message": str(e),
                 "error_type": type(e).__name__
             }
-        }
+        }, 500
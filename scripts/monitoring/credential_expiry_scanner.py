@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Credential Expiry Scanner
+=========================
+
+Scheduled job that finds active credentials whose ``expires_at`` falls within
+``horizon`` and enqueues one job per credential in ``saas_edge_jobs``:
+
+- ``credential_refresh`` when the credential schema requires a refresh token
+  (eBay, Amazon), so a worker can renew it before it lapses
+- ``credential_expiry_notice`` otherwise, so the tenant can be told to
+  replace it
+
+The scan walks ``idx_channel_creds_expires`` in ``(expires_at,
+credential_id)`` order, starting from the cursor in
+``credential_expiry_scan_cursors`` (``schemas/credential_expiry_scan.sql``).
+Each batch locks the cursor, enqueues its jobs and moves the cursor in one
+transaction. A run therefore reads only credentials that entered the horizon
+since the last run, plus those queued in ``credential_expiry_rescan`` because
+they changed behind the cursor. Crashes and concurrent runs neither skip nor
+duplicate jobs.
+
+Usage:
+    python credential_expiry_scanner.py                      # every few minutes
+    python credential_expiry_scanner.py --horizon-days 14 --batch-size 1000
+    python credential_expiry_scanner.py --status
+
+Requirements:
+    pip install psycopg2-binary python-dotenv
+"""
+
+import os
+import json
+import time
+import logging
+import argparse
+from collections import Counter
+from typing import Dict, List, Optional, Any
+import psycopg2
+from psycopg2.extras import RealDictCursor
+from dotenv import load_dotenv
+
+from edge_job_dispatcher import EdgeJobDispatcher
+
+logger = logging.getLogger(__name__)
+
+REFRESH_JOB = 'credential_refresh'
+NOTICE_JOB = 'credential_expiry_notice'
+
+CREDENTIAL_COLUMNS = """
+  c.credential_id::text AS credential_id, c.saas_edge_id::text AS saas_edge_id,
+  c.installation_id::text AS installation_id, c.credential_name, c.credential_type,
+  c.expires_at, cm.channel_key,
+  COALESCE(NULLIF(c.credential_schema, '{}'::jsonb), cm.credential_schema, '{}'::jsonb)
+    -> 'required' ? 'refresh_token' AS refreshable
+"""
+
+# Next credentials after the cursor, in index order. The plain range on
+# expires_at lets the planner use idx_channel_creds_expires; the row
+# comparison breaks ties.
+NEXT_BATCH_QUERY = f"""
+SELECT {CREDENTIAL_COLUMNS}
+FROM saas_channel_credentials c
+JOIN saas_channel_master cm ON cm.channel_id = c.channel_id
+WHERE c.expires_at >= %(after_expires_at)s
+  AND c.expires_at <= %(until)s
+  AND (c.expires_at, c.credential_id) > (%(after_expires_at)s, %(after_credential_id)s::uuid)
+  AND c.status = 'active'
+ORDER BY c.expires_at, c.credential_id
+LIMIT %(limit)s;
+"""
+
+# Drains queued credentials. Only those still active, in the horizon and
+# behind the cursor qualify; the regular scan reaches the others.
+RESCAN_BATCH_QUERY = f"""
+WITH drained AS (
+  DELETE FROM credential_expiry_rescan r
+  WHERE r.scan_name = %(scan_name)s
+    AND r.credential_id IN (SELECT credential_id FROM credential_expiry_rescan
+                            WHERE scan_name = %(scan_name)s
+                            ORDER BY queued_at
+                            LIMIT %(limit)s)
+  RETURNING r.credential_id
+)
+SELECT {CREDENTIAL_COLUMNS},
+       c.status = 'active'
+       AND c.expires_at <= %(until)s
+       AND (c.expires_at, c.credential_id) <= (%(after_expires_at)s, %(after_credential_id)s::uuid) AS qualifies
+FROM drained d
+JOIN saas_channel_credentials c ON c.credential_id = d.credential_id
+JOIN saas_channel_master cm ON cm.channel_id = c.channel_id;
+"""
+
+
+class CredentialExpiryScanner:
+    """Enqueues refresh and notification jobs for credentials nearing expires_at"""
+
+    def __init__(self,
+                 db_config: Dict[str, Any],
+                 dispatcher: Optional[EdgeJobDispatcher] = None,
+                 scan_name: str = 'credential_expiry',
+                 horizon_days: float = 7.0,
+                 lookback_days: float = 1.0,
+                 batch_size: int = 500):
+        self.db_config = db_config
+        self.dispatcher = dispatcher or EdgeJobDispatcher(db_config, worker_id=f"scanner:{scan_name}")
+        self.scan_name = scan_name
+        self.horizon_days = horizon_days
+        self.lookback_days = lookback_days
+        self.batch_size = batch_size
+
+    def get_db_connection(self):
+        return psycopg2.connect(**self.db_config)
+
+    def _lock_cursor(self, cursor) -> Dict[str, Any]:
+        """Create the cursor on first use (lookback_days before now) and lock it"""
+        cursor.execute("""
+            INSERT INTO credential_expiry_scan_cursors (scan_name, cursor_expires_at)
+            VALUES (%s, now() - make_interval(secs => %s))
+            ON CONFLICT (scan_name) DO NOTHING;
+        """, (self.scan_name, self.lookback_days * 86400))
+        cursor.execute("""
+            SELECT cursor_expires_at AS after_expires_at, cursor_credential_id::text AS after_credential_id,
+                   now() + make_interval(secs => %s) AS until
+            FROM credential_expiry_scan_cursors
+            WHERE scan_name = %s
+            FOR UPDATE;
+        """, (self.horizon_days * 86400, self.scan_name))
+        return dict(cursor.fetchone())
+
+    def build_jobs(self, credentials: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        jobs = []
+        for credential in credentials:
+            jobs.append({
+                'saas_edge_id': credential['saas_edge_id'],
+                'job_type': REFRESH_JOB if credential['refreshable'] else NOTICE_JOB,
+                'job_config': {
+                    'credential_id': credential['credential_id'],
+                    'installation_id': credential['installation_id'],
+                    'channel_key': credential['channel_key'],
+                    'credential_type': credential['credential_type'],
+                    'credential_name': credential['credential_name'],
+                    'expires_at': credential['expires_at'].isoformat()
+                }
+            })
+        return jobs
+
+    def _run_batches(self, conn, query: str, advance: bool, counts: Counter) -> int:
+        """Run query until a batch comes back short; returns the credentials enqueued"""
+        enqueued = 0
+        while True:
+            with conn, conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                params = self._lock_cursor(cursor)
+                params.update(scan_name=self.scan_name, limit=self.batch_size)
+                cursor.execute(query, params)
+                rows = cursor.fetchall()
+                credentials = [row for row in rows if row.get('qualifies', True)]
+
+                jobs = self.build_jobs(credentials)
+                self.dispatcher.enqueue_many(jobs, conn=conn)
+                counts.update(job['job_type'] for job in jobs)
+
+                if advance and credentials:
+                    last = credentials[-1]
+                    cursor.execute("""
+                        UPDATE credential_expiry_scan_cursors
+                        SET cursor_expires_at = %s, cursor_credential_id = %s, updated_at = now()
+                        WHERE scan_name = %s;
+                    """, (last['expires_at'], last['credential_id'], self.scan_name))
+
+            enqueued += len(credentials)
+            if len(rows) < self.batch_size:
+                return enqueued
+
+    def run(self) -> Dict[str, Any]:
+        """Drain the rescan queue, then advance the cursor to now() + horizon"""
+        started = time.monotonic()
+        counts: Counter = Counter()
+        conn = self.get_db_connection()
+        try:
+            rescanned = self._run_batches(conn, RESCAN_BATCH_QUERY, advance=False, counts=counts)
+            scanned = self._run_batches(conn, NEXT_BATCH_QUERY, advance=True, counts=counts)
+            with conn, conn.cursor() as cursor:
+                cursor.execute("""
+                    UPDATE credential_expiry_scan_cursors SET last_run_at = now()
+                    WHERE scan_name = %s;
+                """, (self.scan_name,))
+        finally:
+            conn.close()
+
+        if scanned or rescanned:
+            logger.info(f"Enqueued {sum(counts.values())} credential expiry jobs "
+                        f"({scanned} newly in horizon, {rescanned} changed behind the cursor)")
+        return {'status': 'success', 'scanned': scanned, 'rescanned': rescanned,
+                'enqueued': dict(counts), 'seconds': round(time.monotonic() - started, 3),
+                **self.cursor_status()}
+
+    def cursor_status(self) -> Dict[str, Any]:
+        conn = self.get_db_connection()
+        try:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                cursor.execute("""
+                    SELECT s.cursor_expires_at, s.cursor_credential_id::text AS cursor_credential_id,
+                           s.last_run_at,
+                           (SELECT count(*) FROM credential_expiry_rescan r
+                            WHERE r.scan_name = s.scan_name) AS rescan_queued
+                    FROM credential_expiry_scan_cursors s
+                    WHERE s.scan_name = %s;
+                """, (self.scan_name,))
+                row = cursor.fetchone()
+                return {'cursor': dict(row) if row else None}
+        finally:
+            conn.close()
+
+    def close(self) -> None:
+        self.dispatcher.close()
+
+
+def create_db_config() -> Dict[str, Any]:
+    """SaaS database connection settings from the environment"""
+    return {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'port': int(os.getenv('DB_PORT', '5432')),
+        'database': os.getenv('DB_NAME', 'catalog-edge-db'),
+        'user': os.getenv('DB_USER', 'postgres'),
+        'password': os.getenv('DB_PASSWORD', '')
+    }
+
+
+def main():
+    """Main CLI entry point"""
+    load_dotenv()
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description="Enqueue refresh/notification jobs for expiring credentials")
+    parser.add_argument("--scan-name", default='credential_expiry', help="Cursor to use")
+    parser.add_argument("--horizon-days", type=float, default=7.0, help="Enqueue credentials expiring within")
+    parser.add_argument("--lookback-days", type=float, default=1.0,
+                        help="First run only: also include credentials expired this recently")
+    parser.add_argument("--batch-size", type=int, default=500, help="Credentials per transaction")
+    parser.add_argument("--status", action="store_true", help="Print the cursor without scanning")
+
+    args = parser.parse_args()
+
+    try:
+        scanner = CredentialExpiryScanner(create_db_config(), scan_name=args.scan_name,
+                                          horizon_days=args.horizon_days, lookback_days=args.lookback_days,
+                                          batch_size=args.batch_size)
+        result = scanner.cursor_status() if args.status else scanner.run()
+        scanner.close()
+        print(json.dumps(result, indent=2, default=str))
+
+    except Exception as e:
+        logger.error(f"Credential expiry scan failed: {e}")
+        print(json.dumps({"status": "error", "message": str(e)}, indent=2))
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Credential Health Dashboard Maintenance
+=======================================
+
+Scheduled job for ``credential_health_dashboard``
+(``schemas/credential_health_dashboard.sql``). Triggers keep the table current
+on every write; what they cannot see is the clock. Each run applies the
+time-based transitions that have come due (``expiring_soon`` 7 days before
+``expires_at``, ``expired`` at ``expires_at``, ``stale`` 30 days after the last
+test) through ``refresh_credential_health_transitions()``, which only touches
+rows whose ``health_recheck_at`` has passed. Schedule it every few minutes.
+
+``--verify`` compares the table with a live evaluation of the original view
+and reports drifted rows; ``--rebuild`` reloads the table from the source
+tables. ``--saas-edge-id`` prints the per-status counts a portal page shows.
+
+Usage:
+    python credential_health_dashboard.py
+    python credential_health_dashboard.py --verify
+    python credential_health_dashboard.py --rebuild
+    python credential_health_dashboard.py --saas-edge-id <uuid>
+
+Requirements:
+    pip install psycopg2-binary python-dotenv
+"""
+
+import os
+import json
+import time
+import logging
+import argparse
+from typing import Dict, Any
+import psycopg2
+from psycopg2.extras import RealDictCursor
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Rows whose stored values differ from the original view's definition
+DRIFT_QUERY = """
+WITH live AS (
+    SELECT
+        c.credential_id,
+        credential_health_status(c.status, c.expires_at, c.last_tested_at, now()) AS health_status,
+        (SELECT count(*) FROM saas_channel_installed_flows f
+         WHERE f.credential_id = c.credential_id) AS flows_using_credential,
+        cm.channel_key
+    FROM saas_channel_credentials c
+    JOIN saas_channel_master cm ON c.channel_id = cm.channel_id
+)
+SELECT
+    COALESCE(l.credential_id, d.credential_id) AS credential_id,
+    l.health_status AS live_health_status,
+    d.health_status AS stored_health_status,
+    l.flows_using_credential AS live_flows,
+    d.flows_using_credential AS stored_flows
+FROM live l
+FULL JOIN credential_health_dashboard d ON d.credential_id = l.credential_id
+WHERE l.credential_id IS NULL
+   OR d.credential_id IS NULL
+   OR l.health_status IS DISTINCT FROM d.health_status
+   OR l.flows_using_credential IS DISTINCT FROM d.flows_using_credential
+   OR l.channel_key IS DISTINCT FROM d.channel_key
+LIMIT %s;
+"""
+
+
+class CredentialHealthDashboard:
+    """Applies time-based health transitions and checks the dashboard table"""
+
+    def __init__(self, db_config: Dict[str, Any], batch_size: int = 10000):
+        self.db_config = db_config
+        self.batch_size = batch_size
+
+    def get_db_connection(self):
+        return psycopg2.connect(**self.db_config)
+
+    def refresh_transitions(self) -> Dict[str, Any]:
+        """Recompute every row that is due, one batch per transaction"""
+        started = time.monotonic()
+        updated = 0
+        conn = self.get_db_connection()
+        try:
+            while True:
+                with conn, conn.cursor() as cursor:
+                    cursor.execute("SELECT refresh_credential_health_transitions(%s);", (self.batch_size,))
+                    batch = cursor.fetchone()[0]
+                updated += batch
+                if batch < self.batch_size:
+                    break
+        finally:
+            conn.close()
+
+        if updated:
+            logger.info(f"Applied {updated} credential health transitions")
+        return {'status': 'success', 'transitions': updated,
+                'seconds': round(time.monotonic() - started, 3)}
+
+    def rebuild(self) -> int:
+        conn = self.get_db_connection()
+        try:
+            with conn, conn.cursor() as cursor:
+                cursor.execute("SELECT rebuild_credential_health_dashboard();")
+                rows = cursor.fetchone()[0]
+            logger.info(f"Rebuilt credential_health_dashboard with {rows} rows")
+            return rows
+        finally:
+            conn.close()
+
+    def verify(self, limit: int = 100) -> Dict[str, Any]:
+        conn = self.get_db_connection()
+        try:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                cursor.execute(DRIFT_QUERY, (limit,))
+                drifted = [{key: str(value) if value is not None else None for key, value in row.items()}
+                           for row in cursor.fetchall()]
+            return {'status': 'success' if not drifted else 'drift', 'drifted_rows': drifted}
+        finally:
+            conn.close()
+
+    def tenant_summary(self, saas_edge_id: str) -> Dict[str, Any]:
+        """Per-status credential and flow counts for one tenant"""
+        conn = self.get_db_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT health_status, count(*), sum(flows_using_credential)
+                    FROM credential_health_dashboard
+                    WHERE saas_edge_id = %s
+                    GROUP BY health_status;
+                """, (saas_edge_id,))
+                return {status: {'credentials': count, 'flows': int(flows or 0)}
+                        for status, count, flows in cursor.fetchall()}
+        finally:
+            conn.close()
+
+
+def create_db_config() -> Dict[str, Any]:
+    """SaaS database connection settings from the environment"""
+    return {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'port': int(os.getenv('DB_PORT', '5432')),
+        'database': os.getenv('DB_NAME', 'catalog-edge-db'),
+        'user': os.getenv('DB_USER', 'postgres'),
+        'password': os.getenv('DB_PASSWORD', '')
+    }
+
+
+def main():
+    """Main CLI entry point"""
+    parser = argparse.ArgumentParser(description="Maintain the materialized credential health dashboard")
+    parser.add_argument("--batch-size", type=int, default=10000, help="Rows recomputed per transaction")
+    parser.add_argument("--rebuild", action="store_true", help="Reload the table from the source tables first")
+    parser.add_argument("--verify", action="store_true", help="Report rows that differ from a live evaluation")
+    parser.add_argument("--saas-edge-id", help="Print the health summary of one tenant")
+
+    args = parser.parse_args()
+
+    try:
+        dashboard = CredentialHealthDashboard(create_db_config(), batch_size=args.batch_size)
+        if args.saas_edge_id:
+            print(json.dumps(dashboard.tenant_summary(args.saas_edge_id), indent=2))
+            return
+        result: Dict[str, Any] = {}
+        if args.rebuild:
+            result['rebuilt_rows'] = dashboard.rebuild()
+        result.update(dashboard.refresh_transitions())
+        if args.verify:
+            result.update(dashboard.verify())
+        print(json.dumps(result, indent=2))
+
+    except Exception as e:
+        logger.error(f"Credential health dashboard maintenance failed: {e}")
+        print(json.dumps({"status": "error", "message": str(e)}, indent=2))
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Read-Replica Routing for N8N Exporter and Reporting Queries
+===========================================================
+
+Routes read-only work (log extraction, summary stats, sync status reports)
+to PostgreSQL read replicas so nightly analytical scans do not compete with
+live n8n workflow writes on the primary.
+
+Each replica is health-checked and its replication lag measured before it is
+used. Replicas that are unreachable or lag beyond the configured threshold are
+skipped, and reads fall back to the primary when no replica qualifies.
+
+Configuration (environment variables):
+    DB_POSTGRESDB_REPLICA_DSNS         Comma-separated libpq DSNs/URIs of replicas
+    DB_REPLICA_MAX_LAG_SECONDS         Maximum tolerated replication lag (default 30)
+    DB_REPLICA_HEALTH_CHECK_INTERVAL   Seconds a health result is trusted (default 30)
+    DB_REPLICA_CONNECT_TIMEOUT         Connect timeout for replicas in seconds (default 5)
+
+Example:
+    DB_POSTGRESDB_REPLICA_DSNS="host=10.75.16.4 dbname=n8n user=n8n_ro password=...,host=10.75.16.5 dbname=n8n user=n8n_ro password=..."
+"""
+
+import os
+import time
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Any
+import psycopg2
+
+logger = logging.getLogger(__name__)
+
+# Lag is zero when the replica has replayed everything it received; otherwise
+# it is the age of the last replayed transaction. On a primary it is zero.
+REPLICATION_LAG_QUERY = """
+SELECT CASE
+  WHEN NOT pg_is_in_recovery() THEN 0
+  WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+  ELSE COALESCE(EXTRACT(EPOCH FROM (now() - pg_last_xact_replay_timestamp())), 0)
+END AS lag_seconds;
+"""
+
+
+@dataclass
+class ReplicaStatus:
+    """Last known health of a single replica"""
+    dsn: str
+    healthy: bool = False
+    lag_seconds: Optional[float] = None
+    checked_at: float = 0.0
+    error: Optional[str] = None
+
+
+class ReplicaRouter:
+    """Chooses a healthy, low-lag replica for read-only queries"""
+
+    def __init__(self,
+                 primary_config: Dict[str, Any],
+                 replica_dsns: Optional[List[str]] = None,
+                 max_lag_seconds: float = 30.0,
+                 health_check_interval: float = 30.0,
+                 connect_timeout: int = 5):
+        self.primary_config = primary_config
+        self.max_lag_seconds = max_lag_seconds
+        self.health_check_interval = health_check_interval
+        self.connect_timeout = connect_timeout
+        self.replicas = [ReplicaStatus(dsn=dsn) for dsn in (replica_dsns or [])]
+        self._next_replica = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls,
+                 primary_config: Dict[str, Any],
+                 dsn_env_var: str = 'DB_POSTGRESDB_REPLICA_DSNS') -> 'ReplicaRouter':
+        """Build a router from environment variables"""
+        raw_dsns = os.environ.get(dsn_env_var, '')
+        replica_dsns = [dsn.strip() for dsn in raw_dsns.split(',') if dsn.strip()]
+        return cls(
+            primary_config,
+            replica_dsns=replica_dsns,
+            max_lag_seconds=float(os.environ.get('DB_REPLICA_MAX_LAG_SECONDS', 30)),
+            health_check_interval=float(os.environ.get('DB_REPLICA_HEALTH_CHECK_INTERVAL', 30)),
+            connect_timeout=int(os.environ.get('DB_REPLICA_CONNECT_TIMEOUT', 5))
+        )
+
+    def _connect_replica(self, dsn: str):
+        return psycopg2.connect(dsn, connect_timeout=self.connect_timeout)
+
+    def _measure_lag(self, conn) -> float:
+        with conn.cursor() as cursor:
+            cursor.execute(REPLICATION_LAG_QUERY)
+            return float(cursor.fetchone()[0])
+
+    def check_replica(self, replica: ReplicaStatus) -> ReplicaStatus:
+        """Run a health check and lag measurement against one replica"""
+        conn = None
+        try:
+            conn = self._connect_replica(replica.dsn)
+            replica.lag_seconds = self._measure_lag(conn)
+            replica.healthy = replica.lag_seconds <= self.max_lag_seconds
+            replica.error = None if replica.healthy else (
+                f"replication lag {replica.lag_seconds:.1f}s exceeds {self.max_lag_seconds:.1f}s"
+            )
+        except psycopg2.Error as e:
+            replica.healthy = False
+            replica.lag_seconds = None
+            replica.error = str(e).strip()
+        finally:
+            replica.checked_at = time.monotonic()
+            if conn is not None:
+                conn.close()
+
+        if not replica.healthy:
+            logger.warning(f"Replica unavailable for reads: {replica.error}")
+        return replica
+
+    def _is_stale(self, replica: ReplicaStatus) -> bool:
+        return time.monotonic() - replica.checked_at >= self.health_check_interval
+
+    def _candidate_order(self) -> List[ReplicaStatus]:
+        """Round-robin over replicas so read load is spread across them"""
+        with self._lock:
+            start = self._next_replica
+            self._next_replica = (self._next_replica + 1) % max(len(self.replicas), 1)
+        return self.replicas[start:] + self.replicas[:start]
+
+    def get_read_connection(self):
+        """Return a connection to a healthy replica, or the primary as fallback"""
+        for replica in self._candidate_order():
+            if self._is_stale(replica):
+                self.check_replica(replica)
+            if not replica.healthy:
+                continue
+
+            try:
+                conn = self._connect_replica(replica.dsn)
+                # Re-check lag on the connection we hand out; a cached healthy
+                # status may be up to health_check_interval seconds old.
+                lag = self._measure_lag(conn)
+                if lag <= self.max_lag_seconds:
+                    replica.lag_seconds = lag
+                    logger.info(f"Routing read-only query to replica (lag {lag:.1f}s)")
+                    return conn
+                conn.close()
+                replica.healthy = False
+                replica.lag_seconds = lag
+                replica.checked_at = time.monotonic()
+                logger.warning(f"Replica lag {lag:.1f}s exceeds threshold, trying next")
+            except psycopg2.Error as e:
+                replica.healthy = False
+                replica.error = str(e).strip()
+                replica.checked_at = time.monotonic()
+                logger.warning(f"Replica connection failed, trying next: {replica.error}")
+
+        if self.replicas:
+            logger.warning("No healthy replica available, falling back to primary")
+        return psycopg2.connect(**self.primary_config)
+
+    def get_status(self) -> List[Dict[str, Any]]:
+        """Return the last known health of every replica (DSNs are not exposed)"""
+        return [
+            {
+                'replica_index': index,
+                'healthy': replica.healthy,
+                'lag_seconds': replica.lag_seconds,
+                'error': replica.error
+            }
+            for index, replica in enumerate(self.replicas)
+        ]
@@ -0,0 +1,445 @@
+#!/usr/bin/env python3
+"""
+Parallel Job Dispatch over saas_edge_jobs
+=========================================
+
+Lets any number of workers pull jobs from ``saas_edge_jobs`` without
+serializing on row locks (``schemas/edge_job_dispatch.sql``):
+
+1. ``claim()`` takes up to ``batch_size`` pending jobs, oldest first, with
+   ``FOR UPDATE SKIP LOCKED`` -- rows another worker is claiming are skipped
+   instead of waited for -- and marks them ``running`` under a lease owned by
+   this worker
+2. A heartbeat thread extends the lease of every job the worker holds
+3. ``complete()`` / ``fail()`` only succeed while the worker still owns the
+   lease; failed jobs go back to ``pending`` with exponential backoff until
+   ``max_attempts`` is reached
+4. ``reclaim_expired()`` (run periodically by every worker) returns jobs of
+   workers that stopped heartbeating to the queue
+
+Rows are addressed by ``(job_id, started_at)``, the primary key of the
+time-partitioned table, so every update touches a single partition.
+
+Usage:
+    dispatcher = EdgeJobDispatcher(create_db_config(), job_types=['catalog_sync'])
+    dispatcher.enqueue(saas_edge_id, 'catalog_sync', {'channel': 'shopify'})
+
+    def handle(job):
+        ...                                   # do the work
+        return {'synced': 42}                 # stored in job_result
+
+    dispatcher.run(handle)
+
+    python edge_job_dispatcher.py [--reclaim]   # queue stats
+
+Requirements:
+    pip install psycopg2-binary python-dotenv
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import logging
+import argparse
+import threading
+from typing import Dict, List, Optional, Any, Callable, Iterable, Tuple
+import psycopg2
+from psycopg2.extras import RealDictCursor, execute_values
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+# Returned for claimed jobs (j = the jobs table); started_at is needed to address the row
+JOB_COLUMNS = """
+  j.job_id::text AS job_id, j.saas_edge_id::text AS saas_edge_id, j.saas_flow_id::text AS saas_flow_id,
+  j.job_type, j.job_status, j.job_config, j.attempts, j.lease_owner, j.lease_expires_at, j.started_at
+"""
+
+
+class EdgeJobDispatcher:
+    """Claims, leases and settles saas_edge_jobs for one worker"""
+
+    # Benchmarks swap this for plain 'FOR UPDATE' to show the contention it avoids
+    lock_clause = 'FOR UPDATE SKIP LOCKED'
+
+    def __init__(self,
+                 db_config: Dict[str, Any],
+                 worker_id: Optional[str] = None,
+                 table: str = 'saas_edge_jobs',
+                 job_types: Optional[List[str]] = None,
+                 batch_size: int = 10,
+                 lease_seconds: int = 60,
+                 heartbeat_interval: float = 15.0,
+                 reclaim_interval: float = 30.0,
+                 max_attempts: int = 5,
+                 retry_base_seconds: float = 10.0):
+        if heartbeat_interval >= lease_seconds:
+            raise ValueError("heartbeat_interval must be shorter than lease_seconds")
+
+        self.db_config = db_config
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.table = table
+        self.job_types = job_types
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.heartbeat_interval = heartbeat_interval
+        self.reclaim_interval = reclaim_interval
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+
+        self.conn = None
+        self.stop_event = threading.Event()
+        self.stats = {'claimed': 0, 'completed': 0, 'failed': 0, 'retried': 0, 'lost_leases': 0,
+                      'reclaimed': 0, 'empty_polls': 0, 'claim_seconds': 0.0}
+
+    def get_db_connection(self):
+        return psycopg2.connect(**self.db_config)
+
+    def _connection(self):
+        if self.conn is None or self.conn.closed:
+            self.conn = self.get_db_connection()
+        return self.conn
+
+    def close(self) -> None:
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def _execute(self, query: str, params: Any = None) -> List[Dict[str, Any]]:
+        """Run one statement in its own transaction on the worker connection"""
+        conn = self._connection()
+        try:
+            with conn, conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                cursor.execute(query, params)
+                return [dict(row) for row in cursor.fetchall()]
+        except psycopg2.OperationalError:
+            self.close()
+            raise
+
+    # -----------------------------------------
+    # Producer side
+    # -----------------------------------------
+
+    def enqueue(self,
+                saas_edge_id: str,
+                job_type: str,
+                job_config: Optional[Dict[str, Any]] = None,
+                saas_flow_id: Optional[str] = None,
+                available_at: Optional[Any] = None) -> str:
+        """Add one pending job and return its job_id"""
+        rows = self._execute(f"""
+            INSERT INTO {self.table} (saas_edge_id, saas_flow_id, job_type, job_config, available_at)
+            VALUES (%s, %s, %s, %s, %s)
+            RETURNING job_id::text AS job_id;
+        """, (saas_edge_id, saas_flow_id, job_type, json.dumps(job_config or {}, default=str), available_at))
+        return rows[0]['job_id']
+
+    def enqueue_many(self, jobs: Iterable[Dict[str, Any]], page_size: int = 1000, conn=None) -> int:
+        """Add pending jobs given as dicts with saas_edge_id, job_type and optional
+        job_config, saas_flow_id, available_at. With conn, the jobs are inserted
+        in the caller's open transaction and commit with it."""
+        values = [(job['saas_edge_id'], job.get('saas_flow_id'), job['job_type'],
+                   json.dumps(job.get('job_config') or {}, default=str), job.get('available_at'))
+                  for job in jobs]
+        if not values:
+            return 0
+
+        def insert(cursor):
+            execute_values(cursor, f"""
+                INSERT INTO {self.table} (saas_edge_id, saas_flow_id, job_type, job_config, available_at)
+                VALUES %s;
+            """, values, template="(%s, %s, %s, %s::jsonb, %s)", page_size=page_size)
+
+        if conn is not None:
+            with conn.cursor() as cursor:
+                insert(cursor)
+        else:
+            own = self._connection()
+            with own, own.cursor() as cursor:
+                insert(cursor)
+        return len(values)
+
+    # -----------------------------------------
+    # Worker side
+    # -----------------------------------------
+
+    def claim(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Lease up to limit pending jobs to this worker"""
+        started = time.monotonic()
+        jobs = self._execute(f"""
+            WITH claimable AS (
+              SELECT job_id, started_at
+              FROM {self.table}
+              WHERE job_status = 'pending'
+                AND (available_at IS NULL OR available_at <= now())
+                AND (%(job_types)s::text[] IS NULL OR job_type = ANY(%(job_types)s::text[]))
+              ORDER BY started_at
+              LIMIT %(limit)s
+              {self.lock_clause}
+            )
+            UPDATE {self.table} j
+            SET job_status = 'running',
+                attempts = j.attempts + 1,
+                lease_owner = %(worker)s,
+                claimed_at = now(),
+                heartbeat_at = now(),
+                lease_expires_at = now() + make_interval(secs => %(lease)s),
+                error_message = NULL
+            FROM claimable c
+            WHERE j.job_id = c.job_id AND j.started_at = c.started_at
+              AND j.job_status = 'pending'
+            RETURNING {JOB_COLUMNS};
+        """, {'job_types': self.job_types, 'limit': limit or self.batch_size,
+              'worker': self.worker_id, 'lease': self.lease_seconds})
+        self.stats['claim_seconds'] += time.monotonic() - started
+        self.stats['claimed'] += len(jobs)
+        if not jobs:
+            self.stats['empty_polls'] += 1
+        return jobs
+
+    def heartbeat(self, conn=None) -> int:
+        """Extend the lease of every job this worker holds; returns how many"""
+        own_conn = conn is None
+        conn = conn or self.get_db_connection()
+        try:
+            with conn, conn.cursor() as cursor:
+                cursor.execute(f"""
+                    UPDATE {self.table}
+                    SET heartbeat_at = now(),
+                        lease_expires_at = now() + make_interval(secs => %s)
+                    WHERE job_status = 'running' AND lease_owner = %s;
+                """, (self.lease_seconds, self.worker_id))
+                return cursor.rowcount
+        finally:
+            if own_conn:
+                conn.close()
+
+    def complete(self, job: Dict[str, Any], result: Optional[Dict[str, Any]] = None,
+                 n8n_execution_id: Optional[str] = None) -> bool:
+        """Mark a job completed; False if this worker no longer owns its lease"""
+        rows = self._execute(f"""
+            UPDATE {self.table}
+            SET job_status = 'success',
+                job_result = %s::jsonb,
+                n8n_execution_id = COALESCE(%s, n8n_execution_id),
+                completed_at = now(),
+                lease_owner = NULL,
+                lease_expires_at = NULL
+            WHERE job_id = %s AND started_at = %s
+              AND job_status = 'running' AND lease_owner = %s
+            RETURNING job_id;
+        """, (json.dumps(result or {}, default=str), n8n_execution_id,
+              job['job_id'], job['started_at'], self.worker_id))
+        return self._settled(job, rows, 'completed')
+
+    def complete_many(self, completed: List[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]) -> int:
+        """Mark several (job, result) pairs completed in one statement; returns how many
+        were still leased to this worker"""
+        if not completed:
+            return 0
+        values = [(job['job_id'], job['started_at'], json.dumps(result or {}, default=str), self.worker_id)
+                  for job, result in completed]
+        conn = self._connection()
+        with conn, conn.cursor() as cursor:
+            rows = execute_values(cursor, f"""
+                UPDATE {self.table} j
+                SET job_status = 'success',
+                    job_result = v.job_result::jsonb,
+                    completed_at = now(),
+                    lease_owner = NULL,
+                    lease_expires_at = NULL
+                FROM (VALUES %s) AS v (job_id, started_at, job_result, lease_owner)
+                WHERE j.job_id = v.job_id::uuid AND j.started_at = v.started_at::timestamptz
+                  AND j.job_status = 'running' AND j.lease_owner = v.lease_owner
+                RETURNING j.job_id;
+            """, values, fetch=True)
+        self.stats['completed'] += len(rows)
+        lost = len(completed) - len(rows)
+        if lost:
+            self.stats['lost_leases'] += lost
+            logger.warning(f"{lost} jobs lost their lease before they were completed")
+        return len(rows)
+
+    def fail(self, job: Dict[str, Any], message: str, retry: bool = True) -> bool:
+        """Record a failure; the job is retried with backoff until max_attempts"""
+        rows = self._execute(f"""
+            UPDATE {self.table}
+            SET job_status = CASE WHEN %(retry)s AND attempts < %(max_attempts)s
+                                  THEN 'pending' ELSE 'error' END,
+                available_at = CASE WHEN %(retry)s AND attempts < %(max_attempts)s
+                                    THEN now() + make_interval(secs => %(base)s * 2 ^ (attempts - 1))
+                                    ELSE available_at END,
+                completed_at = CASE WHEN %(retry)s AND attempts < %(max_attempts)s
+                                    THEN NULL ELSE now() END,
+                error_message = %(message)s,
+                lease_owner = NULL,
+                lease_expires_at = NULL
+            WHERE job_id = %(job_id)s AND started_at = %(started_at)s
+              AND job_status = 'running' AND lease_owner = %(worker)s
+            RETURNING job_status;
+        """, {'retry': retry, 'max_attempts': self.max_attempts, 'base': self.retry_base_seconds,
+              'message': message[:2000], 'job_id': job['job_id'], 'started_at': job['started_at'],
+              'worker': self.worker_id})
+        if rows and rows[0]['job_status'] == 'pending':
+            self.stats['retried'] += 1
+            return True
+        return self._settled(job, rows, 'failed')
+
+    def _settled(self, job: Dict[str, Any], rows: List[Dict[str, Any]], stat: str) -> bool:
+        if not rows:
+            self.stats['lost_leases'] += 1
+            logger.warning(f"Job {job['job_id']} lease lost before it was {stat}")
+            return False
+        self.stats[stat] += 1
+        return True
+
+    def reclaim_expired(self, limit: int = 1000) -> int:
+        """Return jobs with expired leases to the queue (or fail them after max_attempts)"""
+        rows = self._execute(f"""
+            WITH expired AS (
+              SELECT job_id, started_at
+              FROM {self.table}
+              WHERE job_status = 'running' AND lease_expires_at < now()
+              LIMIT %(limit)s
+              FOR UPDATE SKIP LOCKED
+            )
+            UPDATE {self.table} j
+            SET job_status = CASE WHEN j.attempts < %(max_attempts)s THEN 'pending' ELSE 'error' END,
+                completed_at = CASE WHEN j.attempts < %(max_attempts)s THEN NULL ELSE now() END,
+                error_message = 'Lease held by ' || j.lease_owner || ' expired',
+                lease_owner = NULL,
+                lease_expires_at = NULL
+            FROM expired e
+            WHERE j.job_id = e.job_id AND j.started_at = e.started_at
+            RETURNING j.job_id;
+        """, {'limit': limit, 'max_attempts': self.max_attempts})
+        if rows:
+            logger.warning(f"Reclaimed {len(rows)} jobs with expired leases")
+        self.stats['reclaimed'] += len(rows)
+        return len(rows)
+
+    def _heartbeat_loop(self) -> None:
+        conn = None
+        while not self.stop_event.wait(self.heartbeat_interval):
+            try:
+                if conn is None or conn.closed:
+                    conn = self.get_db_connection()
+                self.heartbeat(conn)
+            except psycopg2.Error as e:
+                logger.warning(f"Heartbeat for {self.worker_id} failed: {e}")
+                if conn is not None:
+                    conn.close()
+                    conn = None
+        if conn is not None:
+            conn.close()
+
+    def run(self,
+            handler: Callable[[Dict[str, Any]], Optional[Dict[str, Any]]],
+            poll_interval: float = 1.0,
+            max_jobs: Optional[int] = None,
+            stop_when_idle: bool = False) -> Dict[str, Any]:
+        """Claim and handle jobs until stop() (or max_jobs / an empty queue)
+
+        The handler's return value is stored as job_result; an exception fails
+        the job with its message.
+        """
+        self.stop_event.clear()
+        heartbeat_thread = threading.Thread(target=self._heartbeat_loop,
+                                            name=f"edge-job-heartbeat-{self.worker_id}", daemon=True)
+        heartbeat_thread.start()
+        handled = 0
+        next_reclaim = time.monotonic()
+        try:
+            while not self.stop_event.is_set():
+                if time.monotonic() >= next_reclaim:
+                    self.reclaim_expired()
+                    next_reclaim = time.monotonic() + self.reclaim_interval
+
+                limit = self.batch_size if max_jobs is None else min(self.batch_size, max_jobs - handled)
+                jobs = self.claim(limit)
+                if not jobs:
+                    if stop_when_idle:
+                        break
+                    self.stop_event.wait(poll_interval)
+                    continue
+
+                # Successes of a claimed batch are settled together
+                completed = []
+                for job in jobs:
+                    try:
+                        completed.append((job, handler(job)))
+                    except Exception as e:
+                        logger.error(f"Job {job['job_id']} ({job['job_type']}) failed: {e}")
+                        self.fail(job, str(e))
+                    handled += 1
+                self.complete_many(completed)
+                if max_jobs is not None and handled >= max_jobs:
+                    break
+        finally:
+            self.stop_event.set()
+            heartbeat_thread.join()
+            self.close()
+        return {'worker_id': self.worker_id, **self.stats}
+
+    def stop(self) -> None:
+        self.stop_event.set()
+
+    def queue_stats(self) -> Dict[str, Any]:
+        """Pending and running job counts, queue age and expired leases"""
+        rows = self._execute(f"""
+            SELECT count(*) FILTER (WHERE job_status = 'pending') AS pending,
+                   count(*) FILTER (WHERE job_status = 'pending'
+                                      AND (available_at IS NULL OR available_at <= now())) AS claimable,
+                   count(*) FILTER (WHERE job_status = 'running') AS running,
+                   count(*) FILTER (WHERE job_status = 'running' AND lease_expires_at < now()) AS expired_leases,
+                   min(started_at) FILTER (WHERE job_status = 'pending') AS oldest_pending
+            FROM {self.table}
+            WHERE job_status IN ('pending', 'running');
+        """)
+        return {'status': 'success', **rows[0]}
+
+
+def create_db_config() -> Dict[str, Any]:
+    """SaaS database connection settings from the environment"""
+    return {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'port': int(os.getenv('DB_PORT', '5432')),
+        'database': os.getenv('DB_NAME', 'catalog-edge-db'),
+        'user': os.getenv('DB_USER', 'postgres'),
+        'password': os.getenv('DB_PASSWORD', '')
+    }
+
+
+def main():
+    """Main CLI entry point"""
+    load_dotenv()
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description="Inspect the saas_edge_jobs queue and reclaim expired leases")
+    parser.add_argument("--reclaim", action="store_true", help="Return jobs with expired leases to the queue")
+    parser.add_argument("--max-attempts", type=int, default=5, help="Fail reclaimed jobs after this many claims")
+
+    args = parser.parse_args()
+
+    try:
+        dispatcher = EdgeJobDispatcher(create_db_config(), worker_id='cli', max_attempts=args.max_attempts)
+        result = {}
+        if args.reclaim:
+            result['reclaimed'] = dispatcher.reclaim_expired()
+        result.update(dispatcher.queue_stats())
+        dispatcher.close()
+        print(json.dumps(result, indent=2, default=str))
+
+    except Exception as e:
+        logger.error(f"Edge job dispatcher command failed: {e}")
+        print(json.dumps({"status": "error", "message": str(e)}, indent=2))
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Throughput Benchmark for the Edge Job Dispatcher
+================================================
+
+Seeds a scratch copy of ``saas_edge_jobs`` with pending jobs (plus, optionally,
+a history of finished jobs) and drains it with 1, 8 and 32 concurrent
+``EdgeJobDispatcher`` workers, reporting jobs/sec, claim latency and whether
+any job was handed out twice. ``--compare-no-skip`` repeats each run with a
+plain ``FOR UPDATE`` claim to show the lock contention ``SKIP LOCKED`` avoids.
+
+The scratch table (``edge_jobs_benchmark`` by default) gets the columns,
+defaults and indexes of ``saas_edge_jobs`` when ``schemas/edge_job_dispatch.sql``
+has been applied there, or an equivalent definition otherwise. It is dropped
+afterwards unless ``--keep-table`` is given; ``--table`` must end in
+``_benchmark`` so a production table is never dropped by mistake.
+
+Usage:
+    python edge_job_dispatcher_benchmark.py
+    python edge_job_dispatcher_benchmark.py --workers 1,8,32 --jobs 20000 --work-ms 2
+    python edge_job_dispatcher_benchmark.py --history 200000 --compare-no-skip
+
+Requirements:
+    pip install psycopg2-binary python-dotenv
+"""
+
+import re
+import json
+import time
+import uuid
+import random
+import logging
+import argparse
+import threading
+from typing import Dict, List, Any
+import psycopg2
+from psycopg2.extras import execute_values
+from dotenv import load_dotenv
+from edge_job_dispatcher import EdgeJobDispatcher, create_db_config
+
+# Load environment variables
+load_dotenv()
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+DISPATCH_COLUMNS = ('available_at', 'attempts', 'lease_owner', 'claimed_at', 'lease_expires_at', 'heartbeat_at')
+
+# Used when saas_edge_jobs is missing or does not have the dispatch columns yet
+FALLBACK_TABLE_DDL = """
+CREATE TABLE {table} (
+  job_id            uuid NOT NULL DEFAULT gen_random_uuid(),
+  saas_edge_id      uuid NOT NULL,
+  saas_flow_id      uuid,
+  job_type          text NOT NULL,
+  job_status        text NOT NULL DEFAULT 'pending',
+  job_config        jsonb DEFAULT '{{}}',
+  job_result        jsonb DEFAULT '{{}}',
+  error_message     text,
+  n8n_execution_id  text,
+  started_at        timestamptz NOT NULL DEFAULT now(),
+  completed_at      timestamptz,
+  created_at        timestamptz NOT NULL DEFAULT now(),
+  updated_at        timestamptz NOT NULL DEFAULT now(),
+  available_at      timestamptz,
+  attempts          integer NOT NULL DEFAULT 0,
+  lease_owner       text,
+  claimed_at        timestamptz,
+  lease_expires_at  timestamptz,
+  heartbeat_at      timestamptz,
+  PRIMARY KEY (job_id, started_at)
+);
+CREATE INDEX ON {table} (job_status);
+CREATE INDEX ON {table} (started_at) WHERE job_status = 'pending';
+CREATE INDEX ON {table} (lease_expires_at) WHERE job_status = 'running';
+"""
+
+# The benchmark drops and recreates its table, so it only accepts scratch names
+SCRATCH_TABLE_PATTERN = re.compile(r'^[a-z_][a-z0-9_]*_benchmark$')
+
+
+def check_scratch_table(table: str) -> None:
+    if not SCRATCH_TABLE_PATTERN.match(table):
+        raise ValueError(f"Refusing to use table '{table}': scratch table names must end in '_benchmark'")
+
+
+class BlockingDispatcher(EdgeJobDispatcher):
+    """Naive claim that waits on row locks instead of skipping them"""
+    lock_clause = 'FOR UPDATE'
+
+
+def create_benchmark_table(db_config: Dict[str, Any], table: str) -> None:
+    check_scratch_table(table)
+    conn = psycopg2.connect(**db_config)
+    try:
+        with conn, conn.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {table};")
+            cursor.execute("""
+                SELECT count(*) FROM information_schema.columns
+                WHERE table_name = 'saas_edge_jobs' AND column_name = ANY(%s);
+            """, (list(DISPATCH_COLUMNS),))
+            if cursor.fetchone()[0] == len(DISPATCH_COLUMNS):
+                cursor.execute(f"CREATE TABLE {table} "
+                               f"(LIKE saas_edge_jobs INCLUDING DEFAULTS INCLUDING INDEXES);")
+            else:
+                cursor.execute(FALLBACK_TABLE_DDL.format(table=table))
+    finally:
+        conn.close()
+
+
+def drop_benchmark_table(db_config: Dict[str, Any], table: str) -> None:
+    check_scratch_table(table)
+    conn = psycopg2.connect(**db_config)
+    try:
+        with conn, conn.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {table};")
+    finally:
+        conn.close()
+
+
+def seed_jobs(db_config: Dict[str, Any], table: str, jobs: int, history: int, tenants: int) -> None:
+    """Replace the table contents with pending jobs and finished history"""
+    rng = random.Random(7)
+    edges = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(tenants)]
+    job_types = ['catalog_sync', 'order_sync', 'inventory_sync', 'credential_test']
+    conn = psycopg2.connect(**db_config)
+    try:
+        with conn, conn.cursor() as cursor:
+            cursor.execute(f"TRUNCATE {table};")
+            if history:
+                execute_values(cursor, f"""
+                    INSERT INTO {table} (saas_edge_id, job_type, job_status, attempts, started_at, completed_at)
+                    VALUES %s;
+                """, [(rng.choice(edges), rng.choice(job_types), 'success', 1) for _ in range(history)],
+                    template="(%s, %s, %s, %s, now() - interval '1 day', now() - interval '1 day')",
+                    page_size=5000)
+            execute_values(cursor, f"""
+                INSERT INTO {table} (saas_edge_id, job_type, job_config) VALUES %s;
+            """, [(rng.choice(edges), rng.choice(job_types), json.dumps({'n': i})) for i in range(jobs)],
+                page_size=5000)
+            cursor.execute(f"ANALYZE {table};")
+    finally:
+        conn.close()
+
+
+def verify(db_config: Dict[str, Any], table: str) -> Dict[str, Any]:
+    conn = psycopg2.connect(**db_config)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"""
+                SELECT count(*) FILTER (WHERE job_status = 'success' AND claimed_at IS NOT NULL),
+                       count(*) FILTER (WHERE job_status IN ('pending', 'running')),
+                       COALESCE(max(attempts), 0)
+                FROM {table};
+            """)
+            completed, left, max_attempts = cursor.fetchone()
+            return {'completed': completed, 'left_in_queue': left, 'max_attempts': max_attempts}
+    finally:
+        conn.close()
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def run_workers(db_config: Dict[str, Any], table: str, workers: int, args,
+                dispatcher_class=EdgeJobDispatcher) -> Dict[str, Any]:
+    seed_jobs(db_config, table, args.jobs, args.history, args.tenants)
+    work_seconds = args.work_ms / 1000
+    claim_latencies: List[float] = []
+    results: List[Dict[str, Any]] = []
+    lock = threading.Lock()
+
+    def handler(job: Dict[str, Any]) -> Dict[str, Any]:
+        if work_seconds:
+            time.sleep(work_seconds)
+        return {'n': job['job_config'].get('n')}
+
+    def work(index: int):
+        dispatcher = dispatcher_class(db_config, worker_id=f"bench-{workers}-{index}", table=table,
+                                      batch_size=args.batch_size)
+        original_claim = dispatcher.claim
+
+        def timed_claim(limit=None):
+            started = time.monotonic()
+            jobs = original_claim(limit)
+            with lock:
+                claim_latencies.append(time.monotonic() - started)
+            return jobs
+
+        dispatcher.claim = timed_claim
+        stats = dispatcher.run(handler, stop_when_idle=True)
+        with lock:
+            results.append(stats)
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(workers)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    check = verify(db_config, table)
+    completed = sum(r['completed'] for r in results)
+    return {
+        'workers': workers,
+        'claim': 'SKIP LOCKED' if dispatcher_class is EdgeJobDispatcher else 'FOR UPDATE',
+        'jobs': args.jobs,
+        'completed': completed,
+        'seconds': round(elapsed, 2),
+        'jobs_per_sec': round(completed / elapsed, 1) if elapsed else 0,
+        'claims': len(claim_latencies),
+        'claim_ms_p50': round(percentile(claim_latencies, 0.5) * 1000, 2),
+        'claim_ms_p99': round(percentile(claim_latencies, 0.99) * 1000, 2),
+        'lost_leases': sum(r['lost_leases'] for r in results),
+        # Every job claimed exactly once and nothing left behind
+        'exactly_once': (check['completed'] == args.jobs and check['left_in_queue'] == 0
+                         and check['max_attempts'] == 1)
+    }
+
+
+def main():
+    """Main CLI entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark parallel saas_edge_jobs dispatch")
+    parser.add_argument("--workers", default="1,8,32", help="Comma-separated worker counts")
+    parser.add_argument("--jobs", type=int, default=20000, help="Pending jobs per run")
+    parser.add_argument("--history", type=int, default=0, help="Finished jobs already in the table")
+    parser.add_argument("--batch-size", type=int, default=10, help="Jobs per claim")
+    parser.add_argument("--work-ms", type=float, default=0, help="Simulated handler time per job")
+    parser.add_argument("--tenants", type=int, default=50, help="Distinct saas_edge_ids")
+    parser.add_argument("--table", default="edge_jobs_benchmark", help="Scratch table name")
+    parser.add_argument("--keep-table", action="store_true", help="Do not drop the scratch table")
+    parser.add_argument("--compare-no-skip", action="store_true",
+                        help="Also run each worker count with a blocking FOR UPDATE claim")
+
+    args = parser.parse_args()
+    db_config = create_db_config()
+    worker_counts = [int(value) for value in args.workers.split(',') if value.strip()]
+
+    try:
+        check_scratch_table(args.table)
+    except ValueError as e:
+        print(json.dumps({"status": "error", "message": str(e)}, indent=2))
+        exit(1)
+
+    try:
+        create_benchmark_table(db_config, args.table)
+        runs = []
+        for workers in worker_counts:
+            runs.append(run_workers(db_config, args.table, workers, args))
+            logger.info(f"{workers} workers (SKIP LOCKED): {runs[-1]['jobs_per_sec']} jobs/sec")
+            if args.compare_no_skip:
+                runs.append(run_workers(db_config, args.table, workers, args, BlockingDispatcher))
+                logger.info(f"{workers} workers (FOR UPDATE): {runs[-1]['jobs_per_sec']} jobs/sec")
+        print(json.dumps({'config': vars(args), 'runs': runs}, indent=2))
+
+    except Exception as e:
+        logger.error(f"Benchmark failed: {e}")
+        print(json.dumps({"status": "error", "message": str(e)}, indent=2))
+        exit(1)
+
+    finally:
+        if not args.keep_table:
+            try:
+                drop_benchmark_table(db_config, args.table)
+            except psycopg2.Error as e:
+                logger.warning(f"Could not drop {args.table}: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Export Job Tracking for the N8N Log Exporter
+============================================
+
+Persists asynchronous export jobs in ``n8n_export_jobs``
+(``schemas/n8n_export_jobs.sql``) so that the Cloud Function can acknowledge a
+trigger immediately and run the export in the background.
+
+Every job has a dedupe key built from the target date and filters. A partial
+unique index allows only one queued/running job per key, so duplicate triggers
+(e.g. Cloud Scheduler retrying after a timeout) collapse into the job that is
+already in flight instead of exporting the same date twice in parallel. A
+running job refreshes ``heartbeat_at``; jobs whose heartbeat is older than
+``stale_after_seconds`` are treated as crashed and may be replaced.
+"""
+
+import json
+import logging
+from typing import Dict, Optional, Any, Tuple
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_JOB_STATUSES = ('queued', 'running')
+
+# Insert/collapse rounds before submit() falls back to the latest job for a key
+SUBMIT_ATTEMPTS = 3
+
+JOB_COLUMNS = """
+  job_id::text AS job_id, dedupe_key, target_date::text AS target_date, filters, status,
+  progress, result, error_message, requested_by, duplicate_requests,
+  created_at, started_at, heartbeat_at, completed_at
+"""
+
+
+def dedupe_key(target_date: str,
+               saas_edge_id: Optional[str] = None,
+               job_type: Optional[str] = None,
+               channel: Optional[str] = None) -> str:
+    """Key shared by every trigger for the same date and filters"""
+    return f"{target_date}|edge={saas_edge_id or '*'}|job={job_type or '*'}|channel={channel or '*'}"
+
+
+def serialize_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON-safe representation of a job row"""
+    return {key: value.isoformat() if hasattr(value, 'isoformat') else value
+            for key, value in job.items()}
+
+
+class ExportJobStore:
+    """Reads and writes export job records on the primary database"""
+
+    def __init__(self, db_config: Dict[str, Any], stale_after_seconds: int = 900):
+        self.db_config = db_config
+        self.stale_after_seconds = stale_after_seconds
+
+    def get_db_connection(self):
+        return psycopg2.connect(**self.db_config)
+
+    def submit(self,
+               target_date: str,
+               saas_edge_id: Optional[str] = None,
+               job_type: Optional[str] = None,
+               channel: Optional[str] = None,
+               requested_by: Optional[str] = None,
+               force: bool = False) -> Tuple[Dict[str, Any], bool]:
+        """Create a job, or return the existing one for the same key
+
+        Returns (job, created). An active job for the key is always reused. A
+        previous successful job is reused unless force is set, so a retried
+        trigger after a completed export does not export again.
+        """
+        key = dedupe_key(target_date, saas_edge_id, job_type, channel)
+        filters = {'saas_edge_id': saas_edge_id, 'job_type': job_type, 'channel': channel}
+
+        conn = self.get_db_connection()
+        try:
+            with conn, conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                # Release keys held by jobs whose runner stopped heartbeating
+                cursor.execute("""
+                    UPDATE n8n_export_jobs
+                    SET status = 'error',
+                        error_message = 'Job heartbeat expired',
+                        completed_at = now()
+                    WHERE dedupe_key = %s
+                      AND status IN ('queued', 'running')
+                      AND COALESCE(heartbeat_at, created_at) < now() - make_interval(secs => %s);
+                """, (key, self.stale_after_seconds))
+
+                # The active job can finish between the insert and the update
+                # below; retry so the trigger lands on its successor instead
+                for _ in range(SUBMIT_ATTEMPTS):
+                    if not force:
+                        cursor.execute(f"""
+                            SELECT {JOB_COLUMNS} FROM n8n_export_jobs
+                            WHERE dedupe_key = %s AND status = 'success'
+                            ORDER BY created_at DESC LIMIT 1;
+                        """, (key,))
+                        done = cursor.fetchone()
+                        if done:
+                            return dict(done), False
+
+                    cursor.execute(f"""
+                        INSERT INTO n8n_export_jobs (dedupe_key, target_date, filters, requested_by)
+                        VALUES (%s, %s, %s, %s)
+                        ON CONFLICT (dedupe_key) WHERE status IN ('queued', 'running') DO NOTHING
+                        RETURNING {JOB_COLUMNS};
+                    """, (key, target_date, json.dumps(filters), requested_by))
+                    created = cursor.fetchone()
+                    if created:
+                        logger.info(f"Created export job {created['job_id']} for {key}")
+                        return dict(created), True
+
+                    cursor.execute(f"""
+                        UPDATE n8n_export_jobs
+                        SET duplicate_requests = duplicate_requests + 1
+                        WHERE dedupe_key = %s AND status IN ('queued', 'running')
+                        RETURNING {JOB_COLUMNS};
+                    """, (key,))
+                    active = cursor.fetchone()
+                    if active:
+                        logger.info(f"Duplicate trigger for {key} collapsed into job {active['job_id']}")
+                        return dict(active), False
+
+                # Jobs keep finishing under us; report the latest one for the key
+                cursor.execute(f"""
+                    SELECT {JOB_COLUMNS} FROM n8n_export_jobs
+                    WHERE dedupe_key = %s
+                    ORDER BY created_at DESC LIMIT 1;
+                """, (key,))
+                return dict(cursor.fetchone()), False
+        finally:
+            conn.close()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        conn = self.get_db_connection()
+        try:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                cursor.execute(f"SELECT {JOB_COLUMNS} FROM n8n_export_jobs WHERE job_id = %s;", (job_id,))
+                row = cursor.fetchone()
+                return dict(row) if row else None
+        finally:
+            conn.close()
+
+    def _update(self, job_id: str, assignments: str, params: tuple) -> None:
+        conn = self.get_db_connection()
+        try:
+            with conn, conn.cursor() as cursor:
+                cursor.execute(f"UPDATE n8n_export_jobs SET {assignments} WHERE job_id = %s;",
+                               params + (job_id,))
+        finally:
+            conn.close()
+
+    def start(self, job_id: str) -> None:
+        self._update(job_id, "status = 'running', started_at = now(), heartbeat_at = now()", ())
+
+    def heartbeat(self, job_id: str) -> None:
+        self._update(job_id, "heartbeat_at = now()", ())
+
+    def update_progress(self, job_id: str, progress: Dict[str, Any]) -> None:
+        """Merge progress fields and refresh the heartbeat"""
+        self._update(job_id, "progress = progress || %s::jsonb, heartbeat_at = now()",
+                     (json.dumps(progress, default=str),))
+
+    def complete(self, job_id: str, result: Dict[str, Any]) -> None:
+        self._update(job_id, "status = 'success', result = %s::jsonb, completed_at = now(), heartbeat_at = now()",
+                     (json.dumps(result, default=str),))
+
+    def fail(self, job_id: str, message: str) -> None:
+        self._update(job_id, "status = 'error', error_message = %s, completed_at = now(), heartbeat_at = now()",
+                     (message,))
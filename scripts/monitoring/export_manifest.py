@@ -0,0 +1,279 @@
+"""
+Export Manifests for N8N Log Exports
+====================================
+
+Every ``export_logs`` run writes one small manifest object per date (and per
+shard, when the export was filtered) that indexes every object it uploaded:
+
+    <prefix>/_manifests/<date>/manifest.json                 # unfiltered export
+    <prefix>/_manifests/<date>/manifest__<shard_id>.json     # filtered export
+
+Each entry lists the object path, type, group, row count, byte size, MD5
+checksum (base64, comparable to the GCS ``md5Hash`` metadata) and the min/max
+execution time it covers. Downstream loaders read the manifests for a date
+instead of recursively listing ``<prefix>/<edge>/<job_type>/<channel>/<date>/``
+across thousands of tenants.
+
+Compacted months (see ``n8n_export_compactor.py``) add a newer
+``manifest__compacted.json`` per date whose entries point at one gzip member of
+the monthly NDJSON object (``member_offset``/``member_length``) instead of the
+deleted daily object; ``resolve_objects`` and ``read_object_bytes`` handle both.
+"""
+
+import re
+import gzip
+import json
+import base64
+import hashlib
+from datetime import datetime
+from typing import Dict, List, Optional, Any, Iterable
+
+MANIFEST_SCHEMA_VERSION = 1
+
+# Version of the executions/summary object layout described by the manifest
+EXPORT_SCHEMA_VERSION = '1.0.0'
+
+# Daily object file name prefix and the key holding its rows, per object type
+OBJECT_FILES = {
+    'executions': ('executions_', 'executions'),
+    'summary': ('summary_', 'summary_stats')
+}
+
+# Compression marker for entries that point into a compacted monthly object
+COMPACTED_COMPRESSION = 'gzip-ndjson'
+
+
+def serialize_export(data: Dict[str, Any]) -> bytes:
+    """Serialize an export object exactly as it is uploaded"""
+    return json.dumps(data, indent=2, default=str).encode('utf-8')
+
+
+def md5_base64(payload: bytes) -> str:
+    """MD5 digest in the base64 form GCS reports as md5Hash"""
+    return base64.b64encode(hashlib.md5(payload).digest()).decode('ascii')
+
+
+def shard_id(saas_edge_id: Optional[str] = None,
+             job_type: Optional[str] = None,
+             channel: Optional[str] = None) -> Optional[str]:
+    """Stable identifier for a filtered export, or None for a full export"""
+    parts = []
+    for name, value in (('edge', saas_edge_id), ('job', job_type), ('channel', channel)):
+        if value:
+            parts.append(f"{name}-{re.sub(r'[^A-Za-z0-9_.-]', '_', value)}")
+    return '__'.join(parts) or None
+
+
+def manifest_prefix(gcs_prefix: str, target_date: str) -> str:
+    return f"{gcs_prefix}/_manifests/{target_date}/"
+
+
+def manifest_path(gcs_prefix: str, target_date: str, shard: Optional[str] = None) -> str:
+    """Object path of the manifest for a date and optional shard"""
+    filename = f"manifest__{shard}.json" if shard else "manifest.json"
+    return f"{manifest_prefix(gcs_prefix, target_date)}{filename}"
+
+
+def time_range(values: Iterable[Optional[str]]) -> Dict[str, Optional[str]]:
+    """Min/max of ISO timestamps, ignoring missing values"""
+    present = [value for value in values if value]
+    return {
+        'min_execution_time': min(present) if present else None,
+        'max_execution_time': max(present) if present else None
+    }
+
+
+class ExportManifestBuilder:
+    """Collects uploaded objects during an export and renders the manifest"""
+
+    def __init__(self,
+                 target_date: str,
+                 exporter_version: str,
+                 saas_edge_id: Optional[str] = None,
+                 job_type: Optional[str] = None,
+                 channel: Optional[str] = None,
+                 shard: Optional[str] = None):
+        self.target_date = target_date
+        self.exporter_version = exporter_version
+        self.filters = {'saas_edge_id': saas_edge_id, 'job_type': job_type, 'channel': channel}
+        self.shard = shard or shard_id(saas_edge_id, job_type, channel)
+        self.objects: List[Dict[str, Any]] = []
+        self.failed_objects: List[str] = []
+
+    def add_object(self,
+                   path: str,
+                   object_type: str,
+                   payload: bytes,
+                   saas_edge_id: str,
+                   job_type: str,
+                   channel: str,
+                   row_count: int,
+                   min_execution_time: Optional[str] = None,
+                   max_execution_time: Optional[str] = None,
+                   **extra: Any) -> None:
+        """Record an uploaded object; extra keys (e.g. member offsets) are kept as-is"""
+        self.objects.append({
+            'path': path,
+            'type': object_type,
+            'saas_edge_id': saas_edge_id,
+            'job_type': job_type,
+            'channel': channel,
+            'row_count': row_count,
+            'byte_size': len(payload),
+            'md5_hash': md5_base64(payload),
+            'min_execution_time': min_execution_time,
+            'max_execution_time': max_execution_time,
+            'schema_version': EXPORT_SCHEMA_VERSION,
+            **extra
+        })
+
+    def add_entry(self, entry: Dict[str, Any]) -> None:
+        """Record an object that was described elsewhere (e.g. a compacted member)"""
+        self.objects.append({'schema_version': EXPORT_SCHEMA_VERSION, **entry})
+
+    def add_failure(self, path: str) -> None:
+        self.failed_objects.append(path)
+
+    def build(self) -> Dict[str, Any]:
+        executions = [obj for obj in self.objects if obj['type'] == 'executions']
+        return {
+            'manifest_version': MANIFEST_SCHEMA_VERSION,
+            'schema_version': EXPORT_SCHEMA_VERSION,
+            'exporter_version': self.exporter_version,
+            'export_date': datetime.now().isoformat(),
+            'target_date': self.target_date,
+            'shard': self.shard,
+            'filters': self.filters,
+            'complete': not self.failed_objects,
+            'failed_objects': self.failed_objects,
+            'total_objects': len(self.objects),
+            'total_executions': sum(obj['row_count'] for obj in executions),
+            'total_bytes': sum(obj['byte_size'] for obj in self.objects),
+            **time_range([obj['min_execution_time'] for obj in executions] +
+                         [obj['max_execution_time'] for obj in executions]),
+            'objects': self.objects
+        }
+
+
+def load_manifests(storage, gcs_prefix: str, target_date: str) -> List[Dict[str, Any]]:
+    """Read every manifest (all shards) written for a date, oldest first"""
+    manifests = []
+    for path in storage.list(manifest_prefix(gcs_prefix, target_date)):
+        if not path.endswith('.json'):
+            continue
+        data = storage.read_bytes(path)
+        if data is not None:
+            manifests.append(json.loads(data))
+    return sorted(manifests, key=lambda manifest: manifest.get('export_date', ''))
+
+
+def latest_objects(manifests: List[Dict[str, Any]], object_type: str) -> Dict[tuple, List[Dict[str, Any]]]:
+    """Index the newest manifest entries per (saas_edge_id, job_type, channel)
+
+    Filtered re-exports overwrite the same object paths as the full export, so
+    the most recent manifest listing a group describes what is in storage. A
+    group uploaded in parts has one entry per part in that manifest.
+    """
+    index = {}
+    for manifest in manifests:
+        entries: Dict[tuple, List[Dict[str, Any]]] = {}
+        for obj in manifest.get('objects', []):
+            if obj.get('type') == object_type:
+                entries.setdefault((obj['saas_edge_id'], obj['job_type'], obj['channel']), []).append(obj)
+        index.update(entries)
+    return index
+
+
+def parse_export_path(path: str, gcs_prefix: str = 'n8n') -> Optional[Dict[str, str]]:
+    """Split a daily exported object path back into its partition values"""
+    parts = path.split('/')
+    if len(parts) != 6 or parts[0] != gcs_prefix:
+        return None
+    return {
+        'saas_edge_id': parts[1],
+        'job_type': parts[2],
+        'channel': parts[3],
+        'date': parts[4],
+        'filename': parts[5]
+    }
+
+
+def _matches(obj: Dict[str, Any], saas_edge_ids: Optional[List[str]],
+             job_types: Optional[List[str]], channels: Optional[List[str]]) -> bool:
+    return ((not saas_edge_ids or obj['saas_edge_id'] in saas_edge_ids) and
+            (not job_types or obj['job_type'] in job_types) and
+            (not channels or obj['channel'] in channels))
+
+
+def resolve_objects(storage,
+                    gcs_prefix: str,
+                    dates: Iterable[str],
+                    object_type: str,
+                    saas_edge_ids: Optional[List[str]] = None,
+                    job_types: Optional[List[str]] = None,
+                    channels: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Find the stored objects of a type for some dates, pruned by group
+
+    Dates with manifests use the newest entries per group (which point into the
+    monthly object once a month is compacted). Dates without manifests fall back
+    to direct paths when every filter is given, otherwise to a prefix listing
+    pruned on the parsed path segments.
+    """
+    file_prefix = OBJECT_FILES[object_type][0]
+    resolved = []
+    unindexed_dates = set()
+
+    for date in dates:
+        manifests = load_manifests(storage, gcs_prefix, date)
+        if not manifests:
+            unindexed_dates.add(date)
+            continue
+        for group, objects in sorted(latest_objects(manifests, object_type).items()):
+            resolved.extend({**obj, 'date': date} for obj in objects
+                            if _matches(obj, saas_edge_ids, job_types, channels))
+
+    if not unindexed_dates:
+        return resolved
+
+    if saas_edge_ids and job_types and channels:
+        for date in sorted(unindexed_dates):
+            filename = f"{file_prefix}{date.replace('-', '')}.json"
+            for edge_id in saas_edge_ids:
+                for j_type in job_types:
+                    for chan in channels:
+                        resolved.append({
+                            'path': f"{gcs_prefix}/{edge_id}/{j_type}/{chan}/{date}/{filename}",
+                            'type': object_type, 'saas_edge_id': edge_id,
+                            'job_type': j_type, 'channel': chan, 'date': date
+                        })
+        return resolved
+
+    prefixes = [f"{gcs_prefix}/{edge_id}/" for edge_id in saas_edge_ids] if saas_edge_ids else [f"{gcs_prefix}/"]
+    for prefix in prefixes:
+        for path in storage.list(prefix):
+            partition = parse_export_path(path, gcs_prefix)
+            if (partition and partition['date'] in unindexed_dates and
+                    partition['filename'].startswith(file_prefix) and
+                    _matches(partition, saas_edge_ids, job_types, channels)):
+                resolved.append({'path': path, 'type': object_type, **partition})
+    return resolved
+
+
+def member_bytes(obj: Dict[str, Any], data: bytes) -> bytes:
+    """The part of a stored object a manifest entry describes"""
+    if 'member_offset' not in obj:
+        return data
+    return data[obj['member_offset']:obj['member_offset'] + obj['member_length']]
+
+
+def read_object_bytes(storage, obj: Dict[str, Any]) -> Optional[bytes]:
+    """Read the bytes a manifest entry's checksum covers, or None if missing"""
+    data = storage.read_bytes(obj['path'])
+    return member_bytes(obj, data) if data is not None else None
+
+
+def decode_rows(obj: Dict[str, Any], payload: bytes) -> List[Dict[str, Any]]:
+    """Rows of a daily JSON object or of one compacted gzip NDJSON member"""
+    if obj.get('compression') == COMPACTED_COMPRESSION:
+        return [json.loads(line) for line in gzip.decompress(payload).splitlines() if line]
+    return json.loads(payload).get(OBJECT_FILES[obj['type']][1], [])
@@ -0,0 +1,132 @@
+"""
+Sampling Policy for N8N Log Exports
+===================================
+
+Lets the exporters write only a sample of the executions of very large tenants
+or job types, while summary statistics, duration percentiles and logical job
+counts are still computed over every execution.
+
+Sampling is deterministic: an execution is kept when a hash of its retry chain
+root (``root_execution_id``, which is the execution id for first attempts) falls
+below the group's rate, so re-running an export keeps the same executions and a
+retry chain is kept or dropped as a whole. Executions with a status in
+``keep_statuses`` or a duration of at least ``keep_slower_than_ms`` are always
+kept.
+
+The policy is JSON, from ``EXPORT_SAMPLING_POLICY`` (inline) or
+``EXPORT_SAMPLING_POLICY_FILE`` (path)::
+
+    {
+      "default_rate": 1.0,
+      "tenants": {"3f6c...": 0.05},
+      "job_types": {"webhook": 0.25},
+      "keep_statuses": ["error", "crashed"],
+      "keep_slower_than_ms": 30000,
+      "seed": "n8n-export"
+    }
+
+A tenant rate takes precedence over a job type rate, which takes precedence
+over ``default_rate``. Rates of 1.0 (the default) disable sampling.
+"""
+
+import os
+import json
+import hashlib
+from typing import Dict, List, Optional, Any, Tuple
+
+DEFAULT_KEEP_STATUSES = ('error', 'crashed')
+
+
+class SamplingPolicy:
+    """Per-tenant / per-job-type deterministic sampling of exported executions"""
+
+    def __init__(self,
+                 default_rate: float = 1.0,
+                 tenants: Optional[Dict[str, float]] = None,
+                 job_types: Optional[Dict[str, float]] = None,
+                 keep_statuses: Optional[List[str]] = None,
+                 keep_slower_than_ms: Optional[float] = None,
+                 seed: str = 'n8n-export'):
+        self.default_rate = default_rate
+        self.tenants = tenants or {}
+        self.job_types = job_types or {}
+        self.keep_statuses = set(keep_statuses if keep_statuses is not None else DEFAULT_KEEP_STATUSES)
+        self.keep_slower_than_ms = keep_slower_than_ms
+        self.seed = seed
+
+        for rate in [default_rate, *self.tenants.values(), *self.job_types.values()]:
+            if not 0 <= rate <= 1:
+                raise ValueError(f"Sampling rates must be between 0 and 1, got {rate}")
+
+    @classmethod
+    def from_dict(cls, config: Dict[str, Any]) -> 'SamplingPolicy':
+        return cls(
+            default_rate=float(config.get('default_rate', 1.0)),
+            tenants={key: float(value) for key, value in config.get('tenants', {}).items()},
+            job_types={key: float(value) for key, value in config.get('job_types', {}).items()},
+            keep_statuses=config.get('keep_statuses'),
+            keep_slower_than_ms=config.get('keep_slower_than_ms'),
+            seed=config.get('seed', 'n8n-export')
+        )
+
+    @classmethod
+    def from_env(cls) -> Optional['SamplingPolicy']:
+        """Policy from the environment, or None when sampling is not configured"""
+        inline = os.environ.get('EXPORT_SAMPLING_POLICY')
+        path = os.environ.get('EXPORT_SAMPLING_POLICY_FILE')
+        if inline:
+            return cls.from_dict(json.loads(inline))
+        if path:
+            with open(path) as f:
+                return cls.from_dict(json.load(f))
+        return None
+
+    def rate_for(self, saas_edge_id: str, job_type: str) -> float:
+        if saas_edge_id in self.tenants:
+            return self.tenants[saas_edge_id]
+        if job_type in self.job_types:
+            return self.job_types[job_type]
+        return self.default_rate
+
+    def _hash_fraction(self, value: Any) -> float:
+        digest = hashlib.blake2b(f"{self.seed}:{value}".encode('utf-8'), digest_size=8).digest()
+        return int.from_bytes(digest, 'big') / 2 ** 64
+
+    def _always_keep(self, execution: Dict[str, Any]) -> bool:
+        if execution.get('status') in self.keep_statuses:
+            return True
+        duration = execution.get('duration_ms')
+        return (self.keep_slower_than_ms is not None and duration is not None and
+                float(duration) >= self.keep_slower_than_ms)
+
+    def apply(self, group_key: tuple, executions: List[Dict[str, Any]]
+              ) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """Sample a group's executions
+
+        Returns the kept executions and the sampling metadata for
+        export_metadata, or (executions, None) when the group is not sampled.
+        """
+        saas_edge_id, job_type, _ = group_key
+        rate = self.rate_for(saas_edge_id, job_type)
+        if rate >= 1:
+            return executions, None
+
+        kept = []
+        always_kept = 0
+        for execution in executions:
+            if self._always_keep(execution):
+                always_kept += 1
+                kept.append(execution)
+            elif self._hash_fraction(execution.get('root_execution_id', execution['execution_id'])) < rate:
+                kept.append(execution)
+
+        return kept, {
+            'rate': rate,
+            'method': 'hash(root_execution_id)',
+            'seed': self.seed,
+            'keep_statuses': sorted(self.keep_statuses),
+            'keep_slower_than_ms': self.keep_slower_than_ms,
+            'population_executions': len(executions),
+            'sampled_executions': len(kept),
+            'always_kept_executions': always_kept
+        }
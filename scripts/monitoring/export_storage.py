@@ -0,0 +1,147 @@
+"""
+Pluggable Storage for Exported N8N Logs
+=======================================
+
+Small storage abstraction over the export layout
+``<prefix>/<saas_edge_id>/<job_type>/<channel>/<date>/<file>`` so the same code
+can read and write exported objects in Google Cloud Storage or in a local
+directory (e.g. a ``gsutil rsync`` mirror used for development and offline
+investigation).
+
+Configuration (environment variables):
+    EXPORT_STORAGE_BACKEND   'gcs' (default) or 'local'
+    GCS_BUCKET_NAME          Bucket used by the GCS backend (default saas_job_logs)
+    EXPORT_LOCAL_ROOT        Root directory used by the local backend
+"""
+
+import os
+import logging
+import threading
+from typing import Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ExportStorage:
+    """Base class for export storage backends"""
+
+    def write_bytes(self, path: str, data: bytes, content_type: str = 'application/json') -> None:
+        raise NotImplementedError
+
+    def read_bytes(self, path: str) -> Optional[bytes]:
+        """Return object contents, or None when the object does not exist"""
+        raise NotImplementedError
+
+    def list(self, prefix: str) -> Iterator[str]:
+        """Yield object paths below a prefix"""
+        raise NotImplementedError
+
+    def delete(self, path: str) -> None:
+        raise NotImplementedError
+
+    def uri(self, path: str) -> str:
+        raise NotImplementedError
+
+
+class GCSExportStorage(ExportStorage):
+    """Google Cloud Storage backend"""
+
+    def __init__(self, bucket_name: str):
+        from google.cloud import storage
+
+        self.bucket_name = bucket_name
+        self.client = storage.Client()
+        self.bucket = self.client.bucket(bucket_name)
+
+    def write_bytes(self, path: str, data: bytes, content_type: str = 'application/json') -> None:
+        self.bucket.blob(path).upload_from_string(data, content_type=content_type)
+
+    def read_bytes(self, path: str) -> Optional[bytes]:
+        from google.api_core.exceptions import NotFound
+
+        try:
+            return self.bucket.blob(path).download_as_bytes()
+        except NotFound:
+            return None
+
+    def list(self, prefix: str) -> Iterator[str]:
+        for blob in self.client.list_blobs(self.bucket_name, prefix=prefix):
+            yield blob.name
+
+    def delete(self, path: str) -> None:
+        self.bucket.blob(path).delete()
+
+    def uri(self, path: str) -> str:
+        return f"gs://{self.bucket_name}/{path}"
+
+
+class LocalExportStorage(ExportStorage):
+    """Local filesystem backend mirroring the GCS object layout"""
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+
+    def _full_path(self, path: str) -> str:
+        full_path = os.path.abspath(os.path.join(self.root, path))
+        if not full_path.startswith(self.root + os.sep):
+            raise ValueError(f"Path escapes storage root: {path}")
+        return full_path
+
+    def write_bytes(self, path: str, data: bytes, content_type: str = 'application/json') -> None:
+        full_path = self._full_path(path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        # Unique per writer, so concurrent writes of the same object cannot collide
+        tmp_path = f"{full_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, full_path)
+
+    def read_bytes(self, path: str) -> Optional[bytes]:
+        try:
+            with open(self._full_path(path), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def list(self, prefix: str) -> Iterator[str]:
+        # Walk from the deepest directory contained in the prefix, then filter
+        # on the full prefix so partial file names behave like GCS prefixes.
+        base_dir = os.path.dirname(prefix) if not prefix.endswith('/') else prefix.rstrip('/')
+        start = self._full_path(base_dir) if base_dir else self.root
+        if not os.path.isdir(start):
+            return
+        for dirpath, dirnames, filenames in os.walk(start):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                if filename.endswith('.tmp'):
+                    continue
+                rel_path = os.path.relpath(os.path.join(dirpath, filename), self.root)
+                rel_path = rel_path.replace(os.sep, '/')
+                if rel_path.startswith(prefix):
+                    yield rel_path
+
+    def delete(self, path: str) -> None:
+        try:
+            os.remove(self._full_path(path))
+        except FileNotFoundError:
+            pass
+
+    def uri(self, path: str) -> str:
+        return f"file://{self._full_path(path)}"
+
+
+def get_export_storage(backend: Optional[str] = None,
+                       bucket_name: Optional[str] = None,
+                       local_root: Optional[str] = None) -> ExportStorage:
+    """Create the configured storage backend"""
+    backend = (backend or os.environ.get('EXPORT_STORAGE_BACKEND', 'gcs')).lower()
+
+    if backend == 'gcs':
+        return GCSExportStorage(bucket_name or os.environ.get('GCS_BUCKET_NAME', 'saas_job_logs'))
+    if backend == 'local':
+        root = local_root or os.environ.get('EXPORT_LOCAL_ROOT')
+        if not root:
+            raise ValueError("EXPORT_LOCAL_ROOT is required for the local storage backend")
+        return LocalExportStorage(root)
+
+    raise ValueError(f"Unknown export storage backend: {backend}")
@@ -0,0 +1,201 @@
+"""
+Streaming Fetch and Upload Pipeline for N8N Log Exports
+=======================================================
+
+The exporters no longer load a whole day of executions with ``fetchall()``.
+Rows are read from a server-side cursor with ``fetchmany`` batches whose size
+adapts to the observed row width, and the rows of each
+(saas_edge_id, job_type, channel) group are handed to a bounded upload queue in
+size-bounded parts:
+
+- ``AdaptiveBatchSizer`` keeps a moving average of bytes per row and sizes the
+  next batch so one batch stays near ``memory_target_bytes``. Narrow rows get
+  large batches (few round trips); wide rows (big JSON metadata) get small ones.
+- ``iter_row_groups`` cuts a group into parts of about ``memory_target_bytes``,
+  so an oversized tenant is uploaded as several objects instead of being
+  collected in memory first. Most groups fit in one part.
+- ``UploadPipeline`` runs uploads on worker threads behind a queue of at most
+  ``max_queued`` parts. When uploads fall behind, ``submit`` blocks, which
+  stops the fetch loop from reading further rows (backpressure).
+
+Peak memory is therefore about ``max_queued + workers + 1`` parts (each also
+serialized once while it uploads), whatever the size of the day or of a group.
+
+Configuration (environment variables):
+    EXPORT_FETCH_MEMORY_TARGET_MB   Target size of one fetch batch and of one group part (default 32)
+    EXPORT_FETCH_MIN_BATCH          Smallest fetchmany batch (default 50)
+    EXPORT_FETCH_MAX_BATCH          Largest fetchmany batch (default 20000)
+    EXPORT_UPLOAD_QUEUE_SIZE        Parts waiting for upload before blocking (default 4)
+    EXPORT_UPLOAD_WORKERS           Parallel upload threads (default 2)
+"""
+
+import os
+import time
+import queue
+import logging
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Any, Iterator, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Approximate per-value overhead of a Python object in a row dict
+VALUE_OVERHEAD_BYTES = 64
+
+
+def estimate_row_bytes(row: tuple) -> int:
+    """Cheap estimate of the memory a fetched row will occupy once converted"""
+    return sum(VALUE_OVERHEAD_BYTES + (len(value) if isinstance(value, (str, bytes)) else len(str(value)))
+               for value in row if value is not None) + VALUE_OVERHEAD_BYTES * len(row)
+
+
+class AdaptiveBatchSizer:
+    """Sizes fetchmany batches from observed bytes per row"""
+
+    def __init__(self,
+                 memory_target_bytes: int = 32 * 1024 * 1024,
+                 min_batch: int = 50,
+                 max_batch: int = 20000,
+                 initial_batch: int = 500,
+                 smoothing: float = 0.3):
+        self.memory_target_bytes = memory_target_bytes
+        self.min_batch = min_batch
+        self.max_batch = max_batch
+        self.batch_size = max(min_batch, min(initial_batch, max_batch))
+        self.smoothing = smoothing
+        self.bytes_per_row: Optional[float] = None
+
+    @classmethod
+    def from_env(cls) -> 'AdaptiveBatchSizer':
+        return cls(
+            memory_target_bytes=int(float(os.environ.get('EXPORT_FETCH_MEMORY_TARGET_MB', 32)) * 1024 * 1024),
+            min_batch=int(os.environ.get('EXPORT_FETCH_MIN_BATCH', 50)),
+            max_batch=int(os.environ.get('EXPORT_FETCH_MAX_BATCH', 20000))
+        )
+
+    def observe(self, rows: List[tuple]) -> int:
+        """Update the estimate from a fetched batch and return the next batch size"""
+        if not rows:
+            return self.batch_size
+        # Sample large batches; row widths within a batch are similar enough
+        sample = rows if len(rows) <= 200 else rows[::len(rows) // 200]
+        observed = sum(estimate_row_bytes(row) for row in sample) / len(sample)
+        if self.bytes_per_row is None:
+            self.bytes_per_row = observed
+        else:
+            self.bytes_per_row += self.smoothing * (observed - self.bytes_per_row)
+
+        target = int(self.memory_target_bytes / max(self.bytes_per_row, 1))
+        self.batch_size = max(self.min_batch, min(target, self.max_batch))
+        return self.batch_size
+
+
+def iter_row_groups(cursor,
+                    sizer: AdaptiveBatchSizer,
+                    group_columns: Tuple[str, ...] = ('saas_edge_id', 'job_type', 'channel')
+                    ) -> Iterator[Tuple[tuple, List[Dict[str, Any]], int, bool]]:
+    """Yield (group key, rows, part number, last part) from an executed cursor
+    ordered by the group columns
+
+    A group is cut into parts of about ``sizer.memory_target_bytes``; parts are
+    numbered from 1 and the last one of a group has ``last`` set. Rows are
+    converted to dicts with datetimes as ISO strings, as the exporters did with
+    fetchall().
+    """
+    columns = None
+    key_indexes = None
+    current_key = None
+    current_rows: List[Dict[str, Any]] = []
+    current_part = 0
+    part_bytes = 0.0
+
+    while True:
+        batch = cursor.fetchmany(sizer.batch_size)
+        if not batch:
+            break
+        if columns is None:
+            # Named cursors only expose the description after the first fetch
+            columns = [desc[0] for desc in cursor.description]
+            key_indexes = [columns.index(col) for col in group_columns]
+        sizer.observe(batch)
+        row_bytes = sizer.bytes_per_row or 0.0
+
+        for row in batch:
+            key = tuple(row[i] for i in key_indexes)
+            if key != current_key:
+                if current_rows:
+                    yield current_key, current_rows, current_part, True
+                current_key, current_rows, current_part, part_bytes = key, [], 1, 0.0
+            elif part_bytes >= sizer.memory_target_bytes:
+                yield current_key, current_rows, current_part, False
+                current_rows, current_part, part_bytes = [], current_part + 1, 0.0
+
+            log_entry = dict(zip(columns, row))
+            for name, value in log_entry.items():
+                if isinstance(value, datetime):
+                    log_entry[name] = value.isoformat()
+            current_rows.append(log_entry)
+            part_bytes += row_bytes
+
+    if current_rows:
+        yield current_key, current_rows, current_part, True
+
+
+class UploadPipeline:
+    """Bounded queue of upload tasks processed by worker threads"""
+
+    def __init__(self, upload_fn: Callable[..., Any], max_queued: int = 4, workers: int = 2):
+        self.upload_fn = upload_fn
+        self.tasks: queue.Queue = queue.Queue(maxsize=max(max_queued, 1))
+        self.errors: List[BaseException] = []
+        self.blocked_seconds = 0.0
+        self.threads = [
+            threading.Thread(target=self._worker, name=f"export-upload-{i}", daemon=True)
+            for i in range(max(workers, 1))
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    @classmethod
+    def from_env(cls, upload_fn: Callable[..., Any]) -> 'UploadPipeline':
+        return cls(
+            upload_fn,
+            max_queued=int(os.environ.get('EXPORT_UPLOAD_QUEUE_SIZE', 4)),
+            workers=int(os.environ.get('EXPORT_UPLOAD_WORKERS', 2))
+        )
+
+    def _worker(self):
+        while True:
+            task = self.tasks.get()
+            try:
+                if task is None:
+                    return
+                self.upload_fn(*task)
+            except BaseException as e:
+                logger.error(f"Upload task failed: {e}")
+                self.errors.append(e)
+            finally:
+                self.tasks.task_done()
+
+    def submit(self, *args: Any) -> None:
+        """Queue an upload, blocking while the queue is full (backpressure)"""
+        if self.errors:
+            raise RuntimeError(f"Upload pipeline failed: {self.errors[0]}")
+        started = time.monotonic()
+        self.tasks.put(args)
+        waited = time.monotonic() - started
+        if waited > 0.01:
+            self.blocked_seconds += waited
+
+    def close(self, raise_errors: bool = True) -> None:
+        """Wait for queued uploads and stop the workers
+
+        With raise_errors=False failed uploads are only logged, so a caller
+        that is already handling an exception does not replace it.
+        """
+        for _ in self.threads:
+            self.tasks.put(None)
+        for thread in self.threads:
+            thread.join()
+        if self.errors and raise_errors:
+            raise RuntimeError(f"Upload pipeline failed: {self.errors[0]}")
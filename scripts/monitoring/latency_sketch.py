@@ -0,0 +1,203 @@
+"""
+Mergeable Latency Sketches for N8N Log Exports
+==============================================
+
+A small pure-Python DDSketch used by the exporters to compute duration
+percentiles (p50/p90/p95/p99) per (saas_edge_id, job_type, channel) group in a
+single pass over the exported executions.
+
+DDSketch maps every value to a logarithmic bucket, so any quantile it returns is
+within ``relative_accuracy`` (1% by default) of the true value. Sketches with the
+same accuracy merge exactly by adding bucket counts, which is what lets daily
+summaries be rolled up into weekly and monthly percentiles without rescanning
+raw executions:
+
+    daily = [LatencySketch.from_dict(s['duration_sketch']) for s in summary_stats]
+    monthly = LatencySketch.merge_all(daily)
+    monthly.quantile(0.99)
+
+Sketches are serialized as a bucket offset plus a dense list of counts, which
+keeps them small (typically a few hundred integers) and JSON friendly.
+"""
+
+import math
+from typing import Dict, List, Optional, Any, Iterable
+
+DEFAULT_RELATIVE_ACCURACY = 0.01
+
+# Oldest buckets are collapsed once a sketch holds more than this many
+DEFAULT_MAX_BINS = 2048
+
+# Smallest value tracked in a logarithmic bucket; anything below counts as zero
+MIN_INDEXABLE_VALUE = 1e-6
+
+PERCENTILES = {
+    'p50_duration_ms': 0.50,
+    'p90_duration_ms': 0.90,
+    'p95_duration_ms': 0.95,
+    'p99_duration_ms': 0.99
+}
+
+
+class LatencySketch:
+    """DDSketch over non-negative values (durations in milliseconds)"""
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY,
+                 max_bins: int = DEFAULT_MAX_BINS):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def _index(self, value: float) -> int:
+        return math.ceil(math.log(value) / self.log_gamma)
+
+    def _value(self, index: int) -> float:
+        # Midpoint of the bucket (gamma^(i-1), gamma^i] in relative terms
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+    def add(self, value: float, count: int = 1) -> None:
+        """Record a value (negative durations are treated as zero)"""
+        value = max(float(value), 0.0)
+        if value < MIN_INDEXABLE_VALUE:
+            self.zero_count += count
+        else:
+            index = self._index(value)
+            self.bins[index] = self.bins.get(index, 0) + count
+            if len(self.bins) > self.max_bins:
+                self._collapse()
+
+        self.count += count
+        self.sum += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def _collapse(self) -> None:
+        """Fold the lowest buckets together so the sketch stays bounded"""
+        indexes = sorted(self.bins)
+        excess = len(indexes) - self.max_bins
+        target = indexes[excess]
+        for index in indexes[:excess]:
+            self.bins[target] += self.bins.pop(index)
+
+    def merge(self, other: 'LatencySketch') -> 'LatencySketch':
+        """Add another sketch's counts into this one"""
+        if not math.isclose(self.relative_accuracy, other.relative_accuracy):
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        if other.count == 0:
+            return self
+
+        for index, bin_count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + bin_count
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    @classmethod
+    def merge_all(cls, sketches: Iterable['LatencySketch'],
+                  relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY) -> 'LatencySketch':
+        merged = cls(relative_accuracy)
+        for sketch in sketches:
+            merged.merge(sketch)
+        return merged
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Approximate value at quantile q (0..1), or None for an empty sketch"""
+        if not 0 <= q <= 1:
+            raise ValueError("quantile must be between 0 and 1")
+        if self.count == 0:
+            return None
+
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+
+        cumulative = self.zero_count
+        for index in sorted(self.bins):
+            cumulative += self.bins[index]
+            if cumulative > rank:
+                # Bucket estimates can overshoot the observed range slightly
+                return min(max(self._value(index), self.min), self.max)
+        return self.max
+
+    def percentiles(self) -> Dict[str, Optional[float]]:
+        """p50/p90/p95/p99 and max, rounded for the summary files"""
+        result = {}
+        for name, q in PERCENTILES.items():
+            value = self.quantile(q)
+            result[name] = round(value, 2) if value is not None else None
+        result['max_duration_ms'] = round(self.max, 2) if self.max is not None else None
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Compact serialization: bucket offset plus dense counts"""
+        offset = min(self.bins) if self.bins else 0
+        counts = [0] * (max(self.bins) - offset + 1) if self.bins else []
+        for index, bin_count in self.bins.items():
+            counts[index - offset] = bin_count
+        return {
+            'type': 'ddsketch',
+            'relative_accuracy': self.relative_accuracy,
+            'count': self.count,
+            'sum': self.sum,
+            'min': self.min,
+            'max': self.max,
+            'zero_count': self.zero_count,
+            'bin_offset': offset,
+            'bin_counts': counts
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'LatencySketch':
+        sketch = cls(data.get('relative_accuracy', DEFAULT_RELATIVE_ACCURACY))
+        offset = data.get('bin_offset', 0)
+        sketch.bins = {offset + i: c for i, c in enumerate(data.get('bin_counts', [])) if c}
+        sketch.zero_count = data.get('zero_count', 0)
+        sketch.count = data.get('count', 0)
+        sketch.sum = data.get('sum', 0.0)
+        sketch.min = data.get('min')
+        sketch.max = data.get('max')
+        return sketch
+
+
+def duration_fields(sketch: Optional[LatencySketch]) -> Dict[str, Any]:
+    """Percentile columns plus the serialized sketch for a summary row"""
+    sketch = sketch or LatencySketch()
+    return {**sketch.percentiles(), 'duration_sketch': sketch.to_dict()}
+
+
+def rollup_summary_stats(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Merge several daily summary rows of one group into a single row
+
+    Counts are summed and percentiles come from the merged sketches, so the
+    result matches what a single scan over all the days would report (within
+    the sketch's relative accuracy).
+    """
+    totals = {key: sum(row.get(key) or 0 for row in rows)
+              for key in ('total_executions', 'successful', 'failed', 'running', 'waiting')}
+    sketch = LatencySketch.merge_all(
+        LatencySketch.from_dict(row['duration_sketch']) for row in rows if row.get('duration_sketch')
+    )
+    total = totals['total_executions']
+    return {
+        **totals,
+        'days': len(rows),
+        'avg_duration_ms': round(sketch.sum / sketch.count, 2) if sketch.count else None,
+        'success_rate_percent': round(totals['successful'] / total * 100, 2) if total else None,
+        'failure_rate_percent': round(totals['failed'] / total * 100, 2) if total else None,
+        **duration_fields(sketch)
+    }
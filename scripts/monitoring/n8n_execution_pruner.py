@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+N8N Execution Archive-then-Prune
+================================
+
+Deletes executions from ``execution_entity`` and ``execution_data`` once their
+day has been exported to GCS, so both tables stay small for n8n and the exporter.
+
+For a target date the pruner:
+1. Optionally runs the export first (``--export-first``)
+2. Verifies the export against the date's export manifests: every
+   (saas_edge_id, job_type, channel) group that has executions in the database
+   must be listed with a matching row count (and, with ``--verify-checksums``,
+   an object whose MD5 matches the manifest)
+3. Deletes the date's executions in small keyset-paginated batches (ordered by
+   execution id), each in its own short transaction with ``lock_timeout`` and
+   ``statement_timeout`` set, sleeping between batches so deletes never hold
+   long locks or produce replication spikes
+
+Only executions the exporter would have exported are deleted; running, waiting
+and new executions are always kept.
+
+Usage:
+    python n8n_execution_pruner.py --date 2024-01-15 [--dry-run]
+    python n8n_execution_pruner.py --date 2024-01-15 --batch-size 500 --sleep 0.5 --lock-timeout-ms 2000
+
+Requirements:
+    pip install google-cloud-storage psycopg2-binary python-dotenv
+"""
+
+import os
+import json
+import time
+import logging
+import argparse
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Any, Tuple
+import psycopg2
+import psycopg2.errors
+from dotenv import load_dotenv
+from export_storage import ExportStorage, get_export_storage
+from export_manifest import load_manifests, latest_objects, md5_base64, read_object_bytes
+
+# Load environment variables
+load_dotenv()
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+GroupKey = Tuple[str, str, str]
+
+# Executions that may still change are never pruned
+ACTIVE_STATUSES = ('running', 'waiting', 'new')
+
+WORKFLOW_METADATA_CTE = """
+WITH workflow_metadata AS (
+  SELECT
+    id as workflow_id,
+    COALESCE(
+      meta->>'saas_edge_id',
+      settings->>'saas_edge_id',
+      'unknown'
+    ) as saas_edge_id,
+    COALESCE(
+      meta->>'job_type',
+      settings->>'job_type',
+      CASE
+        WHEN name ILIKE '%%webhook%%' THEN 'webhook'
+        WHEN name ILIKE '%%schedule%%' THEN 'scheduled'
+        WHEN name ILIKE '%%trigger%%' THEN 'trigger'
+        ELSE 'workflow'
+      END
+    ) as job_type,
+    COALESCE(
+      meta->>'channel',
+      settings->>'channel',
+      'production'
+    ) as channel
+  FROM workflow_entity
+  WHERE "deletedAt" IS NULL
+)
+"""
+
+
+class N8NExecutionPruner:
+    """Verifies exported dates and prunes their executions in small batches"""
+
+    def __init__(self,
+                 db_config: Dict[str, Any],
+                 storage: ExportStorage,
+                 gcs_prefix: str = 'n8n',
+                 batch_size: int = 500,
+                 sleep_seconds: float = 0.5,
+                 lock_timeout_ms: int = 2000,
+                 statement_timeout_ms: int = 30000,
+                 max_lock_retries: int = 5):
+        self.db_config = db_config
+        self.storage = storage
+        self.gcs_prefix = gcs_prefix
+        self.batch_size = batch_size
+        self.sleep_seconds = sleep_seconds
+        self.lock_timeout_ms = lock_timeout_ms
+        self.statement_timeout_ms = statement_timeout_ms
+        self.max_lock_retries = max_lock_retries
+
+    def get_db_connection(self):
+        """Get a primary database connection (pruning always writes)"""
+        conn = psycopg2.connect(**self.db_config)
+        conn.autocommit = False
+        return conn
+
+    def generate_gcs_path(self, saas_edge_id: str, job_type: str, channel: str,
+                          date: str, filename: str) -> str:
+        """Generate blob path following the exporter's structure"""
+        return f"{self.gcs_prefix}/{saas_edge_id}/{job_type}/{channel}/{date}/{filename}"
+
+    def get_database_group_counts(self, target_date: str) -> Dict[GroupKey, int]:
+        """Count exportable executions per group for the date"""
+        query = WORKFLOW_METADATA_CTE + """
+        SELECT w.saas_edge_id, w.job_type, w.channel, COUNT(*) as total_executions
+        FROM execution_entity e
+        INNER JOIN workflow_metadata w ON e."workflowId" = w.workflow_id
+        WHERE e."deletedAt" IS NULL
+          AND DATE(COALESCE(e."startedAt", e."createdAt")) = %s
+        GROUP BY w.saas_edge_id, w.job_type, w.channel;
+        """
+
+        conn = self.get_db_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(query, (target_date,))
+                return {(row[0], row[1], row[2]): int(row[3]) for row in cursor.fetchall()}
+        finally:
+            conn.close()
+
+    def get_exported_count(self, group: GroupKey, target_date: str) -> Optional[int]:
+        """Read the row count from a group's executions file (pre-manifest exports)"""
+        edge_id, j_type, chan = group
+        filename = f"executions_{target_date.replace('-', '')}.json"
+        blob_path = self.generate_gcs_path(edge_id, j_type, chan, target_date, filename)
+
+        data = self.storage.read_bytes(blob_path)
+        if data is None:
+            return None
+
+        export = json.loads(data)
+        return int(export.get('export_metadata', {}).get('total_executions', len(export.get('executions', []))))
+
+    def verify_export(self, target_date: str, verify_checksums: bool = False,
+                      allow_sampled: bool = False) -> Dict[str, Any]:
+        """Check that every group with executions on the date was fully exported
+        
+        Row counts come from the date's export manifests. Exports written before
+        manifests existed fall back to reading each group's executions file.
+        With verify_checksums, every listed object is re-read and its MD5 compared.
+        Groups exported with sampling only hold part of their executions and
+        fail verification unless allow_sampled is set.
+        """
+        db_counts = self.get_database_group_counts(target_date)
+        manifests = load_manifests(self.storage, self.gcs_prefix, target_date)
+        exported_objects = latest_objects(manifests, 'executions')
+        mismatches = []
+
+        for group, db_count in sorted(db_counts.items()):
+            objects = exported_objects.get(group)
+            if objects:
+                exported = sum(obj.get('population_row_count', obj['row_count']) for obj in objects)
+            elif not manifests:
+                exported = self.get_exported_count(group, target_date)
+            else:
+                exported = None
+
+            problem = None
+            if exported != db_count:
+                problem = 'row_count_mismatch' if exported is not None else 'not_exported'
+            elif objects and any('sampling_rate' in obj for obj in objects) and not allow_sampled:
+                problem = 'sampled'
+            elif objects and verify_checksums:
+                for obj in objects:
+                    data = read_object_bytes(self.storage, obj)
+                    if data is None:
+                        problem = 'object_missing'
+                    elif md5_base64(data) != obj['md5_hash']:
+                        problem = 'checksum_mismatch'
+                    if problem:
+                        break
+
+            if problem:
+                mismatches.append({
+                    'saas_edge_id': group[0],
+                    'job_type': group[1],
+                    'channel': group[2],
+                    'problem': problem,
+                    'database_executions': db_count,
+                    'exported_executions': exported
+                })
+
+        incomplete = [m.get('shard') or 'full' for m in manifests if not m.get('complete', True)]
+        if incomplete:
+            logger.warning(f"Manifests with failed uploads for {target_date}: {incomplete}")
+
+        verified = not mismatches
+        if verified:
+            logger.info(f"Export verified for {target_date}: {len(db_counts)} groups, "
+                        f"{sum(db_counts.values())} executions")
+        else:
+            logger.error(f"Export verification failed for {target_date}: {len(mismatches)} groups differ")
+
+        return {
+            'verified': verified,
+            'groups': len(db_counts),
+            'database_executions': sum(db_counts.values()),
+            'manifests': len(manifests),
+            'mismatches': mismatches
+        }
+
+    def get_id_bounds(self, target_date: str) -> Tuple[Optional[int], Optional[int]]:
+        """Find the execution id range of the date so batches walk the primary key"""
+        query = """
+        SELECT MIN(e.id), MAX(e.id)
+        FROM execution_entity e
+        WHERE e."createdAt" >= (%s::date - INTERVAL '1 day')
+          AND e."createdAt" < (%s::date + INTERVAL '1 day')
+          AND DATE(COALESCE(e."startedAt", e."createdAt")) = %s;
+        """
+
+        conn = self.get_db_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(query, (target_date, target_date, target_date))
+                min_id, max_id = cursor.fetchone()
+                return min_id, max_id
+        finally:
+            conn.close()
+
+    def delete_batch(self, conn, target_date: str, after_id: int, max_id: int) -> List[int]:
+        """Delete one batch of executions above a keyset cursor, returning deleted ids"""
+        query = """
+        WITH batch AS (
+          SELECT e.id
+          FROM execution_entity e
+          WHERE e.id > %(after_id)s
+            AND e.id <= %(max_id)s
+            AND DATE(COALESCE(e."startedAt", e."createdAt")) = %(target_date)s
+            AND e.status <> ALL(%(active_statuses)s)
+            AND e."deletedAt" IS NULL
+            AND EXISTS (
+              SELECT 1 FROM workflow_entity w
+              WHERE w.id = e."workflowId" AND w."deletedAt" IS NULL
+            )
+          ORDER BY e.id
+          LIMIT %(batch_size)s
+          FOR UPDATE SKIP LOCKED
+        ),
+        deleted_data AS (
+          DELETE FROM execution_data d
+          USING batch
+          WHERE d."executionId" = batch.id
+        )
+        DELETE FROM execution_entity e
+        USING batch
+        WHERE e.id = batch.id
+        RETURNING e.id;
+        """
+
+        with conn.cursor() as cursor:
+            cursor.execute("SET LOCAL lock_timeout = %s", (f"{self.lock_timeout_ms}ms",))
+            cursor.execute("SET LOCAL statement_timeout = %s", (f"{self.statement_timeout_ms}ms",))
+            cursor.execute(query, {
+                'after_id': after_id,
+                'max_id': max_id,
+                'target_date': target_date,
+                'active_statuses': list(ACTIVE_STATUSES),
+                'batch_size': self.batch_size
+            })
+            return sorted(row[0] for row in cursor.fetchall())
+
+    def prune_date(self, target_date: str, dry_run: bool = False,
+                   verify_checksums: bool = False, allow_sampled: bool = False) -> Dict[str, Any]:
+        """Verify the export for a date, then delete its executions in batches"""
+        verification = self.verify_export(target_date, verify_checksums, allow_sampled)
+        if not verification['verified']:
+            return {
+                'status': 'error',
+                'message': 'Export verification failed; nothing was deleted',
+                'target_date': target_date,
+                'verification': verification
+            }
+
+        min_id, max_id = self.get_id_bounds(target_date)
+        if min_id is None:
+            return {'status': 'success', 'message': 'No executions to prune',
+                    'target_date': target_date, 'deleted_executions': 0}
+
+        if dry_run:
+            return {
+                'status': 'success',
+                'dry_run': True,
+                'target_date': target_date,
+                'verification': verification,
+                'id_range': [min_id, max_id]
+            }
+
+        deleted_total = 0
+        batches = 0
+        lock_retries = 0
+        after_id = min_id - 1
+
+        conn = self.get_db_connection()
+        try:
+            while True:
+                try:
+                    deleted_ids = self.delete_batch(conn, target_date, after_id, max_id)
+                    conn.commit()
+                except (psycopg2.errors.LockNotAvailable, psycopg2.errors.QueryCanceled) as e:
+                    conn.rollback()
+                    lock_retries += 1
+                    if lock_retries > self.max_lock_retries:
+                        logger.error(f"Giving up after {lock_retries} lock timeouts: {e}")
+                        raise
+                    backoff = self.sleep_seconds * (2 ** lock_retries)
+                    logger.warning(f"Batch hit lock/statement timeout, retrying in {backoff:.1f}s")
+                    time.sleep(backoff)
+                    continue
+
+                if not deleted_ids:
+                    break
+
+                lock_retries = 0
+                batches += 1
+                deleted_total += len(deleted_ids)
+                after_id = deleted_ids[-1]
+                logger.info(f"Pruned batch {batches}: {len(deleted_ids)} executions "
+                            f"(up to id {after_id}, {deleted_total} total)")
+
+                if self.sleep_seconds > 0:
+                    time.sleep(self.sleep_seconds)
+        finally:
+            conn.close()
+
+        logger.info(f"Pruning completed for {target_date}: {deleted_total} executions in {batches} batches")
+
+        return {
+            'status': 'success',
+            'target_date': target_date,
+            'deleted_executions': deleted_total,
+            'batches': batches,
+            'verification': verification
+        }
+
+
+def create_db_config() -> Dict[str, Any]:
+    """Create primary database configuration from environment variables"""
+    return {
+        'host': os.getenv('DB_POSTGRESDB_HOST', 'localhost'),
+        'port': int(os.getenv('DB_POSTGRESDB_PORT', 5432)),
+        'database': os.getenv('DB_POSTGRESDB_DATABASE', 'n8n'),
+        'user': os.getenv('DB_POSTGRESDB_USER', 'n8n'),
+        'password': os.getenv('DB_POSTGRESDB_PASSWORD')
+    }
+
+
+def main():
+    """Main CLI entry point"""
+    parser = argparse.ArgumentParser(description="Prune exported N8N executions from the database")
+    parser.add_argument("--date", help="Target date (YYYY-MM-DD)")
+    parser.add_argument("--days-ago", type=int, help="Prune the date this many days ago")
+    parser.add_argument("--export-first", action="store_true", help="Run the GCS export before verifying")
+    parser.add_argument("--batch-size", type=int, default=500, help="Executions deleted per batch")
+    parser.add_argument("--sleep", type=float, default=0.5, help="Seconds to sleep between batches")
+    parser.add_argument("--lock-timeout-ms", type=int, default=2000, help="lock_timeout per batch")
+    parser.add_argument("--statement-timeout-ms", type=int, default=30000, help="statement_timeout per batch")
+    parser.add_argument("--verify-checksums", action="store_true",
+                        help="Re-read exported objects and compare MD5 with the manifest")
+    parser.add_argument("--allow-sampled", action="store_true",
+                        help="Also prune groups that were exported with sampling (unsampled rows are lost)")
+    parser.add_argument("--dry-run", action="store_true", help="Verify only; do not delete")
+
+    args = parser.parse_args()
+
+    if args.days_ago is not None:
+        target_date = (datetime.now() - timedelta(days=args.days_ago)).strftime("%Y-%m-%d")
+    elif args.date:
+        target_date = args.date
+    else:
+        parser.error("--date or --days-ago is required")
+
+    try:
+        if args.export_first:
+            from n8n_log_exporter import N8NLogExporter
+            export_result = N8NLogExporter().export_logs(target_date=target_date)
+            logger.info(f"Export finished: {len(export_result.get('uploaded_files', []))} files")
+
+        pruner = N8NExecutionPruner(
+            create_db_config(),
+            get_export_storage(),
+            batch_size=args.batch_size,
+            sleep_seconds=args.sleep,
+            lock_timeout_ms=args.lock_timeout_ms,
+            statement_timeout_ms=args.statement_timeout_ms
+        )
+        result = pruner.prune_date(target_date, dry_run=args.dry_run,
+                                   verify_checksums=args.verify_checksums,
+                                   allow_sampled=args.allow_sampled)
+        print(json.dumps(result, indent=2, default=str))
+
+        if result['status'] != 'success':
+            exit(1)
+
+    except Exception as e:
+        logger.error(f"Pruning failed: {e}")
+        print(json.dumps({"status": "error", "message": str(e)}, indent=2))
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+N8N Export Compactor
+====================
+
+Rolls a finished month of daily export objects into one compressed object per
+(saas_edge_id, job_type, channel) group and object type, so historical analytics
+read a handful of monthly objects instead of thousands of tiny daily ones:
+
+    n8n/<edge>/<job_type>/<channel>/<date>/executions_YYYYMMDD.json     (daily, one per day
+    n8n/<edge>/<job_type>/<channel>/<date>/executions_YYYYMMDD_partNNN.json   or one per part)
+    n8n/<edge>/<job_type>/<channel>/_monthly/<YYYY-MM>/executions_YYYYMM.ndjson.gz
+    n8n/<edge>/<job_type>/<channel>/_monthly/<YYYY-MM>/summary_YYYYMM.ndjson.gz
+    n8n/<edge>/<job_type>/<channel>/_monthly/<YYYY-MM>/index_YYYYMM.json
+
+Each daily object (each part, for a group exported in parts) becomes its own
+gzip member (newline-delimited JSON rows) inside the monthly object;
+concatenated members are still a valid gzip file for tools that read the whole
+month. The index records every member's byte offset, length, MD5, row count
+and time range, so a single day can be read with a range request.
+
+For a month the compactor:
+1. Resolves the month's objects through the export manifests (listing only for
+   days without manifests)
+2. Writes the monthly objects and re-reads them to verify every member's MD5
+   and rows against the sources
+3. Writes the index and a ``manifest__compacted.json`` per date whose entries
+   point at the members, so manifest readers (query CLI, pruner) follow them
+4. Optionally deletes the merged daily objects (``--delete-sources``), only
+   after all of the above succeeded
+
+Re-running is safe: days already compacted are read back from the monthly
+object, and days re-exported since are merged in again.
+
+Usage:
+    python n8n_export_compactor.py --month 2024-01 --dry-run
+    python n8n_export_compactor.py --months-ago 2 --delete-sources
+
+Requirements:
+    pip install google-cloud-storage python-dotenv
+"""
+
+import json
+import gzip
+import logging
+import argparse
+import calendar
+from datetime import datetime, date
+from typing import Dict, List, Optional, Any, Tuple
+from dotenv import load_dotenv
+from export_storage import ExportStorage, get_export_storage
+from export_manifest import (
+    COMPACTED_COMPRESSION, OBJECT_FILES, ExportManifestBuilder, decode_rows, manifest_path,
+    md5_base64, member_bytes, resolve_objects, serialize_export, shard_id, time_range
+)
+
+# Load environment variables
+load_dotenv()
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+COMPACTOR_VERSION = '1.0.0'
+
+GroupKey = Tuple[str, str, str]
+
+# Manifest fields of sampled exports that must survive compaction
+SAMPLING_FIELDS = ('population_row_count', 'sampling_rate')
+
+
+def month_dates(month: str) -> List[str]:
+    """All YYYY-MM-DD dates of a YYYY-MM month"""
+    year, month_number = (int(part) for part in month.split('-'))
+    days = calendar.monthrange(year, month_number)[1]
+    return [date(year, month_number, day).strftime("%Y-%m-%d") for day in range(1, days + 1)]
+
+
+def row_time(object_type: str, row: Dict[str, Any]) -> List[Optional[str]]:
+    """Timestamps a row contributes to the manifest time range"""
+    if object_type == 'executions':
+        return [row.get('startedAt') or row.get('createdAt')]
+    return [row.get('first_execution'), row.get('last_execution')]
+
+
+class N8NExportCompactor:
+    """Compacts daily export objects into monthly gzip NDJSON objects"""
+
+    def __init__(self, storage: ExportStorage, gcs_prefix: str = 'n8n', compression_level: int = 6):
+        self.storage = storage
+        self.gcs_prefix = gcs_prefix
+        self.compression_level = compression_level
+
+    def monthly_path(self, group: GroupKey, month: str, filename: str) -> str:
+        edge_id, j_type, chan = group
+        return f"{self.gcs_prefix}/{edge_id}/{j_type}/{chan}/_monthly/{month}/{filename}"
+
+    def collect_sources(self, month: str,
+                        saas_edge_ids: Optional[List[str]] = None,
+                        job_types: Optional[List[str]] = None,
+                        channels: Optional[List[str]] = None) -> Dict[GroupKey, Dict[str, List[Dict[str, Any]]]]:
+        """Current object entry per group, type and day for the month"""
+        groups: Dict[GroupKey, Dict[str, List[Dict[str, Any]]]] = {}
+        dates = month_dates(month)
+        for object_type in OBJECT_FILES:
+            for obj in resolve_objects(self.storage, self.gcs_prefix, dates, object_type,
+                                       saas_edge_ids, job_types, channels):
+                group = (obj['saas_edge_id'], obj['job_type'], obj['channel'])
+                groups.setdefault(group, {}).setdefault(object_type, []).append(obj)
+        return groups
+
+    def compact_object(self, group: GroupKey, month: str, object_type: str,
+                       sources: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Write one monthly object from its daily sources and verify it
+
+        Returns the object description with one member per day, or None when
+        none of the sources could be read.
+        """
+        file_prefix = OBJECT_FILES[object_type][0]
+        path = self.monthly_path(group, month, f"{file_prefix}{month.replace('-', '')}.ndjson.gz")
+
+        chunks, members, expected_rows = [], [], {}
+        fetched: Dict[str, Optional[bytes]] = {}
+        offset = 0
+        # Parts of a day stay in order, one member each
+        for source in sorted(sources, key=lambda obj: (obj['date'], obj.get('source_path', obj['path']),
+                                                     obj.get('member_offset', 0))):
+            # Days already compacted share one monthly object; download it once
+            if source['path'] not in fetched:
+                fetched[source['path']] = self.storage.read_bytes(source['path'])
+            data = fetched[source['path']]
+            if data is not None:
+                data = member_bytes(source, data)
+            if data is None:
+                logger.warning(f"Source missing, skipping day: {source['path']}")
+                continue
+            rows = decode_rows(source, data)
+            ndjson = ''.join(json.dumps(row, default=str) + '\n' for row in rows).encode('utf-8')
+            member = gzip.compress(ndjson, compresslevel=self.compression_level, mtime=0)
+
+            chunks.append(member)
+            expected_rows[offset] = json.loads(json.dumps(rows, default=str))
+            members.append({
+                'date': source['date'],
+                'member_offset': offset,
+                'member_length': len(member),
+                'md5_hash': md5_base64(member),
+                'row_count': len(rows),
+                'source_path': source.get('source_path', source['path']),
+                **{key: source[key] for key in SAMPLING_FIELDS if key in source},
+                **time_range(value for row in rows for value in row_time(object_type, row))
+            })
+            offset += len(member)
+
+        if not members:
+            return None
+
+        payload = b''.join(chunks)
+        self.storage.write_bytes(path, payload, content_type='application/gzip')
+
+        # Re-read what was written before anything points at it
+        written = self.storage.read_bytes(path)
+        if written is None or md5_base64(written) != md5_base64(payload):
+            raise RuntimeError(f"Verification failed, object differs after upload: {path}")
+        for member in members:
+            part = written[member['member_offset']:member['member_offset'] + member['member_length']]
+            entry = {'type': object_type, 'compression': COMPACTED_COMPRESSION}
+            if (md5_base64(part) != member['md5_hash'] or
+                    decode_rows(entry, part) != expected_rows[member['member_offset']]):
+                raise RuntimeError(f"Verification failed for {member['date']} in {path}")
+
+        logger.info(f"Compacted {len(members)} day(s) into {self.storage.uri(path)} ({len(payload)} bytes)")
+        return {'path': path, 'byte_size': len(payload), 'md5_hash': md5_base64(payload), 'members': members}
+
+    def compact_group(self, group: GroupKey, month: str,
+                      sources: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Compact every object type of a group and write the group's index"""
+        objects = {}
+        for object_type, type_sources in sources.items():
+            compacted = self.compact_object(group, month, object_type, type_sources)
+            if compacted:
+                objects[object_type] = compacted
+
+        index = {
+            'index_version': 1,
+            'compactor_version': COMPACTOR_VERSION,
+            'compacted_at': datetime.now().isoformat(),
+            'month': month,
+            'saas_edge_id': group[0],
+            'job_type': group[1],
+            'channel': group[2],
+            'compression': COMPACTED_COMPRESSION,
+            'objects': objects
+        }
+        self.storage.write_bytes(self.monthly_path(group, month, f"index_{month.replace('-', '')}.json"),
+                                 serialize_export(index))
+        return index
+
+    def write_manifests(self, month: str, indexes: List[Dict[str, Any]], shard: str) -> List[str]:
+        """Write a compacted manifest per date pointing at the monthly members"""
+        builders: Dict[str, ExportManifestBuilder] = {}
+        for index in indexes:
+            for object_type, compacted in index['objects'].items():
+                for member in compacted['members']:
+                    builder = builders.setdefault(
+                        member['date'], ExportManifestBuilder(member['date'], COMPACTOR_VERSION, shard=shard)
+                    )
+                    builder.add_entry({
+                        'path': compacted['path'],
+                        'type': object_type,
+                        'saas_edge_id': index['saas_edge_id'],
+                        'job_type': index['job_type'],
+                        'channel': index['channel'],
+                        'row_count': member['row_count'],
+                        'byte_size': member['member_length'],
+                        'md5_hash': member['md5_hash'],
+                        'min_execution_time': member['min_execution_time'],
+                        'max_execution_time': member['max_execution_time'],
+                        'compression': COMPACTED_COMPRESSION,
+                        'member_offset': member['member_offset'],
+                        'member_length': member['member_length'],
+                        'source_path': member['source_path'],
+                        **{key: member[key] for key in SAMPLING_FIELDS if key in member}
+                    })
+
+        written = []
+        for target_date, builder in sorted(builders.items()):
+            path = manifest_path(self.gcs_prefix, target_date, builder.shard)
+            self.storage.write_bytes(path, serialize_export(builder.build()))
+            written.append(path)
+        return written
+
+    def compact_month(self,
+                      month: str,
+                      saas_edge_ids: Optional[List[str]] = None,
+                      job_types: Optional[List[str]] = None,
+                      channels: Optional[List[str]] = None,
+                      delete_sources: bool = False,
+                      dry_run: bool = False) -> Dict[str, Any]:
+        """Compact a finished month, optionally deleting the merged daily objects"""
+        dates = month_dates(month)
+        if dates[-1] >= date.today().strftime("%Y-%m-%d"):
+            raise ValueError(f"Month {month} has not finished yet; only past months are compacted")
+
+        groups = self.collect_sources(month, saas_edge_ids, job_types, channels)
+        daily_sources = [obj for sources in groups.values() for type_sources in sources.values()
+                         for obj in type_sources if obj.get('compression') != COMPACTED_COMPRESSION]
+        logger.info(f"{month}: {len(groups)} group(s), {len(daily_sources)} daily object(s) to compact")
+
+        if dry_run:
+            return {
+                'status': 'dry_run',
+                'month': month,
+                'groups': len(groups),
+                'daily_objects': len(daily_sources)
+            }
+
+        indexes = [self.compact_group(group, month, sources) for group, sources in sorted(groups.items())]
+
+        shard = 'compacted'
+        filter_shard = shard_id(','.join(saas_edge_ids or []), ','.join(job_types or []), ','.join(channels or []))
+        if filter_shard:
+            shard = f"{shard}__{filter_shard}"
+        manifests = self.write_manifests(month, indexes, shard)
+
+        compacted_paths = {index_obj['path'] for index in indexes for index_obj in index['objects'].values()}
+        deleted = 0
+        if delete_sources:
+            # Compacted days point at the monthly object; only daily objects go
+            for source in daily_sources:
+                if source['path'] not in compacted_paths:
+                    self.storage.delete(source['path'])
+                    deleted += 1
+            logger.info(f"Deleted {deleted} daily object(s) merged into {month}")
+
+        return {
+            'status': 'success',
+            'month': month,
+            'groups': len(indexes),
+            'daily_objects': len(daily_sources),
+            'monthly_objects': len(compacted_paths),
+            'manifests': len(manifests),
+            'deleted_sources': deleted,
+            'bytes_written': sum(obj['byte_size'] for index in indexes for obj in index['objects'].values())
+        }
+
+
+def split_list(value: Optional[str]) -> Optional[List[str]]:
+    return [item.strip() for item in value.split(',') if item.strip()] if value else None
+
+
+def main():
+    """Main CLI entry point"""
+    parser = argparse.ArgumentParser(description="Compact daily N8N export objects into monthly objects")
+    parser.add_argument("--month", help="Month to compact (YYYY-MM)")
+    parser.add_argument("--months-ago", type=int, help="Compact the month this many months ago")
+    parser.add_argument("--saas-edge-id", help="Comma-separated tenant ids")
+    parser.add_argument("--job-type", help="Comma-separated job types")
+    parser.add_argument("--channel", help="Comma-separated channels")
+    parser.add_argument("--compression-level", type=int, default=6, help="gzip level (1-9)")
+    parser.add_argument("--delete-sources", action="store_true",
+                        help="Delete the daily objects once the monthly objects are verified")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would be compacted")
+
+    args = parser.parse_args()
+
+    if args.months_ago is not None:
+        today = date.today()
+        months = today.year * 12 + today.month - 1 - args.months_ago
+        month = f"{months // 12:04d}-{months % 12 + 1:02d}"
+    elif args.month:
+        month = args.month
+    else:
+        parser.error("--month or --months-ago is required")
+
+    try:
+        compactor = N8NExportCompactor(get_export_storage(), compression_level=args.compression_level)
+        result = compactor.compact_month(
+            month,
+            saas_edge_ids=split_list(args.saas_edge_id),
+            job_types=split_list(args.job_type),
+            channels=split_list(args.channel),
+            delete_sources=args.delete_sources,
+            dry_run=args.dry_run
+        )
+        print(json.dumps(result, indent=2))
+
+    except Exception as e:
+        logger.error(f"Compaction failed: {e}")
+        print(json.dumps({"status": "error", "message": str(e)}, indent=2))
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
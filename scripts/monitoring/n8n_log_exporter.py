@@ -16,6 +16,7 @@ Features:
 
 Usage:
     python n8n_log_exporter.py --date 2024-01-15 [--saas-edge-id ID] [--job-type TYPE] [--channel CHAN]
+    python n8n_log_exporter.py --date 2024-01-15 --sampling-policy sampling_policy.json
 
 Requirements:
     pip install google-cloud-storage psycopg2-binary python-dotenv
@@ -24,12 +25,19 @@ Requirements:
 import os
 import json
 import logging
+import threading
 import argparse
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any, Iterator, Tuple, Union
 import psycopg2
 from google.cloud import storage
 from dotenv import load_dotenv
+from db_replicas import ReplicaRouter
+from export_manifest import ExportManifestBuilder, manifest_path, serialize_export, time_range
+from latency_sketch import LatencySketch, duration_fields
+from retry_chains import RetryChainIndex
+from export_stream import AdaptiveBatchSizer, UploadPipeline, iter_row_groups
+from export_sampling import SamplingPolicy
 
 # Load environment variables
 load_dotenv()
@@ -59,6 +67,12 @@ class N8NLogExporter:
             'password': os.getenv('DB_POSTGRESDB_PASSWORD')
         }
         
+        # Read-only queries go to replicas when configured
+        self.replica_router = ReplicaRouter.from_env(self.db_config)
+        
+        # Optional sampling of oversized tenants / job types (None = export everything)
+        self.sampling_policy = SamplingPolicy.from_env()
+        
         # GCS configuration
         self.bucket_name = os.getenv('GCS_BUCKET_NAME', 'saas_job_logs')
         self.gcs_prefix = 'n8n'
@@ -69,12 +83,19 @@ class N8NLogExporter:
         
         logger.info(f"Initialized N8N Log Exporter for bucket: {self.bucket_name}")
     
-    def get_db_connection(self):
-        """Get database connection with retry logic"""
+    def get_db_connection(self, read_only: bool = False):
+        """Get database connection with retry logic
+        
+        Read-only connections are routed to a healthy replica when one is
+        configured and within the lag threshold, otherwise to the primary.
+        """
         max_retries = 3
         for attempt in range(max_retries):
             try:
-                conn = psycopg2.connect(**self.db_config)
+                if read_only:
+                    conn = self.replica_router.get_read_connection()
+                else:
+                    conn = psycopg2.connect(**self.db_config)
                 logger.info("Database connection established")
                 return conn
             except psycopg2.Error as e:
@@ -83,12 +104,17 @@ class N8NLogExporter:
                     raise
         return None
     
-    def extract_execution_logs(self, 
-                             target_date: str,
-                             saas_edge_id: Optional[str] = None,
-                             job_type: Optional[str] = None,
-                             channel: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Extract execution logs from database"""
+    def stream_execution_logs(self,
+                              target_date: str,
+                              saas_edge_id: Optional[str] = None,
+                              job_type: Optional[str] = None,
+                              channel: Optional[str] = None) -> Iterator[Tuple[tuple, List[Dict[str, Any]], int, bool]]:
+        """Stream execution logs from database as (group key, rows, part, last part)
+        
+        Rows are read through a server-side cursor in fetchmany batches sized
+        from the observed bytes per row, and each (saas_edge_id, job_type,
+        channel) group is yielded in size-bounded parts (see export_stream.py).
+        """
         
         query = """
         WITH workflow_metadata AS (
@@ -104,9 +130,9 @@ class N8NLogExporter:
               meta->>'job_type',
               settings->>'job_type',
               CASE 
-                WHEN name ILIKE '%webhook%' THEN 'webhook'
-                WHEN name ILIKE '%schedule%' THEN 'scheduled'
-                WHEN name ILIKE '%trigger%' THEN 'trigger'
+                WHEN name ILIKE '%%webhook%%' THEN 'webhook'
+                WHEN name ILIKE '%%schedule%%' THEN 'scheduled'
+                WHEN name ILIKE '%%trigger%%' THEN 'trigger'
                 ELSE 'workflow'
               END
             ) as job_type,
@@ -116,7 +142,7 @@ class N8NLogExporter:
               'production'
             ) as channel
           FROM workflow_entity
-          WHERE deletedAt IS NULL
+          WHERE "deletedAt" IS NULL
         )
         SELECT 
           e.id as execution_id,
@@ -126,49 +152,43 @@ class N8NLogExporter:
           w.name as workflow_name,
           e.status,
           e.mode,
-          e.startedAt,
-          e.stoppedAt,
-          e.createdAt,
+          e."startedAt",
+          e."stoppedAt",
+          e."createdAt",
           e.finished,
-          e.retryOf,
-          DATE(COALESCE(e.startedAt, e.createdAt)) as execution_date,
+          e."retryOf",
+          DATE(COALESCE(e."startedAt", e."createdAt")) as execution_date,
           CASE 
-            WHEN e.startedAt IS NOT NULL AND e.stoppedAt IS NOT NULL 
-            THEN EXTRACT(EPOCH FROM (e.stoppedAt - e.startedAt)) * 1000
+            WHEN e."startedAt" IS NOT NULL AND e."stoppedAt" IS NOT NULL 
+            THEN EXTRACT(EPOCH FROM (e."stoppedAt" - e."startedAt")) * 1000
             ELSE NULL 
           END as duration_ms
         FROM execution_entity e
-        INNER JOIN workflow_metadata w ON e.workflowId = w.workflow_id
-        WHERE e.deletedAt IS NULL
-          AND DATE(COALESCE(e.startedAt, e.createdAt)) = %s
+        INNER JOIN workflow_metadata w ON e."workflowId" = w.workflow_id
+        WHERE e."deletedAt" IS NULL
+          AND DATE(COALESCE(e."startedAt", e."createdAt")) = %s
           AND (%s IS NULL OR w.saas_edge_id = %s)
           AND (%s IS NULL OR w.job_type = %s)
           AND (%s IS NULL OR w.channel = %s)
-        ORDER BY w.saas_edge_id, w.job_type, w.channel, e.createdAt DESC;
+        ORDER BY w.saas_edge_id, w.job_type, w.channel, e."createdAt" DESC;
         """
         
-        conn = self.get_db_connection()
+        conn = self.get_db_connection(read_only=True)
         try:
-            with conn.cursor() as cursor:
+            with conn.cursor(name='n8n_execution_logs') as cursor:
                 cursor.execute(query, (
                     target_date, saas_edge_id, saas_edge_id,
                     job_type, job_type, channel, channel
                 ))
                 
-                columns = [desc[0] for desc in cursor.description]
-                rows = cursor.fetchall()
-                
-                logs = []
-                for row in rows:
-                    log_entry = dict(zip(columns, row))
-                    # Convert datetime objects to ISO strings
-                    for key, value in log_entry.items():
-                        if isinstance(value, datetime):
-                            log_entry[key] = value.isoformat()
-                    logs.append(log_entry)
+                sizer = AdaptiveBatchSizer.from_env()
+                total_logs = 0
+                for group_key, logs, part, last in iter_row_groups(cursor, sizer):
+                    total_logs += len(logs)
+                    yield group_key, logs, part, last
                 
-                logger.info(f"Extracted {len(logs)} execution logs for date: {target_date}")
-                return logs
+                logger.info(f"Extracted {total_logs} execution logs for date: {target_date} "
+                            f"(~{sizer.bytes_per_row or 0:.0f} bytes/row, last batch {sizer.batch_size} rows)")
                 
         except Exception as e:
             logger.error(f"Error extracting logs: {e}")
@@ -176,6 +196,85 @@ class N8NLogExporter:
         finally:
             conn.close()
     
+    def extract_execution_logs(self, 
+                             target_date: str,
+                             saas_edge_id: Optional[str] = None,
+                             job_type: Optional[str] = None,
+                             channel: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Extract execution logs from database"""
+        return [log for _, logs, _, _ in self.stream_execution_logs(target_date, saas_edge_id, job_type, channel)
+                for log in logs]
+    
+    def extract_retry_chains(self,
+                             target_date: str,
+                             saas_edge_id: Optional[str] = None,
+                             job_type: Optional[str] = None,
+                             channel: Optional[str] = None) -> Dict[tuple, List[Dict[str, Any]]]:
+        """Executions that retry or were retried, per (saas_edge_id, job_type, channel)
+        
+        Only id, retryOf and status are read, so retry chains can be resolved
+        before a group's executions are streamed in parts.
+        """
+        
+        query = """
+        WITH workflow_metadata AS (
+          SELECT 
+            id as workflow_id,
+            COALESCE(
+              meta->>'saas_edge_id',
+              settings->>'saas_edge_id',
+              'unknown'
+            ) as saas_edge_id,
+            COALESCE(
+              meta->>'job_type',
+              settings->>'job_type',
+              CASE 
+                WHEN name ILIKE '%%webhook%%' THEN 'webhook'
+                WHEN name ILIKE '%%schedule%%' THEN 'scheduled'
+                WHEN name ILIKE '%%trigger%%' THEN 'trigger'
+                ELSE 'workflow'
+              END
+            ) as job_type,
+            COALESCE(
+              meta->>'channel',
+              settings->>'channel',
+              'production'
+            ) as channel
+          FROM workflow_entity
+          WHERE "deletedAt" IS NULL
+        ),
+        day_executions AS (
+          SELECT e.id, e."retryOf", e.status, w.saas_edge_id, w.job_type, w.channel
+          FROM execution_entity e
+          INNER JOIN workflow_metadata w ON e."workflowId" = w.workflow_id
+          WHERE e."deletedAt" IS NULL
+            AND DATE(COALESCE(e."startedAt", e."createdAt")) = %s
+            AND (%s IS NULL OR w.saas_edge_id = %s)
+            AND (%s IS NULL OR w.job_type = %s)
+            AND (%s IS NULL OR w.channel = %s)
+        )
+        SELECT d.id as execution_id, d."retryOf", d.status, d.saas_edge_id, d.job_type, d.channel
+        FROM day_executions d
+        WHERE d."retryOf" IS NOT NULL
+           OR d.id::text IN (SELECT "retryOf"::text FROM day_executions WHERE "retryOf" IS NOT NULL);
+        """
+        
+        conn = self.get_db_connection(read_only=True)
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(query, (
+                    target_date, saas_edge_id, saas_edge_id,
+                    job_type, job_type, channel, channel
+                ))
+                chains = {}
+                for execution_id, retry_of, status, edge_id, j_type, chan in cursor.fetchall():
+                    chains.setdefault((edge_id, j_type, chan), []).append(
+                        {'execution_id': execution_id, 'retryOf': retry_of, 'status': status}
+                    )
+                return chains
+        finally:
+            conn.close()
+    
     def extract_summary_stats(self,
                             target_date: str,
                             saas_edge_id: Optional[str] = None,
@@ -197,9 +296,9 @@ class N8NLogExporter:
               meta->>'job_type',
               settings->>'job_type',
               CASE 
-                WHEN name ILIKE '%webhook%' THEN 'webhook'
-                WHEN name ILIKE '%schedule%' THEN 'scheduled'
-                WHEN name ILIKE '%trigger%' THEN 'trigger'
+                WHEN name ILIKE '%%webhook%%' THEN 'webhook'
+                WHEN name ILIKE '%%schedule%%' THEN 'scheduled'
+                WHEN name ILIKE '%%trigger%%' THEN 'trigger'
                 ELSE 'workflow'
               END
             ) as job_type,
@@ -209,14 +308,14 @@ class N8NLogExporter:
               'production'
             ) as channel
           FROM workflow_entity
-          WHERE deletedAt IS NULL
+          WHERE "deletedAt" IS NULL
         ),
         daily_stats AS (
           SELECT 
             w.saas_edge_id,
             w.job_type,
             w.channel,
-            DATE(COALESCE(e.startedAt, e.createdAt)) as execution_date,
+            DATE(COALESCE(e."startedAt", e."createdAt")) as execution_date,
             COUNT(*) as total_executions,
             COUNT(CASE WHEN e.status = 'success' THEN 1 END) as successful,
             COUNT(CASE WHEN e.status = 'error' THEN 1 END) as failed,
@@ -224,22 +323,22 @@ class N8NLogExporter:
             COUNT(CASE WHEN e.status = 'waiting' THEN 1 END) as waiting,
             AVG(
               CASE 
-                WHEN e.startedAt IS NOT NULL AND e.stoppedAt IS NOT NULL 
-                THEN EXTRACT(EPOCH FROM (e.stoppedAt - e.startedAt)) * 1000
+                WHEN e."startedAt" IS NOT NULL AND e."stoppedAt" IS NOT NULL 
+                THEN EXTRACT(EPOCH FROM (e."stoppedAt" - e."startedAt")) * 1000
                 ELSE NULL 
               END
             ) as avg_duration_ms,
-            MIN(e.startedAt) as first_execution,
-            MAX(e.stoppedAt) as last_execution,
+            MIN(e."startedAt") as first_execution,
+            MAX(e."stoppedAt") as last_execution,
             COUNT(DISTINCT w.workflow_id) as unique_workflows
           FROM execution_entity e
-          INNER JOIN workflow_metadata w ON e.workflowId = w.workflow_id
-          WHERE e.deletedAt IS NULL
-            AND DATE(COALESCE(e.startedAt, e.createdAt)) = %s
+          INNER JOIN workflow_metadata w ON e."workflowId" = w.workflow_id
+          WHERE e."deletedAt" IS NULL
+            AND DATE(COALESCE(e."startedAt", e."createdAt")) = %s
             AND (%s IS NULL OR w.saas_edge_id = %s)
             AND (%s IS NULL OR w.job_type = %s)
             AND (%s IS NULL OR w.channel = %s)
-          GROUP BY w.saas_edge_id, w.job_type, w.channel, DATE(COALESCE(e.startedAt, e.createdAt))
+          GROUP BY w.saas_edge_id, w.job_type, w.channel, DATE(COALESCE(e."startedAt", e."createdAt"))
         )
         SELECT 
           *,
@@ -249,7 +348,7 @@ class N8NLogExporter:
         ORDER BY saas_edge_id, job_type, channel;
         """
         
-        conn = self.get_db_connection()
+        conn = self.get_db_connection(read_only=True)
         try:
             with conn.cursor() as cursor:
                 cursor.execute(query, (
@@ -280,14 +379,12 @@ class N8NLogExporter:
         finally:
             conn.close()
     
-    def upload_to_gcs(self, data: Dict[str, Any], blob_path: str) -> bool:
-        """Upload data to Google Cloud Storage"""
+    def upload_to_gcs(self, data: Union[Dict[str, Any], bytes], blob_path: str) -> bool:
+        """Upload data (or an already serialized payload) to Google Cloud Storage"""
         try:
+            payload = data if isinstance(data, bytes) else serialize_export(data)
             blob = self.bucket.blob(blob_path)
-            blob.upload_from_string(
-                json.dumps(data, indent=2, default=str),
-                content_type='application/json'
-            )
+            blob.upload_from_string(payload, content_type='application/json')
             logger.info(f"Successfully uploaded to: gs://{self.bucket_name}/{blob_path}")
             return True
         except Exception as e:
@@ -299,35 +396,46 @@ class N8NLogExporter:
         """Generate GCS blob path following the required structure"""
         return f"{self.gcs_prefix}/{saas_edge_id}/{job_type}/{channel}/{date}/{filename}"
     
+    def write_manifest(self, manifest: ExportManifestBuilder, target_date: str) -> Optional[str]:
+        """Upload the export manifest for the date (and shard, if filtered)"""
+        blob_path = manifest_path(self.gcs_prefix, target_date, manifest.shard)
+        if self.upload_to_gcs(manifest.build(), blob_path):
+            return blob_path
+        return None
+    
     def export_logs(self, 
                    target_date: str,
                    saas_edge_id: Optional[str] = None,
                    job_type: Optional[str] = None,
-                   channel: Optional[str] = None) -> Dict[str, Any]:
-        """Main export function"""
+                   channel: Optional[str] = None,
+                   progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """Main export function
         
-        logger.info(f"Starting log export for date: {target_date}")
+        progress_callback, if given, receives progress dicts (stage, counts)
+        as the export advances; used by the asynchronous job mode.
+        """
         
-        # Extract logs and summary stats
-        logs = self.extract_execution_logs(target_date, saas_edge_id, job_type, channel)
-        stats = self.extract_summary_stats(target_date, saas_edge_id, job_type, channel)
+        def report(**progress):
+            if progress_callback:
+                progress_callback(progress)
         
-        if not logs and not stats:
-            logger.info("No logs found for the specified criteria")
-            return {"status": "success", "message": "No logs found", "uploaded_files": []}
+        logger.info(f"Starting log export for date: {target_date}")
+        report(stage='extracting')
         
-        # Group logs by saas_edge_id, job_type, channel for separate files
-        grouped_logs = {}
-        for log in logs:
-            key = (log['saas_edge_id'], log['job_type'], log['channel'])
-            if key not in grouped_logs:
-                grouped_logs[key] = []
-            grouped_logs[key].append(log)
+        # Summary stats come from one aggregate query; executions are streamed
+        stats = self.extract_summary_stats(target_date, saas_edge_id, job_type, channel)
         
+        manifest = ExportManifestBuilder(target_date, "1.0.0", saas_edge_id, job_type, channel)
         uploaded_files = []
+        upload_lock = threading.Lock()
+        duration_sketches = {}
+        logical_counts = {}
+        total_executions = 0
+        sampled_groups = 0
         
-        # Upload grouped logs
-        for (edge_id, j_type, chan), log_group in grouped_logs.items():
+        def upload_group(group_key: tuple, log_group: List[Dict[str, Any]], part: int, last: bool,
+                         logical_jobs: int, sampling: Optional[Dict[str, Any]]):
+            edge_id, j_type, chan = group_key
             # Prepare log data structure
             log_data = {
                 "export_metadata": {
@@ -336,19 +444,96 @@ class N8NLogExporter:
                     "saas_edge_id": edge_id,
                     "job_type": j_type,
                     "channel": chan,
-                    "total_executions": len(log_group),
+                    "total_executions": sampling['population_executions'] if sampling else len(log_group),
+                    "logical_jobs": logical_jobs,
                     "exporter_version": "1.0.0"
                 },
                 "executions": log_group
             }
+            sampling_fields = {}
+            if sampling:
+                log_data["export_metadata"]["exported_executions"] = len(log_group)
+                log_data["export_metadata"]["sampling"] = sampling
+                sampling_fields = {'population_row_count': sampling['population_executions'],
+                                   'sampling_rate': sampling['rate']}
             
-            # Generate file path
-            filename = f"executions_{target_date.replace('-', '')}.json"
+            # Generate file path; groups too large for one part get one file per part
+            if part == 1 and last:
+                filename = f"executions_{target_date.replace('-', '')}.json"
+            else:
+                filename = f"executions_{target_date.replace('-', '')}_part{part:03d}.json"
+                log_data["export_metadata"]["part"] = part
+                log_data["export_metadata"]["last_part"] = last
             blob_path = self.generate_gcs_path(edge_id, j_type, chan, target_date, filename)
             
             # Upload to GCS
-            if self.upload_to_gcs(log_data, blob_path):
-                uploaded_files.append(blob_path)
+            payload = serialize_export(log_data)
+            uploaded = self.upload_to_gcs(payload, blob_path)
+            with upload_lock:
+                if uploaded:
+                    uploaded_files.append(blob_path)
+                    report(stage='uploading', uploaded_files=len(uploaded_files))
+                    manifest.add_object(
+                        blob_path, 'executions', payload, edge_id, j_type, chan,
+                        row_count=len(log_group),
+                        **time_range(log['startedAt'] or log['createdAt'] for log in log_group),
+                        **sampling_fields
+                    )
+                else:
+                    manifest.add_failure(blob_path)
+        
+        # Upload each part of a group as soon as it is complete; submit() blocks
+        # while the upload queue is full, which pauses fetching (backpressure)
+        chain_executions = self.extract_retry_chains(target_date, saas_edge_id, job_type, channel)
+        pipeline = UploadPipeline.from_env(upload_group)
+        try:
+            for group_key, log_group, part, last in self.stream_execution_logs(target_date, saas_edge_id,
+                                                                               job_type, channel):
+                if part == 1:
+                    duration_sketches[group_key] = LatencySketch()
+                    retry_chains = RetryChainIndex(chain_executions.pop(group_key, []))
+                
+                # Sketch durations and annotate retry chains while the part is in memory
+                sketch = duration_sketches[group_key]
+                for log in log_group:
+                    if log['duration_ms'] is not None:
+                        sketch.add(float(log['duration_ms']))
+                    retry_chains.annotate(log)
+                logical_jobs = len({log['root_execution_id'] for log in log_group})
+                if last:
+                    logical_counts[group_key] = retry_chains.finish()
+                total_executions += len(log_group)
+                
+                # Sample only after the full-population sketch and counts above
+                sampling = None
+                if self.sampling_policy:
+                    log_group, sampling = self.sampling_policy.apply(group_key, log_group)
+                    if sampling and part == 1:
+                        sampled_groups += 1
+                
+                pipeline.submit(group_key, log_group, part, last, logical_jobs, sampling)
+                report(stage='uploading', executions_processed=total_executions,
+                       groups_processed=len(logical_counts))
+        except BaseException:
+            # Upload failures must not replace the error that stopped the export
+            pipeline.close(raise_errors=False)
+            raise
+        pipeline.close()
+        
+        if pipeline.blocked_seconds:
+            logger.info(f"Fetching waited {pipeline.blocked_seconds:.1f}s on the upload queue")
+        
+        if not logical_counts and not stats:
+            logger.info("No logs found for the specified criteria")
+            # An empty manifest still records that the date was exported
+            manifest_blob_path = self.write_manifest(manifest, target_date)
+            return {"status": "success", "message": "No logs found", "uploaded_files": [],
+                    "manifest": manifest_blob_path}
+        
+        for stat in stats:
+            key = (stat['saas_edge_id'], stat['job_type'], stat['channel'])
+            stat.update(logical_counts.get(key, {}))
+            stat.update(duration_fields(duration_sketches.get(key)))
         
         # Upload summary stats (if any)
         if stats:
@@ -383,17 +568,34 @@ class N8NLogExporter:
                     )]
                 }
                 
-                if self.upload_to_gcs(filtered_summary, blob_path):
+                payload = serialize_export(filtered_summary)
+                group_stats = filtered_summary['summary_stats']
+                if self.upload_to_gcs(payload, blob_path):
                     uploaded_files.append(blob_path)
+                    manifest.add_object(
+                        blob_path, 'summary', payload,
+                        stat['saas_edge_id'], stat['job_type'], stat['channel'],
+                        row_count=len(group_stats),
+                        **time_range([s['first_execution'] for s in group_stats] +
+                                     [s['last_execution'] for s in group_stats])
+                    )
+                else:
+                    manifest.add_failure(blob_path)
+        
+        # Write the manifest last so every object it lists already exists
+        report(stage='writing_manifest', uploaded_files=len(uploaded_files))
+        manifest_blob_path = self.write_manifest(manifest, target_date)
         
         logger.info(f"Export completed. Uploaded {len(uploaded_files)} files to GCS")
         
         return {
             "status": "success",
             "target_date": target_date,
-            "total_executions": len(logs),
-            "total_groups": len(grouped_logs),
-            "uploaded_files": uploaded_files
+            "total_executions": total_executions,
+            "total_groups": len(logical_counts),
+            "sampled_groups": sampled_groups,
+            "uploaded_files": uploaded_files,
+            "manifest": manifest_blob_path
         }
 
 def main():
@@ -404,6 +606,7 @@ def main():
     parser.add_argument("--job-type", help="Filter by job type")
     parser.add_argument("--channel", help="Filter by channel")
     parser.add_argument("--yesterday", action="store_true", help="Export yesterday's logs")
+    parser.add_argument("--sampling-policy", help="JSON sampling policy file (overrides EXPORT_SAMPLING_POLICY)")
     
     args = parser.parse_args()
     
@@ -415,6 +618,9 @@ def main():
     
     try:
         exporter = N8NLogExporter()
+        if args.sampling_policy:
+            with open(args.sampling_policy) as f:
+                exporter.sampling_policy = SamplingPolicy.from_dict(json.load(f))
         result = exporter.export_logs(
             target_date=target_date,
             saas_edge_id=args.saas_edge_id,
@@ -37,6 +37,7 @@ from typing import Dict, List, Optional, Any
 import psycopg2
 from google.cloud import storage
 import functions_framework
+from db_replicas import ReplicaRouter
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -60,6 +61,9 @@ class N8NLogExporter:
         if not all([self.db_config['host'], self.db_config['password']]):
             raise ValueError("Missing required database configuration")
         
+        # Read-only queries go to replicas when configured
+        self.replica_router = ReplicaRouter.from_env(self.db_config)
+        
         # GCS configuration
         self.bucket_name = os.environ.get('GCS_BUCKET_NAME', 'saas_job_logs')
         self.gcs_prefix = 'n8n'
@@ -70,12 +74,19 @@ class N8NLogExporter:
         
         logger.info(f"Initialized N8N Log Exporter for bucket: {self.bucket_name}")
     
-    def get_db_connection(self):
-        """Get database connection with retry logic"""
+    def get_db_connection(self, read_only: bool = False):
+        """Get database connection with retry logic
+        
+        Read-only connections are routed to a healthy replica when one is
+        configured and within the lag threshold, otherwise to the primary.
+        """
         max_retries = 3
         for attempt in range(max_retries):
             try:
-                conn = psycopg2.connect(**self.db_config)
+                if read_only:
+                    conn = self.replica_router.get_read_connection()
+                else:
+                    conn = psycopg2.connect(**self.db_config)
                 logger.info("Database connection established")
                 return conn
             except psycopg2.Error as e:
@@ -118,7 +129,7 @@ class N8NLogExporter:
         LIMIT 100;
         """
         
-        conn = self.get_db_connection()
+        conn = self.get_db_connection(read_only=True)
         try:
             with conn.cursor() as cursor:
                 cursor.execute(query, (target_date,))
@@ -181,7 +192,7 @@ class N8NLogExporter:
         ORDER BY execution_date;
         """
         
-        conn = self.get_db_connection()
+        conn = self.get_db_connection(read_only=True)
         try:
             with conn.cursor() as cursor:
                 cursor.execute(query, (target_date,))
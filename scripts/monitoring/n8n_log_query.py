@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Offline Query CLI for Exported N8N Logs
+=======================================
+
+Investigate incidents from the exported logs instead of the production database.
+The exporter's path layout (``generate_gcs_path``)::
+
+    <prefix>/<saas_edge_id>/<job_type>/<channel>/<date>/executions_YYYYMMDD.json
+
+is used for partition pruning, so only objects whose tenant, job type, channel
+and date match the filters are fetched:
+
+1. The date's export manifests are read and filtered on the group, which also
+   finds days that were compacted into monthly objects
+2. Dates without manifests use direct object paths when tenant, job type and
+   channel are all given, otherwise a prefix listing that is pruned on the
+   parsed path segments
+
+Matching objects are streamed (in parallel) into newline-delimited JSON on local
+disk and queried with DuckDB, a vectorized columnar engine, as the
+``executions`` (or ``summaries``) view.
+
+Usage:
+    # All failed Shopify webhook executions for one tenant last week
+    python n8n_log_query.py --start-date 2024-01-08 --end-date 2024-01-14 \\
+        --saas-edge-id <edge> --job-type webhook --channel shopify --status error
+
+    # Failure counts and p95 duration per tenant and day
+    python n8n_log_query.py --start-date 2024-01-01 --end-date 2024-01-31 \\
+        --group-by saas_edge_id,execution_date
+
+    # Executions and failure rate per channel and day from the daily summaries
+    python n8n_log_query.py --start-date 2024-01-01 --end-date 2024-01-31 \\
+        --summaries --group-by channel,execution_date
+
+    # Monthly p50/p95/p99 per group merged from the daily summary sketches
+    python n8n_log_query.py --start-date 2024-01-01 --end-date 2024-03-31 --rollup month
+
+    # Arbitrary SQL against the executions view, reading a local mirror
+    EXPORT_STORAGE_BACKEND=local EXPORT_LOCAL_ROOT=./saas_job_logs \\
+    python n8n_log_query.py --start-date 2024-01-14 \\
+        --sql "SELECT workflow_name, COUNT(*) FROM executions GROUP BY 1 ORDER BY 2 DESC"
+
+Requirements:
+    pip install duckdb google-cloud-storage python-dotenv
+"""
+
+import os
+import csv
+import sys
+import json
+import logging
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Any, Iterator, Tuple
+import duckdb
+from dotenv import load_dotenv
+from export_storage import ExportStorage, get_export_storage
+from export_manifest import decode_rows, member_bytes, resolve_objects
+from latency_sketch import rollup_summary_stats
+
+# Load environment variables
+load_dotenv()
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    stream=sys.stderr
+)
+logger = logging.getLogger(__name__)
+
+# Manifest object type behind each queryable view
+VIEW_OBJECT_TYPES = {
+    'executions': 'executions',
+    'summaries': 'summary'
+}
+
+# Numeric columns the exporter serializes as strings (Decimal via default=str)
+NUMERIC_COLUMNS = {
+    'executions': ['duration_ms'],
+    'summaries': ['avg_duration_ms', 'success_rate_percent', 'failure_rate_percent']
+}
+
+ROLLUP_COLUMNS = [
+    'saas_edge_id', 'job_type', 'channel', 'period', 'days', 'total_executions',
+    'successful', 'failed', 'failure_rate_percent', 'avg_duration_ms',
+    'p50_duration_ms', 'p90_duration_ms', 'p95_duration_ms', 'p99_duration_ms', 'max_duration_ms'
+]
+
+# --group-by aggregates per view; daily summaries are already counts and averages,
+# so they are summed and execution-weighted (use --rollup for their percentiles)
+AGGREGATES = {
+    'executions': """
+  COUNT(*) AS executions,
+  COUNT(*) FILTER (WHERE status = 'success') AS successful,
+  COUNT(*) FILTER (WHERE status = 'error') AS failed,
+  ROUND(AVG(duration_ms), 1) AS avg_duration_ms,
+  ROUND(quantile_cont(duration_ms, 0.95), 1) AS p95_duration_ms,
+  MAX(duration_ms) AS max_duration_ms
+""",
+    'summaries': """
+  SUM(total_executions) AS executions,
+  SUM(successful) AS successful,
+  SUM(failed) AS failed,
+  ROUND(SUM(failed) * 100.0 / NULLIF(SUM(total_executions), 0), 2) AS failure_rate_percent,
+  ROUND(SUM(avg_duration_ms * total_executions)
+        / NULLIF(SUM(total_executions) FILTER (WHERE avg_duration_ms IS NOT NULL), 0), 1) AS avg_duration_ms
+"""
+}
+
+
+def date_range(start_date: str, end_date: str) -> List[str]:
+    """Inclusive list of YYYY-MM-DD dates"""
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    end = datetime.strptime(end_date, "%Y-%m-%d")
+    if end < start:
+        raise ValueError("end date is before start date")
+    return [(start + timedelta(days=offset)).strftime("%Y-%m-%d")
+            for offset in range((end - start).days + 1)]
+
+
+class ExportLogQuery:
+    """Prunes exported objects by path and queries them with DuckDB"""
+
+    def __init__(self, storage: ExportStorage, gcs_prefix: str = 'n8n', workers: int = 8):
+        self.storage = storage
+        self.gcs_prefix = gcs_prefix
+        self.workers = workers
+
+    def find_objects(self,
+                     dates: List[str],
+                     saas_edge_ids: Optional[List[str]] = None,
+                     job_types: Optional[List[str]] = None,
+                     channels: Optional[List[str]] = None,
+                     view: str = 'executions') -> List[Dict[str, Any]]:
+        """Resolve the objects (daily or compacted members) that can contain matching rows"""
+        return resolve_objects(self.storage, self.gcs_prefix, dates, VIEW_OBJECT_TYPES[view],
+                               saas_edge_ids, job_types, channels)
+
+    def _fetch(self, path: str) -> Tuple[str, Optional[bytes]]:
+        return path, self.storage.read_bytes(path)
+
+    def iter_rows(self, objects: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Fetch objects in parallel (bounded) and yield their rows in order
+
+        Compacted days share one monthly object, so each path is downloaded once
+        and every requested member is sliced out of it.
+        """
+        by_path: Dict[str, List[Dict[str, Any]]] = {}
+        for obj in objects:
+            by_path.setdefault(obj['path'], []).append(obj)
+        paths = list(by_path)
+
+        chunk_size = max(self.workers * 4, 1)
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for start in range(0, len(paths), chunk_size):
+                for path, data in pool.map(self._fetch, paths[start:start + chunk_size]):
+                    if data is None:
+                        continue
+                    for obj in by_path[path]:
+                        yield from decode_rows(obj, member_bytes(obj, data))
+
+    def load(self, con, objects: List[Dict[str, Any]], view: str, spool_dir: str) -> int:
+        """Stream matching objects to NDJSON on disk and expose them as a view"""
+        spool_path = os.path.join(spool_dir, f"{view}.ndjson")
+        row_count = 0
+        with open(spool_path, 'w') as spool:
+            for row in self.iter_rows(objects):
+                # Sketches are only meaningful to --rollup, not as SQL columns
+                row.pop('duration_sketch', None)
+                spool.write(json.dumps(row, default=str))
+                spool.write('\n')
+                row_count += 1
+
+        if row_count:
+            quoted_path = spool_path.replace("'", "''")
+            casts = ', '.join(f"TRY_CAST({col} AS DOUBLE) AS {col}" for col in NUMERIC_COLUMNS[view])
+            con.execute(
+                f"CREATE VIEW {view} AS SELECT * REPLACE ({casts}) "
+                f"FROM read_json_auto('{quoted_path}', format='newline_delimited')"
+            )
+        return row_count
+
+    def run(self,
+            start_date: str,
+            end_date: Optional[str] = None,
+            saas_edge_ids: Optional[List[str]] = None,
+            job_types: Optional[List[str]] = None,
+            channels: Optional[List[str]] = None,
+            statuses: Optional[List[str]] = None,
+            where: Optional[str] = None,
+            group_by: Optional[List[str]] = None,
+            sql: Optional[str] = None,
+            view: str = 'executions',
+            limit: int = 1000) -> Tuple[List[str], List[tuple]]:
+        """Prune, load and query; returns (column names, rows)"""
+        if statuses and view == 'summaries':
+            raise ValueError("--status filters executions; the summaries view has no status column")
+        dates = date_range(start_date, end_date or start_date)
+        objects = self.find_objects(dates, saas_edge_ids, job_types, channels, view)
+        logger.info(f"Partition pruning selected {len(objects)} object(s) across {len(dates)} date(s)")
+
+        con = duckdb.connect()
+        with tempfile.TemporaryDirectory(prefix='n8n_log_query_') as spool_dir:
+            row_count = self.load(con, objects, view, spool_dir)
+            logger.info(f"Loaded {row_count} {view} row(s)")
+            if not row_count:
+                return [], []
+
+            if sql:
+                result = con.execute(sql)
+            else:
+                conditions, params = [], []
+                if statuses:
+                    conditions.append(f"status IN ({', '.join('?' for _ in statuses)})")
+                    params.extend(statuses)
+                if where:
+                    conditions.append(f"({where})")
+                where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+                if group_by:
+                    columns = ', '.join(group_by)
+                    query = (f"SELECT {columns}, {AGGREGATES[view]} FROM {view} {where_clause} "
+                             f"GROUP BY {columns} ORDER BY {columns} LIMIT {int(limit)}")
+                else:
+                    query = f"SELECT * FROM {view} {where_clause} LIMIT {int(limit)}"
+                result = con.execute(query, params)
+
+            columns = [desc[0] for desc in result.description]
+            return columns, result.fetchall()
+
+    def rollup(self,
+               start_date: str,
+               end_date: Optional[str] = None,
+               saas_edge_ids: Optional[List[str]] = None,
+               job_types: Optional[List[str]] = None,
+               channels: Optional[List[str]] = None,
+               period: str = 'month') -> Tuple[List[str], List[tuple]]:
+        """Weekly or monthly percentiles per group from the daily summary sketches"""
+        dates = date_range(start_date, end_date or start_date)
+        objects = self.find_objects(dates, saas_edge_ids, job_types, channels, 'summaries')
+        logger.info(f"Rolling up {len(objects)} summary object(s) by {period}")
+
+        groups: Dict[tuple, List[Dict[str, Any]]] = {}
+        for row in self.iter_rows(objects):
+            day = datetime.strptime(row['execution_date'][:10], "%Y-%m-%d")
+            if period == 'week':
+                period_key = (day - timedelta(days=day.weekday())).strftime("%Y-%m-%d")
+            else:
+                period_key = day.strftime("%Y-%m")
+            key = (row['saas_edge_id'], row['job_type'], row['channel'], period_key)
+            groups.setdefault(key, []).append(row)
+
+        rows = []
+        for (edge_id, j_type, chan, period_key), group_rows in sorted(groups.items()):
+            merged = {'saas_edge_id': edge_id, 'job_type': j_type, 'channel': chan,
+                      'period': period_key, **rollup_summary_stats(group_rows)}
+            rows.append(tuple(merged.get(col) for col in ROLLUP_COLUMNS))
+        return (ROLLUP_COLUMNS if rows else []), rows
+
+
+def print_results(columns: List[str], rows: List[tuple], output_format: str):
+    """Print query results as a table, JSON or CSV"""
+    if not columns:
+        logger.info("No exported rows matched the filters")
+        return
+    if output_format == 'json':
+        print(json.dumps([dict(zip(columns, row)) for row in rows], indent=2, default=str))
+    elif output_format == 'csv':
+        writer = csv.writer(sys.stdout)
+        writer.writerow(columns)
+        writer.writerows(rows)
+    else:
+        cells = [[str(value) for value in row] for row in rows]
+        widths = [max([len(col)] + [len(r[i]) for r in cells]) for i, col in enumerate(columns)]
+        print('  '.join(col.ljust(widths[i]) for i, col in enumerate(columns)))
+        print('  '.join('-' * width for width in widths))
+        for row in cells:
+            print('  '.join(value.ljust(widths[i]) for i, value in enumerate(row)))
+        print(f"({len(rows)} rows)")
+
+
+def split_list(value: Optional[str]) -> Optional[List[str]]:
+    return [item.strip() for item in value.split(',') if item.strip()] if value else None
+
+
+def main():
+    """Main CLI entry point"""
+    parser = argparse.ArgumentParser(description="Query exported N8N logs without touching the database")
+    parser.add_argument("--start-date", required=True, help="First date (YYYY-MM-DD)")
+    parser.add_argument("--end-date", help="Last date, inclusive (defaults to start date)")
+    parser.add_argument("--saas-edge-id", help="Comma-separated tenant ids")
+    parser.add_argument("--job-type", help="Comma-separated job types")
+    parser.add_argument("--channel", help="Comma-separated channels")
+    parser.add_argument("--status", help="Comma-separated execution statuses (e.g. error)")
+    parser.add_argument("--where", help="Extra SQL filter, e.g. \"duration_ms > 5000\"")
+    parser.add_argument("--group-by", help="Comma-separated columns to aggregate by")
+    parser.add_argument("--sql", help="Run this SQL against the loaded view instead")
+    parser.add_argument("--summaries", action="store_true", help="Query daily summary objects (view 'summaries')")
+    parser.add_argument("--rollup", choices=['week', 'month'],
+                        help="Merge daily summary sketches into weekly/monthly percentiles per group")
+    parser.add_argument("--limit", type=int, default=1000, help="Maximum rows returned")
+    parser.add_argument("--workers", type=int, default=8, help="Parallel object downloads")
+    parser.add_argument("--format", choices=['table', 'json', 'csv'], default='table')
+
+    args = parser.parse_args()
+
+    try:
+        query = ExportLogQuery(get_export_storage(), workers=args.workers)
+        if args.rollup:
+            columns, rows = query.rollup(
+                start_date=args.start_date,
+                end_date=args.end_date,
+                saas_edge_ids=split_list(args.saas_edge_id),
+                job_types=split_list(args.job_type),
+                channels=split_list(args.channel),
+                period=args.rollup
+            )
+            print_results(columns, rows, args.format)
+            return
+
+        columns, rows = query.run(
+            start_date=args.start_date,
+            end_date=args.end_date,
+            saas_edge_ids=split_list(args.saas_edge_id),
+            job_types=split_list(args.job_type),
+            channels=split_list(args.channel),
+            statuses=split_list(args.status),
+            where=args.where,
+            group_by=split_list(args.group_by),
+            sql=args.sql,
+            view='summaries' if args.summaries else 'executions',
+            limit=args.limit
+        )
+        print_results(columns, rows, args.format)
+
+    except Exception as e:
+        logger.error(f"Query failed: {e}")
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Partition Maintenance for Webhook Logs and Edge Jobs
+====================================================
+
+Runs the retention policy in ``time_partition_policies``
+(``schemas/time_partitioning_migration.sql``) against the range-partitioned
+``saas_channel_webhook_logs`` and ``saas_edge_jobs`` tables:
+
+1. Pre-creates the next ``premake`` day/week partitions, so inserts never fall
+   into the DEFAULT partition
+2. Detaches (into the ``partition_archive`` schema) or drops partitions whose
+   upper bound is older than ``retention``
+3. Reports rows found in a DEFAULT partition, which means ``premake`` is too
+   small or rows arrive with far-future timestamps
+
+The DDL is done by the partition functions the migration installs, and
+``SELECT * FROM run_time_partition_maintenance();`` runs the same pass from
+pg_cron; this script adds dry runs, per-table runs and a status report.
+Schedule one of them at least daily.
+
+Usage:
+    python partition_maintenance.py [--dry-run]
+    python partition_maintenance.py --table saas_channel_webhook_logs
+    python partition_maintenance.py --status
+
+Requirements:
+    pip install psycopg2-binary python-dotenv
+"""
+
+import os
+import json
+import logging
+import argparse
+from typing import Dict, List, Optional, Any
+import psycopg2
+from psycopg2 import sql
+from psycopg2.extras import RealDictCursor
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+class PartitionMaintenance:
+    """Applies and reports time partition policies"""
+
+    def __init__(self, db_config: Dict[str, Any]):
+        self.db_config = db_config
+
+    def get_db_connection(self):
+        return psycopg2.connect(**self.db_config)
+
+    def policies(self, cursor, table: Optional[str] = None) -> List[Dict[str, Any]]:
+        cursor.execute("""
+            SELECT parent_table, partition_column, granularity, premake,
+                   retention::text AS retention, retention_action
+            FROM time_partition_policies
+            WHERE %s::text IS NULL OR parent_table = %s
+            ORDER BY parent_table;
+        """, (table, table))
+        rows = [dict(row) for row in cursor.fetchall()]
+        if table and not rows:
+            raise ValueError(f"No time_partition_policies row for {table}")
+        return rows
+
+    def run(self, table: Optional[str] = None, dry_run: bool = False) -> Dict[str, Any]:
+        """Create future partitions and expire old ones"""
+        conn = self.get_db_connection()
+        actions = []
+        try:
+            with conn, conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                # Fail fast if another session holds a lock on a partitioned table
+                cursor.execute("SET LOCAL lock_timeout = '10s';")
+                for policy in self.policies(cursor, table):
+                    parent = policy['parent_table']
+                    cursor.execute("""
+                        SELECT relkind FROM pg_class WHERE oid = to_regclass(%s);
+                    """, (parent,))
+                    row = cursor.fetchone()
+                    if not row or row['relkind'] != 'p':
+                        actions.append({'parent_table': parent, 'action': 'skipped',
+                                        'detail': 'table is not partitioned'})
+                        continue
+
+                    cursor.execute("SELECT * FROM ensure_time_partitions(%s, NULL, %s) AS name;",
+                                   (parent, dry_run))
+                    actions.extend({'parent_table': parent, 'partition_name': r['name'], 'action': 'created'}
+                                   for r in cursor.fetchall())
+
+                    cursor.execute("SELECT * FROM expire_time_partitions(%s, %s);", (parent, dry_run))
+                    actions.extend({'parent_table': parent, 'partition_name': r['partition_name'],
+                                    'action': 'dropped' if r['action'] == 'drop' else 'detached',
+                                    'detail': f"range_end {r['range_end'].isoformat()}"}
+                                   for r in cursor.fetchall())
+
+                    default_rows = self._default_rows(cursor, parent)
+                    if default_rows:
+                        logger.warning(f"{parent}: {default_rows} rows in the DEFAULT partition")
+                        actions.append({'parent_table': parent, 'action': 'default_rows',
+                                        'detail': f"{default_rows} rows outside every range partition"})
+        finally:
+            conn.close()
+
+        for action in actions:
+            logger.info(f"{'[dry run] ' if dry_run else ''}{action['parent_table']}: "
+                        f"{action['action']} {action.get('partition_name') or ''}")
+        return {'status': 'success', 'dry_run': dry_run, 'actions': actions}
+
+    def _default_rows(self, cursor, parent: str) -> int:
+        cursor.execute("SELECT partition_name FROM time_partitions(%s) WHERE is_default;", (parent,))
+        row = cursor.fetchone()
+        if not row:
+            return 0
+        cursor.execute(sql.SQL("SELECT count(*) AS rows FROM {};").format(sql.Identifier(row['partition_name'])))
+        return cursor.fetchone()['rows']
+
+    def status(self, table: Optional[str] = None) -> Dict[str, Any]:
+        """Partitions per table with bounds, estimated rows and size"""
+        conn = self.get_db_connection()
+        try:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                tables = []
+                for policy in self.policies(cursor, table):
+                    parent = policy['parent_table']
+                    cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s);", (parent,))
+                    row = cursor.fetchone()
+                    if not row or row['relkind'] != 'p':
+                        tables.append({**policy, 'partitioned': False})
+                        continue
+
+                    cursor.execute("""
+                        SELECT p.partition_name, p.range_start, p.range_end, p.is_default,
+                               GREATEST(c.reltuples, 0)::bigint AS estimated_rows,
+                               pg_total_relation_size(c.oid) AS size_bytes
+                        FROM time_partitions(%s) p
+                        JOIN pg_class c ON c.oid = to_regclass(p.partition_name);
+                    """, (parent,))
+                    partitions = []
+                    for part in cursor.fetchall():
+                        part = dict(part)
+                        for key in ('range_start', 'range_end'):
+                            if part[key] is not None:
+                                part[key] = part[key].isoformat()
+                        partitions.append(part)
+
+                    cursor.execute("""
+                        SELECT count(*) FILTER (WHERE range_start > now()) AS future_partitions,
+                               min(range_start) FILTER (WHERE range_start > '-infinity') AS oldest_range_start
+                        FROM time_partitions(%s) WHERE NOT is_default;
+                    """, (parent,))
+                    summary = cursor.fetchone()
+                    tables.append({
+                        **policy,
+                        'partitioned': True,
+                        'partitions': len(partitions),
+                        'future_partitions': summary['future_partitions'],
+                        'oldest_range_start': (summary['oldest_range_start'].isoformat()
+                                               if summary['oldest_range_start'] else None),
+                        'total_size_bytes': sum(p['size_bytes'] for p in partitions),
+                        'default_rows': self._default_rows(cursor, parent),
+                        'partition_list': partitions
+                    })
+                return {'status': 'success', 'tables': tables}
+        finally:
+            conn.close()
+
+
+def create_db_config() -> Dict[str, Any]:
+    """SaaS database connection settings from the environment"""
+    return {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'port': int(os.getenv('DB_PORT', '5432')),
+        'database': os.getenv('DB_NAME', 'catalog-edge-db'),
+        'user': os.getenv('DB_USER', 'postgres'),
+        'password': os.getenv('DB_PASSWORD', '')
+    }
+
+
+def main():
+    """Main CLI entry point"""
+    parser = argparse.ArgumentParser(description="Create and expire time partitions per retention policy")
+    parser.add_argument("--table", help="Only maintain this partitioned table")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would be created or expired")
+    parser.add_argument("--status", action="store_true", help="Show partitions instead of maintaining them")
+
+    args = parser.parse_args()
+
+    try:
+        maintenance = PartitionMaintenance(create_db_config())
+        if args.status:
+            result = maintenance.status(args.table)
+        else:
+            result = maintenance.run(args.table, dry_run=args.dry_run)
+        print(json.dumps(result, indent=2, default=str))
+
+    except Exception as e:
+        logger.error(f"Partition maintenance failed: {e}")
+        print(json.dumps({"status": "error", "message": str(e)}, indent=2))
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Retry-Chain Resolution for N8N Log Exports
+==========================================
+
+n8n records a retried execution with ``retryOf`` pointing at the execution it
+retried, so one logical job may appear as several executions. The exporters
+resolve the chains while they pass over a group's executions in id order
+(retries always get a higher id than the execution they retry) and add to
+every execution:
+
+- ``root_execution_id`` - id of the first attempt of the logical job
+- ``attempt_number``    - 1 for the first attempt, 2 for its first retry, ...
+- ``final_status``      - status of the latest attempt of the logical job
+
+The id index only covers the executions passed to the resolver (one group of
+one export day). A retry whose parent lies outside that window is attributed to
+the parent id with ``attempt_number`` None and ``retry_chain_truncated`` set.
+
+Exports that upload a group in several parts cannot wait for the whole group.
+``RetryChainIndex`` resolves the group's chains up front from the executions
+that take part in one (those with ``retryOf`` and their parents), which is
+usually a small share of the group, and annotates every other execution as a
+single-attempt job while the parts stream past.
+"""
+
+from typing import Dict, List, Optional, Any, Tuple
+
+
+class RetryChainResolver:
+    """Streaming retry-chain resolution over executions ordered by id"""
+
+    def __init__(self):
+        # execution id -> (root id, attempt number)
+        self.chains: Dict[str, Tuple[Any, Optional[int]]] = {}
+        # root id -> executions of the logical job, in id order
+        self.jobs: Dict[Any, List[Dict[str, Any]]] = {}
+
+    def add(self, execution: Dict[str, Any]) -> None:
+        """Annotate one execution with its root and attempt number"""
+        execution_id = execution['execution_id']
+        parent_id = execution.get('retryOf')
+
+        if parent_id in (None, ''):
+            root_id, attempt = execution_id, 1
+        elif str(parent_id) in self.chains:
+            # Attempts are numbered in id order, also when the same execution
+            # was retried more than once
+            root_id, parent_attempt = self.chains[str(parent_id)]
+            attempt = len(self.jobs[str(root_id)]) + 1 if parent_attempt is not None else None
+        else:
+            # Parent is outside the window; its own position is unknown
+            root_id = int(parent_id) if str(parent_id).isdigit() else parent_id
+            attempt = None
+            execution['retry_chain_truncated'] = True
+
+        self.chains[str(execution_id)] = (root_id, attempt)
+        execution['root_execution_id'] = root_id
+        execution['attempt_number'] = attempt
+        self.jobs.setdefault(str(root_id), []).append(execution)
+
+    def finish(self) -> Dict[str, Any]:
+        """Set final_status on every execution and return logical job counts"""
+        counts = {'logical_jobs': len(self.jobs), 'logical_successful': 0, 'logical_failed': 0,
+                  'retried_jobs': 0, 'retry_attempts': 0}
+
+        for attempts in self.jobs.values():
+            final_status = attempts[-1]['status']
+            for execution in attempts:
+                execution['final_status'] = final_status
+
+            if final_status == 'success':
+                counts['logical_successful'] += 1
+            elif final_status in ('error', 'crashed'):
+                counts['logical_failed'] += 1
+            retries = sum(1 for execution in attempts if execution.get('retryOf') not in (None, ''))
+            if retries:
+                counts['retried_jobs'] += 1
+                counts['retry_attempts'] += retries
+
+        return with_logical_rates(counts)
+
+
+def with_logical_rates(counts: Dict[str, Any]) -> Dict[str, Any]:
+    """Add the logical success/failure rates to logical job counts"""
+    total = counts['logical_jobs']
+    counts['logical_success_rate_percent'] = round(counts['logical_successful'] / total * 100, 2) if total else None
+    counts['logical_failure_rate_percent'] = round(counts['logical_failed'] / total * 100, 2) if total else None
+    return counts
+
+
+class RetryChainIndex:
+    """Retry chains of one group, resolved before its executions are streamed
+
+    chain_executions holds ``execution_id``, ``retryOf`` and ``status`` of the
+    group's executions that retry or were retried; any other execution of the
+    group is a job of its own.
+    """
+
+    def __init__(self, chain_executions: List[Dict[str, Any]]):
+        resolver = RetryChainResolver()
+        for execution in sorted(chain_executions, key=lambda e: e['execution_id']):
+            resolver.add(execution)
+        self.counts = resolver.finish()
+        self.chained = {str(execution['execution_id']): execution for execution in chain_executions}
+
+    def annotate(self, execution: Dict[str, Any]) -> None:
+        """Set root_execution_id, attempt_number and final_status on one execution"""
+        chained = self.chained.get(str(execution['execution_id']))
+        if chained is None:
+            execution['root_execution_id'] = execution['execution_id']
+            execution['attempt_number'] = 1
+            execution['final_status'] = execution['status']
+            self.counts['logical_jobs'] += 1
+            if execution['status'] == 'success':
+                self.counts['logical_successful'] += 1
+            elif execution['status'] in ('error', 'crashed'):
+                self.counts['logical_failed'] += 1
+            return
+
+        execution['root_execution_id'] = chained['root_execution_id']
+        execution['attempt_number'] = chained['attempt_number']
+        execution['final_status'] = chained['final_status']
+        if chained.get('retry_chain_truncated'):
+            execution['retry_chain_truncated'] = True
+
+    def finish(self) -> Dict[str, Any]:
+        """Logical job counts of the group, once every execution was annotated"""
+        return with_logical_rates(self.counts)
+
+
+def resolve_retry_chains(executions: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Annotate a group's executions in place and return its logical job counts"""
+    resolver = RetryChainResolver()
+    for execution in sorted(executions, key=lambda e: e['execution_id']):
+        resolver.add(execution)
+    return resolver.finish()
@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+"""
+Push Stream of Edge Job and Flow Status Changes
+===============================================
+
+Listens on the ``saas_status_events`` channel fed by the triggers in
+``schemas/status_change_notify.sql`` and fans each job/flow status transition
+out to in-process callbacks or to Server-Sent Events clients, so portals and
+orchestrators no longer poll ``saas_edge_jobs`` and
+``saas_channel_installed_flows``.
+
+NOTIFY messages sent while no connection is listening are lost, so after every
+(re)connect the subscriber first LISTENs and then catches up by reading rows
+whose ``updated_at`` is past its cursor (minus a small overlap for
+transactions that committed late). Catch-up events carry the current status
+with ``"catch_up": true`` and no ``previous_status``; events the subscriber has
+already delivered are suppressed. Delivery is at-least-once: consumers should
+treat an event as "this job/flow is now in status X".
+
+SSE endpoint (``--serve``):
+    GET /events?saas_edge_id=<uuid>&kinds=job,flow
+        id: <updated_at>     event: job|flow     data: <event JSON>
+    A reconnecting EventSource sends Last-Event-ID and receives the changes it
+    missed before live events. GET /health returns subscriber counters.
+
+Usage:
+    subscriber = StatusEventSubscriber(create_db_config()).start()
+    subscriber.subscribe(lambda event: print(event), saas_edge_id=edge_id, kinds=['job'])
+
+    python status_event_stream.py [--saas-edge-id ...] [--since 2024-01-15T10:00:00Z]
+    python status_event_stream.py --serve --port 8090
+
+Requirements:
+    pip install psycopg2-binary python-dotenv
+"""
+
+import os
+import json
+import queue
+import select
+import logging
+import argparse
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Any, Callable, Iterable
+from urllib.parse import urlparse, parse_qs
+import psycopg2
+from psycopg2.extras import RealDictCursor
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+STATUS_CHANNEL = 'saas_status_events'
+
+CHANGES_QUERY = """
+SELECT * FROM (
+  SELECT 'job' AS kind, job_id::text AS id, saas_edge_id::text AS saas_edge_id,
+         job_status AS status, job_type, NULL AS channel_id, updated_at
+  FROM saas_edge_jobs
+  WHERE updated_at >= %(since)s
+    AND (%(edge)s::uuid IS NULL OR saas_edge_id = %(edge)s::uuid)
+    AND 'job' = ANY(%(kinds)s)
+  UNION ALL
+  SELECT 'flow', saas_flow_id::text, saas_edge_id::text,
+         status, NULL, channel_id::text, updated_at
+  FROM saas_channel_installed_flows
+  WHERE updated_at >= %(since)s
+    AND (%(edge)s::uuid IS NULL OR saas_edge_id = %(edge)s::uuid)
+    AND 'flow' = ANY(%(kinds)s)
+) changes
+ORDER BY updated_at
+LIMIT %(limit)s;
+"""
+
+
+def parse_timestamp(value: Any) -> Optional[datetime]:
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+
+
+def fetch_changes(conn,
+                  since: datetime,
+                  saas_edge_id: Optional[str] = None,
+                  kinds: Iterable[str] = ('job', 'flow'),
+                  limit: int = 1000) -> List[Dict[str, Any]]:
+    """Current status of jobs/flows updated at or after since, oldest first"""
+    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        cursor.execute(CHANGES_QUERY, {'since': since, 'edge': saas_edge_id,
+                                       'kinds': list(kinds), 'limit': limit})
+        rows = cursor.fetchall()
+    events = []
+    for row in rows:
+        event = {'kind': row['kind'], 'id': row['id'], 'saas_edge_id': row['saas_edge_id'],
+                 'status': row['status'], 'previous_status': None,
+                 'updated_at': row['updated_at'].isoformat(), 'catch_up': True}
+        event['job_type' if row['kind'] == 'job' else 'channel_id'] = row['job_type'] or row['channel_id']
+        events.append(event)
+    return events
+
+
+class StatusEventSubscriber:
+    """LISTENs for status events and dispatches them to subscribed callbacks"""
+
+    def __init__(self,
+                 db_config: Dict[str, Any],
+                 since: Optional[datetime] = None,
+                 catchup_overlap_seconds: float = 5.0,
+                 catchup_page_size: int = 1000,
+                 keepalive_interval: float = 30.0,
+                 reconnect_max_delay: float = 30.0,
+                 remembered_entities: int = 100000):
+        self.db_config = db_config
+        self.cursor_at = parse_timestamp(since)
+        self.catchup_overlap = timedelta(seconds=catchup_overlap_seconds)
+        self.catchup_page_size = catchup_page_size
+        self.keepalive_interval = keepalive_interval
+        self.reconnect_max_delay = reconnect_max_delay
+        self.remembered_entities = remembered_entities
+
+        # (kind, id) -> (status, updated_at) of the last delivered event, LRU-bounded
+        self.last_seen: OrderedDict = OrderedDict()
+        self.subscribers: Dict[int, Dict[str, Any]] = {}
+        self.next_token = 1
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.connected = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        self.conn = None
+        self.stats = {'notifications': 0, 'caught_up': 0, 'delivered': 0, 'duplicates': 0,
+                      'callback_errors': 0, 'malformed': 0, 'reconnects': 0}
+
+    def subscribe(self,
+                  callback: Callable[[Dict[str, Any]], None],
+                  saas_edge_id: Optional[str] = None,
+                  kinds: Optional[Iterable[str]] = None) -> int:
+        """Register a callback, optionally filtered by tenant and kind; returns a token"""
+        with self.lock:
+            token = self.next_token
+            self.next_token += 1
+            self.subscribers[token] = {'callback': callback, 'saas_edge_id': saas_edge_id,
+                                       'kinds': set(kinds) if kinds else None}
+            return token
+
+    def unsubscribe(self, token: int) -> None:
+        with self.lock:
+            self.subscribers.pop(token, None)
+
+    def start(self) -> 'StatusEventSubscriber':
+        if self.thread is None:
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self.run, name='status-event-subscriber', daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+            self.thread = None
+
+    def metrics(self) -> Dict[str, Any]:
+        with self.lock:
+            return {**self.stats, 'subscribers': len(self.subscribers), 'connected': self.connected.is_set(),
+                    'cursor': self.cursor_at.isoformat() if self.cursor_at else None}
+
+    def run(self) -> None:
+        """Listen until stop(), reconnecting with backoff"""
+        delay = 1.0
+        while not self.stop_event.is_set():
+            try:
+                self._connect()
+                delay = 1.0
+                self._listen()
+            except (psycopg2.Error, OSError) as e:
+                self.stats['reconnects'] += 1
+                logger.warning(f"Status event connection lost ({e}); reconnecting in {delay:.0f}s")
+                self.stop_event.wait(delay)
+                delay = min(delay * 2, self.reconnect_max_delay)
+            finally:
+                self.connected.clear()
+                if self.conn is not None:
+                    self.conn.close()
+                    self.conn = None
+
+    def _connect(self) -> None:
+        self.conn = psycopg2.connect(**self.db_config)
+        self.conn.autocommit = True
+        with self.conn.cursor() as cursor:
+            # LISTEN before catching up, so nothing committed in between is missed
+            cursor.execute(f"LISTEN {STATUS_CHANNEL};")
+            if self.cursor_at is None:
+                cursor.execute("SELECT now();")
+                self.cursor_at = cursor.fetchone()[0]
+        self._catch_up()
+        self.connected.set()
+        logger.info(f"Listening on {STATUS_CHANNEL} from {self.cursor_at.isoformat()}")
+
+    def _catch_up(self) -> None:
+        since = self.cursor_at - self.catchup_overlap
+        while True:
+            events = fetch_changes(self.conn, since, limit=self.catchup_page_size)
+            for event in events:
+                self.stats['caught_up'] += 1
+                self._dispatch(event)
+            if len(events) < self.catchup_page_size:
+                return
+            last = parse_timestamp(events[-1]['updated_at'])
+            if last <= since:
+                logger.warning(f"More than {self.catchup_page_size} changes share updated_at {last}; "
+                               f"raise catchup_page_size")
+                return
+            since = last
+
+    def _listen(self) -> None:
+        idle = 0.0
+        while not self.stop_event.is_set():
+            if select.select([self.conn], [], [], 1.0) == ([], [], []):
+                idle += 1.0
+                if idle >= self.keepalive_interval:
+                    # Detects a silently dropped connection
+                    with self.conn.cursor() as cursor:
+                        cursor.execute("SELECT 1;")
+                    idle = 0.0
+                continue
+            idle = 0.0
+            self.conn.poll()
+            while self.conn.notifies:
+                notify = self.conn.notifies.pop(0)
+                self.stats['notifications'] += 1
+                try:
+                    event = json.loads(notify.payload)
+                except ValueError:
+                    event = None
+                if not isinstance(event, dict):
+                    self.stats['malformed'] += 1
+                    logger.warning(f"Ignoring malformed status event: {notify.payload[:200]}")
+                    continue
+                self._dispatch(event)
+
+    def _dispatch(self, event: Dict[str, Any]) -> None:
+        try:
+            updated_at = parse_timestamp(event.get('updated_at'))
+        except ValueError:
+            # A bad timestamp must not take the listener down with it
+            self.stats['malformed'] += 1
+            logger.warning(f"Ignoring status event with invalid updated_at: {event.get('updated_at')!r}")
+            return
+        key = (event.get('kind'), event.get('id'))
+        seen = self.last_seen.get(key)
+        if seen is not None:
+            seen_status, seen_at = seen
+            # Already delivered this state, or a newer one
+            if (updated_at is not None and seen_at is not None and updated_at < seen_at) or \
+                    (event.get('catch_up') and seen_status == event.get('status')) or \
+                    (seen_status == event.get('status') and seen_at == updated_at):
+                self.stats['duplicates'] += 1
+                return
+
+        self.last_seen[key] = (event.get('status'), updated_at)
+        self.last_seen.move_to_end(key)
+        if len(self.last_seen) > self.remembered_entities:
+            self.last_seen.popitem(last=False)
+        if updated_at is not None and (self.cursor_at is None or updated_at > self.cursor_at):
+            self.cursor_at = updated_at
+
+        with self.lock:
+            subscribers = list(self.subscribers.values())
+        for subscriber in subscribers:
+            if subscriber['saas_edge_id'] and subscriber['saas_edge_id'] != event.get('saas_edge_id'):
+                continue
+            if subscriber['kinds'] and event.get('kind') not in subscriber['kinds']:
+                continue
+            try:
+                subscriber['callback'](event)
+                self.stats['delivered'] += 1
+            except Exception as e:
+                self.stats['callback_errors'] += 1
+                logger.error(f"Status event callback failed: {e}")
+
+
+class StatusEventSSEServer:
+    """Serves the subscriber's events as Server-Sent Events"""
+
+    def __init__(self,
+                 subscriber: StatusEventSubscriber,
+                 host: str = '0.0.0.0',
+                 port: int = 8090,
+                 client_queue_size: int = 1000,
+                 heartbeat_seconds: float = 15.0):
+        self.subscriber = subscriber
+        self.client_queue_size = client_queue_size
+        self.heartbeat_seconds = heartbeat_seconds
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+
+    def serve_forever(self) -> None:
+        logger.info(f"Serving status events on http://{self.httpd.server_address[0]}:"
+                    f"{self.httpd.server_address[1]}/events")
+        self.httpd.serve_forever()
+
+    def shutdown(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+            def _json(self, status: int, body: Dict[str, Any]) -> None:
+                data = json.dumps(body, default=str).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == '/health':
+                    self._json(200, {'status': 'success', **server.subscriber.metrics()})
+                elif url.path == '/events':
+                    self._stream(parse_qs(url.query))
+                else:
+                    self._json(404, {'status': 'error', 'message': 'not found'})
+
+            def _send(self, event: Dict[str, Any]) -> None:
+                self.wfile.write(f"id: {event['updated_at']}\nevent: {event['kind']}\n"
+                                 f"data: {json.dumps(event)}\n\n".encode('utf-8'))
+
+            def _stream(self, params: Dict[str, List[str]]) -> None:
+                saas_edge_id = params.get('saas_edge_id', [None])[0]
+                kinds = params.get('kinds', ['job,flow'])[0].split(',')
+                events: queue.Queue = queue.Queue(maxsize=server.client_queue_size)
+                overflowed = threading.Event()
+
+                def enqueue(event):
+                    try:
+                        events.put_nowait(event)
+                    except queue.Full:
+                        overflowed.set()
+
+                token = server.subscriber.subscribe(enqueue, saas_edge_id, kinds)
+                try:
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/event-stream')
+                    self.send_header('Cache-Control', 'no-cache')
+                    self.send_header('X-Accel-Buffering', 'no')
+                    self.end_headers()
+
+                    last_event_id = self.headers.get('Last-Event-ID')
+                    if last_event_id:
+                        conn = psycopg2.connect(**server.subscriber.db_config)
+                        try:
+                            for event in fetch_changes(conn, parse_timestamp(last_event_id), saas_edge_id,
+                                                       kinds, limit=server.client_queue_size):
+                                self._send(event)
+                        finally:
+                            conn.close()
+                    self.wfile.flush()
+
+                    while not server.subscriber.stop_event.is_set():
+                        if overflowed.is_set():
+                            # Slow client: drop it; EventSource reconnects with Last-Event-ID
+                            logger.warning(f"Closing slow SSE client {self.client_address[0]}")
+                            return
+                        try:
+                            self._send(events.get(timeout=server.heartbeat_seconds))
+                        except queue.Empty:
+                            self.wfile.write(b": keepalive\n\n")
+                        self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    server.subscriber.unsubscribe(token)
+
+        return Handler
+
+
+def create_db_config() -> Dict[str, Any]:
+    """SaaS database connection settings from the environment"""
+    return {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'port': int(os.getenv('DB_PORT', '5432')),
+        'database': os.getenv('DB_NAME', 'catalog-edge-db'),
+        'user': os.getenv('DB_USER', 'postgres'),
+        'password': os.getenv('DB_PASSWORD', '')
+    }
+
+
+def main():
+    """Main CLI entry point"""
+    load_dotenv()
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description="Stream edge job and flow status changes")
+    parser.add_argument("--serve", action="store_true", help="Serve Server-Sent Events over HTTP")
+    parser.add_argument("--host", default="0.0.0.0", help="SSE bind address")
+    parser.add_argument("--port", type=int, default=int(os.getenv('STATUS_EVENTS_PORT', '8090')),
+                        help="SSE port")
+    parser.add_argument("--saas-edge-id", help="Only print events of this tenant")
+    parser.add_argument("--kinds", default="job,flow", help="Comma-separated event kinds to print")
+    parser.add_argument("--since", help="Catch up from this ISO timestamp before streaming")
+
+    args = parser.parse_args()
+
+    try:
+        subscriber = StatusEventSubscriber(create_db_config(), since=parse_timestamp(args.since))
+        if args.serve:
+            subscriber.start()
+            StatusEventSSEServer(subscriber, args.host, args.port).serve_forever()
+        else:
+            subscriber.subscribe(lambda event: print(json.dumps(event), flush=True),
+                                 args.saas_edge_id, args.kinds.split(','))
+            subscriber.run()
+
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        logger.error(f"Status event stream failed: {e}")
+        print(json.dumps({"status": "error", "message": str(e)}, indent=2))
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Incremental Hourly Webhook Activity Rollup
+==========================================
+
+Maintains ``webhook_activity_hourly`` (``schemas/webhook_activity_rollup.sql``)
+from ``saas_channel_webhook_logs``. Each run only reads log rows received
+between the stored watermark and ``now() - settle_seconds``:
+
+1. Locks the watermark row in ``rollup_watermarks`` (concurrent runs queue up)
+2. Aggregates the new rows per (hour, saas_edge_id, channel_id) and response time
+3. Merges them into the existing hourly rows: counts and sums are added and the
+   latency sketches merged, from which p95 is recomputed
+4. Advances the watermark in the same transaction, so a failed run leaves no
+   partial state
+
+``settle_seconds`` covers rows that are committed after their ``received_at``
+(e.g. batched by ``webhook_log_ingestor.py``); rows that arrive later than that
+are not counted until the affected hours are rebuilt with ``--rebuild-from``.
+Long gaps are processed in windows of ``--max-window-hours``, one transaction
+each. Schedule the refresher every minute or few minutes.
+
+Usage:
+    python webhook_activity_rollup.py
+    python webhook_activity_rollup.py --settle-seconds 300 --retention-days 90
+    python webhook_activity_rollup.py --rebuild-from 2024-01-15T00:00:00Z
+
+Requirements:
+    pip install psycopg2-binary python-dotenv
+"""
+
+import os
+import json
+import logging
+import argparse
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Any, Tuple
+import psycopg2
+from psycopg2.extras import RealDictCursor, execute_values
+from dotenv import load_dotenv
+from latency_sketch import LatencySketch
+
+# Load environment variables
+load_dotenv()
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+ROLLUP_NAME = 'webhook_activity_hourly'
+
+RollupKey = Tuple[datetime, str, str]
+
+COUNT_COLUMNS = ('total_requests', 'successful_requests', 'error_requests',
+                 'client_error_requests', 'server_error_requests')
+
+# New log rows per hour, tenant, channel and response time. Grouping by the
+# integer response time keeps the result small and lets the sketch be built
+# from (value, count) pairs.
+NEW_ROWS_QUERY = """
+SELECT
+  date_trunc('hour', w.received_at) AS activity_hour,
+  w.saas_edge_id::text AS saas_edge_id,
+  f.channel_id::text AS channel_id,
+  cm.channel_name,
+  w.response_time_ms,
+  COUNT(*) AS total_requests,
+  COUNT(*) FILTER (WHERE w.processing_status = 'success') AS successful_requests,
+  COUNT(*) FILTER (WHERE w.processing_status = 'error') AS error_requests,
+  COUNT(*) FILTER (WHERE w.response_status BETWEEN 400 AND 499) AS client_error_requests,
+  COUNT(*) FILTER (WHERE w.response_status >= 500) AS server_error_requests
+FROM saas_channel_webhook_logs w
+JOIN saas_channel_installed_flows f ON w.saas_flow_id = f.saas_flow_id
+JOIN saas_channel_master cm ON f.channel_id = cm.channel_id
+WHERE w.received_at >= %s AND w.received_at < %s
+GROUP BY 1, 2, 3, 4, 5;
+"""
+
+
+class WebhookActivityRollup:
+    """Folds new webhook log rows into webhook_activity_hourly"""
+
+    def __init__(self,
+                 db_config: Dict[str, Any],
+                 settle_seconds: int = 120,
+                 max_window_hours: int = 6,
+                 backfill_hours: int = 24):
+        self.db_config = db_config
+        self.settle = timedelta(seconds=settle_seconds)
+        self.max_window = timedelta(hours=max_window_hours)
+        self.backfill = timedelta(hours=backfill_hours)
+
+    def get_db_connection(self):
+        return psycopg2.connect(**self.db_config)
+
+    def _lock_watermark(self, cursor) -> datetime:
+        """Lock the watermark row, creating it at the backfill start on first run"""
+        cursor.execute("""
+            INSERT INTO rollup_watermarks (rollup_name, watermark)
+            VALUES (%s, date_trunc('hour', now() - %s))
+            ON CONFLICT (rollup_name) DO NOTHING;
+        """, (ROLLUP_NAME, self.backfill))
+        cursor.execute("""
+            SELECT watermark FROM rollup_watermarks WHERE rollup_name = %s FOR UPDATE;
+        """, (ROLLUP_NAME,))
+        return cursor.fetchone()['watermark']
+
+    def _aggregate(self, cursor, start: datetime, end: datetime) -> Dict[RollupKey, Dict[str, Any]]:
+        cursor.execute(NEW_ROWS_QUERY, (start, end))
+        groups: Dict[RollupKey, Dict[str, Any]] = {}
+        for row in cursor.fetchall():
+            key = (row['activity_hour'], row['saas_edge_id'], row['channel_id'])
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = {'channel_name': row['channel_name'], 'sketch': LatencySketch(),
+                                       **{col: 0 for col in COUNT_COLUMNS}}
+            for col in COUNT_COLUMNS:
+                group[col] += row[col]
+            if row['response_time_ms'] is not None:
+                group['sketch'].add(row['response_time_ms'], count=row['total_requests'])
+        return groups
+
+    def _merge(self, cursor, groups: Dict[RollupKey, Dict[str, Any]]) -> int:
+        """Add the new aggregates to the stored hourly rows and upsert them"""
+        hours = sorted({key[0] for key in groups})
+        cursor.execute("""
+            SELECT activity_hour, saas_edge_id::text AS saas_edge_id, channel_id::text AS channel_id,
+                   total_requests, successful_requests, error_requests,
+                   client_error_requests, server_error_requests, response_time_sketch
+            FROM webhook_activity_hourly
+            WHERE activity_hour = ANY(%s)
+            FOR UPDATE;
+        """, (hours,))
+        existing = {(row['activity_hour'], row['saas_edge_id'], row['channel_id']): row
+                    for row in cursor.fetchall()}
+
+        rows = []
+        for key, group in groups.items():
+            sketch = group['sketch']
+            stored = existing.get(key)
+            if stored:
+                for col in COUNT_COLUMNS:
+                    group[col] += stored[col]
+                if stored['response_time_sketch']:
+                    sketch.merge(LatencySketch.from_dict(stored['response_time_sketch']))
+
+            p95 = sketch.quantile(0.95)
+            rows.append((
+                key[0], key[1], key[2], group['channel_name'],
+                *(group[col] for col in COUNT_COLUMNS),
+                sketch.count, round(sketch.sum),
+                int(sketch.max) if sketch.max is not None else None,
+                round(p95, 2) if p95 is not None else None,
+                json.dumps(sketch.to_dict())
+            ))
+
+        execute_values(cursor, f"""
+            INSERT INTO webhook_activity_hourly (
+              activity_hour, saas_edge_id, channel_id, channel_name, {', '.join(COUNT_COLUMNS)},
+              response_time_count, response_time_sum_ms, max_response_time_ms,
+              p95_response_time_ms, response_time_sketch
+            ) VALUES %s
+            ON CONFLICT (activity_hour, saas_edge_id, channel_id) DO UPDATE SET
+              channel_name = EXCLUDED.channel_name,
+              {', '.join(f'{col} = EXCLUDED.{col}' for col in COUNT_COLUMNS)},
+              response_time_count = EXCLUDED.response_time_count,
+              response_time_sum_ms = EXCLUDED.response_time_sum_ms,
+              max_response_time_ms = EXCLUDED.max_response_time_ms,
+              p95_response_time_ms = EXCLUDED.p95_response_time_ms,
+              response_time_sketch = EXCLUDED.response_time_sketch,
+              updated_at = now();
+        """, rows, template="(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s::jsonb)")
+        return len(rows)
+
+    def refresh_window(self, target: datetime) -> Optional[Dict[str, Any]]:
+        """Process one window after the watermark, up to target; None when caught up"""
+        conn = self.get_db_connection()
+        try:
+            with conn, conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                watermark = self._lock_watermark(cursor)
+                upper = min(target, watermark + self.max_window)
+                if upper <= watermark:
+                    return None
+
+                groups = self._aggregate(cursor, watermark, upper)
+                requests = sum(group['total_requests'] for group in groups.values())
+                upserted = self._merge(cursor, groups) if groups else 0
+                cursor.execute("""
+                    UPDATE rollup_watermarks SET watermark = %s, updated_at = now()
+                    WHERE rollup_name = %s;
+                """, (upper, ROLLUP_NAME))
+
+                window = {
+                    'from': watermark.isoformat(),
+                    'to': upper.isoformat(),
+                    'requests': requests,
+                    'hourly_rows': upserted
+                }
+                logger.info(f"Rolled up {window['requests']} webhook requests from {window['from']} "
+                            f"to {window['to']} into {upserted} hourly rows")
+                return window
+        finally:
+            conn.close()
+
+    def refresh(self) -> Dict[str, Any]:
+        """Catch up to now() - settle_seconds, as of the start of the run"""
+        conn = self.get_db_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT now();")
+                target = cursor.fetchone()[0] - self.settle
+        finally:
+            conn.close()
+
+        windows = []
+        while True:
+            window = self.refresh_window(target)
+            if window is None:
+                break
+            windows.append(window)
+        return {
+            'status': 'success',
+            'windows': len(windows),
+            'requests': sum(window['requests'] for window in windows),
+            'hourly_rows': sum(window['hourly_rows'] for window in windows),
+            'watermark': windows[-1]['to'] if windows else None
+        }
+
+    def rebuild_from(self, start: datetime) -> None:
+        """Forget the rollup from start's hour on, so the next refresh recomputes it"""
+        conn = self.get_db_connection()
+        try:
+            with conn, conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                cursor.execute("SELECT date_trunc('hour', %s::timestamptz) AS hour;", (start,))
+                hour = cursor.fetchone()['hour']
+                self._lock_watermark(cursor)
+                cursor.execute("DELETE FROM webhook_activity_hourly WHERE activity_hour >= %s;", (hour,))
+                deleted = cursor.rowcount
+                cursor.execute("""
+                    UPDATE rollup_watermarks SET watermark = LEAST(watermark, %s), updated_at = now()
+                    WHERE rollup_name = %s;
+                """, (hour, ROLLUP_NAME))
+                logger.info(f"Cleared {deleted} hourly rows from {hour.isoformat()} for rebuild")
+        finally:
+            conn.close()
+
+    def apply_retention(self, retention_days: int) -> int:
+        conn = self.get_db_connection()
+        try:
+            with conn, conn.cursor() as cursor:
+                cursor.execute("""
+                    DELETE FROM webhook_activity_hourly WHERE activity_hour < now() - make_interval(days => %s);
+                """, (retention_days,))
+                return cursor.rowcount
+        finally:
+            conn.close()
+
+
+def create_db_config() -> Dict[str, Any]:
+    """SaaS database connection settings from the environment"""
+    return {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'port': int(os.getenv('DB_PORT', '5432')),
+        'database': os.getenv('DB_NAME', 'catalog-edge-db'),
+        'user': os.getenv('DB_USER', 'postgres'),
+        'password': os.getenv('DB_PASSWORD', '')
+    }
+
+
+def main():
+    """Main CLI entry point"""
+    parser = argparse.ArgumentParser(description="Incrementally refresh webhook_activity_hourly")
+    parser.add_argument("--settle-seconds", type=int, default=120,
+                        help="Only roll up rows received at least this long ago")
+    parser.add_argument("--max-window-hours", type=int, default=6,
+                        help="Largest span of log rows processed in one transaction")
+    parser.add_argument("--backfill-hours", type=int, default=24,
+                        help="History rolled up on the first run")
+    parser.add_argument("--rebuild-from", help="Recompute hours from this ISO timestamp on")
+    parser.add_argument("--retention-days", type=int, help="Delete hourly rows older than this")
+
+    args = parser.parse_args()
+
+    try:
+        rollup = WebhookActivityRollup(
+            create_db_config(),
+            settle_seconds=args.settle_seconds,
+            max_window_hours=args.max_window_hours,
+            backfill_hours=args.backfill_hours
+        )
+        if args.rebuild_from:
+            rollup.rebuild_from(datetime.fromisoformat(args.rebuild_from.replace('Z', '+00:00')))
+        result = rollup.refresh()
+        if args.retention_days:
+            result['expired_rows'] = rollup.apply_retention(args.retention_days)
+        print(json.dumps(result, indent=2))
+
+    except Exception as e:
+        logger.error(f"Webhook activity rollup failed: {e}")
+        print(json.dumps({"status": "error", "message": str(e)}, indent=2))
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Object Storage for Large Webhook Bodies
+=======================================
+
+Keeps large ``request_body`` / ``response_body`` payloads of
+``saas_channel_webhook_logs`` out of PostgreSQL. Bodies whose serialized JSON is
+larger than ``threshold_bytes`` are written gzip-compressed to the pluggable
+export storage (GCS or a local directory, see ``export_storage.py``) and the log
+row keeps only a pointer, the size and a SHA-256 of the JSON
+(``schemas/webhook_body_offload.sql``). Small bodies stay inline.
+
+Objects are stored as ``<prefix>/<YYYY-MM-DD>/<saas_edge_id>/<sha256>.json.gz``,
+so identical payloads of one tenant and day share an object and whole days can
+be purged once the log partitions they belong to have expired.
+
+``WebhookLogIngestor`` offloads bodies when given a ``body_store``;
+``WebhookLogReader`` loads a log row and fetches offloaded bodies only when
+they are asked for.
+
+Configuration (environment variables):
+    WEBHOOK_BODY_OFFLOAD_THRESHOLD_BYTES  Largest body kept inline (default 8192)
+    WEBHOOK_BODY_PREFIX                   Object prefix (default webhook_bodies)
+    WEBHOOK_BODY_BUCKET                   Bucket, if not GCS_BUCKET_NAME
+    EXPORT_STORAGE_BACKEND / GCS_BUCKET_NAME / EXPORT_LOCAL_ROOT (see export_storage.py)
+
+Usage:
+    python webhook_body_store.py --log-id 5b1e... [--bodies]
+    python webhook_body_store.py --purge-older-than-days 30 [--lookback-days 30] [--dry-run]
+
+Requirements:
+    pip install google-cloud-storage psycopg2-binary python-dotenv
+"""
+
+import os
+import io
+import gzip
+import json
+import hashlib
+import logging
+import argparse
+from datetime import datetime, date, timedelta, timezone
+from typing import Dict, Optional, Any
+import psycopg2
+from psycopg2.extras import RealDictCursor
+from dotenv import load_dotenv
+from export_storage import ExportStorage, get_export_storage
+
+logger = logging.getLogger(__name__)
+
+BODY_COLUMNS = ('request_body', 'response_body')
+
+# Added to the COPY column list when bodies are offloaded
+OFFLOAD_COLUMNS = tuple(f"{body}_{suffix}" for body in BODY_COLUMNS for suffix in ('ref', 'size_bytes', 'sha256'))
+
+
+def serialize_body(body: Any) -> bytes:
+    """Compact JSON, as the ingestor writes inline bodies"""
+    return json.dumps(body, default=str, separators=(',', ':')).encode('utf-8')
+
+
+class WebhookBodyStore:
+    """Writes and reads offloaded webhook bodies"""
+
+    def __init__(self,
+                 storage: ExportStorage,
+                 prefix: str = 'webhook_bodies',
+                 threshold_bytes: int = 8192,
+                 compression_level: int = 6):
+        self.storage = storage
+        self.prefix = prefix.rstrip('/')
+        self.threshold_bytes = threshold_bytes
+        self.compression_level = compression_level
+
+    @classmethod
+    def from_env(cls) -> 'WebhookBodyStore':
+        return cls(
+            get_export_storage(bucket_name=os.environ.get('WEBHOOK_BODY_BUCKET')),
+            prefix=os.environ.get('WEBHOOK_BODY_PREFIX', 'webhook_bodies'),
+            threshold_bytes=int(os.environ.get('WEBHOOK_BODY_OFFLOAD_THRESHOLD_BYTES', 8192))
+        )
+
+    def object_path(self, saas_edge_id: Any, received_at: Any, sha256: str) -> str:
+        if isinstance(received_at, datetime):
+            day = received_at.astimezone(timezone.utc).date().isoformat()
+        elif received_at:
+            day = str(received_at)[:10]
+        else:
+            day = datetime.now(timezone.utc).date().isoformat()
+        return f"{self.prefix}/{day}/{saas_edge_id}/{sha256}.json.gz"
+
+    columns = OFFLOAD_COLUMNS
+
+    def offload(self, record: Dict[str, Any]) -> int:
+        """Move large bodies of a log record to storage, in place
+
+        Sets <body>_size_bytes for every present body and <body>_ref /
+        <body>_sha256 for offloaded ones. A failed upload keeps the body inline.
+        Returns the number of body bytes moved out of the row.
+        """
+        offloaded = 0
+        for column in BODY_COLUMNS:
+            body = record.get(column)
+            if body is None:
+                continue
+            data = serialize_body(body)
+            record[f"{column}_size_bytes"] = len(data)
+            if len(data) <= self.threshold_bytes:
+                continue
+
+            sha256 = hashlib.sha256(data).hexdigest()
+            path = self.object_path(record.get('saas_edge_id'), record.get('received_at'), sha256)
+            buffer = io.BytesIO()
+            with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=self.compression_level, mtime=0) as gz:
+                gz.write(data)
+            try:
+                self.storage.write_bytes(path, buffer.getvalue(), content_type='application/gzip')
+            except Exception as e:
+                logger.warning(f"Keeping {len(data)} byte {column} inline, upload to {path} failed: {e}")
+                continue
+
+            record[column] = None
+            record[f"{column}_ref"] = path
+            record[f"{column}_sha256"] = sha256
+            offloaded += len(data)
+        return offloaded
+
+    def load(self, ref: str, sha256: Optional[str] = None) -> Any:
+        """Fetch an offloaded body, verifying its hash"""
+        compressed = self.storage.read_bytes(ref)
+        if compressed is None:
+            raise FileNotFoundError(f"Webhook body not found: {self.storage.uri(ref)}")
+        data = gzip.decompress(compressed)
+        if sha256 and hashlib.sha256(data).hexdigest() != sha256:
+            raise ValueError(f"Webhook body checksum mismatch: {ref}")
+        return json.loads(data)
+
+    def purge_before(self, cutoff: date, lookback_days: int = 30, dry_run: bool = False) -> Dict[str, Any]:
+        """Delete the objects of the lookback_days days before cutoff
+
+        Only day prefixes are listed, so a daily run never walks the whole bucket.
+        """
+        days = [cutoff - timedelta(days=offset) for offset in range(lookback_days, 0, -1)]
+        purged = []
+        deleted = 0
+        for day in days:
+            paths = list(self.storage.list(f"{self.prefix}/{day.isoformat()}/"))
+            if not paths:
+                continue
+            for path in paths:
+                if not dry_run:
+                    self.storage.delete(path)
+            purged.append(day.isoformat())
+            deleted += len(paths)
+        return {'days': purged, 'objects': deleted, 'dry_run': dry_run}
+
+
+class WebhookLogReader:
+    """Reads webhook log rows, loading offloaded bodies on demand"""
+
+    def __init__(self, db_config: Dict[str, Any], body_store: WebhookBodyStore):
+        self.db_config = db_config
+        self.body_store = body_store
+
+    def get_db_connection(self):
+        return psycopg2.connect(**self.db_config)
+
+    def get_log(self, log_id: str, include_bodies: bool = False) -> Optional[Dict[str, Any]]:
+        """One log row; offloaded bodies are replaced by their pointer unless include_bodies"""
+        conn = self.get_db_connection()
+        try:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                cursor.execute("SELECT * FROM saas_channel_webhook_logs WHERE log_id = %s;", (log_id,))
+                row = cursor.fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+
+        log = dict(row)
+        for column in BODY_COLUMNS:
+            ref = log.get(f"{column}_ref")
+            if not ref:
+                continue
+            if include_bodies:
+                log[column] = self.body_store.load(ref, log.get(f"{column}_sha256"))
+            else:
+                log[column] = {'offloaded': True, 'ref': ref,
+                               'size_bytes': log.get(f"{column}_size_bytes"),
+                               'sha256': log.get(f"{column}_sha256")}
+        return log
+
+    def get_body(self, log_id: str, column: str = 'request_body') -> Any:
+        """A single body, inline or from storage"""
+        if column not in BODY_COLUMNS:
+            raise ValueError(f"column must be one of {BODY_COLUMNS}")
+        conn = self.get_db_connection()
+        try:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                cursor.execute(f"""
+                    SELECT {column} AS body, {column}_ref AS ref, {column}_sha256 AS sha256
+                    FROM saas_channel_webhook_logs WHERE log_id = %s;
+                """, (log_id,))
+                row = cursor.fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            raise KeyError(f"Webhook log not found: {log_id}")
+        if row['ref']:
+            return self.body_store.load(row['ref'], row['sha256'])
+        return row['body']
+
+
+def create_db_config() -> Dict[str, Any]:
+    """SaaS database connection settings from the environment"""
+    return {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'port': int(os.getenv('DB_PORT', '5432')),
+        'database': os.getenv('DB_NAME', 'catalog-edge-db'),
+        'user': os.getenv('DB_USER', 'postgres'),
+        'password': os.getenv('DB_PASSWORD', '')
+    }
+
+
+def main():
+    """Main CLI entry point"""
+    load_dotenv()
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description="View webhook logs with offloaded bodies, or purge old bodies")
+    parser.add_argument("--log-id", help="Webhook log to show")
+    parser.add_argument("--bodies", action="store_true", help="Load offloaded bodies from storage")
+    parser.add_argument("--purge-older-than-days", type=int, help="Delete body objects of older days")
+    parser.add_argument("--lookback-days", type=int, default=30, help="Days before the cutoff to purge")
+    parser.add_argument("--dry-run", action="store_true", help="Report what --purge would delete")
+
+    args = parser.parse_args()
+    if not args.log_id and args.purge_older_than_days is None:
+        parser.error("--log-id or --purge-older-than-days is required")
+
+    try:
+        body_store = WebhookBodyStore.from_env()
+        if args.log_id:
+            log = WebhookLogReader(create_db_config(), body_store).get_log(args.log_id, include_bodies=args.bodies)
+            if log is None:
+                raise KeyError(f"Webhook log not found: {args.log_id}")
+            result: Any = log
+        else:
+            cutoff = datetime.now(timezone.utc).date() - timedelta(days=args.purge_older_than_days)
+            result = {'status': 'success', **body_store.purge_before(cutoff, args.lookback_days,
+                                                                         dry_run=args.dry_run)}
+        print(json.dumps(result, indent=2, default=str))
+
+    except Exception as e:
+        logger.error(f"Webhook body command failed: {e}")
+        print(json.dumps({"status": "error", "message": str(e)}, indent=2))
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Load Benchmark for the Webhook Log Ingestor
+===========================================
+
+Drives ``WebhookLogIngestor`` with synthetic webhook log records from several
+producer threads for a fixed duration and reports the sustained rate at which
+rows were committed to PostgreSQL, per-second throughput samples, drops and
+queue depth. ``--compare-insert`` also measures the single-row INSERT path the
+ingestor replaces.
+
+Rows are written to a scratch table (``webhook_logs_benchmark`` by default)
+created with the columns, defaults and indexes of ``saas_channel_webhook_logs``
+(or an equivalent definition when that table does not exist), so foreign keys
+do not have to be satisfied and production data is never touched. The table is
+dropped afterwards unless ``--keep-table`` is given; ``--table`` must end in
+``_benchmark`` so a production table is never dropped by mistake.
+
+Usage:
+    python webhook_ingestor_benchmark.py --duration 30 --producers 4
+    python webhook_ingestor_benchmark.py --rate 5000 --batch-size 1000 --overflow-policy drop_oldest
+    python webhook_ingestor_benchmark.py --duration 10 --compare-insert
+
+Requirements:
+    pip install psycopg2-binary python-dotenv
+"""
+
+import re
+import json
+import time
+import uuid
+import random
+import logging
+import argparse
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Any
+import psycopg2
+from dotenv import load_dotenv
+from webhook_log_ingestor import WebhookLogIngestor, WEBHOOK_LOG_COLUMNS, create_db_config
+
+# Load environment variables
+load_dotenv()
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Used when saas_channel_webhook_logs does not exist in the target database
+FALLBACK_TABLE_DDL = """
+CREATE TABLE {table} (
+  log_id              uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+  saas_flow_id        uuid,
+  saas_edge_id        uuid NOT NULL,
+  webhook_path        text NOT NULL,
+  http_method         text NOT NULL,
+  source_ip           inet,
+  user_agent          text,
+  request_headers     jsonb,
+  request_body        jsonb,
+  request_size_bytes  integer,
+  response_status     integer,
+  response_body       jsonb,
+  response_time_ms    integer,
+  processing_status   text,
+  error_message       text,
+  n8n_execution_id    text,
+  received_at         timestamptz DEFAULT now()
+);
+CREATE INDEX ON {table} (saas_flow_id);
+CREATE INDEX ON {table} (saas_edge_id);
+CREATE INDEX ON {table} (received_at);
+CREATE INDEX ON {table} (processing_status);
+"""
+
+# The benchmark drops and recreates its table, so it only accepts scratch names
+SCRATCH_TABLE_PATTERN = re.compile(r'^[a-z_][a-z0-9_]*_benchmark$')
+
+
+def check_scratch_table(table: str) -> None:
+    if not SCRATCH_TABLE_PATTERN.match(table):
+        raise ValueError(f"Refusing to use table '{table}': scratch table names must end in '_benchmark'")
+
+
+def create_benchmark_table(db_config: Dict[str, Any], table: str) -> None:
+    check_scratch_table(table)
+    conn = psycopg2.connect(**db_config)
+    try:
+        with conn, conn.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {table};")
+            cursor.execute("SELECT to_regclass('saas_channel_webhook_logs') IS NOT NULL;")
+            if cursor.fetchone()[0]:
+                cursor.execute(f"CREATE TABLE {table} "
+                               f"(LIKE saas_channel_webhook_logs INCLUDING DEFAULTS INCLUDING INDEXES);")
+            else:
+                cursor.execute(FALLBACK_TABLE_DDL.format(table=table))
+    finally:
+        conn.close()
+
+
+def drop_benchmark_table(db_config: Dict[str, Any], table: str) -> None:
+    check_scratch_table(table)
+    conn = psycopg2.connect(**db_config)
+    try:
+        with conn, conn.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {table};")
+    finally:
+        conn.close()
+
+
+def count_rows(db_config: Dict[str, Any], table: str) -> int:
+    conn = psycopg2.connect(**db_config)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"SELECT count(*) FROM {table};")
+            return cursor.fetchone()[0]
+    finally:
+        conn.close()
+
+
+class RecordFactory:
+    """Synthetic webhook log records shaped like production traffic"""
+
+    def __init__(self, tenants: int = 50, body_bytes: int = 512, seed: int = 7):
+        rng = random.Random(seed)
+        self.edges = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(tenants)]
+        self.flows = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(tenants * 4)]
+        self.paths = ['/webhook/shopify/orders', '/webhook/stripe/events', '/webhook/hubspot/contacts',
+                      '/webhook/slack/events', '/webhook/generic/ingest']
+        self.padding = 'x' * max(body_bytes - 120, 0)
+
+    def make(self, rng: random.Random) -> Dict[str, Any]:
+        failed = rng.random() < 0.02
+        body = {'id': rng.getrandbits(48), 'event': rng.choice(['created', 'updated', 'deleted']),
+                'amount': round(rng.random() * 500, 2), 'note': self.padding}
+        return {
+            'saas_flow_id': rng.choice(self.flows),
+            'saas_edge_id': rng.choice(self.edges),
+            'webhook_path': rng.choice(self.paths),
+            'http_method': 'POST',
+            'source_ip': f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}",
+            'user_agent': 'benchmark/1.0',
+            'request_headers': {'content-type': 'application/json', 'x-request-id': str(uuid.uuid4())},
+            'request_body': body,
+            'request_size_bytes': len(json.dumps(body)),
+            'response_status': 500 if failed else 200,
+            'response_body': {'ok': not failed},
+            'response_time_ms': int(rng.expovariate(1 / 40)),
+            'processing_status': 'error' if failed else 'success',
+            'error_message': 'upstream timeout' if failed else None,
+            'n8n_execution_id': str(rng.getrandbits(32)),
+            'received_at': datetime.now(timezone.utc)
+        }
+
+
+def run_producers(submit, factory: RecordFactory, producers: int, duration: float,
+                  rate: float) -> Dict[str, int]:
+    """Submit records from several threads, optionally paced to a total rate"""
+    counts = {'offered': 0, 'accepted': 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+    per_thread_interval = producers / rate if rate else 0
+
+    def produce(index: int):
+        rng = random.Random(index)
+        offered = accepted = 0
+        next_at = time.monotonic()
+        while time.monotonic() < deadline:
+            if per_thread_interval:
+                next_at += per_thread_interval
+                delay = next_at - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            offered += 1
+            if submit(factory.make(rng)) is not False:
+                accepted += 1
+        with lock:
+            counts['offered'] += offered
+            counts['accepted'] += accepted
+
+    threads = [threading.Thread(target=produce, args=(i,)) for i in range(producers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return counts
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def benchmark_ingestor(db_config: Dict[str, Any], table: str, args) -> Dict[str, Any]:
+    factory = RecordFactory(tenants=args.tenants, body_bytes=args.body_bytes)
+    ingestor = WebhookLogIngestor(
+        db_config,
+        table=table,
+        max_queue_size=args.max_queue,
+        batch_size=args.batch_size,
+        flush_interval=args.flush_interval,
+        overflow_policy=args.overflow_policy,
+        register_atexit=False
+    ).start()
+
+    # Sample committed rows once a second while the producers run
+    samples: List[float] = []
+    sampling = threading.Event()
+
+    def sample():
+        last = 0
+        while not sampling.wait(1.0):
+            written = ingestor.metrics()['written']
+            samples.append(written - last)
+            last = written
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    started = time.monotonic()
+    sampler.start()
+    counts = run_producers(ingestor.submit, factory, args.producers, args.duration, args.rate)
+    produced_seconds = time.monotonic() - started
+    sampling.set()
+    sampler.join()
+
+    ingestor.stop()
+    drained_seconds = time.monotonic() - started
+    metrics = ingestor.metrics()
+    in_table = count_rows(db_config, table)
+
+    # The first sample includes connection setup; ignore it when there are enough
+    steady = samples[1:] if len(samples) > 2 else samples
+    return {
+        'mode': 'copy',
+        'offered': counts['offered'],
+        'accepted': counts['accepted'],
+        'written': metrics['written'],
+        'rows_in_table': in_table,
+        'dropped': metrics['dropped'],
+        'failed': metrics['failed'],
+        'batches': metrics['batches'],
+        'queue_high_water': metrics['queue_high_water'],
+        'produce_seconds': round(produced_seconds, 2),
+        'drain_seconds': round(drained_seconds - produced_seconds, 2),
+        'sustained_events_per_sec': round(metrics['written'] / drained_seconds, 1),
+        'per_second_min': min(steady) if steady else 0,
+        'per_second_p50': percentile(steady, 0.5),
+        'per_second_max': max(steady) if steady else 0,
+        'copy_seconds': round(metrics['copy_seconds'], 2)
+    }
+
+
+def benchmark_single_inserts(db_config: Dict[str, Any], table: str, args) -> Dict[str, Any]:
+    """Baseline: one INSERT and commit per webhook, one connection per producer"""
+    factory = RecordFactory(tenants=args.tenants, body_bytes=args.body_bytes)
+    columns = ', '.join(WEBHOOK_LOG_COLUMNS)
+    placeholders = ', '.join(['%s'] * len(WEBHOOK_LOG_COLUMNS))
+    sql = f"INSERT INTO {table} ({columns}) VALUES ({placeholders})"
+    local = threading.local()
+    connections = []
+    connections_lock = threading.Lock()
+
+    def insert(record: Dict[str, Any]) -> bool:
+        if not hasattr(local, 'conn'):
+            local.conn = psycopg2.connect(**db_config)
+            with connections_lock:
+                connections.append(local.conn)
+        values = [json.dumps(record[col]) if col in ('request_headers', 'request_body', 'response_body')
+                  else record[col] for col in WEBHOOK_LOG_COLUMNS]
+        with local.conn.cursor() as cursor:
+            cursor.execute(sql, values)
+        local.conn.commit()
+        return True
+
+    before = count_rows(db_config, table)
+    started = time.monotonic()
+    counts = run_producers(insert, factory, args.producers, args.duration, args.rate)
+    elapsed = time.monotonic() - started
+    for conn in connections:
+        conn.close()
+    written = count_rows(db_config, table) - before
+
+    return {
+        'mode': 'single_insert',
+        'offered': counts['offered'],
+        'written': written,
+        'seconds': round(elapsed, 2),
+        'sustained_events_per_sec': round(written / elapsed, 1)
+    }
+
+
+def main():
+    """Main CLI entry point"""
+    parser = argparse.ArgumentParser(description="Benchmark COPY-based webhook log ingestion")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to produce records")
+    parser.add_argument("--producers", type=int, default=4, help="Producer threads")
+    parser.add_argument("--rate", type=float, default=0,
+                        help="Total offered events/sec across producers (0 = as fast as possible)")
+    parser.add_argument("--batch-size", type=int, default=2000, help="Records per COPY")
+    parser.add_argument("--flush-interval", type=float, default=1.0, help="Max seconds a record waits")
+    parser.add_argument("--max-queue", type=int, default=50000, help="Queue capacity")
+    parser.add_argument("--overflow-policy", default="drop_newest",
+                        choices=["drop_newest", "drop_oldest", "block"])
+    parser.add_argument("--tenants", type=int, default=50, help="Distinct saas_edge_ids")
+    parser.add_argument("--body-bytes", type=int, default=512, help="Approximate request body size")
+    parser.add_argument("--table", default="webhook_logs_benchmark", help="Scratch table name")
+    parser.add_argument("--keep-table", action="store_true", help="Do not drop the scratch table")
+    parser.add_argument("--compare-insert", action="store_true",
+                        help="Also measure single-row INSERTs")
+
+    args = parser.parse_args()
+    db_config = create_db_config()
+
+    try:
+        check_scratch_table(args.table)
+    except ValueError as e:
+        print(json.dumps({"status": "error", "message": str(e)}, indent=2))
+        exit(1)
+
+    try:
+        create_benchmark_table(db_config, args.table)
+        results = {'config': vars(args), 'copy': benchmark_ingestor(db_config, args.table, args)}
+        if args.compare_insert:
+            results['single_insert'] = benchmark_single_inserts(db_config, args.table, args)
+            baseline = results['single_insert']['sustained_events_per_sec']
+            if baseline:
+                results['speedup'] = round(results['copy']['sustained_events_per_sec'] / baseline, 1)
+        print(json.dumps(results, indent=2))
+
+    except Exception as e:
+        logger.error(f"Benchmark failed: {e}")
+        print(json.dumps({"status": "error", "message": str(e)}, indent=2))
+        exit(1)
+
+    finally:
+        if not args.keep_table:
+            try:
+                drop_benchmark_table(db_config, args.table)
+            except psycopg2.Error as e:
+                logger.warning(f"Could not drop {args.table}: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+"""
+Bulk Ingestion for saas_channel_webhook_logs
+============================================
+
+Webhook handlers call ``submit()`` with one log record per request; the
+ingestor buffers records in a bounded in-memory queue and a background thread
+writes them to PostgreSQL with ``COPY ... FROM STDIN`` in batches, instead of
+one INSERT (and one round trip and commit) per webhook hit.
+
+A batch is flushed when ``batch_size`` records are waiting or
+``flush_interval`` seconds have passed since the oldest waiting record arrived,
+whichever comes first. ``stop()`` (also registered with ``atexit``) flushes
+everything still queued.
+
+When the queue is full, ``overflow_policy`` decides what happens:
+    'drop_newest'  reject the new record (default; the caller is never blocked)
+    'drop_oldest'  discard the oldest queued record to make room
+    'block'        wait up to ``block_timeout`` seconds for room, then reject
+
+COPYs that fail on the connection (``OperationalError``/``InterfaceError``) are
+retried with backoff on a fresh connection; a batch that still fails is counted
+in ``failed`` and logged. When the database rejects the data instead (a
+malformed ``source_ip``, a deleted ``saas_flow_id``, a ``\u0000`` escape in a
+JSON body), the batch is split in halves until the offending records are
+isolated; only those are counted in ``rejected`` and kept in
+``rejected_records`` for inspection, and the rest of the batch is written.
+
+With a ``body_store`` (``webhook_body_store.WebhookBodyStore``), bodies above
+its threshold are uploaded to object storage by the writer thread before the
+COPY, and only their pointer, size and hash are written to the row.
+
+Usage:
+    ingestor = WebhookLogIngestor(create_db_config())
+    ingestor.start()
+    ingestor.submit({
+        'saas_edge_id': edge_id, 'saas_flow_id': flow_id,
+        'webhook_path': '/webhook/shopify/orders', 'http_method': 'POST',
+        'request_headers': headers, 'request_body': body,
+        'response_status': 200, 'response_time_ms': 42, 'processing_status': 'success'
+    })
+    ...
+    ingestor.stop()
+
+Requirements:
+    pip install psycopg2-binary
+"""
+
+import io
+import os
+import json
+import time
+import atexit
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Any
+import psycopg2
+
+logger = logging.getLogger(__name__)
+
+# Insertable columns of saas_channel_webhook_logs (log_id uses its default)
+WEBHOOK_LOG_COLUMNS = (
+    'saas_flow_id', 'saas_edge_id', 'webhook_path', 'http_method', 'source_ip', 'user_agent',
+    'request_headers', 'request_body', 'request_size_bytes', 'response_status', 'response_body',
+    'response_time_ms', 'processing_status', 'error_message', 'n8n_execution_id', 'received_at'
+)
+
+JSON_COLUMNS = {'request_headers', 'request_body', 'response_body'}
+
+OVERFLOW_POLICIES = ('drop_newest', 'drop_oldest', 'block')
+
+# Errors worth retrying on a fresh connection; anything else is about the data
+TRANSIENT_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+_COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def copy_value(column: str, value: Any) -> str:
+    """Render one value in COPY text format"""
+    if value is None:
+        return '\\N'
+    if column in JSON_COLUMNS:
+        value = json.dumps(value, default=str, separators=(',', ':'))
+    elif isinstance(value, datetime):
+        value = value.isoformat()
+    else:
+        value = str(value)
+    # COPY text format cannot carry NUL bytes
+    return value.replace('\x00', '').translate(_COPY_ESCAPES)
+
+
+def create_db_config() -> Dict[str, Any]:
+    """SaaS database connection settings from the environment"""
+    return {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'port': int(os.getenv('DB_PORT', '5432')),
+        'database': os.getenv('DB_NAME', 'catalog-edge-db'),
+        'user': os.getenv('DB_USER', 'postgres'),
+        'password': os.getenv('DB_PASSWORD', '')
+    }
+
+
+class WebhookLogIngestor:
+    """Buffers webhook log records and writes them with COPY in batches"""
+
+    def __init__(self,
+                 db_config: Dict[str, Any],
+                 table: str = 'saas_channel_webhook_logs',
+                 max_queue_size: int = 50000,
+                 batch_size: int = 2000,
+                 flush_interval: float = 1.0,
+                 overflow_policy: str = 'drop_newest',
+                 block_timeout: float = 0.5,
+                 max_retries: int = 3,
+                 max_rejected_records: int = 1000,
+                 body_store: Optional[Any] = None,
+                 body_upload_workers: int = 8,
+                 register_atexit: bool = True):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow_policy must be one of {OVERFLOW_POLICIES}")
+
+        self.db_config = db_config
+        self.table = table
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout
+        self.max_retries = max_retries
+        self.body_store = body_store
+        self.body_upload_workers = body_upload_workers
+        self.upload_pool: Optional[ThreadPoolExecutor] = None
+
+        self.queue: deque = deque()
+        self.condition = threading.Condition()
+        self.oldest_enqueued_at: Optional[float] = None
+        self.flush_requested = False
+        self.stopping = False
+        self.thread: Optional[threading.Thread] = None
+        self.conn = None
+
+        # Records the database refused, with the error, newest last
+        self.rejected_records: deque = deque(maxlen=max_rejected_records)
+
+        self.stats = {'submitted': 0, 'written': 0, 'dropped': 0, 'failed': 0, 'rejected': 0, 'batches': 0,
+                      'copy_seconds': 0.0, 'queue_high_water': 0,
+                      'bodies_offloaded_bytes': 0, 'offload_seconds': 0.0}
+        self.columns = WEBHOOK_LOG_COLUMNS + (tuple(body_store.columns) if body_store is not None else ())
+        self.copy_sql = (f"COPY {table} ({', '.join(self.columns)}) "
+                         f"FROM STDIN WITH (FORMAT text)")
+
+        if register_atexit:
+            atexit.register(self.stop)
+
+    def start(self) -> 'WebhookLogIngestor':
+        if self.thread is None:
+            self.stopping = False
+            if self.body_store is not None and self.upload_pool is None:
+                self.upload_pool = ThreadPoolExecutor(self.body_upload_workers,
+                                                      thread_name_prefix='webhook-body-upload')
+            self.thread = threading.Thread(target=self._run, name='webhook-log-ingestor', daemon=True)
+            self.thread.start()
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def submit(self, record: Dict[str, Any]) -> bool:
+        """Queue a record; returns False when it was dropped by the overflow policy"""
+        record.setdefault('received_at', datetime.now(timezone.utc))
+
+        with self.condition:
+            if self.stopping:
+                self.stats['dropped'] += 1
+                return False
+
+            if len(self.queue) >= self.max_queue_size:
+                if self.overflow_policy == 'drop_oldest':
+                    self.queue.popleft()
+                    self.stats['dropped'] += 1
+                elif self.overflow_policy == 'block':
+                    deadline = time.monotonic() + self.block_timeout
+                    while len(self.queue) >= self.max_queue_size and not self.stopping:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self.condition.wait(remaining)
+                    if len(self.queue) >= self.max_queue_size or self.stopping:
+                        self.stats['dropped'] += 1
+                        return False
+                else:
+                    self.stats['dropped'] += 1
+                    return False
+
+            self.queue.append(record)
+            self.stats['submitted'] += 1
+            self.stats['queue_high_water'] = max(self.stats['queue_high_water'], len(self.queue))
+            if self.oldest_enqueued_at is None:
+                self.oldest_enqueued_at = time.monotonic()
+            if len(self.queue) >= self.batch_size:
+                self.condition.notify_all()
+            return True
+
+    def metrics(self) -> Dict[str, Any]:
+        """Counters plus the current queue depth"""
+        with self.condition:
+            return {**self.stats, 'queue_depth': len(self.queue)}
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        """Ask the writer to flush now and wait until the queue is empty"""
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            self.flush_requested = True
+            self.condition.notify_all()
+            while self.queue and time.monotonic() < deadline:
+                self.condition.wait(0.05)
+            return not self.queue
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Flush everything queued and stop the writer thread"""
+        with self.condition:
+            if self.thread is None:
+                return
+            self.stopping = True
+            self.condition.notify_all()
+        self.thread.join(timeout)
+        if self.thread.is_alive():
+            logger.error(f"Webhook log ingestor did not stop within {timeout}s; "
+                         f"{len(self.queue)} records not written")
+        self.thread = None
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+        if self.upload_pool is not None:
+            self.upload_pool.shutdown(wait=True)
+            self.upload_pool = None
+        logger.info(f"Webhook log ingestor stopped: {self.stats}")
+
+    def _next_batch(self) -> Optional[List[Dict[str, Any]]]:
+        """Wait until a batch is due (size, age, flush or stop) and take it"""
+        with self.condition:
+            while True:
+                if self.queue:
+                    age = time.monotonic() - self.oldest_enqueued_at
+                    if (len(self.queue) >= self.batch_size or age >= self.flush_interval or
+                            self.flush_requested or self.stopping):
+                        break
+                    self.condition.wait(self.flush_interval - age)
+                elif self.stopping:
+                    return None
+                else:
+                    self.flush_requested = False
+                    self.condition.wait(self.flush_interval)
+
+            count = min(len(self.queue), self.batch_size)
+            batch = [self.queue.popleft() for _ in range(count)]
+            self.oldest_enqueued_at = time.monotonic() if self.queue else None
+            if not self.queue:
+                self.flush_requested = False
+            # Wake producers blocked on a full queue
+            self.condition.notify_all()
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            self._write_batch(batch)
+
+    def _connection(self):
+        if self.conn is None or self.conn.closed:
+            self.conn = psycopg2.connect(**self.db_config)
+        return self.conn
+
+    def _offload_bodies(self, batch: List[Dict[str, Any]]) -> None:
+        # Uploads happen once per batch, outside the COPY retry loop
+        started = time.monotonic()
+        self.stats['bodies_offloaded_bytes'] += sum(self.upload_pool.map(self.body_store.offload, batch))
+        self.stats['offload_seconds'] += time.monotonic() - started
+
+    def _write_batch(self, batch: List[Dict[str, Any]]) -> None:
+        if self.upload_pool is not None:
+            self._offload_bodies(batch)
+
+        lines = ['\t'.join(copy_value(col, record.get(col)) for col in self.columns) + '\n'
+                 for record in batch]
+        self._write_lines(batch, lines)
+
+    def _write_lines(self, records: List[Dict[str, Any]], lines: List[str]) -> None:
+        """COPY lines, splitting the batch to isolate records the database rejects"""
+        try:
+            self._copy(lines)
+        except TRANSIENT_ERRORS:
+            logger.error(f"Giving up on {len(records)} webhook logs after {self.max_retries + 1} attempts")
+            self.stats['failed'] += len(records)
+        except psycopg2.Error as e:
+            if len(records) == 1:
+                logger.warning(f"Rejected webhook log for {records[0].get('webhook_path')} "
+                               f"(flow {records[0].get('saas_flow_id')}): {e}")
+                self.rejected_records.append((records[0], str(e).strip()))
+                self.stats['rejected'] += 1
+                return
+            middle = len(records) // 2
+            self._write_lines(records[:middle], lines[:middle])
+            self._write_lines(records[middle:], lines[middle:])
+
+    def _copy(self, lines: List[str]) -> None:
+        """COPY and commit lines, retrying connection failures; data errors are raised at once"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                started = time.monotonic()
+                conn = self._connection()
+                with conn.cursor() as cursor:
+                    cursor.copy_expert(self.copy_sql, io.StringIO(''.join(lines)))
+                conn.commit()
+                self.stats['copy_seconds'] += time.monotonic() - started
+                self.stats['written'] += len(lines)
+                self.stats['batches'] += 1
+                return
+            except TRANSIENT_ERRORS as e:
+                logger.warning(f"COPY of {len(lines)} webhook logs failed (attempt {attempt + 1}): {e}")
+                if self.conn is not None:
+                    self.conn.close()
+                    self.conn = None
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(min(0.2 * 2 ** attempt, 5))
+            except psycopg2.Error:
+                if self.conn is not None and not self.conn.closed:
+                    self.conn.rollback()
+                raise